@@ -1,31 +1,91 @@
 # agentops/__init__.py
+"""
+Submodules are imported on first use (PEP 562): `import agentops` only loads the logger, so that
+importing the SDK costs next to nothing in CLIs and serverless functions. The client, its HTTP and
+system dependencies and the provider integrations are loaded by the first call that needs them, and
+public names like `agentops.Client` or `agentops.LLMEvent` resolve to their submodule when accessed.
+"""
+
+from __future__ import annotations
+
 import sys
-from typing import Optional, List, Union
+import threading
+from importlib import import_module
+from typing import TYPE_CHECKING, Dict, Optional, List, Union
 
-from .client import Client
-from .event import Event, ActionEvent, LLMEvent, ToolEvent, ErrorEvent
-from .decorators import record_action, track_agent, record_tool, record_function
-from .helpers import check_agentops_update
 from .log_config import logger
-from .session import Session
-import threading
-from importlib.metadata import version as get_version
-from packaging import version
 
-try:
+if TYPE_CHECKING:
+    from .client import Client
+    from .event import Event, ActionEvent, LLMEvent, ToolEvent, ErrorEvent
+    from .decorators import record_action, track_agent, record_tool, record_function
+    from .helpers import check_agentops_update
+    from .pricing import ModelPrice, PriceTable
+    from .session import Session
+    from .spans import propagate_context
+    from .exporters import EventSink
     from .partners.langchain_callback_handler import (
         LangchainCallbackHandler,
         AsyncLangchainCallbackHandler,
     )
-except ModuleNotFoundError:
-    pass
+
+# Public names and the submodules that define them
+_LAZY_ATTRIBUTES = {
+    "Client": ".client",
+    "Event": ".event",
+    "ActionEvent": ".event",
+    "LLMEvent": ".event",
+    "ToolEvent": ".event",
+    "ErrorEvent": ".event",
+    "record_action": ".decorators",
+    "track_agent": ".decorators",
+    "record_tool": ".decorators",
+    "record_function": ".decorators",
+    "check_agentops_update": ".helpers",
+    "ModelPrice": ".pricing",
+    "PriceTable": ".pricing",
+    "Session": ".session",
+    "propagate_context": ".spans",
+    "EventSink": ".exporters",
+    "LangchainCallbackHandler": ".partners.langchain_callback_handler",
+    "AsyncLangchainCallbackHandler": ".partners.langchain_callback_handler",
+}
+# Submodules that depend on packages which may not be installed
+_OPTIONAL_MODULES = {".partners.langchain_callback_handler"}
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        module = import_module(module_name, __name__)
+    except ModuleNotFoundError as e:
+        if module_name not in _OPTIONAL_MODULES:
+            raise
+        raise AttributeError(f"{name} is not available: {e}") from e
+    value = getattr(module, name)
+    # Later accesses are plain module attribute lookups
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
 
 if "autogen" in sys.modules:
+    from .client import Client
+
     Client().configure(instrument_llm_calls=False)
     Client()._initialize_autogen_logger()
     Client().add_default_tags(["autogen"])
 
 if "crewai" in sys.modules:
+    from importlib.metadata import version as get_version
+    from packaging import version
+    from .client import Client
+
     crew_version = version.parse(get_version("crewai"))
 
     # uses langchain, greater versions will use litellm and default is to instrument
@@ -47,6 +107,23 @@ def init(
     auto_start_session: Optional[bool] = None,
     inherited_session_id: Optional[str] = None,
     skip_auto_end_session: Optional[bool] = None,
+    price_table: Optional[Union[PriceTable, dict, str]] = None,
+    resource_sampling_interval: Optional[int] = None,
+    loop_lag_threshold: Optional[float] = None,
+    telemetry_port: Optional[int] = None,
+    otlp_endpoint: Optional[str] = None,
+    otlp_protocol: Optional[str] = None,
+    otlp_headers: Optional[Dict[str, str]] = None,
+    otlp_only: Optional[bool] = None,
+    sinks: Optional[List[EventSink]] = None,
+    replay_mode: Optional[str] = None,
+    replay_path: Optional[str] = None,
+    replay_stream_delay: Optional[Union[float, str]] = None,
+    response_cache: Optional[bool] = None,
+    response_cache_ttl: Optional[float] = None,
+    response_cache_size: Optional[int] = None,
+    response_cache_path: Optional[str] = None,
+    response_cache_models: Optional[List[str]] = None,
 ) -> Union[Session, None]:
     """
     Initializes the AgentOps singleton pattern.
@@ -68,8 +145,42 @@ def init(
         inherited_session_id (optional, str): Init Agentops with an existing Session
         skip_auto_end_session (optional, bool): Don't automatically end session based on your framework's decision-making
             (i.e. Crew determining when tasks are complete and ending the session)
+        price_table (PriceTable, dict, str, optional): Prices used to compute the cost of LLM calls locally.
+            Accepts a PriceTable, a dict or a path to a JSON/YAML file. Defaults to the built-in table.
+        resource_sampling_interval (int, optional): Sample the RSS, CPU %, threads, open file descriptors and network
+            bytes of the process every N milliseconds while a session is running. Disabled by default.
+        loop_lag_threshold (float, optional): Monitor the lag of asyncio event loops that record events and record
+            lags above this many milliseconds as "event_loop_lag" actions with the blocking stack. Disabled by default.
+        telemetry_port (int, optional): Serve the SDK's own health metrics (queue depth, dropped events, HTTP latency...)
+            in the Prometheus text format on http://127.0.0.1:<port>/metrics. See also Client().get_telemetry().
+        otlp_endpoint (str, optional): Also export sessions and events as OpenTelemetry traces to this OTLP/HTTP
+            collector, e.g. "http://localhost:4318".
+        otlp_protocol (str, optional): "json" (default) or "protobuf". Protobuf requires opentelemetry-proto.
+        otlp_headers (Dict[str, str], optional): Headers sent to the collector. Defaults to OTEL_EXPORTER_OTLP_HEADERS.
+        otlp_only (bool, optional): Export events only to the OTLP collector instead of the AgentOps API.
+        sinks (List[EventSink], optional): Where sessions and events are sent, see agentops.exporters. Defaults to
+            [AgentOpsHTTPSink()]. Use e.g. [JSONLFileSink("events.jsonl")] or [InMemorySink()] to run without the network.
+        replay_mode (str, optional): "record" stores every LLM call locally, "replay" serves recorded responses without
+            calling the provider and raises ReplayMissError for unrecorded requests, "auto" replays what was recorded
+            and records the rest. Read from AGENTOPS_REPLAY_MODE. Disabled by default.
+        replay_path (str, optional): Directory of the recordings. Read from AGENTOPS_REPLAY_PATH. Defaults to
+            ".agentops/replay".
+        replay_stream_delay (float, str, optional): Pacing of replayed streams, including complete responses replayed
+            to streaming requests as synthesized chunks: a delay in milliseconds before each chunk, or "recorded" to
+            use the recorded delays. Read from AGENTOPS_REPLAY_STREAM_DELAY. By default, chunks are not delayed.
+        response_cache (bool, optional): Serve repeated deterministic LLM calls (temperature 0, not streamed) from a
+            cache instead of calling the provider. Read from AGENTOPS_RESPONSE_CACHE. Disabled by default.
+        response_cache_ttl (float, optional): Seconds a cached response is served for. Defaults to 3600.
+        response_cache_size (int, optional): Responses kept in memory, least recently used first out. Defaults to 1024.
+        response_cache_path (str, optional): Directory of an on-disk tier, shared across processes and runs. Read from
+            AGENTOPS_RESPONSE_CACHE_PATH. By default, responses are only cached in memory.
+        response_cache_models (List[str], optional): Models whose calls are cached, as glob patterns, e.g. ["gpt-4o*"].
+            Read from AGENTOPS_RESPONSE_CACHE_MODELS, comma-separated. Defaults to every model.
     Attributes:
     """
+    from .client import Client
+    from .helpers import check_agentops_update
+
     Client().unsuppress_logs()
     t = threading.Thread(target=check_agentops_update)
     t.start()
@@ -93,6 +204,23 @@ def init(
         instrument_llm_calls=instrument_llm_calls,
         auto_start_session=auto_start_session,
         skip_auto_end_session=skip_auto_end_session,
+        price_table=price_table,
+        resource_sampling_interval=resource_sampling_interval,
+        loop_lag_threshold=loop_lag_threshold,
+        telemetry_port=telemetry_port,
+        otlp_endpoint=otlp_endpoint,
+        otlp_protocol=otlp_protocol,
+        otlp_headers=otlp_headers,
+        otlp_only=otlp_only,
+        sinks=sinks,
+        replay_mode=replay_mode,
+        replay_path=replay_path,
+        replay_stream_delay=replay_stream_delay,
+        response_cache=response_cache,
+        response_cache_ttl=response_cache_ttl,
+        response_cache_size=response_cache_size,
+        response_cache_path=response_cache_path,
+        response_cache_models=response_cache_models,
     )
 
     if inherited_session_id is not None:
@@ -118,6 +246,23 @@ def configure(
     instrument_llm_calls: Optional[bool] = None,
     auto_start_session: Optional[bool] = None,
     skip_auto_end_session: Optional[bool] = None,
+    price_table: Optional[Union[PriceTable, dict, str]] = None,
+    resource_sampling_interval: Optional[int] = None,
+    loop_lag_threshold: Optional[float] = None,
+    telemetry_port: Optional[int] = None,
+    otlp_endpoint: Optional[str] = None,
+    otlp_protocol: Optional[str] = None,
+    otlp_headers: Optional[Dict[str, str]] = None,
+    otlp_only: Optional[bool] = None,
+    sinks: Optional[List[EventSink]] = None,
+    replay_mode: Optional[str] = None,
+    replay_path: Optional[str] = None,
+    replay_stream_delay: Optional[Union[float, str]] = None,
+    response_cache: Optional[bool] = None,
+    response_cache_ttl: Optional[float] = None,
+    response_cache_size: Optional[int] = None,
+    response_cache_path: Optional[str] = None,
+    response_cache_models: Optional[List[str]] = None,
 ):
     """
     Configure the AgentOps Client
@@ -133,7 +278,26 @@ def configure(
         auto_start_session (bool, optional): Whether to start a session automatically when the client is created.
         skip_auto_end_session (bool, optional): Don't automatically end session based on your framework's decision-making
             (i.e. Crew determining when tasks are complete and ending the session)
+        price_table (PriceTable, dict, str, optional): Prices used to compute the cost of LLM calls locally.
+        resource_sampling_interval (int, optional): Sample process resource usage every N milliseconds during sessions.
+        loop_lag_threshold (float, optional): Monitor asyncio event loop lag and record spikes above N milliseconds.
+        telemetry_port (int, optional): Serve the SDK's own health metrics for Prometheus on this local port.
+        otlp_endpoint (str, optional): Also export sessions and events as traces to this OTLP/HTTP collector.
+        otlp_protocol (str, optional): "json" or "protobuf".
+        otlp_headers (Dict[str, str], optional): Headers sent to the collector.
+        otlp_only (bool, optional): Export events only to the OTLP collector instead of the AgentOps API.
+        sinks (List[EventSink], optional): Where sessions and events are sent. Defaults to [AgentOpsHTTPSink()].
+        replay_mode (str, optional): "record", "replay" or "auto" to record LLM calls locally or serve recorded ones.
+        replay_path (str, optional): Directory of the recordings. Defaults to ".agentops/replay".
+        replay_stream_delay (float, str, optional): Milliseconds before each replayed chunk, or "recorded".
+        response_cache (bool, optional): Serve repeated deterministic LLM calls from a cache.
+        response_cache_ttl (float, optional): Seconds a cached response is served for. Defaults to 3600.
+        response_cache_size (int, optional): Responses kept in memory. Defaults to 1024.
+        response_cache_path (str, optional): Directory of an on-disk tier. Defaults to memory only.
+        response_cache_models (List[str], optional): Glob patterns of the models whose calls are cached.
     """
+    from .client import Client
+
     Client().configure(
         api_key=api_key,
         parent_key=parent_key,
@@ -144,6 +308,23 @@ def configure(
         instrument_llm_calls=instrument_llm_calls,
         auto_start_session=auto_start_session,
         skip_auto_end_session=skip_auto_end_session,
+        price_table=price_table,
+        resource_sampling_interval=resource_sampling_interval,
+        loop_lag_threshold=loop_lag_threshold,
+        telemetry_port=telemetry_port,
+        otlp_endpoint=otlp_endpoint,
+        otlp_protocol=otlp_protocol,
+        otlp_headers=otlp_headers,
+        otlp_only=otlp_only,
+        sinks=sinks,
+        replay_mode=replay_mode,
+        replay_path=replay_path,
+        replay_stream_delay=replay_stream_delay,
+        response_cache=response_cache,
+        response_cache_ttl=response_cache_ttl,
+        response_cache_size=response_cache_size,
+        response_cache_path=response_cache_path,
+        response_cache_models=response_cache_models,
     )
 
 
@@ -159,6 +340,8 @@ def start_session(
             e.g. ["test_run"].
         inherited_session_id: (str, optional): Set the session ID to inherit from another client
     """
+    from .client import Client
+
     Client().unsuppress_logs()
 
     if not Client().is_initialized:
@@ -183,6 +366,8 @@ def end_session(
         end_state_reason (str, optional): The reason for ending the session.
         video (str, optional): URL to a video recording of the session
     """
+    from .client import Client
+
     Client().unsuppress_logs()
 
     if Client().is_multi_session:
@@ -209,6 +394,8 @@ def record(event: Union[Event, ErrorEvent]):
     Args:
         event (Event): The event to record.
     """
+    from .client import Client
+
     Client().unsuppress_logs()
 
     if Client().is_multi_session:
@@ -232,6 +419,8 @@ def add_tags(tags: List[str]):
     Args:
         tags (List[str]): The list of tags to append.
     """
+    from .client import Client
+
     if Client().is_multi_session:
         return logger.warning(
             "Could not add tags to session - multiple sessions detected. You must use session.add_tags() instead of agentops.add_tags()"
@@ -253,6 +442,8 @@ def set_tags(tags: List[str]):
     Args:
         tags (List[str]): The list of tags to set.
     """
+    from .client import Client
+
     if Client().is_multi_session:
         return logger.warning(
             "Could not set tags on session - multiple sessions detected. You must use session.set_tags() instead of agentops.set_tags()"
@@ -267,11 +458,36 @@ def set_tags(tags: List[str]):
     Client().set_tags(tags)
 
 
+def monitor_event_loop(
+    threshold_ms: Optional[float] = None, interval_ms: Optional[float] = None
+):
+    """
+    Monitor the lag of the running asyncio event loop until the session ends. Call it from a coroutine.
+
+    Args:
+        threshold_ms (float, optional): Lag in milliseconds above which a spike is recorded with the stack
+            of the blocking code. Defaults to the `loop_lag_threshold` option, or 100.
+        interval_ms (float, optional): Time between heartbeats. Defaults to half the threshold.
+    """
+    from .client import Client
+
+    if Client().is_multi_session:
+        return logger.warning(
+            "Could not monitor the event loop - multiple sessions detected. You must use session.monitor_event_loop() instead of agentops.monitor_event_loop()"
+        )
+
+    return Client().monitor_event_loop(threshold_ms, interval_ms)
+
+
 def get_api_key() -> Union[str, None]:
+    from .client import Client
+
     return Client().api_key
 
 
 def set_api_key(api_key: str) -> None:
+    from .client import Client
+
     Client().configure(api_key=api_key)
 
 
@@ -282,15 +498,21 @@ def set_parent_key(parent_key: str):
     Args:
         parent_key (str): The API key of the parent organization to set.
     """
+    from .client import Client
+
     Client().configure(parent_key=parent_key)
 
 
 def stop_instrumenting():
+    from .client import Client
+
     if Client().is_initialized:
         Client().stop_instrumenting()
 
 
 def create_agent(name: str, agent_id: Optional[str] = None):
+    from .client import Client
+
     if Client().is_multi_session:
         return logger.warning(
             "Could not create agent - multiple sessions detected. You must use session.create_agent() instead of agentops.create_agent()"
@@ -312,6 +534,8 @@ def get_session(session_id: str):
     Args:
         session_id (str): the session id for the session to be retreived
     """
+    from .client import Client
+
     Client().unsuppress_logs()
 
     return Client().get_session(session_id)
@@ -320,4 +544,6 @@ def get_session(session_id: str):
 # Mostly used for unit testing -
 # prevents unexpected sessions on new tests
 def end_all_sessions() -> None:
+    from .client import Client
+
     return Client().end_all_sessions()
@@ -0,0 +1,499 @@
+"""
+Offline analytics over exported events.
+
+Loads events from JSONLFileSink spools (plain or gzipped, including rotated files), JSON exports or any
+iterable of event dicts, such as SQLiteStore.iter_events, into columnar NumPy arrays, and computes
+per-model (or per-tool, per-action) throughput, latency percentiles, tokens per second, cost and error
+rates with vectorized operations.
+
+Files are read in chunks of `chunk_size` events, and statistics are accumulated chunk by chunk, so
+memory is bounded whatever the size of the export; JSON exports are decoded one event at a time too.
+Latency percentiles come from DDSketches (see `agentops.sketch`), within 1% of the exact values.
+
+Requires numpy: `pip install agentops[analytics]`.
+"""
+
+import glob
+import gzip
+import json
+import math
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+try:
+    import numpy as np
+except ImportError as e:  # pragma: no cover
+    raise ImportError(
+        "agentops.analytics requires numpy. Install it with `pip install agentops[analytics]`."
+    ) from e
+
+from .enums import EventType
+from .metrics import parse_ISO_time
+from .sketch import MIN_INDEXABLE_VALUE, DDSketch
+
+EVENT_TYPES = (
+    EventType.LLM.value,
+    EventType.ACTION.value,
+    EventType.API.value,
+    EventType.TOOL.value,
+    EventType.ERROR.value,
+)
+_TYPE_CODES = {event_type: code for code, event_type in enumerate(EVENT_TYPES)}
+_ERROR_CODE = _TYPE_CODES[EventType.ERROR.value]
+
+# Errors are attributed to the model or tool of their trigger event, which is written just before them
+_RECENT_EVENTS = 65_536
+
+Source = Union[str, Sequence[str], Iterable[dict]]
+
+
+@dataclass
+class EventColumns:
+    """
+    A chunk of events as columns. Strings are dictionary-encoded: `key` holds codes into `keys`
+    (-1 when missing), shared by all the chunks of a load.
+
+    key is the model of LLM events, the tool name of tool events and the action type of actions. The
+    key of an error is the key of the event that triggered it, and its `trigger_type` that event's type.
+    """
+
+    keys: List[str]
+    event_type: "np.ndarray"  # int8 codes into EVENT_TYPES, -1 if unknown
+    trigger_type: "np.ndarray"  # int8, errors only
+    key: "np.ndarray"  # int32
+    start: "np.ndarray"  # float64 epoch seconds, NaN if unknown
+    end: "np.ndarray"  # float64 epoch seconds
+    duration_ms: "np.ndarray"  # float64, NaN if unknown
+    prompt_tokens: "np.ndarray"  # int64
+    completion_tokens: "np.ndarray"  # int64
+    cost: "np.ndarray"  # float64, NaN if unknown
+
+    def __len__(self) -> int:
+        return len(self.event_type)
+
+
+def _epoch_seconds(timestamps: List[Optional[str]]) -> "np.ndarray":
+    """ISO timestamps as epoch seconds. UTC timestamps, all of those get_ISO_time writes, are parsed by numpy."""
+    result = np.full(len(timestamps), np.nan)
+    utc_index: List[int] = []
+    utc_values: List[str] = []
+    for i, value in enumerate(timestamps):
+        if not value:
+            continue
+        if value.endswith("+00:00"):
+            utc_index.append(i)
+            utc_values.append(value[:-6])
+        elif value.endswith("Z"):
+            utc_index.append(i)
+            utc_values.append(value[:-1])
+        else:
+            parsed = parse_ISO_time(value)
+            if parsed is not None:
+                result[i] = parsed.timestamp()
+    if utc_values:
+        try:
+            micros = np.array(utc_values, dtype="datetime64[us]").astype(np.int64)
+            result[utc_index] = micros / 1_000_000
+        except ValueError:
+            for i, value in zip(utc_index, utc_values):
+                parsed = parse_ISO_time(value + "+00:00")
+                if parsed is not None:
+                    result[i] = parsed.timestamp()
+    return result
+
+
+def _number(value, default=0):
+    return (
+        value
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+        else default
+    )
+
+
+def _key_of(event: dict) -> Optional[str]:
+    event_type = event.get("event_type")
+    if event_type == EventType.LLM.value:
+        return event.get("model")
+    if event_type == EventType.ACTION.value:
+        return event.get("action_type")
+    return event.get("name")
+
+
+def _open(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def _expand(paths: Union[str, Sequence[str]]) -> List[str]:
+    if isinstance(paths, str):
+        paths = [paths]
+    expanded: List[str] = []
+    for path in paths:
+        path = os.path.expanduser(path)
+        if os.path.isdir(path):
+            found = glob.glob(os.path.join(path, "*.jsonl*")) + glob.glob(
+                os.path.join(path, "*.json")
+            )
+            expanded.extend(sorted(found))
+        elif glob.has_magic(path):
+            expanded.extend(sorted(glob.glob(path)))
+        else:
+            expanded.append(path)
+    return expanded
+
+
+_WHITESPACE = re.compile(r"\s*")
+
+
+class _JSONStream:
+    """Decodes the values of a JSON document one at a time, reading the file as they are needed."""
+
+    def __init__(self, f, read_size: int = 1 << 16):
+        self._f = f
+        self._read_size = read_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+
+    def _read(self) -> bool:
+        # Reads at least as much as is buffered, so that a large value is decoded in a few attempts
+        data = self._f.read(max(self._read_size, len(self._buffer) - self._pos))
+        if not data:
+            return False
+        self._buffer = self._buffer[self._pos :] + data
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """The next character that isn't whitespace, or "" at the end of the file."""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Invalid JSON export: expected {char!r} at {self._pos}")
+        self._pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._read():
+                    raise
+                continue
+            # A number at the end of the buffer may go on in the rest of the file
+            if end < len(self._buffer) or not self._read():
+                self._pos = end
+                return value
+
+    def array(self) -> Iterator:
+        self.expect("[")
+        while self.peek() != "]":
+            yield self.value()
+            if self.peek() == ",":
+                self._pos += 1
+        self.expect("]")
+
+
+def _iter_json_export(f, read_size: int = 1 << 16) -> Iterator[dict]:
+    """Events of a JSON export, a list of events or {"events": [...]}, decoded one at a time."""
+    stream = _JSONStream(f, read_size)
+    if stream.peek() != "{":
+        yield from stream.array()
+        return
+    stream.expect("{")
+    while stream.peek() != "}":
+        key = stream.value()
+        stream.expect(":")
+        if key == "events":
+            yield from stream.array()
+        else:
+            stream.value()
+        if stream.peek() == ",":
+            stream.expect(",")
+
+
+def iter_events(source: Source) -> Iterator[dict]:
+    """
+    Events of a source, one at a time. A source is a path, glob or directory of JSON Lines files
+    (optionally gzipped), a JSON export holding a list of events (or {"events": [...]}), a list of
+    those, or an iterable of event dicts. Both JSON exports and JSON Lines are streamed.
+    Session records written by JSONLFileSink are skipped.
+    """
+    if not isinstance(source, str) and not (
+        isinstance(source, (list, tuple)) and source and isinstance(source[0], str)
+    ):
+        yield from source
+        return
+    for path in _expand(source):
+        with _open(path) as f:
+            if path.endswith((".json", ".json.gz")):
+                yield from (
+                    e for e in _iter_json_export(f) if e.get("event_type") != "session"
+                )
+                continue
+            for line in f:
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if event.get("event_type") != "session":
+                    yield event
+
+
+def load_columns(source: Source, chunk_size: int = 100_000) -> Iterator[EventColumns]:
+    """Load a source in chunks of at most `chunk_size` events. See `iter_events` for sources."""
+    keys: List[str] = []
+    key_codes: Dict[str, int] = {}
+    # id -> (event type code, key code) of recent events, to attribute errors to their trigger
+    recent: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def code_of(key: Optional[str]) -> int:
+        if key is None:
+            return -1
+        code = key_codes.get(key)
+        if code is None:
+            code = key_codes[key] = len(keys)
+            keys.append(key)
+        return code
+
+    def build(rows: List[tuple], starts: List, ends: List) -> EventColumns:
+        types, triggers, codes, prompt, completion, cost = zip(*rows)
+        start = _epoch_seconds(starts)
+        end = _epoch_seconds(ends)
+        duration = np.maximum((end - start) * 1000, 0.0)
+        return EventColumns(
+            keys=keys,
+            event_type=np.array(types, dtype=np.int8),
+            trigger_type=np.array(triggers, dtype=np.int8),
+            key=np.array(codes, dtype=np.int32),
+            start=start,
+            end=end,
+            duration_ms=duration,
+            prompt_tokens=np.array(prompt, dtype=np.int64),
+            completion_tokens=np.array(completion, dtype=np.int64),
+            cost=np.array(cost, dtype=np.float64),
+        )
+
+    rows: List[tuple] = []
+    starts: List[Optional[str]] = []
+    ends: List[Optional[str]] = []
+    for event in iter_events(source):
+        type_code = _TYPE_CODES.get(event.get("event_type"), -1)
+        trigger_code = -1
+        if type_code == _ERROR_CODE:
+            trigger = recent.get(str(event.get("trigger_event_id")))
+            if trigger is not None:
+                trigger_code, key_code = trigger
+            else:
+                trigger_code = _TYPE_CODES.get(event.get("trigger_event_type"), -1)
+                key_code = -1
+            starts.append(event.get("timestamp"))
+            ends.append(event.get("timestamp"))
+        else:
+            key_code = code_of(_key_of(event))
+            if event.get("id") is not None:
+                recent[str(event["id"])] = (type_code, key_code)
+                if len(recent) > _RECENT_EVENTS:
+                    recent.popitem(last=False)
+            starts.append(event.get("init_timestamp"))
+            ends.append(event.get("end_timestamp") or event.get("init_timestamp"))
+        rows.append(
+            (
+                type_code,
+                trigger_code,
+                key_code,
+                _number(event.get("prompt_tokens")),
+                _number(event.get("completion_tokens")),
+                _number(event.get("cost"), math.nan),
+            )
+        )
+        if len(rows) >= chunk_size:
+            yield build(rows, starts, ends)
+            rows, starts, ends = [], [], []
+    if rows:
+        yield build(rows, starts, ends)
+
+
+def _sketch_of(values: "np.ndarray", relative_accuracy: float) -> DDSketch:
+    """A DDSketch of an array, binned in one vectorized pass."""
+    sketch = DDSketch(relative_accuracy)
+    positive = values[values > MIN_INDEXABLE_VALUE]
+    data = {
+        "relative_accuracy": relative_accuracy,
+        "count": int(len(values)),
+        "sum": float(values.sum()),
+        "min": float(values.min()) if len(values) else None,
+        "max": float(values.max()) if len(values) else None,
+        "zero_count": int(len(values) - len(positive)),
+        "offset": 0,
+        "counts": [],
+    }
+    if len(positive):
+        indexes = np.ceil(np.log(positive) / math.log(sketch.gamma)).astype(np.int64)
+        offset = int(indexes.min())
+        data["offset"] = offset
+        data["counts"] = np.bincount(indexes - offset).tolist()
+    return DDSketch.from_dict(data)
+
+
+class EventStats:
+    """
+    Statistics of one event type, grouped by key (model, tool name or action type), accumulated over
+    chunks of events in constant memory per key.
+
+    Args:
+        event_type (str, optional): "llms", "tools", "actions" or "apis". Defaults to "llms".
+        relative_accuracy (float, optional): Accuracy of latency percentiles. Defaults to 0.01.
+    """
+
+    def __init__(
+        self, event_type: str = EventType.LLM.value, relative_accuracy: float = 0.01
+    ):
+        self.event_type = event_type
+        self._type_code = _TYPE_CODES[event_type]
+        self.relative_accuracy = relative_accuracy
+        self.keys: List[str] = []
+        self.calls = np.zeros(0, dtype=np.int64)
+        self.errors = np.zeros(0, dtype=np.int64)
+        self.prompt_tokens = np.zeros(0, dtype=np.int64)
+        self.completion_tokens = np.zeros(0, dtype=np.int64)
+        self.cost = np.zeros(0)
+        self.time_ms = np.zeros(0)
+        self.first_start = np.zeros(0)
+        self.last_end = np.zeros(0)
+        self.sketches: Dict[int, DDSketch] = {}
+
+    def _grow(self, size: int) -> None:
+        grow = size - len(self.calls)
+        if grow <= 0:
+            return
+        for name in ("calls", "errors", "prompt_tokens", "completion_tokens"):
+            setattr(
+                self,
+                name,
+                np.concatenate([getattr(self, name), np.zeros(grow, dtype=np.int64)]),
+            )
+        for name in ("cost", "time_ms"):
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros(grow)]))
+        self.first_start = np.concatenate([self.first_start, np.full(grow, np.inf)])
+        self.last_end = np.concatenate([self.last_end, np.full(grow, -np.inf)])
+
+    def update(self, columns: EventColumns) -> None:
+        self.keys = columns.keys
+        size = len(self.keys)
+        self._grow(size)
+
+        mask = (columns.event_type == self._type_code) & (columns.key >= 0)
+        key = columns.key[mask]
+        duration = columns.duration_ms[mask]
+        known = ~np.isnan(duration)
+
+        self.calls += np.bincount(key, minlength=size)
+        self.prompt_tokens += np.bincount(
+            key, weights=columns.prompt_tokens[mask], minlength=size
+        ).astype(np.int64)
+        self.completion_tokens += np.bincount(
+            key, weights=columns.completion_tokens[mask], minlength=size
+        ).astype(np.int64)
+        self.cost += np.bincount(
+            key, weights=np.nan_to_num(columns.cost[mask]), minlength=size
+        )
+        self.time_ms += np.bincount(key[known], weights=duration[known], minlength=size)
+
+        start, end = columns.start[mask], columns.end[mask]
+        timed = ~np.isnan(start) & ~np.isnan(end)
+        np.minimum.at(self.first_start, key[timed], start[timed])
+        np.maximum.at(self.last_end, key[timed], end[timed])
+
+        errors = (
+            (columns.event_type == _ERROR_CODE)
+            & (columns.trigger_type == self._type_code)
+            & (columns.key >= 0)
+        )
+        self.errors += np.bincount(columns.key[errors], minlength=size)
+
+        # Sort once, then sketch each key's contiguous slice
+        key, duration = key[known], duration[known]
+        order = np.argsort(key, kind="stable")
+        key, duration = key[order], duration[order]
+        boundaries = np.flatnonzero(np.diff(key)) + 1
+        for group in np.split(np.arange(len(key)), boundaries):
+            if not len(group):
+                continue
+            code = int(key[group[0]])
+            sketch = _sketch_of(duration[group], self.relative_accuracy)
+            if code in self.sketches:
+                self.sketches[code].merge(sketch)
+            else:
+                self.sketches[code] = sketch
+
+    def report(self, quantiles: Sequence[float] = (0.5, 0.95, 0.99)) -> Dict[str, dict]:
+        """
+        {key: stats}, where stats are calls, errors, error_rate, calls_per_second (over the span from
+        the first start to the last end), mean_ms, a pXX latency for each quantile, prompt_tokens,
+        completion_tokens, tokens_per_second (completion tokens per second of call time) and cost.
+        """
+        report: Dict[str, dict] = {}
+        span_s = np.where(
+            self.last_end > self.first_start, self.last_end - self.first_start, np.nan
+        )
+        for code in np.flatnonzero(self.calls):
+            calls = int(self.calls[code])
+            time_ms = float(self.time_ms[code])
+            sketch = self.sketches.get(int(code))
+            span = float(span_s[code])
+            stats = {
+                "calls": calls,
+                "errors": int(self.errors[code]),
+                "error_rate": float(self.errors[code]) / calls,
+                "calls_per_second": calls / span if not math.isnan(span) else None,
+                "mean_ms": sketch.mean if sketch is not None else None,
+            }
+            for q in quantiles:
+                stats[f"p{q * 100:g}"] = (
+                    sketch.quantile(q) if sketch is not None else None
+                )
+            stats.update(
+                prompt_tokens=int(self.prompt_tokens[code]),
+                completion_tokens=int(self.completion_tokens[code]),
+                tokens_per_second=(
+                    float(self.completion_tokens[code]) / (time_ms / 1000)
+                    if time_ms > 0
+                    else None
+                ),
+                cost=float(self.cost[code]),
+            )
+            report[self.keys[code]] = stats
+        return report
+
+
+def summarize(
+    source: Source,
+    event_type: str = EventType.LLM.value,
+    chunk_size: int = 100_000,
+    quantiles: Sequence[float] = (0.5, 0.95, 0.99),
+) -> Dict[str, dict]:
+    """
+    Per-model (or per-tool, per-action) statistics of a source of events. See `EventStats.report`.
+
+    Args:
+        source: Paths, globs or directories of JSON Lines or JSON exports, or an iterable of event dicts.
+        event_type (str, optional): "llms" (grouped by model), "tools" (by name), "actions" (by action
+            type) or "apis". Defaults to "llms".
+        chunk_size (int, optional): Events loaded at a time. Defaults to 100,000.
+        quantiles (Sequence[float], optional): Latency quantiles to report. Defaults to p50, p95, p99.
+    """
+    stats = EventStats(event_type)
+    for columns in load_columns(source, chunk_size):
+        stats.update(columns)
+    return stats.report(quantiles)
@@ -1,8 +1,150 @@
 import argparse
-from .time_travel import fetch_time_travel_id, set_time_travel_active_state
+import os
+import re
+import time
+from datetime import datetime
+from typing import List, Optional
 
+from .time_travel import (
+    compile_time_travel_cache,
+    fetch_time_travel_id,
+    set_time_travel_active_state,
+)
 
-def main():
+
+def parse_since(value: Optional[str]) -> Optional[float]:
+    """ "today", a duration such as "30m", "24h" or "7d", or an ISO timestamp, as epoch seconds."""
+    if value is None:
+        return None
+    if value == "today":
+        midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        return midnight.timestamp()
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhd])", value)
+    if match:
+        seconds = {"s": 1, "m": 60, "h": 3600, "d": 86400}[match.group(2)]
+        return time.time() - float(match.group(1)) * seconds
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed.timestamp()
+
+
+def _print_table(rows: List[dict], columns: List[str]) -> None:
+    def cell(value) -> str:
+        if value is None:
+            return "-"
+        if isinstance(value, float):
+            return (
+                f"{value:.6f}".rstrip("0").rstrip(".") if value < 1 else f"{value:.1f}"
+            )
+        return str(value)
+
+    cells = [[cell(row.get(column)) for column in columns] for row in rows]
+    widths = [
+        max([len(column)] + [len(r[i]) for r in cells])
+        for i, column in enumerate(columns)
+    ]
+    print("  ".join(column.ljust(w) for column, w in zip(columns, widths)))
+    for r in cells:
+        print("  ".join(value.ljust(w) for value, w in zip(r, widths)))
+
+
+def _store_command(args) -> None:
+    from .exporters.sqlite import SQLiteStore
+
+    if not os.path.exists(os.path.expanduser(args.db)):
+        print(f"No local store at {args.db}")
+        return
+    store = SQLiteStore(args.db)
+    since = parse_since(getattr(args, "since", None))
+    event_type = getattr(args, "type", None)
+    if event_type == "all":
+        event_type = None
+
+    if args.store_command == "sessions":
+        rows = store.sessions(since=since, limit=args.limit)
+        _print_table(
+            rows,
+            [
+                "session_id",
+                "init_timestamp",
+                "duration_ms",
+                "end_state",
+                "events",
+                "cost",
+            ],
+        )
+    elif args.store_command == "slowest":
+        rows = store.query_events(
+            event_type=event_type,
+            model=args.model,
+            since=since,
+            order_by="duration_ms",
+            descending=True,
+            limit=args.limit,
+        )
+        _print_table(
+            rows,
+            [
+                "duration_ms",
+                "event_type",
+                "name",
+                "model",
+                "init_timestamp",
+                "session_id",
+                "id",
+            ],
+        )
+    elif args.store_command == "stats":
+        rows = store.stats(group_by=args.by, event_type=event_type, since=since)
+        _print_table(
+            rows,
+            [
+                "key",
+                "count",
+                "total_ms",
+                "avg_ms",
+                "max_ms",
+                "prompt_tokens",
+                "completion_tokens",
+                "cost",
+            ],
+        )
+    elif args.store_command == "events":
+        rows = store.query_events(session_id=args.session_id, limit=args.limit)
+        _print_table(
+            rows,
+            [
+                "init_timestamp",
+                "event_type",
+                "name",
+                "model",
+                "duration_ms",
+                "id",
+                "parent_id",
+            ],
+        )
+    store.close()
+
+
+def _trace_command(args) -> None:
+    from .exporters.chrome_trace import write_chrome_trace
+    from .exporters.sqlite import SQLiteStore
+
+    out = args.output or f"{args.session_id}.trace.json"
+    if args.jsonl:
+        written = write_chrome_trace(args.jsonl, out, session_id=args.session_id)
+    else:
+        if not os.path.exists(os.path.expanduser(args.db)):
+            print(f"No local store at {args.db}")
+            return
+        store = SQLiteStore(args.db)
+        written = write_chrome_trace(store, out, session_id=args.session_id)
+        store.close()
+    print(
+        f"Wrote {written} trace events to {out}. Open it in https://ui.perfetto.dev or chrome://tracing"
+    )
+
+
+def main(argv: Optional[List[str]] = None):
     parser = argparse.ArgumentParser(description="AgentOps CLI")
     subparsers = parser.add_subparsers(dest="command")
 
@@ -25,8 +167,79 @@ def main():
         action="store_true",
         help="Turns off Time Travel Debugging",
     )
+    timetravel_parser.add_argument(
+        "--compile",
+        nargs="?",
+        const="",
+        metavar="CACHE",
+        help="Compiles the cache file (agentops_time_travel.json by default) into a memory-mapped .ttc file, "
+        "which opens in constant time however large the cache is",
+    )
+
+    store_parser = subparsers.add_parser(
+        "store", help="Query the local session store (SQLiteStore)"
+    )
+    store_parser.add_argument(
+        "--db",
+        default=os.environ.get("AGENTOPS_STORE_PATH", "~/.agentops/sessions.db"),
+        help="Path of the store. Defaults to $AGENTOPS_STORE_PATH or ~/.agentops/sessions.db",
+    )
+    store_subparsers = store_parser.add_subparsers(dest="store_command", required=True)
+    since_help = 'Only include events since "today", a duration ("30m", "24h", "7d") or an ISO timestamp'
+
+    sessions_parser = store_subparsers.add_parser(
+        "sessions", help="Most recent sessions"
+    )
+    sessions_parser.add_argument("--since", help=since_help)
+    sessions_parser.add_argument("--limit", type=int, default=20)
+
+    slowest_parser = store_subparsers.add_parser(
+        "slowest", help='Slowest events, e.g. "agentops store slowest --since today"'
+    )
+    slowest_parser.add_argument(
+        "--type",
+        default="llms",
+        help="Event type: llms, tools, actions, errors or all. Defaults to llms",
+    )
+    slowest_parser.add_argument("--model", help="Only include this model")
+    slowest_parser.add_argument("--since", help=since_help)
+    slowest_parser.add_argument("--limit", type=int, default=20)
+
+    stats_parser = store_subparsers.add_parser(
+        "stats", help="Latency, tokens and cost grouped by model, name or agent"
+    )
+    stats_parser.add_argument(
+        "--by",
+        default="model",
+        choices=["model", "name", "agent_id", "event_type", "session_id"],
+    )
+    stats_parser.add_argument("--type", default="llms", help="Event type or all")
+    stats_parser.add_argument("--since", help=since_help)
+
+    events_parser = store_subparsers.add_parser("events", help="Events of a session")
+    events_parser.add_argument("session_id")
+    events_parser.add_argument("--limit", type=int, default=None)
+
+    trace_parser = subparsers.add_parser(
+        "trace",
+        help="Export a session as a Chrome trace, for Perfetto or chrome://tracing",
+    )
+    trace_parser.add_argument("session_id")
+    trace_parser.add_argument(
+        "-o",
+        "--output",
+        help='Output file, gzipped if it ends with ".gz". Defaults to SESSION_ID.trace.json',
+    )
+    trace_parser.add_argument(
+        "--db",
+        default=os.environ.get("AGENTOPS_STORE_PATH", "~/.agentops/sessions.db"),
+        help="Local store to read the session from. Defaults to $AGENTOPS_STORE_PATH or ~/.agentops/sessions.db",
+    )
+    trace_parser.add_argument(
+        "--jsonl", help="Read the session from a JSONLFileSink file instead"
+    )
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     if args.command in ["timetravel", "tt"]:
         if args.branch_name:
@@ -35,3 +248,10 @@ def main():
             set_time_travel_active_state(True)
         if args.off:
             set_time_travel_active_state(False)
+        if args.compile is not None:
+            count = compile_time_travel_cache(args.compile or None)
+            print(f"Compiled {count} completion overrides")
+    elif args.command == "store":
+        _store_command(args)
+    elif args.command == "trace":
+        _trace_command(args)
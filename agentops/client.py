@@ -15,19 +15,25 @@ import threading
 import traceback
 from decimal import Decimal
 from uuid import UUID, uuid4
-from typing import Optional, List, Union, Tuple
+from typing import TYPE_CHECKING, Dict, Optional, List, Union, Tuple
 from termcolor import colored
 
 from .event import Event, ErrorEvent
 from .singleton import (
     conditional_singleton,
 )
-from .session import Session, active_sessions
+from .session import Session, active_sessions, ended_sessions_latency, shutdown_sinks
+from .sketch import LatencySketches
 from .host_env import get_host_env
 from .log_config import logger
 from .meta_client import MetaClient
 from .config import Configuration
-from .llms import LlmTracker
+from .telemetry import start_prometheus_server, telemetry
+from .exporters import EventSink
+from .pricing import PriceTable
+
+if TYPE_CHECKING:
+    from .llms import LlmTracker
 
 
 @conditional_singleton
@@ -35,7 +41,7 @@ class Client(metaclass=MetaClient):
     def __init__(self):
         self._pre_init_messages: List[str] = []
         self._initialized: bool = False
-        self._llm_tracker: Optional[LlmTracker] = None
+        self._llm_tracker: Optional["LlmTracker"] = None
         self._sessions: List[Session] = active_sessions
         self._config = Configuration()
         self._pre_init_queue = {"agents": []}
@@ -48,6 +54,14 @@ class Client(metaclass=MetaClient):
                 "AGENTOPS_ENV_DATA_OPT_OUT", "False"
             ).lower()
             == "true",
+            replay_mode=os.environ.get("AGENTOPS_REPLAY_MODE"),
+            replay_path=os.environ.get("AGENTOPS_REPLAY_PATH"),
+            replay_stream_delay=os.environ.get("AGENTOPS_REPLAY_STREAM_DELAY"),
+            response_cache=os.environ.get("AGENTOPS_RESPONSE_CACHE", "").lower()
+            == "true"
+            or None,
+            response_cache_path=os.environ.get("AGENTOPS_RESPONSE_CACHE_PATH"),
+            response_cache_models=os.environ.get("AGENTOPS_RESPONSE_CACHE_MODELS"),
         )
 
     def configure(
@@ -62,6 +76,23 @@ class Client(metaclass=MetaClient):
         auto_start_session: Optional[bool] = None,
         skip_auto_end_session: Optional[bool] = None,
         env_data_opt_out: Optional[bool] = None,
+        price_table: Optional[Union[PriceTable, dict, str]] = None,
+        resource_sampling_interval: Optional[int] = None,
+        loop_lag_threshold: Optional[float] = None,
+        telemetry_port: Optional[int] = None,
+        otlp_endpoint: Optional[str] = None,
+        otlp_protocol: Optional[str] = None,
+        otlp_headers: Optional[Dict[str, str]] = None,
+        otlp_only: Optional[bool] = None,
+        sinks: Optional[List[EventSink]] = None,
+        replay_mode: Optional[str] = None,
+        replay_path: Optional[str] = None,
+        replay_stream_delay: Optional[Union[float, str]] = None,
+        response_cache: Optional[bool] = None,
+        response_cache_ttl: Optional[float] = None,
+        response_cache_size: Optional[int] = None,
+        response_cache_path: Optional[str] = None,
+        response_cache_models: Optional[List[str]] = None,
     ):
         if self.has_sessions:
             return logger.warning(
@@ -80,6 +111,23 @@ class Client(metaclass=MetaClient):
             auto_start_session=auto_start_session,
             skip_auto_end_session=skip_auto_end_session,
             env_data_opt_out=env_data_opt_out,
+            price_table=price_table,
+            resource_sampling_interval=resource_sampling_interval,
+            loop_lag_threshold=loop_lag_threshold,
+            telemetry_port=telemetry_port,
+            otlp_endpoint=otlp_endpoint,
+            otlp_protocol=otlp_protocol,
+            otlp_headers=otlp_headers,
+            otlp_only=otlp_only,
+            sinks=sinks,
+            replay_mode=replay_mode,
+            replay_path=replay_path,
+            replay_stream_delay=replay_stream_delay,
+            response_cache=response_cache,
+            response_cache_ttl=response_cache_ttl,
+            response_cache_size=response_cache_size,
+            response_cache_path=response_cache_path,
+            response_cache_models=response_cache_models,
         )
 
     def initialize(self) -> Union[Session, None]:
@@ -96,7 +144,13 @@ class Client(metaclass=MetaClient):
         self._handle_unclean_exits()
         self._initialized = True
 
+        if self._config.telemetry_port is not None:
+            start_prometheus_server(self._config.telemetry_port)
+
         if self._config.instrument_llm_calls:
+            # The provider modules are only loaded when LLM calls are instrumented
+            from .llms import LlmTracker
+
             self._llm_tracker = LlmTracker(self)
             self._llm_tracker.override_api()
 
@@ -198,11 +252,62 @@ class Client(metaclass=MetaClient):
 
         session = self._safe_get_session()
         if session is None:
+            telemetry.event_dropped("no_session")
             return logger.error(
                 "Could not record event. Start a session by calling agentops.start_session()."
             )
         session.record(event)
 
+    def get_metrics(self) -> Optional[dict]:
+        """
+        Live performance metrics of the current session, aggregated locally without a server round-trip.
+
+        Returns:
+            dict: See Session.get_metrics. None if there is no current session.
+        """
+        session = self._safe_get_session()
+        if session is None:
+            return None
+        return session.get_metrics()
+
+    def get_latency_sketches(self) -> LatencySketches:
+        """
+        Latency sketches per LLM model, tool and action type, merged across all the sessions of this
+        process, running or ended. Memory is constant however many events were recorded.
+
+        Returns:
+            LatencySketches: Use `quantiles()` for p50/p95/p99, `merge()` to combine with other
+                processes, and `to_dict()` to serialize.
+        """
+        sketches = ended_sessions_latency.copy()
+        for session in list(self._sessions):
+            sketches.merge(session.metrics.latency)
+        return sketches
+
+    def get_telemetry(self) -> dict:
+        """
+        Health and overhead metrics of the SDK itself, shared by all sessions of the process.
+
+        Returns:
+            dict: Events enqueued, sent and dropped (by reason), current and max queue depth, bytes sent,
+                serialization and flush time histograms, and HTTP latency, retries and failures per endpoint.
+        """
+        return telemetry.snapshot()
+
+    def monitor_event_loop(
+        self,
+        threshold_ms: Optional[float] = None,
+        interval_ms: Optional[float] = None,
+    ):
+        """
+        Monitor the lag of the running asyncio event loop for the current session.
+        See Session.monitor_event_loop.
+        """
+        session = self._safe_get_session()
+        if session is None:
+            return None
+        return session.monitor_event_loop(threshold_ms, interval_ms)
+
     def start_session(
         self,
         tags: Optional[List[str]] = None,
@@ -315,6 +420,7 @@ class Client(metaclass=MetaClient):
                         end_state=end_state,
                         end_state_reason=end_state_reason,
                     )
+            shutdown_sinks()
 
         def signal_handler(signum, frame):
             """
@@ -431,6 +537,7 @@ class Client(metaclass=MetaClient):
             s.end_session()
 
         self._sessions.clear()
+        shutdown_sinks()
 
     @property
     def is_initialized(self) -> bool:
@@ -1,7 +1,13 @@
-from typing import List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
 from uuid import UUID
 
 from .log_config import logger
+from .replay import DEFAULT_REPLAY_PATH, RECORDED_DELAY, REPLAY_MODES
+from .response_cache import DEFAULT_MAX_ENTRIES, DEFAULT_TTL
+from .pricing import PriceTable, get_default_price_table, load_price_table
+
+if TYPE_CHECKING:
+    from .exporters import EventSink
 
 
 class Configuration:
@@ -16,6 +22,23 @@ class Configuration:
         self.auto_start_session: bool = True
         self.skip_auto_end_session: bool = False
         self.env_data_opt_out: bool = False
+        self.price_table: PriceTable = get_default_price_table()
+        self.resource_sampling_interval: Optional[int] = None
+        self.loop_lag_threshold: Optional[float] = None
+        self.telemetry_port: Optional[int] = None
+        self.otlp_endpoint: Optional[str] = None
+        self.otlp_protocol: str = "json"
+        self.otlp_headers: Optional[Dict[str, str]] = None
+        self.otlp_only: bool = False
+        self.sinks: Optional[List["EventSink"]] = None
+        self.replay_mode: Optional[str] = None
+        self.replay_path: str = DEFAULT_REPLAY_PATH
+        self.replay_stream_delay: Optional[Union[float, str]] = None
+        self.response_cache: bool = False
+        self.response_cache_ttl: float = DEFAULT_TTL
+        self.response_cache_size: int = DEFAULT_MAX_ENTRIES
+        self.response_cache_path: Optional[str] = None
+        self.response_cache_models: Optional[List[str]] = None
 
     def configure(
         self,
@@ -30,6 +53,23 @@ class Configuration:
         auto_start_session: Optional[bool] = None,
         skip_auto_end_session: Optional[bool] = None,
         env_data_opt_out: Optional[bool] = None,
+        price_table: Optional[Union[PriceTable, dict, str]] = None,
+        resource_sampling_interval: Optional[int] = None,
+        loop_lag_threshold: Optional[float] = None,
+        telemetry_port: Optional[int] = None,
+        otlp_endpoint: Optional[str] = None,
+        otlp_protocol: Optional[str] = None,
+        otlp_headers: Optional[Dict[str, str]] = None,
+        otlp_only: Optional[bool] = None,
+        sinks: Optional[List["EventSink"]] = None,
+        replay_mode: Optional[str] = None,
+        replay_path: Optional[str] = None,
+        replay_stream_delay: Optional[Union[float, str]] = None,
+        response_cache: Optional[bool] = None,
+        response_cache_ttl: Optional[float] = None,
+        response_cache_size: Optional[int] = None,
+        response_cache_path: Optional[str] = None,
+        response_cache_models: Optional[Union[List[str], str]] = None,
     ):
         if api_key is not None:
             try:
@@ -72,3 +112,97 @@ class Configuration:
 
         if env_data_opt_out is not None:
             self.env_data_opt_out = env_data_opt_out
+
+        if price_table is not None:
+            table = load_price_table(price_table)
+            if table is not None:
+                self.price_table = table
+
+        if resource_sampling_interval is not None:
+            self.resource_sampling_interval = resource_sampling_interval
+
+        if loop_lag_threshold is not None:
+            self.loop_lag_threshold = loop_lag_threshold
+
+        if telemetry_port is not None:
+            self.telemetry_port = telemetry_port
+
+        if otlp_endpoint is not None:
+            self.otlp_endpoint = otlp_endpoint
+
+        if otlp_protocol is not None:
+            if otlp_protocol in ("json", "protobuf"):
+                self.otlp_protocol = otlp_protocol
+            else:
+                message = f"Unsupported OTLP protocol: {otlp_protocol}. Use 'json' or 'protobuf'"
+                client.add_pre_init_warning(message)
+                logger.warning(message)
+
+        if otlp_headers is not None:
+            self.otlp_headers = otlp_headers
+
+        if otlp_only is not None:
+            self.otlp_only = otlp_only
+
+        if sinks is not None:
+            self.sinks = list(sinks)
+
+        if replay_mode is not None:
+            if replay_mode in REPLAY_MODES:
+                self.replay_mode = replay_mode
+            elif replay_mode in ("", "off", "none"):
+                self.replay_mode = None
+            else:
+                message = f"Unsupported replay mode: {replay_mode}. Use one of {', '.join(REPLAY_MODES)}"
+                client.add_pre_init_warning(message)
+                logger.warning(message)
+
+        if replay_path is not None:
+            self.replay_path = replay_path
+
+        if replay_stream_delay is not None:
+            if replay_stream_delay == RECORDED_DELAY:
+                self.replay_stream_delay = RECORDED_DELAY
+            else:
+                try:
+                    self.replay_stream_delay = max(float(replay_stream_delay), 0.0)
+                except (TypeError, ValueError):
+                    message = (
+                        f"Invalid replay_stream_delay: {replay_stream_delay}. "
+                        'Use a number of milliseconds or "recorded"'
+                    )
+                    client.add_pre_init_warning(message)
+                    logger.warning(message)
+
+        if response_cache is not None:
+            self.response_cache = response_cache
+
+        if response_cache_ttl is not None:
+            try:
+                if float(response_cache_ttl) <= 0:
+                    raise ValueError
+                self.response_cache_ttl = float(response_cache_ttl)
+            except (TypeError, ValueError):
+                message = f"Invalid response_cache_ttl: {response_cache_ttl}. Use a positive number of seconds"
+                client.add_pre_init_warning(message)
+                logger.warning(message)
+
+        if response_cache_size is not None:
+            try:
+                if int(response_cache_size) <= 0:
+                    raise ValueError
+                self.response_cache_size = int(response_cache_size)
+            except (TypeError, ValueError):
+                message = f"Invalid response_cache_size: {response_cache_size}. Use a positive number of entries"
+                client.add_pre_init_warning(message)
+                logger.warning(message)
+
+        if response_cache_path is not None:
+            self.response_cache_path = response_cache_path or None
+
+        if response_cache_models is not None:
+            if isinstance(response_cache_models, str):
+                response_cache_models = [
+                    m.strip() for m in response_cache_models.split(",") if m.strip()
+                ]
+            self.response_cache_models = list(response_cache_models) or None
@@ -1,5 +1,6 @@
 import functools
 import inspect
+import time
 from typing import Optional, Union
 from uuid import uuid4
 
@@ -7,6 +8,8 @@ from .event import ActionEvent, ErrorEvent, ToolEvent
 from .helpers import check_call_stack_for_agent_id, get_ISO_time
 from .session import Session
 from .client import Client
+from .spans import reset_current_event_id, set_current_event_id
+from .profiling import CallProfiler
 from .log_config import logger
 
 
@@ -17,153 +20,322 @@ def record_function(event_name: str):
     return record_action(event_name)
 
 
-def record_action(event_name: Optional[str] = None):
+class _FuncSignature:
     """
-    Decorator to record an event before and after a function call.
-    Usage:
-            - Actions: Records function parameters and return statements of the
-                    function being decorated. Additionally, timing information about
-                    the action is recorded
-    Args:
-            event_name (optional, str): The name of the event to record.
+    Signature metadata of a decorated function, computed once at decoration time so that
+    binding the arguments of each call is only a couple of dict operations.
     """
 
-    def decorator(func):
-        if inspect.iscoroutinefunction(func):
-
-            @functools.wraps(func)
-            async def async_wrapper(*args, session: Optional[Session] = None, **kwargs):
-                init_time = get_ISO_time()
-                if "session" in kwargs.keys():
-                    del kwargs["session"]
-                if session is None:
-                    if Client().is_multi_session:
-                        raise ValueError(
-                            "If multiple sessions exists, `session` is a required parameter in the function decorated by @record_action"
-                        )
-                func_args = inspect.signature(func).parameters
-                arg_names = list(func_args.keys())
-                # Get default values
-                arg_values = {
-                    name: func_args[name].default
-                    for name in arg_names
-                    if func_args[name].default is not inspect._empty
-                }
-                # Update with positional arguments
-                arg_values.update(dict(zip(arg_names, args)))
-                arg_values.update(kwargs)
-
-                if not event_name:
-                    action_type = func.__name__
-                else:
-                    action_type = event_name
-
-                event = ActionEvent(
-                    params=arg_values,
-                    init_timestamp=init_time,
-                    agent_id=check_call_stack_for_agent_id(),
-                    action_type=action_type,
-                )
-
-                try:
-                    returns = await func(*args, **kwargs)
-
-                    # If the function returns multiple values, record them all in the same event
-                    if isinstance(returns, tuple):
-                        returns = list(returns)
+    __slots__ = ("arg_names", "defaults")
 
-                    event.returns = returns
+    def __init__(self, func):
+        parameters = inspect.signature(func).parameters
+        self.arg_names = tuple(parameters.keys())
+        self.defaults = {
+            name: parameter.default
+            for name, parameter in parameters.items()
+            if parameter.default is not inspect.Parameter.empty
+        }
 
-                    # NOTE: Will likely remove in future since this is tightly coupled. Adding it to see how useful we find it for now
-                    # TODO: check if screenshot is the url string we expect it to be? And not e.g. "True"
-                    if hasattr(returns, "screenshot"):
-                        event.screenshot = returns.screenshot  # type: ignore
+    def bind(self, args: tuple, kwargs: dict) -> dict:
+        arg_values = self.defaults.copy()
+        arg_values.update(zip(self.arg_names, args))
+        arg_values.update(kwargs)
+        return arg_values
 
-                    event.end_timestamp = get_ISO_time()
 
-                    if session:
-                        session.record(event)
-                    else:
-                        Client().record(event)
+def _record_event(event, session: Optional[Session], client) -> None:
+    event.end_timestamp = get_ISO_time()
 
-                except Exception as e:
-                    Client().record(ErrorEvent(trigger_event=event, exception=e))
+    if session:
+        session.record(event)
+    else:
+        client.record(event)
 
-                    # Re-raise the exception
-                    raise
 
-                return returns
+def _stop_profiler(event, profiler: Optional[CallProfiler]) -> None:
+    if profiler is not None:
+        event.profile = profiler.stop()
 
-            return async_wrapper
-        else:
 
-            @functools.wraps(func)
-            def sync_wrapper(*args, session: Optional[Session] = None, **kwargs):
-                init_time = get_ISO_time()
-                if "session" in kwargs.keys():
-                    del kwargs["session"]
-                if session is None:
-                    if Client().is_multi_session:
-                        raise ValueError(
-                            "If multiple sessions exists, `session` is a required parameter in the function decorated by @record_action"
-                        )
-                func_args = inspect.signature(func).parameters
-                arg_names = list(func_args.keys())
-                # Get default values
-                arg_values = {
-                    name: func_args[name].default
-                    for name in arg_names
-                    if func_args[name].default is not inspect._empty
-                }
-                # Update with positional arguments
-                arg_values.update(dict(zip(arg_names, args)))
-                arg_values.update(kwargs)
-
-                if not event_name:
-                    action_type = func.__name__
-                else:
-                    action_type = event_name
-
-                event = ActionEvent(
-                    params=arg_values,
-                    init_timestamp=init_time,
-                    agent_id=check_call_stack_for_agent_id(),
-                    action_type=action_type,
-                )
+def _record_returns(
+    event,
+    returns,
+    session: Optional[Session],
+    client,
+    started: float,
+    profiler: Optional[CallProfiler] = None,
+):
+    """
+    Record the event of a finished call. Generators and async generators are wrapped instead, so
+    the event is recorded once the stream is exhausted, closed or fails.
+    """
+    if inspect.isgenerator(returns):
+        return _record_generator(returns, event, session, client, started, profiler)
+    if inspect.isasyncgen(returns):
+        return _record_async_generator(
+            returns, event, session, client, started, profiler
+        )
+
+    _stop_profiler(event, profiler)
+
+    # If the function returns multiple values, record them all in the same event
+    if isinstance(returns, tuple):
+        returns = list(returns)
+
+    event.returns = returns
+
+    # NOTE: Will likely remove in future since this is tightly coupled. Adding it to see how useful we find it for now
+    # TODO: check if screenshot is the url string we expect it to be? And not e.g. "True"
+    if hasattr(returns, "screenshot"):
+        event.screenshot = returns.screenshot  # type: ignore
+
+    _record_event(event, session, client)
+    return returns
+
+
+class _StreamStats:
+    __slots__ = ("started", "items", "first_item_at")
+
+    def __init__(self, started: float):
+        self.started = started
+        self.items = 0
+        self.first_item_at: Optional[float] = None
+
+    def item(self) -> None:
+        if self.first_item_at is None:
+            self.first_item_at = time.perf_counter()
+        self.items += 1
+
+    def to_dict(self, status: str) -> dict:
+        now = time.perf_counter()
+        return {
+            "status": status,
+            "items": self.items,
+            "time_to_first_item_ms": (
+                (self.first_item_at - self.started) * 1000
+                if self.first_item_at is not None
+                else None
+            ),
+            "duration_ms": (now - self.started) * 1000,
+        }
+
+
+def _record_generator(
+    generator, event, session: Optional[Session], client, started, profiler=None
+):
+    # Items are passed through as they are produced, and send() and throw() are forwarded to the
+    # generator as `yield from` would (PEP 380); only counts and timings are kept
+    stats = _StreamStats(started)
+    step, value = generator.send, None
+    try:
+        while True:
+            # The generator body runs on each step, so that's when it is inside the event's span
+            token = set_current_event_id(event.id)
+            try:
+                item = step(value)
+            except StopIteration as stop:
+                result = stop.value
+                break
+            finally:
+                reset_current_event_id(token)
+            stats.item()
+            try:
+                value = yield item
+                step = generator.send
+            except GeneratorExit:
+                raise
+            except BaseException as e:
+                step, value = generator.throw, e
+    except GeneratorExit:
+        generator.close()
+        event.stream_stats = stats.to_dict("closed")
+        _stop_profiler(event, profiler)
+        _record_event(event, session, client)
+        raise
+    except Exception as e:
+        event.stream_stats = stats.to_dict("error")
+        _stop_profiler(event, profiler)
+        event.end_timestamp = get_ISO_time()
+        client.record(ErrorEvent(trigger_event=event, exception=e))
+        raise
+    event.stream_stats = stats.to_dict("exhausted")
+    _stop_profiler(event, profiler)
+    _record_event(event, session, client)
+    return result
+
+
+async def _record_async_generator(
+    generator, event, session: Optional[Session], client, started, profiler=None
+):
+    # asend() and athrow() are forwarded like send() and throw() in _record_generator
+    stats = _StreamStats(started)
+    step, value = generator.asend, None
+    try:
+        while True:
+            token = set_current_event_id(event.id)
+            try:
+                item = await step(value)
+            except StopAsyncIteration:
+                break
+            finally:
+                reset_current_event_id(token)
+            stats.item()
+            try:
+                value = yield item
+                step = generator.asend
+            except GeneratorExit:
+                raise
+            except BaseException as e:
+                step, value = generator.athrow, e
+    except GeneratorExit:
+        await generator.aclose()
+        event.stream_stats = stats.to_dict("closed")
+        _stop_profiler(event, profiler)
+        _record_event(event, session, client)
+        raise
+    except Exception as e:
+        event.stream_stats = stats.to_dict("error")
+        _stop_profiler(event, profiler)
+        event.end_timestamp = get_ISO_time()
+        client.record(ErrorEvent(trigger_event=event, exception=e))
+        raise
+    event.stream_stats = stats.to_dict("exhausted")
+    _stop_profiler(event, profiler)
+    _record_event(event, session, client)
+
+
+def _instrument(
+    func,
+    create_event,
+    decorator_name: str,
+    profile: bool = False,
+    profile_memory: bool = False,
+):
+    """
+    Wrap `func` so that every call is recorded as the event returned by
+    `create_event(params, init_timestamp)`. With `profile` or `profile_memory`, the event also gets
+    the CPU, wall time and (optionally) memory profile of the call, see `profiling.CallProfiler`.
 
+    When no session is passed and the client is not initialized nothing can be recorded,
+    so the call goes straight to `func`. Generator and async generator functions (or functions
+    returning one) are recorded when their stream ends.
+    """
+    signature = _FuncSignature(func)
+    profiling = profile or profile_memory
+    multi_session_error = f"If multiple sessions exists, `session` is a required parameter in the function decorated by @{decorator_name}"
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, session: Optional[Session] = None, **kwargs):
+            client = Client()
+            if session is None:
+                if not client.is_initialized:
+                    return await func(*args, **kwargs)
+                if client.is_multi_session:
+                    raise ValueError(multi_session_error)
+
+            event = create_event(signature.bind(args, kwargs), get_ISO_time())
+            started = time.perf_counter()
+            profiler = CallProfiler(profile_memory).start() if profiling else None
+
+            try:
+                token = set_current_event_id(event.id)
                 try:
-                    returns = func(*args, **kwargs)
-
-                    # If the function returns multiple values, record them all in the same event
-                    if isinstance(returns, tuple):
-                        returns = list(returns)
-
-                    event.returns = returns
+                    returns = await func(*args, **kwargs)
+                finally:
+                    reset_current_event_id(token)
+                returns = _record_returns(
+                    event, returns, session, client, started, profiler
+                )
+            except Exception as e:
+                if event.profile is None:
+                    _stop_profiler(event, profiler)
+                client.record(ErrorEvent(trigger_event=event, exception=e))
+
+                # Re-raise the exception
+                raise
+
+            return returns
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def sync_wrapper(*args, session: Optional[Session] = None, **kwargs):
+        client = Client()
+        if session is None:
+            if not client.is_initialized:
+                return func(*args, **kwargs)
+            if client.is_multi_session:
+                raise ValueError(multi_session_error)
+
+        event = create_event(signature.bind(args, kwargs), get_ISO_time())
+        started = time.perf_counter()
+        profiler = CallProfiler(profile_memory).start() if profiling else None
+
+        try:
+            # Events created during the call (tools, LLM calls, nested actions) get this event as parent
+            token = set_current_event_id(event.id)
+            try:
+                returns = func(*args, **kwargs)
+            finally:
+                reset_current_event_id(token)
+            returns = _record_returns(
+                event, returns, session, client, started, profiler
+            )
+        except Exception as e:
+            if event.profile is None:
+                _stop_profiler(event, profiler)
+            client.record(ErrorEvent(trigger_event=event, exception=e))
 
-                    if hasattr(returns, "screenshot"):
-                        event.screenshot = returns.screenshot  # type: ignore
+            # Re-raise the exception
+            raise
 
-                    event.end_timestamp = get_ISO_time()
+        return returns
 
-                    if session:
-                        session.record(event)
-                    else:
-                        Client().record(event)
+    return sync_wrapper
 
-                except Exception as e:
-                    Client().record(ErrorEvent(trigger_event=event, exception=e))
 
-                    # Re-raise the exception
-                    raise
+def record_action(
+    event_name: Optional[str] = None,
+    profile: bool = False,
+    profile_memory: bool = False,
+):
+    """
+    Decorator to record an event before and after a function call.
+    Usage:
+            - Actions: Records function parameters and return statements of the
+                    function being decorated. Additionally, timing information about
+                    the action is recorded
+    Args:
+            event_name (optional, str): The name of the event to record.
+            profile (optional, bool): Record the process and thread CPU time and wall time of each call in `event.profile`.
+            profile_memory (optional, bool): Also record the peak and net memory allocated during each call using tracemalloc.
+                Slows down allocations in the whole process while a profiled call is running.
+    """
 
-                return returns
+    def decorator(func):
+        action_type = event_name or func.__name__
+
+        def create_event(params: dict, init_timestamp: str) -> ActionEvent:
+            return ActionEvent(
+                params=params,
+                init_timestamp=init_timestamp,
+                agent_id=check_call_stack_for_agent_id(),
+                action_type=action_type,
+            )
 
-            return sync_wrapper
+        return _instrument(func, create_event, "record_action", profile, profile_memory)
 
     return decorator
 
 
-def record_tool(tool_name: Optional[str] = None):
+def record_tool(
+    tool_name: Optional[str] = None,
+    profile: bool = False,
+    profile_memory: bool = False,
+):
     """
     Decorator to record a tool use event before and after a function call.
     Usage:
@@ -172,139 +344,23 @@ def record_tool(tool_name: Optional[str] = None):
                     the action is recorded
     Args:
             tool_name (optional, str): The name of the event to record.
+            profile (optional, bool): Record the process and thread CPU time and wall time of each call in `event.profile`.
+            profile_memory (optional, bool): Also record the peak and net memory allocated during each call using tracemalloc.
+                Slows down allocations in the whole process while a profiled call is running.
     """
 
     def decorator(func):
-        if inspect.iscoroutinefunction(func):
-
-            @functools.wraps(func)
-            async def async_wrapper(*args, session: Optional[Session] = None, **kwargs):
-                init_time = get_ISO_time()
-                if "session" in kwargs.keys():
-                    del kwargs["session"]
-                if session is None:
-                    if Client().is_multi_session:
-                        raise ValueError(
-                            "If multiple sessions exists, `session` is a required parameter in the function decorated by @record_tool"
-                        )
-                func_args = inspect.signature(func).parameters
-                arg_names = list(func_args.keys())
-                # Get default values
-                arg_values = {
-                    name: func_args[name].default
-                    for name in arg_names
-                    if func_args[name].default is not inspect._empty
-                }
-                # Update with positional arguments
-                arg_values.update(dict(zip(arg_names, args)))
-                arg_values.update(kwargs)
-
-                if not tool_name:
-                    name = func.__name__
-                else:
-                    name = tool_name
-
-                event = ToolEvent(
-                    params=arg_values,
-                    init_timestamp=init_time,
-                    agent_id=check_call_stack_for_agent_id(),
-                    name=name,
-                )
-
-                try:
-                    returns = await func(*args, **kwargs)
-
-                    # If the function returns multiple values, record them all in the same event
-                    if isinstance(returns, tuple):
-                        returns = list(returns)
-
-                    event.returns = returns
-
-                    # NOTE: Will likely remove in future since this is tightly coupled. Adding it to see how useful we find it for now
-                    # TODO: check if screenshot is the url string we expect it to be? And not e.g. "True"
-                    if hasattr(returns, "screenshot"):
-                        event.screenshot = returns.screenshot  # type: ignore
-
-                    event.end_timestamp = get_ISO_time()
-
-                    if session:
-                        session.record(event)
-                    else:
-                        Client().record(event)
-
-                except Exception as e:
-                    Client().record(ErrorEvent(trigger_event=event, exception=e))
-
-                    # Re-raise the exception
-                    raise
-
-                return returns
-
-            return async_wrapper
-        else:
-
-            @functools.wraps(func)
-            def sync_wrapper(*args, session: Optional[Session] = None, **kwargs):
-                init_time = get_ISO_time()
-                if "session" in kwargs.keys():
-                    del kwargs["session"]
-                if session is None:
-                    if Client().is_multi_session:
-                        raise ValueError(
-                            "If multiple sessions exists, `session` is a required parameter in the function decorated by @record_tool"
-                        )
-                func_args = inspect.signature(func).parameters
-                arg_names = list(func_args.keys())
-                # Get default values
-                arg_values = {
-                    name: func_args[name].default
-                    for name in arg_names
-                    if func_args[name].default is not inspect._empty
-                }
-                # Update with positional arguments
-                arg_values.update(dict(zip(arg_names, args)))
-                arg_values.update(kwargs)
-
-                if not tool_name:
-                    name = func.__name__
-                else:
-                    name = tool_name
-
-                event = ToolEvent(
-                    params=arg_values,
-                    init_timestamp=init_time,
-                    agent_id=check_call_stack_for_agent_id(),
-                    name=name,
-                )
-
-                try:
-                    returns = func(*args, **kwargs)
-
-                    # If the function returns multiple values, record them all in the same event
-                    if isinstance(returns, tuple):
-                        returns = list(returns)
-
-                    event.returns = returns
-
-                    if hasattr(returns, "screenshot"):
-                        event.screenshot = returns.screenshot  # type: ignore
-
-                    event.end_timestamp = get_ISO_time()
-
-                    if session:
-                        session.record(event)
-                    else:
-                        Client().record(event)
-
-                except Exception as e:
-                    Client().record(ErrorEvent(trigger_event=event, exception=e))
-
-                    # Re-raise the exception
-                    raise
-
-                return returns
+        name = tool_name or func.__name__
+
+        def create_event(params: dict, init_timestamp: str) -> ToolEvent:
+            return ToolEvent(
+                params=params,
+                init_timestamp=init_timestamp,
+                agent_id=check_call_stack_for_agent_id(),
+                name=name,
+            )
 
-            return sync_wrapper
+        return _instrument(func, create_event, "record_tool", profile, profile_memory)
 
     return decorator
 
@@ -9,6 +9,7 @@ from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional, Sequence, Union
 from .helpers import get_ISO_time, check_call_stack_for_agent_id
 from .enums import EventType
+from .spans import get_current_event_id
 from uuid import UUID, uuid4
 import traceback
 
@@ -25,6 +26,12 @@ class Event:
     end_timestamp(str): A timestamp indicating when the event ended. Defaults to the time when this Event was instantiated.
     agent_id(UUID, optional): The unique identifier of the agent that triggered the event.
     id(UUID): A unique identifier for the event. Defaults to a new UUID.
+    parent_id(UUID, optional): The id of the enclosing event, e.g. the action during which an LLM call was made.
+        Defaults to the event currently being recorded by @record_action or @record_tool in this context.
+    stream_stats(dict, optional): For functions that return a generator: how the stream ended ('exhausted', 'closed' or 'error'),
+        the number of items yielded, the time to the first item and the total duration in milliseconds.
+    profile(dict, optional): CPU time, wall time and optionally memory allocation of the call, when profiling
+        is enabled on @record_action or @record_tool.
 
     foo(x=1) {
         ...
@@ -43,6 +50,9 @@ class Event:
     end_timestamp: Optional[str] = None
     agent_id: Optional[UUID] = field(default_factory=check_call_stack_for_agent_id)
     id: UUID = field(default_factory=uuid4)
+    parent_id: Optional[UUID] = field(default_factory=get_current_event_id)
+    stream_stats: Optional[dict] = None
+    profile: Optional[dict] = None
 
 
 @dataclass
@@ -72,7 +82,14 @@ class LLMEvent(Event):
     prompt_tokens(int, optional): The number of tokens in the prompt message.
     completion(str, object, optional): The message or messages returned by the LLM. Preferably in ChatML format which is more fully supported by AgentOps.
     completion_tokens(int, optional): The number of tokens in the completion message.
+    cached_prompt_tokens(int, optional): The number of prompt tokens served from the provider's prompt cache. Included in prompt_tokens.
+    cache_read_tokens(int, optional): The number of prompt tokens read from the provider's prompt cache, for providers that report them apart from prompt_tokens (e.g. Anthropic). Not included in prompt_tokens.
+    cache_creation_tokens(int, optional): The number of prompt tokens written to the provider's prompt cache. Not included in prompt_tokens.
     model(str, optional): LLM model e.g. "gpt-4", "gpt-3.5-turbo".
+    cost(float, optional): The cost of the call in USD. Computed from the session's price table when the event is recorded.
+    cache(dict, optional): For calls served from the response cache: {"hit": True, "key", "cached_at"} and the
+        latency, tokens and cost of the original call ("saved_latency_ms", "saved_prompt_tokens",
+        "saved_completion_tokens", "saved_cost"). The cost of the event itself is 0.
 
     """
 
@@ -82,7 +99,12 @@ class LLMEvent(Event):
     prompt_tokens: Optional[int] = None
     completion: Union[str, object] = None
     completion_tokens: Optional[int] = None
+    cached_prompt_tokens: Optional[int] = None
+    cache_read_tokens: Optional[int] = None
+    cache_creation_tokens: Optional[int] = None
     model: Optional[str] = None
+    cost: Optional[float] = None
+    cache: Optional[dict] = None
 
 
 @dataclass
@@ -14,3 +14,13 @@ class NoSessionException(Exception):
 class ApiServerException(Exception):
     def __init__(self, message):
         super().__init__(message)
+
+
+class ReplayMissError(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+
+class MappedStoreError(Exception):
+    def __init__(self, message):
+        super().__init__(message)
@@ -0,0 +1,49 @@
+from .base import EventSink
+from .chrome_trace import ChromeTraceWriter, read_jsonl_events, write_chrome_trace
+from .fanout import FanOutSink
+from .file import JSONLFileSink
+from .http import AgentOpsHTTPSink
+from .memory import InMemorySink
+from .otlp import OTLPExporter
+from .sqlite import SQLiteStore
+
+
+def build_sink(config) -> EventSink:
+    """
+    The sink of a new session: the configured `sinks` (the AgentOps API by default, unless
+    `otlp_only` is set), plus an OTLP exporter when `otlp_endpoint` is set.
+    """
+    if config.sinks is not None:
+        sinks = list(config.sinks)
+    elif config.otlp_only and config.otlp_endpoint:
+        sinks = []
+    else:
+        sinks = [AgentOpsHTTPSink()]
+
+    if config.otlp_endpoint:
+        sinks.append(
+            OTLPExporter(
+                config.otlp_endpoint,
+                protocol=config.otlp_protocol,
+                headers=config.otlp_headers,
+            )
+        )
+
+    if len(sinks) == 1:
+        return sinks[0]
+    return FanOutSink(sinks)
+
+
+__all__ = [
+    "EventSink",
+    "AgentOpsHTTPSink",
+    "JSONLFileSink",
+    "InMemorySink",
+    "FanOutSink",
+    "OTLPExporter",
+    "SQLiteStore",
+    "build_sink",
+    "ChromeTraceWriter",
+    "write_chrome_trace",
+    "read_jsonl_events",
+]
@@ -0,0 +1,43 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+
+class EventSink(ABC):
+    """
+    Destination of the events recorded in sessions.
+
+    Sessions hand their queued events to `export` in batches from their background flush thread.
+    `export` returns True once the batch is safely delivered (acknowledged) and False if it was not,
+    in which case the batch is counted as dropped. The session lifecycle hooks are optional; a sink
+    that owns sessions (like the AgentOps API) uses them to create, update and close them.
+
+    A sink instance can be shared by several sessions, so per-session state must be keyed by
+    `session.session_id` or stored on the session.
+    """
+
+    def start_session(self, session) -> bool:
+        """Called when a session starts. Returning False stops the session from running."""
+        return True
+
+    @abstractmethod
+    def export(self, session, events: List[dict]) -> bool:
+        """Deliver a batch of serialized events (`Event.__dict__`). Returns whether it was acknowledged."""
+
+    def update_session(self, session) -> None:
+        """Called when session attributes such as tags change."""
+
+    def end_session(self, session) -> Optional[dict]:
+        """
+        Called once the last batch of an ended session is exported. May return the server's response,
+        e.g. {"token_cost": ..., "session_url": ...}.
+        """
+        return None
+
+    def create_agent(self, session, agent_id: str, name: Optional[str]) -> None:
+        """Called when an agent is created in the session."""
+
+    def shutdown(self) -> None:
+        """
+        Release resources such as open files or connections. Called once, when the client ends its last
+        sessions or the process exits, since the sink may be shared by several sessions.
+        """
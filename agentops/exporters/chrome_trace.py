@@ -0,0 +1,356 @@
+"""
+Chrome Trace Event export of a session timeline.
+
+Writes the events of a session as Trace Event Format JSON (begin/end pairs), which can be opened in
+https://ui.perfetto.dev or chrome://tracing to see where a run spends its time. Each agent gets its
+own track; events recorded outside of an agent are grouped by LLM thread, or on a "session" track.
+Overlapping events that don't nest, such as concurrent LLM calls of one agent, are spread over extra
+lanes of the same track.
+
+The output is streamed: events are converted and written one at a time, and only the events that
+haven't ended yet are kept in memory, so sessions with millions of events can be exported. Sources
+that aren't in start order, such as JSONL spools written in flush order, are first sorted in runs of
+SORT_RUN_SIZE events, spilled to temporary files and merged.
+"""
+
+import gzip
+import heapq
+import io
+import json
+import itertools
+import os
+import tempfile
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from ..enums import EventType
+from ..metrics import parse_ISO_time
+from .memory import InMemorySink
+from .sqlite import SQLiteStore, _name_of
+
+_PID = 1
+
+# Events sorted in memory at once when ordering a source by start time
+SORT_RUN_SIZE = 100_000
+
+# Timing and category are part of the slice itself; payloads would make traces too large to load
+_OMITTED_ARGS = {
+    "init_timestamp",
+    "end_timestamp",
+    "event_type",
+    "session_id",
+    "params",
+    "returns",
+    "prompt",
+    "completion",
+    "logs",
+    "screenshot",
+}
+
+
+def _micros(timestamp: Optional[str]) -> Optional[float]:
+    parsed = parse_ISO_time(timestamp)
+    return parsed.timestamp() * 1_000_000 if parsed is not None else None
+
+
+def _slice_name(event: dict) -> str:
+    event_type = event.get("event_type") or "event"
+    if event_type == EventType.LLM.value and event.get("model"):
+        return f"llm {event['model']}"
+    name = _name_of(event)
+    return (
+        f"{event_type[:-1] if event_type.endswith('s') else event_type} {name}"
+        if name
+        else event_type
+    )
+
+
+def _args(event: dict) -> dict:
+    return {
+        key: str(value) if not isinstance(value, (int, float, bool)) else value
+        for key, value in event.items()
+        if value is not None and value != "" and key not in _OMITTED_ARGS
+    }
+
+
+class _Lane:
+    # The (start, end) of the open slices, each nested in the previous one, and the latest end of
+    # the closed ones
+    __slots__ = ("tid", "stack", "floor")
+
+    def __init__(self, tid: int):
+        self.tid = tid
+        self.stack: List[Tuple[float, float]] = []
+        self.floor = float("-inf")
+
+    def fits(self, start: float, end: float) -> bool:
+        stack = self.stack
+        while stack and stack[-1][1] <= start:
+            self.floor = max(self.floor, stack.pop()[1])
+        if start < self.floor:
+            return False
+        return not stack or (stack[-1][0] <= start and end <= stack[-1][1])
+
+
+class _Track:
+    """Lanes of one agent or thread. A slice goes on the first lane where it nests or follows."""
+
+    __slots__ = ("name", "lanes")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.lanes: List[_Lane] = []
+
+    def place(self, start: float, end: float, next_tid: int) -> Tuple[_Lane, bool]:
+        """The lane of the slice [start, end], and whether it's a new lane (with tid `next_tid`)."""
+        for lane in self.lanes:
+            if lane.fits(start, end):
+                lane.stack.append((start, end))
+                return lane, False
+        lane = _Lane(next_tid)
+        lane.stack.append((start, end))
+        self.lanes.append(lane)
+        return lane, True
+
+
+class ChromeTraceWriter:
+    """
+    Streams trace events to a text file as a Trace Event Format JSON object.
+
+    Events are expected in start order, as SQLiteStore.iter_events yields them. Events out of order are
+    still exported correctly, though they may be placed on additional lanes.
+
+    Args:
+        out (IO[str]): File to write to.
+        session_id (str, optional): Shown as the name of the process.
+        agent_names (Dict[str, str], optional): Names of the agent tracks, by agent id.
+    """
+
+    def __init__(
+        self,
+        out: IO[str],
+        session_id: Optional[str] = None,
+        agent_names: Optional[Dict[str, Optional[str]]] = None,
+    ):
+        self._out = out
+        self._agent_names = {str(k): v for k, v in (agent_names or {}).items()}
+        self._tracks: Dict[str, _Track] = {}
+        self._next_tid = 1
+        # End events not written yet, as (end, -sequence, tid): at equal times the inner slice ends first
+        self._pending: List[Tuple[float, int, int]] = []
+        self._sequence = 0
+        self._first = True
+        self.written = 0
+
+        self._out.write('{"displayTimeUnit":"ms","traceEvents":[\n')
+        self._emit(
+            {
+                "ph": "M",
+                "pid": _PID,
+                "name": "process_name",
+                "args": {
+                    "name": (
+                        f"session {session_id}" if session_id else "agentops session"
+                    )
+                },
+            }
+        )
+
+    def _emit(self, record: dict) -> None:
+        if not self._first:
+            self._out.write(",\n")
+        self._first = False
+        self._out.write(json.dumps(record, separators=(",", ":"), default=str))
+        self.written += 1
+
+    def _flush_until(self, ts: Optional[float]) -> None:
+        pending = self._pending
+        while pending and (ts is None or pending[0][0] <= ts):
+            end, _, tid = heapq.heappop(pending)
+            self._emit({"ph": "E", "pid": _PID, "tid": tid, "ts": end})
+
+    def _track_key(self, event: dict) -> Tuple[str, str]:
+        agent_id = event.get("agent_id")
+        if agent_id:
+            agent_id = str(agent_id)
+            name = self._agent_names.get(agent_id) or agent_id[:8]
+            return f"agent:{agent_id}", f"agent {name}"
+        thread_id = event.get("thread_id")
+        if thread_id:
+            return f"thread:{thread_id}", f"thread {str(thread_id)[:8]}"
+        return "session", "session"
+
+    def _lane(self, event: dict, start: float, end: float) -> int:
+        key, name = self._track_key(event)
+        track = self._tracks.get(key)
+        if track is None:
+            track = self._tracks[key] = _Track(name)
+        lane, new = track.place(start, end, self._next_tid)
+        tid = lane.tid
+        if new:
+            self._next_tid += 1
+            lane_name = (
+                track.name
+                if len(track.lanes) == 1
+                else f"{track.name} #{len(track.lanes)}"
+            )
+            self._emit(
+                {
+                    "ph": "M",
+                    "pid": _PID,
+                    "tid": tid,
+                    "name": "thread_name",
+                    "args": {"name": lane_name},
+                }
+            )
+            self._emit(
+                {
+                    "ph": "M",
+                    "pid": _PID,
+                    "tid": tid,
+                    "name": "thread_sort_index",
+                    "args": {"sort_index": tid},
+                }
+            )
+        return tid
+
+    def add(self, event: dict) -> None:
+        """Write an event as a begin/end pair, or as an instant for errors and events without duration."""
+        start = _micros(event.get("init_timestamp") or event.get("timestamp"))
+        if start is None:
+            return
+        end = _micros(event.get("end_timestamp") or event.get("timestamp"))
+        end = max(end if end is not None else start, start)
+
+        self._flush_until(start)
+        tid = self._lane(event, start, end)
+        record = {
+            "name": _slice_name(event),
+            "cat": event.get("event_type") or "event",
+            "pid": _PID,
+            "tid": tid,
+            "ts": start,
+            "args": _args(event),
+        }
+        if event.get("event_type") == EventType.ERROR.value or end == start:
+            record.update(ph="i", s="t")
+            self._emit(record)
+            return
+        record["ph"] = "B"
+        self._emit(record)
+        self._sequence += 1
+        heapq.heappush(self._pending, (end, -self._sequence, tid))
+
+    def close(self) -> None:
+        """Write the remaining end events and terminate the JSON document. Doesn't close the file."""
+        self._flush_until(None)
+        self._out.write("\n]}\n")
+
+
+def read_jsonl_events(path: str, session_id: Optional[str] = None) -> Iterator[dict]:
+    """Events of a JSONLFileSink file, one line at a time, optionally only those of one session."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if event.get("event_type") == "session":
+                continue
+            if session_id is not None and event.get("session_id") != str(session_id):
+                continue
+            yield event
+
+
+def _start_key(event: dict) -> Tuple[float, float]:
+    start = _micros(event.get("init_timestamp") or event.get("timestamp"))
+    if start is None:
+        return float("-inf"), 0.0
+    end = _micros(event.get("end_timestamp") or event.get("timestamp"))
+    # At equal starts the enclosing slice comes first, so that the others nest in it
+    return start, -(end if end is not None else start)
+
+
+def sort_by_start(
+    events: Iterable[dict], run_size: int = SORT_RUN_SIZE
+) -> Iterator[dict]:
+    """
+    Events in start order. Sources of more than `run_size` events are sorted in runs of that size,
+    spilled to temporary files and merged, so that memory stays bounded by the run size.
+    """
+    iterator = iter(events)
+    runs: List[IO[str]] = []
+    try:
+        while True:
+            run = sorted(itertools.islice(iterator, run_size), key=_start_key)
+            if not runs and len(run) < run_size:
+                yield from run
+                return
+            if not run:
+                break
+            spill = tempfile.TemporaryFile("w+", encoding="utf-8")
+            runs.append(spill)
+            for event in run:
+                spill.write(json.dumps(event, default=str) + "\n")
+            spill.seek(0)
+        yield from heapq.merge(
+            *(map(json.loads, spill) for spill in runs), key=_start_key
+        )
+    finally:
+        for spill in runs:
+            spill.close()
+
+
+def _events_of(source, session_id: Optional[str]) -> Iterable[dict]:
+    if isinstance(source, SQLiteStore):
+        if session_id is None:
+            raise ValueError("A session_id is required to export from a SQLiteStore")
+        return source.iter_events(session_id)
+    # Other sources are in flush order, which is about end order: parents come after their children
+    if isinstance(source, InMemorySink):
+        return sorted(source.events(session_id), key=_start_key)
+    if isinstance(source, (str, os.PathLike)):
+        return sort_by_start(read_jsonl_events(os.fspath(source), session_id))
+    return sort_by_start(source)
+
+
+def write_chrome_trace(
+    source: Union[SQLiteStore, InMemorySink, str, Iterable[dict]],
+    out: Union[str, IO[str]],
+    session_id: Optional[str] = None,
+    agent_names: Optional[Dict[str, Optional[str]]] = None,
+) -> int:
+    """
+    Export the events of a session as a Chrome trace.
+
+    Args:
+        source: A SQLiteStore, an InMemorySink, the path of a JSONLFileSink file, or an iterable of
+            serialized events, in any order.
+        out (str or IO[str]): Output path, gzip-compressed if it ends with ".gz", or a text file.
+        session_id (str, optional): Session to export. Required for a SQLiteStore; for other sources,
+            all events are exported when omitted.
+        agent_names (Dict[str, str], optional): Names of the agent tracks, by agent id. Read from the
+            store when exporting from a SQLiteStore.
+
+    Returns:
+        int: Number of trace events written.
+    """
+    events = _events_of(source, session_id)
+    if agent_names is None and isinstance(source, SQLiteStore):
+        agent_names = source.agents(session_id)
+
+    if isinstance(out, (str, os.PathLike)):
+        path = os.fspath(out)
+        if path.endswith(".gz"):
+            f = io.TextIOWrapper(gzip.open(path, "wb"), encoding="utf-8")
+        else:
+            f = open(path, "w", encoding="utf-8")
+        with f:
+            return _write(events, f, session_id, agent_names)
+    return _write(events, out, session_id, agent_names)
+
+
+def _write(events: Iterable[dict], out: IO[str], session_id, agent_names) -> int:
+    writer = ChromeTraceWriter(out, session_id=session_id, agent_names=agent_names)
+    for event in events:
+        writer.add(event)
+    writer.close()
+    return writer.written
@@ -0,0 +1,56 @@
+from typing import List, Optional, Sequence
+
+from ..log_config import logger
+from .base import EventSink
+
+
+class FanOutSink(EventSink):
+    """
+    Sends every batch to several sinks. A batch is acknowledged only if every sink acknowledged it,
+    and a session only runs if every sink accepted it. A failing sink doesn't prevent the others from
+    receiving the batch.
+
+    Args:
+        sinks (Sequence[EventSink]): The sinks, called in order.
+    """
+
+    def __init__(self, sinks: Sequence[EventSink]):
+        self.sinks: List[EventSink] = list(sinks)
+
+    def start_session(self, session) -> bool:
+        started = [sink.start_session(session) for sink in self.sinks]
+        return all(started)
+
+    def export(self, session, events: List[dict]) -> bool:
+        acked = True
+        for sink in self.sinks:
+            try:
+                acked = sink.export(session, events) and acked
+            except Exception as e:
+                logger.error(f"{type(sink).__name__} failed to export events - {e}")
+                acked = False
+        return acked
+
+    def update_session(self, session) -> None:
+        for sink in self.sinks:
+            sink.update_session(session)
+
+    def end_session(self, session) -> Optional[dict]:
+        response = None
+        for sink in self.sinks:
+            try:
+                body = sink.end_session(session)
+            except Exception as e:
+                logger.error(f"{type(sink).__name__} could not end session - {e}")
+                continue
+            if response is None:
+                response = body
+        return response
+
+    def create_agent(self, session, agent_id: str, name: Optional[str]) -> None:
+        for sink in self.sinks:
+            sink.create_agent(session, agent_id, name)
+
+    def shutdown(self) -> None:
+        for sink in self.sinks:
+            sink.shutdown()
@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+from typing import List, Optional
+
+from ..helpers import get_ISO_time, safe_serialize
+from ..log_config import logger
+from ..telemetry import telemetry
+from .base import EventSink
+
+
+class JSONLFileSink(EventSink):
+    """
+    Appends events to a local JSON Lines file, one event per line with its `session_id`. A
+    `{"event_type": "session", ...}` line is written when a session ends.
+
+    When the file would grow beyond `max_bytes` it is rotated like logging.RotatingFileHandler:
+    `events.jsonl` becomes `events.jsonl.1`, `events.jsonl.1` becomes `events.jsonl.2` and so on,
+    keeping at most `backup_count` old files.
+
+    Args:
+        path (str): Path of the file. Parent directories are created.
+        max_bytes (int, optional): Rotate when the file would exceed this size. 0 disables rotation.
+            Defaults to 64 MiB.
+        backup_count (int, optional): Number of rotated files to keep. Defaults to 5.
+        fsync (bool, optional): fsync after each batch, so acknowledged events survive a power loss.
+            Defaults to False.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 64 * 1024 * 1024,
+        backup_count: int = 5,
+        fsync: bool = False,
+    ):
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+
+    def _open(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, "ab")
+        self._size = self._file.tell()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        self._file = None
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{i}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def _write(self, lines: List[bytes]) -> bool:
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._open()
+                for line in lines:
+                    if (
+                        self.max_bytes
+                        and self._size > 0
+                        and self._size + len(line) > self.max_bytes
+                    ):
+                        self._rotate()
+                    self._file.write(line)
+                    self._size += len(line)
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+                return True
+            except OSError as e:
+                logger.error(f"Could not write events to {self.path} - {e}")
+                return False
+
+    def export(self, session, events: List[dict]) -> bool:
+        session_id = str(session.session_id)
+        started = time.perf_counter()
+        lines = [
+            (safe_serialize({"session_id": session_id, **event}) + "\n").encode("utf-8")
+            for event in events
+        ]
+        telemetry.serialized((time.perf_counter() - started) * 1000)
+        return self._write(lines)
+
+    def end_session(self, session) -> Optional[dict]:
+        record = {
+            "session_id": str(session.session_id),
+            "event_type": "session",
+            "init_timestamp": session.init_timestamp,
+            "end_timestamp": session.end_timestamp or get_ISO_time(),
+            "end_state": session.end_state,
+            "end_state_reason": session.end_state_reason,
+            "tags": session.tags,
+        }
+        self._write([(safe_serialize(record) + "\n").encode("utf-8")])
+        return None
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,123 @@
+import json
+import time
+from typing import List, Optional
+
+from termcolor import colored
+
+from ..exceptions import ApiServerException
+from ..helpers import filter_unjsonable, safe_serialize
+from ..http_client import HttpClient
+from ..log_config import logger
+from ..telemetry import telemetry
+from .base import EventSink
+
+
+class AgentOpsHTTPSink(EventSink):
+    """
+    The AgentOps API. Creates the session with /v2/create_session, posts events to /v2/create_events
+    and updates the session with /v2/update_session. Endpoint and keys come from the session's config.
+    """
+
+    def start_session(self, session) -> bool:
+        config = session.config
+        payload = {"session": session.__dict__}
+        serialized_payload = json.dumps(filter_unjsonable(payload)).encode("utf-8")
+
+        try:
+            res = HttpClient.post(
+                f"{config.endpoint}/v2/create_session",
+                serialized_payload,
+                config.api_key,
+                config.parent_key,
+            )
+        except ApiServerException as e:
+            logger.error(f"Could not start session - {e}")
+            return False
+
+        logger.debug(res.body)
+
+        if res.code != 200:
+            return False
+
+        jwt = res.body.get("jwt", None)
+        session.jwt = jwt
+        if jwt is None:
+            return False
+
+        session_url = res.body.get(
+            "session_url",
+            f"https://app.agentops.ai/drilldown?session_id={session.session_id}",
+        )
+
+        logger.info(
+            colored(
+                f"\x1b[34mSession Replay: {session_url}\x1b[0m",
+                "blue",
+            )
+        )
+
+        return True
+
+    def export(self, session, events: List[dict]) -> bool:
+        endpoint = session.config.endpoint
+        payload = {
+            "events": events,
+        }
+
+        started = time.perf_counter()
+        serialized_payload = safe_serialize(payload).encode("utf-8")
+        telemetry.serialized((time.perf_counter() - started) * 1000)
+        try:
+            HttpClient.post(
+                f"{endpoint}/v2/create_events",
+                serialized_payload,
+                jwt=session.jwt,
+            )
+        except ApiServerException as e:
+            logger.error(f"Could not post events - {e}")
+            return False
+
+        logger.debug("\n<AGENTOPS_DEBUG_OUTPUT>")
+        logger.debug(f"Session request to {endpoint}/v2/create_events")
+        logger.debug(serialized_payload)
+        logger.debug("</AGENTOPS_DEBUG_OUTPUT>\n")
+        return True
+
+    def update_session(self, session) -> None:
+        payload = {"session": session.__dict__}
+
+        try:
+            HttpClient.post(
+                f"{session.config.endpoint}/v2/update_session",
+                json.dumps(filter_unjsonable(payload)).encode("utf-8"),
+                jwt=session.jwt,
+            )
+        except ApiServerException as e:
+            logger.error(f"Could not update session - {e}")
+
+    def end_session(self, session) -> Optional[dict]:
+        """Raises ApiServerException if the session could not be ended."""
+        payload = {"session": session.__dict__}
+        res = HttpClient.post(
+            f"{session.config.endpoint}/v2/update_session",
+            json.dumps(filter_unjsonable(payload)).encode("utf-8"),
+            jwt=session.jwt,
+        )
+        logger.debug(res.body)
+        return res.body
+
+    def create_agent(self, session, agent_id: str, name: Optional[str]) -> None:
+        payload = {
+            "id": agent_id,
+            "name": name,
+        }
+
+        serialized_payload = safe_serialize(payload).encode("utf-8")
+        try:
+            HttpClient.post(
+                f"{session.config.endpoint}/v2/create_agent",
+                serialized_payload,
+                jwt=session.jwt,
+            )
+        except ApiServerException as e:
+            logger.error(f"Could not create agent - {e}")
@@ -0,0 +1,55 @@
+import threading
+from collections import deque
+from typing import List, Optional
+
+from .base import EventSink
+
+
+class InMemorySink(EventSink):
+    """
+    Keeps the most recent events in memory, for tests and benchmarks. Events are stored as given,
+    with the `session_id` added. Once `capacity` is reached the oldest events are discarded.
+
+    Args:
+        capacity (int, optional): Maximum number of events kept. Defaults to 10,000.
+    """
+
+    def __init__(self, capacity: int = 10_000):
+        self._events: deque = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.overwritten = 0
+        self.ended_sessions: List[str] = []
+
+    def export(self, session, events: List[dict]) -> bool:
+        session_id = str(session.session_id)
+        with self._lock:
+            overflow = len(self._events) + len(events) - self._events.maxlen
+            if overflow > 0:
+                self.overwritten += overflow
+            self._events.extend({**event, "session_id": session_id} for event in events)
+            self.batches += 1
+        return True
+
+    def end_session(self, session) -> Optional[dict]:
+        with self._lock:
+            self.ended_sessions.append(str(session.session_id))
+        return None
+
+    def events(self, session_id=None) -> List[dict]:
+        """Events kept, oldest first, optionally only those of one session."""
+        with self._lock:
+            if session_id is None:
+                return list(self._events)
+            session_id = str(session_id)
+            return [e for e in self._events if e["session_id"] == session_id]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._events.clear()
+            self.batches = 0
+            self.overwritten = 0
+            self.ended_sessions = []
+
+    def __len__(self) -> int:
+        return len(self._events)
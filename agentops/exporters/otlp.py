@@ -0,0 +1,353 @@
+"""
+OTLP/HTTP trace exporter.
+
+Each session is a trace whose id is the session id. The session itself is exported as the root span
+when it ends, and every recorded event becomes a span:
+
+    LLMEvent    -> "chat {model}" (CLIENT) with gen_ai.* attributes
+    ToolEvent   -> "execute_tool {name}" with gen_ai.tool.name
+    ActionEvent -> "{action_type}"
+    ErrorEvent  -> "error {error_type}" with status ERROR and an "exception" span event
+
+Spans are parented to the event they were recorded in (`parent_id`) or to the session root span.
+Batches are exported from the session's flush thread, so exporting never blocks the caller.
+The JSON encoding has no dependencies; protobuf requires the `opentelemetry-proto` package.
+"""
+
+import base64
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID, uuid4
+
+import requests
+
+from ..enums import EventType
+from ..helpers import get_agentops_version, safe_serialize
+from ..log_config import logger
+from ..metrics import parse_ISO_time
+from ..telemetry import telemetry
+from .base import EventSink
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_CODE_OK = 1
+STATUS_CODE_ERROR = 2
+
+# Longer attribute values (params, returns, logs) are truncated
+MAX_ATTRIBUTE_LENGTH = 4096
+
+
+def trace_id_of(session_id) -> str:
+    return UUID(str(session_id)).hex
+
+
+def span_id_of(event_id) -> str:
+    return UUID(str(event_id)).hex[:16]
+
+
+def root_span_id_of(session_id) -> str:
+    return UUID(str(session_id)).hex[16:]
+
+
+def _unix_nano(timestamp: Optional[str]) -> str:
+    parsed = parse_ISO_time(timestamp)
+    seconds = parsed.timestamp() if parsed is not None else time.time()
+    return str(int(seconds * 1_000_000_000))
+
+
+def _any_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if not isinstance(value, str):
+        value = safe_serialize(value)
+    return {"stringValue": value[:MAX_ATTRIBUTE_LENGTH]}
+
+
+def _attributes(attributes: Dict[str, object]) -> List[dict]:
+    return [
+        {"key": key, "value": _any_value(value)}
+        for key, value in attributes.items()
+        if value is not None
+    ]
+
+
+def event_to_span(event: dict, session_id) -> dict:
+    """Map a serialized event (`Event.__dict__`) to an OTLP JSON span."""
+    event_type = event.get("event_type")
+    trace_id = trace_id_of(session_id)
+    parent_id = event.get("parent_id")
+    parent_span_id = span_id_of(parent_id) if parent_id else root_span_id_of(session_id)
+    attributes: Dict[str, object] = {
+        "agentops.event_type": event_type,
+        "agentops.agent_id": str(event["agent_id"]) if event.get("agent_id") else None,
+    }
+    kind = SPAN_KIND_INTERNAL
+    status = {"code": STATUS_CODE_OK}
+    span_events: List[dict] = []
+
+    if event_type == EventType.ERROR.value:
+        trigger_event_id = event.get("trigger_event_id")
+        if trigger_event_id:
+            parent_span_id = span_id_of(trigger_event_id)
+        error_type = event.get("error_type") or "error"
+        start = end = _unix_nano(event.get("timestamp"))
+        span_id = uuid4().hex[:16]
+        name = f"error {error_type}"
+        attributes["error.type"] = error_type
+        attributes["agentops.error.code"] = event.get("code")
+        status = {"code": STATUS_CODE_ERROR, "message": str(event.get("details") or "")}
+        span_events.append(
+            {
+                "timeUnixNano": start,
+                "name": "exception",
+                "attributes": _attributes(
+                    {
+                        "exception.type": error_type,
+                        "exception.message": event.get("details"),
+                        "exception.stacktrace": event.get("logs"),
+                    }
+                ),
+            }
+        )
+    else:
+        span_id = span_id_of(event["id"])
+        start = _unix_nano(event.get("init_timestamp"))
+        end = _unix_nano(event.get("end_timestamp") or event.get("init_timestamp"))
+        if event_type == EventType.LLM.value:
+            model = event.get("model")
+            name = f"chat {model}" if model else "chat"
+            kind = SPAN_KIND_CLIENT
+            attributes.update(
+                {
+                    "gen_ai.operation.name": "chat",
+                    "gen_ai.request.model": model,
+                    "gen_ai.response.model": model,
+                    "gen_ai.usage.input_tokens": event.get("prompt_tokens"),
+                    "gen_ai.usage.output_tokens": event.get("completion_tokens"),
+                    "gen_ai.usage.cached_input_tokens": event.get(
+                        "cached_prompt_tokens"
+                    ),
+                    "agentops.cost_usd": event.get("cost"),
+                }
+            )
+        elif event_type == EventType.TOOL.value:
+            tool_name = event.get("name")
+            name = f"execute_tool {tool_name}" if tool_name else "execute_tool"
+            attributes.update(
+                {
+                    "gen_ai.operation.name": "execute_tool",
+                    "gen_ai.tool.name": tool_name,
+                    "agentops.params": event.get("params"),
+                    "agentops.returns": event.get("returns"),
+                }
+            )
+        else:
+            name = event.get("action_type") or event_type or "event"
+            attributes.update(
+                {
+                    "agentops.action_type": event.get("action_type"),
+                    "agentops.params": event.get("params"),
+                    "agentops.returns": event.get("returns"),
+                    "agentops.logs": event.get("logs"),
+                }
+            )
+
+    span = {
+        "traceId": trace_id,
+        "spanId": span_id,
+        "parentSpanId": parent_span_id,
+        "name": name,
+        "kind": kind,
+        "startTimeUnixNano": start,
+        "endTimeUnixNano": end,
+        "attributes": _attributes(attributes),
+        "status": status,
+    }
+    if span_events:
+        span["events"] = span_events
+    return span
+
+
+def session_to_span(session) -> dict:
+    """The root span of a session's trace."""
+    failed = session.end_state == "Fail"
+    status = {"code": STATUS_CODE_ERROR if failed else STATUS_CODE_OK}
+    if session.end_state_reason:
+        status["message"] = session.end_state_reason
+    return {
+        "traceId": trace_id_of(session.session_id),
+        "spanId": root_span_id_of(session.session_id),
+        "name": "session",
+        "kind": SPAN_KIND_INTERNAL,
+        "startTimeUnixNano": _unix_nano(session.init_timestamp),
+        "endTimeUnixNano": _unix_nano(session.end_timestamp),
+        "attributes": _attributes(
+            {
+                "agentops.session_id": str(session.session_id),
+                "agentops.end_state": session.end_state,
+                "agentops.tags": list(session.tags) if session.tags else None,
+                "agentops.cost_usd": float(session.metrics.cost),
+            }
+        ),
+        "status": status,
+    }
+
+
+def _to_proto_json(payload: dict) -> dict:
+    # The protobuf JSON mapping encodes bytes fields in base64, OTLP/JSON uses hex
+    for resource_spans in payload["resourceSpans"]:
+        for scope_spans in resource_spans["scopeSpans"]:
+            for span in scope_spans["spans"]:
+                for key in ("traceId", "spanId", "parentSpanId"):
+                    if span.get(key):
+                        span[key] = base64.b64encode(bytes.fromhex(span[key])).decode()
+    return payload
+
+
+def _parse_headers(value: Optional[str]) -> Dict[str, str]:
+    """Parse the OTEL_EXPORTER_OTLP_HEADERS format: "key1=value1,key2=value2"."""
+    headers = {}
+    for pair in (value or "").split(","):
+        if "=" in pair:
+            key, _, val = pair.partition("=")
+            headers[key.strip()] = val.strip()
+    return headers
+
+
+_version: Optional[str] = None
+
+
+def _sdk_version() -> Optional[str]:
+    global _version
+    if _version is None:
+        _version = get_agentops_version() or ""
+    return _version or None
+
+
+class OTLPExporter(EventSink):
+    """
+    Exports sessions and events as OTLP/HTTP traces.
+
+    Args:
+        endpoint (str): Base URL of the collector, e.g. "http://localhost:4318". "/v1/traces" is appended
+            unless the URL already ends with it.
+        protocol (str, optional): "json" or "protobuf". Defaults to "json".
+        headers (Dict[str, str], optional): Extra request headers. Defaults to OTEL_EXPORTER_OTLP_HEADERS.
+        service_name (str, optional): The service.name resource attribute. Defaults to OTEL_SERVICE_NAME or "agentops".
+        timeout (float, optional): Request timeout in seconds. Defaults to 10.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        protocol: str = "json",
+        headers: Optional[Dict[str, str]] = None,
+        service_name: Optional[str] = None,
+        timeout: float = 10,
+    ):
+        if protocol not in ("json", "protobuf"):
+            raise ValueError(f"Unsupported OTLP protocol: {protocol}")
+        endpoint = endpoint.rstrip("/")
+        self.url = (
+            endpoint if endpoint.endswith("/v1/traces") else endpoint + "/v1/traces"
+        )
+        self.protocol = protocol
+        self.headers = (
+            headers
+            if headers is not None
+            else _parse_headers(os.environ.get("OTEL_EXPORTER_OTLP_HEADERS"))
+        )
+        self.service_name = service_name or os.environ.get(
+            "OTEL_SERVICE_NAME", "agentops"
+        )
+        self.timeout = timeout
+        self._version = _sdk_version()
+        self._http = requests.Session()
+
+    def build_request(self, session, spans: List[dict]) -> dict:
+        resource_attributes = {
+            "service.name": self.service_name,
+            "telemetry.sdk.name": "agentops",
+            "telemetry.sdk.version": self._version,
+            "agentops.session_id": str(session.session_id),
+        }
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": _attributes(resource_attributes)},
+                    "scopeSpans": [
+                        {
+                            "scope": {
+                                "name": "agentops",
+                                "version": self._version or "",
+                            },
+                            "spans": spans,
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def export(self, session, events: Iterable[dict]) -> bool:
+        """Export a batch of serialized events as spans. Returns whether the collector accepted them."""
+        spans = [event_to_span(event, session.session_id) for event in events]
+        if not spans:
+            return True
+        return self._send(self.build_request(session, spans))
+
+    def end_session(self, session) -> Optional[dict]:
+        """Export the root span of the ended session."""
+        self._send(self.build_request(session, [session_to_span(session)]))
+        return None
+
+    def _encode(self, payload: dict):
+        if self.protocol == "json":
+            return json.dumps(payload).encode("utf-8"), "application/json"
+
+        from google.protobuf.json_format import ParseDict
+        from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import (
+            ExportTraceServiceRequest,
+        )
+
+        message = ParseDict(_to_proto_json(payload), ExportTraceServiceRequest())
+        return message.SerializeToString(), "application/x-protobuf"
+
+    def _send(self, payload: dict) -> bool:
+        started = time.perf_counter()
+        try:
+            body, content_type = self._encode(payload)
+        except ImportError:
+            logger.error(
+                "OTLP protobuf export requires the opentelemetry-proto package. Use protocol='json' or install it."
+            )
+            return False
+        telemetry.serialized((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        ok = False
+        try:
+            res = self._http.post(
+                self.url,
+                data=body,
+                headers={**self.headers, "Content-Type": content_type},
+                timeout=self.timeout,
+            )
+            ok = 200 <= res.status_code < 300
+            if not ok:
+                logger.error(f"Could not export OTLP traces - HTTP {res.status_code}")
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Could not export OTLP traces - {e}")
+        finally:
+            telemetry.http_request(
+                self.url,
+                (time.perf_counter() - started) * 1000,
+                bytes_sent=len(body),
+                failed=not ok,
+            )
+        return ok
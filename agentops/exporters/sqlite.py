@@ -0,0 +1,369 @@
+"""
+Local session store backed by SQLite.
+
+SQLiteStore is an EventSink, so it receives the same create/update session and create events calls as
+the AgentOps API, and keeps them in a single SQLite file in WAL mode (readers, such as the `agentops
+store` CLI, don't block the writing process). Events are indexed by session, type, model, agent,
+start time and duration, and can be queried with `query_events` and `sessions`.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Union
+from uuid import uuid4
+
+from ..enums import EventType
+from ..helpers import get_ISO_time, safe_serialize
+from ..log_config import logger
+from ..metrics import event_duration_ms, parse_ISO_time
+from ..telemetry import telemetry
+from .base import EventSink
+
+DEFAULT_STORE_PATH = os.path.join("~", ".agentops", "sessions.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    init_timestamp TEXT,
+    end_timestamp TEXT,
+    start_time REAL,
+    duration_ms REAL,
+    end_state TEXT,
+    end_state_reason TEXT,
+    tags TEXT,
+    cost REAL,
+    host_env TEXT
+);
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    event_type TEXT,
+    name TEXT,
+    model TEXT,
+    agent_id TEXT,
+    parent_id TEXT,
+    init_timestamp TEXT,
+    end_timestamp TEXT,
+    start_time REAL,
+    duration_ms REAL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    cost REAL,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS agents (
+    id TEXT PRIMARY KEY,
+    session_id TEXT,
+    name TEXT
+);
+CREATE INDEX IF NOT EXISTS events_session ON events (session_id, start_time);
+CREATE INDEX IF NOT EXISTS events_type_duration ON events (event_type, duration_ms);
+CREATE INDEX IF NOT EXISTS events_type_start ON events (event_type, start_time);
+CREATE INDEX IF NOT EXISTS events_model_duration ON events (model, duration_ms);
+CREATE INDEX IF NOT EXISTS events_agent ON events (agent_id);
+CREATE INDEX IF NOT EXISTS sessions_start ON sessions (start_time);
+"""
+
+_INDEXED_COLUMNS = (
+    "id, session_id, event_type, name, model, agent_id, parent_id, init_timestamp, end_timestamp, "
+    "start_time, duration_ms, prompt_tokens, completion_tokens, cost"
+)
+_ORDER_COLUMNS = {
+    "duration_ms",
+    "start_time",
+    "cost",
+    "prompt_tokens",
+    "completion_tokens",
+}
+
+
+def _epoch(timestamp: Optional[str]) -> Optional[float]:
+    parsed = parse_ISO_time(timestamp)
+    return parsed.timestamp() if parsed is not None else None
+
+
+def _name_of(event: dict) -> Optional[str]:
+    event_type = event.get("event_type")
+    if event_type == EventType.TOOL.value:
+        return event.get("name")
+    if event_type == EventType.ERROR.value:
+        return event.get("error_type")
+    return event.get("action_type") or event.get("name")
+
+
+class _Timestamps:
+    # event_duration_ms works on objects, the store receives serialized dicts
+    __slots__ = ("init_timestamp", "end_timestamp")
+
+    def __init__(self, event: dict):
+        self.init_timestamp = event.get("init_timestamp") or event.get("timestamp")
+        self.end_timestamp = event.get("end_timestamp") or event.get("timestamp")
+
+
+class SQLiteStore(EventSink):
+    """
+    Args:
+        path (str, optional): Database file. Defaults to ~/.agentops/sessions.db.
+        store_payloads (bool, optional): Also keep the full event (prompts, completions, params...) as JSON.
+            Defaults to True.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, store_payloads: bool = True):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.store_payloads = store_payloads
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # EventSink
+
+    def start_session(self, session) -> bool:
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO sessions
+                (session_id, init_timestamp, start_time, end_state, tags, host_env)
+                VALUES (?, ?, ?, ?, ?, ?)""",
+                (
+                    str(session.session_id),
+                    session.init_timestamp,
+                    _epoch(session.init_timestamp),
+                    session.end_state,
+                    json.dumps(list(session.tags or [])),
+                    safe_serialize(session.host_env) if session.host_env else None,
+                ),
+            )
+        return True
+
+    def export(self, session, events: List[dict]) -> bool:
+        session_id = str(session.session_id)
+        started = time.perf_counter()
+        rows = [self._row(session_id, event) for event in events]
+        telemetry.serialized((time.perf_counter() - started) * 1000)
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    """INSERT OR REPLACE INTO events
+                    (id, session_id, event_type, name, model, agent_id, parent_id, init_timestamp,
+                     end_timestamp, start_time, duration_ms, prompt_tokens, completion_tokens, cost, data)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+                return True
+            except sqlite3.Error as e:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                logger.error(f"Could not store events in {self.path} - {e}")
+                return False
+
+    def _row(self, session_id: str, event: dict) -> tuple:
+        timestamps = _Timestamps(event)
+        agent_id = event.get("agent_id")
+        parent_id = event.get("parent_id") or event.get("trigger_event_id")
+        return (
+            str(event.get("id") or uuid4()),
+            session_id,
+            event.get("event_type"),
+            _name_of(event),
+            event.get("model"),
+            str(agent_id) if agent_id else None,
+            str(parent_id) if parent_id else None,
+            timestamps.init_timestamp,
+            timestamps.end_timestamp,
+            _epoch(timestamps.init_timestamp),
+            event_duration_ms(timestamps),
+            event.get("prompt_tokens"),
+            event.get("completion_tokens"),
+            event.get("cost"),
+            safe_serialize(event) if self.store_payloads else None,
+        )
+
+    def update_session(self, session) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE sessions SET tags = ? WHERE session_id = ?",
+                (json.dumps(list(session.tags or [])), str(session.session_id)),
+            )
+
+    def end_session(self, session) -> Optional[dict]:
+        end_timestamp = session.end_timestamp or get_ISO_time()
+        start, end = _epoch(session.init_timestamp), _epoch(end_timestamp)
+        with self._lock:
+            self._conn.execute(
+                """UPDATE sessions SET end_timestamp = ?, duration_ms = ?, end_state = ?,
+                end_state_reason = ?, tags = ?, cost = ? WHERE session_id = ?""",
+                (
+                    end_timestamp,
+                    (
+                        (end - start) * 1000
+                        if start is not None and end is not None
+                        else None
+                    ),
+                    session.end_state,
+                    session.end_state_reason,
+                    json.dumps(list(session.tags or [])),
+                    float(session.metrics.cost),
+                    str(session.session_id),
+                ),
+            )
+        return None
+
+    def create_agent(self, session, agent_id: str, name: Optional[str]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO agents (id, session_id, name) VALUES (?, ?, ?)",
+                (str(agent_id), str(session.session_id), name),
+            )
+
+    def shutdown(self) -> None:
+        # The store is shared by sessions and stays open; see close()
+        pass
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # Queries
+
+    def _select(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def query_events(
+        self,
+        event_type: Optional[str] = None,
+        session_id: Optional[str] = None,
+        model: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        name: Optional[str] = None,
+        since: Optional[Union[float, str]] = None,
+        until: Optional[Union[float, str]] = None,
+        min_duration_ms: Optional[float] = None,
+        order_by: str = "start_time",
+        descending: bool = False,
+        limit: Optional[int] = 100,
+        include_data: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Query events. `since` and `until` are epoch seconds or ISO timestamps. Results are dicts of the
+        indexed columns, plus the full event under "data" with `include_data`.
+
+        Example, the 20 slowest LLM calls of the last day:
+            store.query_events("llms", since=time.time() - 86400, order_by="duration_ms", descending=True, limit=20)
+        """
+        if order_by not in _ORDER_COLUMNS:
+            raise ValueError(f"order_by must be one of {sorted(_ORDER_COLUMNS)}")
+        clauses, params = [], []
+        for column, value in (
+            ("event_type", event_type),
+            ("session_id", session_id),
+            ("model", model),
+            ("agent_id", agent_id),
+            ("name", name),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(str(value))
+        if since is not None:
+            clauses.append("start_time >= ?")
+            params.append(since if isinstance(since, (int, float)) else _epoch(since))
+        if until is not None:
+            clauses.append("start_time < ?")
+            params.append(until if isinstance(until, (int, float)) else _epoch(until))
+        if min_duration_ms is not None:
+            clauses.append("duration_ms >= ?")
+            params.append(min_duration_ms)
+
+        sql = f"SELECT {'*' if include_data else _INDEXED_COLUMNS} FROM events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {order_by} {'DESC' if descending else 'ASC'}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        rows = self._select(sql, tuple(params))
+        if include_data:
+            for row in rows:
+                row["data"] = json.loads(row["data"]) if row["data"] else None
+        return rows
+
+    def iter_events(self, session_id: str, batch_size: int = 1000) -> Iterator[dict]:
+        """The full events of a session in start order, read in batches so any size fits in memory."""
+        last_start, last_id = -1.0, ""
+        while True:
+            # Keyset pagination on (start_time, id); events without a start time come first
+            rows = self._select(
+                """SELECT id, COALESCE(start_time, 0) AS start, data FROM events
+                WHERE session_id = ? AND (start > ? OR (start = ? AND id > ?))
+                ORDER BY start, id LIMIT ?""",
+                (str(session_id), last_start, last_start, last_id, batch_size),
+            )
+            for row in rows:
+                # Error events have no id of their own; the stored one is generated
+                event = json.loads(row["data"]) if row["data"] else {}
+                event.setdefault("id", row["id"])
+                yield event
+            if len(rows) < batch_size:
+                return
+            last_start, last_id = rows[-1]["start"], rows[-1]["id"]
+
+    def agents(self, session_id: str) -> Dict[str, Optional[str]]:
+        """Names of the agents of a session, by agent id."""
+        rows = self._select(
+            "SELECT id, name FROM agents WHERE session_id = ?", (str(session_id),)
+        )
+        return {row["id"]: row["name"] for row in rows}
+
+    def sessions(
+        self, since: Optional[Union[float, str]] = None, limit: Optional[int] = 20
+    ) -> List[Dict[str, Any]]:
+        """Most recent sessions first, with their number of events."""
+        sql = """SELECT s.*, (SELECT COUNT(*) FROM events e WHERE e.session_id = s.session_id) AS events
+            FROM sessions s"""
+        params: list = []
+        if since is not None:
+            sql += " WHERE s.start_time >= ?"
+            params.append(since if isinstance(since, (int, float)) else _epoch(since))
+        sql += " ORDER BY s.start_time DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        rows = self._select(sql, tuple(params))
+        for row in rows:
+            row["tags"] = json.loads(row["tags"]) if row["tags"] else []
+        return rows
+
+    def stats(
+        self,
+        group_by: str = "model",
+        event_type: Optional[str] = EventType.LLM.value,
+        since: Optional[Union[float, str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Count, total/average/max duration, tokens and cost of events grouped by model, name or agent_id."""
+        if group_by not in ("model", "name", "agent_id", "event_type", "session_id"):
+            raise ValueError(f"Cannot group events by {group_by}")
+        clauses, params = [], []
+        if event_type is not None:
+            clauses.append("event_type = ?")
+            params.append(event_type)
+        if since is not None:
+            clauses.append("start_time >= ?")
+            params.append(since if isinstance(since, (int, float)) else _epoch(since))
+        sql = f"""SELECT {group_by} AS key, COUNT(*) AS count, SUM(duration_ms) AS total_ms,
+            AVG(duration_ms) AS avg_ms, MAX(duration_ms) AS max_ms,
+            SUM(prompt_tokens) AS prompt_tokens, SUM(completion_tokens) AS completion_tokens,
+            SUM(cost) AS cost FROM events"""
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" GROUP BY {group_by} ORDER BY total_ms DESC"
+        return self._select(sql, tuple(params))
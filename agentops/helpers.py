@@ -3,7 +3,6 @@ from functools import wraps
 from datetime import datetime, timezone
 import inspect
 from typing import Union
-import requests
 import json
 from importlib.metadata import version, PackageNotFoundError
 
@@ -99,22 +98,29 @@ def safe_serialize(obj):
 
 
 def check_call_stack_for_agent_id() -> Union[UUID, None]:
-    for frame_info in inspect.stack():
-        # Look through the call stack for the class that called the LLM
-        local_vars = frame_info.frame.f_locals
-        for var in local_vars.values():
-            # We stop looking up the stack at main because after that we see global variables
-            if var == "__main__":
-                return None
-            if hasattr(var, "agent_ops_agent_id") and getattr(
-                var, "agent_ops_agent_id"
-            ):
-                logger.debug(
-                    "LLM call from agent named: %s",
-                    getattr(var, "agent_ops_agent_name"),
-                )
-                return getattr(var, "agent_ops_agent_id")
-    return None
+    # Walk the frames directly: inspect.stack() also loads source context for every frame, which is
+    # far too slow for something that runs on every recorded event
+    frame = inspect.currentframe()
+    try:
+        while frame is not None:
+            # Look through the call stack for the class that called the LLM
+            local_vars = frame.f_locals
+            for var in local_vars.values():
+                # We stop looking up the stack at main because after that we see global variables
+                if var == "__main__":
+                    return None
+                if hasattr(var, "agent_ops_agent_id") and getattr(
+                    var, "agent_ops_agent_id"
+                ):
+                    logger.debug(
+                        "LLM call from agent named: %s",
+                        getattr(var, "agent_ops_agent_name"),
+                    )
+                    return getattr(var, "agent_ops_agent_id")
+            frame = frame.f_back
+        return None
+    finally:
+        del frame
 
 
 def get_agentops_version():
@@ -127,6 +133,8 @@ def get_agentops_version():
 
 
 def check_agentops_update():
+    import requests
+
     try:
         response = requests.get("https://pypi.org/pypi/agentops/json")
 
@@ -1,9 +1,12 @@
+import time
 from enum import Enum
 from typing import Optional
 from requests.adapters import Retry, HTTPAdapter
 import requests
+from urllib3.exceptions import MaxRetryError
 
 from .exceptions import ApiServerException
+from .telemetry import telemetry
 
 JSON_HEADER = {"Content-Type": "application/json; charset=UTF-8", "Accept": "*/*"}
 
@@ -29,9 +32,13 @@ class Response:
         self.status: HttpStatus = status
         self.code: int = status.value
         self.body = body if body else {}
+        self.retries = 0
 
     def parse(self, res: requests.models.Response):
         res_body = res.json()
+        # urllib3 keeps the retries it made for this request on the raw response
+        history = getattr(getattr(res.raw, "retries", None), "history", None)
+        self.retries = len(history) if history else 0
         self.code = res.status_code
         self.status = self.get_status(self.code)
         self.body = res_body
@@ -56,6 +63,23 @@ class Response:
         return HttpStatus.UNKNOWN
 
 
+def _retries_of(e: requests.exceptions.RequestException) -> int:
+    # requests wraps the urllib3 MaxRetryError when the retries ran out, all of them were made
+    if e.args and isinstance(e.args[0], MaxRetryError):
+        return retry_config.total
+    return 0
+
+
+def _record_request(url: str, started: float, result: Response, bytes_sent=0):
+    telemetry.http_request(
+        url,
+        (time.perf_counter() - started) * 1000,
+        bytes_sent=bytes_sent,
+        retries=result.retries,
+        failed=result.status != HttpStatus.SUCCESS,
+    )
+
+
 class HttpClient:
 
     @staticmethod
@@ -67,7 +91,42 @@ class HttpClient:
         jwt: Optional[str] = None,
         header=None,
     ) -> Response:
+        started = time.perf_counter()
+        # Filled in by the request even when it raises, so that failures are recorded too
         result = Response()
+        try:
+            return HttpClient._post(
+                url, payload, api_key, parent_key, jwt, header, result
+            )
+        finally:
+            _record_request(url, started, result, bytes_sent=len(payload))
+
+    @staticmethod
+    def get(
+        url: str,
+        api_key: Optional[str] = None,
+        jwt: Optional[str] = None,
+        header=None,
+    ) -> Response:
+        started = time.perf_counter()
+        # Filled in by the request even when it raises, so that failures are recorded too
+        result = Response()
+        try:
+            return HttpClient._get(url, api_key, jwt, header, result)
+        finally:
+            _record_request(url, started, result)
+
+    @staticmethod
+    def _post(
+        url: str,
+        payload: bytes,
+        api_key: Optional[str] = None,
+        parent_key: Optional[str] = None,
+        jwt: Optional[str] = None,
+        header=None,
+        result: Optional[Response] = None,
+    ) -> Response:
+        result = result if result is not None else Response()
         try:
             # Create request session with retries configured
             request_session = requests.Session()
@@ -87,7 +146,8 @@ class HttpClient:
             )
 
             result.parse(res)
-        except requests.exceptions.Timeout:
+        except requests.exceptions.Timeout as e:
+            result.retries = _retries_of(e)
             result.code = 408
             result.status = HttpStatus.TIMEOUT
             raise ApiServerException(
@@ -97,12 +157,12 @@ class HttpClient:
             try:
                 result.parse(e.response)
             except Exception:
-                result = Response()
                 result.code = e.response.status_code
                 result.status = Response.get_status(e.response.status_code)
                 result.body = {"error": str(e)}
                 raise ApiServerException(f"HTTPError: {e}")
         except requests.exceptions.RequestException as e:
+            result.retries = _retries_of(e)
             result.body = {"error": str(e)}
             raise ApiServerException(f"RequestException: {e}")
 
@@ -121,13 +181,14 @@ class HttpClient:
         return result
 
     @staticmethod
-    def get(
+    def _get(
         url: str,
         api_key: Optional[str] = None,
         jwt: Optional[str] = None,
         header=None,
+        result: Optional[Response] = None,
     ) -> Response:
-        result = Response()
+        result = result if result is not None else Response()
         try:
             # Create request session with retries configured
             request_session = requests.Session()
@@ -142,7 +203,8 @@ class HttpClient:
             res = request_session.get(url, headers=JSON_HEADER, timeout=20)
 
             result.parse(res)
-        except requests.exceptions.Timeout:
+        except requests.exceptions.Timeout as e:
+            result.retries = _retries_of(e)
             result.code = 408
             result.status = HttpStatus.TIMEOUT
             raise ApiServerException(
@@ -152,12 +214,12 @@ class HttpClient:
             try:
                 result.parse(e.response)
             except Exception:
-                result = Response()
                 result.code = e.response.status_code
                 result.status = Response.get_status(e.response.status_code)
                 result.body = {"error": str(e)}
                 raise ApiServerException(f"HTTPError: {e}")
         except requests.exceptions.RequestException as e:
+            result.retries = _retries_of(e)
             result.body = {"error": str(e)}
             raise ApiServerException(f"RequestException: {e}")
 
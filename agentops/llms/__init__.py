@@ -1,7 +1,9 @@
 import functools
 import sys
-from importlib import import_module
-from importlib.metadata import version
+import threading
+from importlib.abc import Loader, MetaPathFinder
+from importlib.metadata import PackageNotFoundError, version
+from typing import Optional
 
 from packaging.version import Version, parse
 
@@ -21,6 +23,77 @@ original_create = None
 original_create_async = None
 
 
+@functools.lru_cache(maxsize=None)
+def resolve_version(api: str) -> Optional[str]:
+    """The installed version of an API's package, looked up once per process."""
+    try:
+        return version(api)
+    except PackageNotFoundError:
+        return getattr(sys.modules.get(api), "__version__", None)
+
+
+class _InstrumentingLoader(Loader):
+    """Runs the real loader of a provider's module, then instruments it. Everything else is delegated."""
+
+    def __init__(self, loader, on_import):
+        self.loader = loader
+        self.on_import = on_import
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        # The module gets its real loader back, which is what importlib.resources and reloads use
+        module.__loader__ = self.loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self.loader
+        self.loader.exec_module(module)
+        self.on_import(module.__name__)
+
+
+class ProviderImportHook(MetaPathFinder):
+    """
+    Meta path finder that instruments supported LLM APIs when they're first imported, so that SDKs
+    imported lazily after agentops.init() are recorded too. It only wraps the loader of the top-level
+    modules in LlmTracker.SUPPORTED_APIS, and doesn't change how any module is found or loaded.
+    """
+
+    def __init__(self, tracker: "LlmTracker"):
+        self.tracker = tracker
+
+    @classmethod
+    def install(cls, tracker: "LlmTracker") -> "ProviderImportHook":
+        """Put a hook first on sys.meta_path, replacing the hook of a previous tracker."""
+        hook = cls(tracker)
+        sys.meta_path[:] = [
+            finder for finder in sys.meta_path if not isinstance(finder, cls)
+        ]
+        sys.meta_path.insert(0, hook)
+        return hook
+
+    def uninstall(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        if path is not None or fullname not in self.tracker.SUPPORTED_APIS:
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _InstrumentingLoader(
+                        spec.loader, self.tracker._on_import
+                    )
+                return spec
+        return None
+
+
 class LlmTracker:
     SUPPORTED_APIS = {
         "litellm": {"1.3.1": ("openai_chat_completions.completion",)},
@@ -52,128 +125,80 @@ class LlmTracker:
         },
     }
 
+    # Provider, minimum version and display name of each supported API
+    PROVIDERS = {
+        "litellm": (LiteLLMProvider, "1.3.1", "LiteLLM"),
+        "openai": (OpenAiProvider, "1.0.0", "OpenAI"),
+        "cohere": (CohereProvider, "5.4.0", "Cohere"),
+        "ollama": (OllamaProvider, "0.0.1", "Ollama"),
+        "groq": (GroqProvider, "0.9.0", "Groq"),
+        "anthropic": (AnthropicProvider, "0.32.0", "Anthropic"),
+        "mistralai": (MistralProvider, "1.0.1", "MistralAI"),
+        "ai21": (AI21Provider, "2.0.0", "AI21"),
+    }
+
     def __init__(self, client):
         self.client = client
+        self._providers = {}
+        self._lock = threading.RLock()
+        self._import_hook = None
 
     def override_api(self):
         """
-        Overrides key methods of the specified API to record events.
+        Overrides key methods of the supported APIs to record events: those already imported now, the
+        others when they're first imported, through an import hook.
         """
-
         for api in self.SUPPORTED_APIS:
             if api in sys.modules:
-                module = import_module(api)
-                if api == "litellm":
-                    module_version = version(api)
-                    if module_version is None:
-                        logger.warning(
-                            f"Cannot determine LiteLLM version. Only LiteLLM>=1.3.1 supported."
-                        )
-
-                    if Version(module_version) >= parse("1.3.1"):
-                        provider = LiteLLMProvider(self.client)
-                        provider.override()
-                    else:
-                        logger.warning(
-                            f"Only LiteLLM>=1.3.1 supported. v{module_version} found."
-                        )
-                    return  # If using an abstraction like litellm, do not patch the underlying LLM APIs
-
+                self._instrument(api)
+        self._import_hook = ProviderImportHook.install(self)
+
+    def _on_import(self, api: str) -> None:
+        # Called by the import hook; a failure to instrument must never fail the import
+        try:
+            self._instrument(api)
+        except Exception as e:
+            logger.warning(f"Unable to instrument {api} - {e}")
+
+    def _instrument(self, api: str) -> None:
+        with self._lock:
+            if api in self._providers:
+                return
+            if api != "litellm" and "litellm" in sys.modules:
+                # If using an abstraction like litellm, do not patch the underlying LLM APIs
+                return
+            provider_class, min_version, name = self.PROVIDERS[api]
+            module_version = resolve_version(api)
+            if module_version is None:
+                logger.warning(
+                    f"Cannot determine {name} version. Only {name}>={min_version} supported."
+                )
+                return
+            if Version(module_version) < parse(min_version):
                 if api == "openai":
-                    # Patch openai v1.0.0+ methods
-                    if hasattr(module, "__version__"):
-                        module_version = parse(module.__version__)
-                        if module_version >= parse("1.0.0"):
-                            provider = OpenAiProvider(self.client)
-                            provider.override()
-                        else:
-                            raise DeprecationWarning(
-                                "OpenAI versions < 0.1 are no longer supported by AgentOps. Please upgrade OpenAI or "
-                                "downgrade AgentOps to <=0.3.8."
-                            )
-
-                if api == "cohere":
-                    # Patch cohere v5.4.0+ methods
-                    module_version = version(api)
-                    if module_version is None:
-                        logger.warning(
-                            f"Cannot determine Cohere version. Only Cohere>=5.4.0 supported."
-                        )
-
-                    if Version(module_version) >= parse("5.4.0"):
-                        provider = CohereProvider(self.client)
-                        provider.override()
-                    else:
-                        logger.warning(
-                            f"Only Cohere>=5.4.0 supported. v{module_version} found."
-                        )
-
-                if api == "ollama":
-                    module_version = version(api)
-
-                    if Version(module_version) >= parse("0.0.1"):
-                        provider = OllamaProvider(self.client)
-                        provider.override()
-                    else:
-                        logger.warning(
-                            f"Only Ollama>=0.0.1 supported. v{module_version} found."
-                        )
-
-                if api == "groq":
-                    module_version = version(api)
-
-                    if Version(module_version) >= parse("0.9.0"):
-                        provider = GroqProvider(self.client)
-                        provider.override()
-                    else:
-                        logger.warning(
-                            f"Only Groq>=0.9.0 supported. v{module_version} found."
-                        )
-
-                if api == "anthropic":
-                    module_version = version(api)
-
-                    if module_version is None:
-                        logger.warning(
-                            f"Cannot determine Anthropic version. Only Anthropic>=0.32.0 supported."
-                        )
-
-                    if Version(module_version) >= parse("0.32.0"):
-                        provider = AnthropicProvider(self.client)
-                        provider.override()
-                    else:
-                        logger.warning(
-                            f"Only Anthropic>=0.32.0 supported. v{module_version} found."
-                        )
-
-                if api == "mistralai":
-                    module_version = version(api)
-
-                    if Version(module_version) >= parse("1.0.1"):
-                        provider = MistralProvider(self.client)
-                        provider.override()
-                    else:
-                        logger.warning(
-                            f"Only MistralAI>=1.0.1 supported. v{module_version} found."
-                        )
-
-                if api == "ai21":
-                    module_version = version(api)
-
-                    if module_version is None:
-                        logger.warning(
-                            f"Cannot determine AI21 version. Only AI21>=2.0.0 supported."
-                        )
-
-                    if Version(module_version) >= parse("2.0.0"):
-                        provider = AI21Provider(self.client)
-                        provider.override()
-                    else:
-                        logger.warning(
-                            f"Only AI21>=2.0.0 supported. v{module_version} found."
-                        )
+                    raise DeprecationWarning(
+                        "OpenAI versions < 0.1 are no longer supported by AgentOps. Please upgrade OpenAI or "
+                        "downgrade AgentOps to <=0.3.8."
+                    )
+                logger.warning(
+                    f"Only {name}>={min_version} supported. v{module_version} found."
+                )
+                return
+
+            provider = provider_class(self.client)
+            provider.override()
+            self._providers[api] = provider
+            if api == "litellm":
+                # litellm was imported after the APIs it wraps, which were already patched
+                for other in [a for a in self._providers if a != "litellm"]:
+                    self._providers.pop(other).undo_override()
+            logger.debug(f"Instrumented {name} v{module_version}")
 
     def stop_instrumenting(self):
+        if self._import_hook is not None:
+            self._import_hook.uninstall()
+            self._import_hook = None
+        self._providers.clear()
         OpenAiProvider(self.client).undo_override()
         GroqProvider(self.client).undo_override()
         CohereProvider(self.client).undo_override()
@@ -3,13 +3,13 @@ import pprint
 from typing import Optional
 
 from agentops.llms.instrumented_provider import InstrumentedProvider
-from agentops.time_travel import fetch_completion_override_from_time_travel_cache
 
 from ..event import ErrorEvent, LLMEvent, ActionEvent, ToolEvent
 from ..session import Session
 from ..log_config import logger
 from ..helpers import check_call_stack_for_agent_id, get_ISO_time
 from ..singleton import singleton
+from .. import replay as _replay
 
 
 @singleton
@@ -24,6 +24,33 @@ class AI21Provider(InstrumentedProvider):
         super().__init__(client)
         self._provider_name = "AI21"
 
+    def replay_types(self):
+        from ai21.models.chat.chat_completion_chunk import ChatCompletionChunk
+        from ai21.models.chat.chat_completion_response import ChatCompletionResponse
+        from ai21.models.responses.answer_response import AnswerResponse
+
+        return (ChatCompletionResponse, ChatCompletionChunk, AnswerResponse)
+
+    def stream_chunks(self, response, request):
+        chunks = super().stream_chunks(response, request)
+        if chunks is None:
+            return None
+        # AI21 chunks only have an id, choices and, on the last one, the usage
+        usage = (_replay.dump_model(response) or {}).get("usage")
+        chunks = [
+            {
+                "id": chunk["id"],
+                "choices": [
+                    {k: v for k, v in choice.items() if k != "logprobs"}
+                    for choice in chunk["choices"]
+                ],
+            }
+            for chunk in chunks
+        ]
+        if usage is not None:
+            chunks[-1]["usage"] = usage
+        return chunks
+
     def handle_response(
         self, response, kwargs, init_timestamp, session: Optional[Session] = None
     ):
@@ -34,6 +61,8 @@ class AI21Provider(InstrumentedProvider):
         from ai21.models.chat.chat_completion_response import ChatCompletionResponse
         from ai21.models.responses.answer_response import AnswerResponse
 
+        from ..replay import AsyncReplayStream, ReplayStream
+
         llm_event = LLMEvent(init_timestamp=init_timestamp, params=kwargs)
         action_event = ActionEvent(init_timestamp=init_timestamp, params=kwargs)
 
@@ -94,7 +123,7 @@ class AI21Provider(InstrumentedProvider):
 
         # if the response is a generator, decorate the generator
         # For synchronous Stream
-        if isinstance(response, Stream):
+        if isinstance(response, (Stream, ReplayStream)):
 
             def generator():
                 for chunk in response:
@@ -104,7 +133,7 @@ class AI21Provider(InstrumentedProvider):
             return generator()
 
         # For asynchronous AsyncStream
-        if isinstance(response, AsyncStream):
+        if isinstance(response, (AsyncStream, AsyncReplayStream)):
 
             async def async_generator():
                 async for chunk in response:
@@ -169,7 +198,18 @@ class AI21Provider(InstrumentedProvider):
             session = kwargs.get("session", None)
             if "session" in kwargs.keys():
                 del kwargs["session"]
-            result = original_create(*args, **kwargs)
+
+            intercepted = self.intercept(kwargs)
+            if intercepted is not None:
+                return self.handle_response(
+                    intercepted, kwargs, init_timestamp, session=session
+                )
+
+            try:
+                result = original_create(*args, **kwargs)
+                result = self.record(kwargs, result)
+            finally:
+                self._clear_cache_miss()
             return self.handle_response(result, kwargs, init_timestamp, session=session)
 
         # Override the original method with the patched one
@@ -187,7 +227,18 @@ class AI21Provider(InstrumentedProvider):
             session = kwargs.get("session", None)
             if "session" in kwargs.keys():
                 del kwargs["session"]
-            result = await original_create_async(*args, **kwargs)
+
+            intercepted = self.intercept(kwargs, is_async=True)
+            if intercepted is not None:
+                return self.handle_response(
+                    intercepted, kwargs, init_timestamp, session=session
+                )
+
+            try:
+                result = await original_create_async(*args, **kwargs)
+                result = self.record(kwargs, result, is_async=True)
+            finally:
+                self._clear_cache_miss()
             return self.handle_response(result, kwargs, init_timestamp, session=session)
 
         # Override the original method with the patched one
@@ -206,7 +257,18 @@ class AI21Provider(InstrumentedProvider):
             session = kwargs.get("session", None)
             if "session" in kwargs.keys():
                 del kwargs["session"]
-            result = original_answer(*args, **kwargs)
+
+            intercepted = self.intercept(kwargs)
+            if intercepted is not None:
+                return self.handle_response(
+                    intercepted, kwargs, init_timestamp, session=session
+                )
+
+            try:
+                result = original_answer(*args, **kwargs)
+                result = self.record(kwargs, result)
+            finally:
+                self._clear_cache_miss()
             return self.handle_response(result, kwargs, init_timestamp, session=session)
 
         StudioAnswer.create = patched_function
@@ -224,7 +286,18 @@ class AI21Provider(InstrumentedProvider):
             session = kwargs.get("session", None)
             if "session" in kwargs.keys():
                 del kwargs["session"]
-            result = await original_answer_async(*args, **kwargs)
+
+            intercepted = self.intercept(kwargs, is_async=True)
+            if intercepted is not None:
+                return self.handle_response(
+                    intercepted, kwargs, init_timestamp, session=session
+                )
+
+            try:
+                result = await original_answer_async(*args, **kwargs)
+                result = self.record(kwargs, result, is_async=True)
+            finally:
+                self._clear_cache_miss()
             return self.handle_response(result, kwargs, init_timestamp, session=session)
 
         AsyncStudioAnswer.create = patched_function
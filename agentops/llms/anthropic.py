@@ -2,7 +2,7 @@ import pprint
 from typing import Optional
 
 from agentops.llms.instrumented_provider import InstrumentedProvider
-from agentops.time_travel import fetch_completion_override_from_time_travel_cache
+from agentops.time_travel import register_override_types
 
 from ..event import ErrorEvent, LLMEvent, ToolEvent
 from ..session import Session
@@ -31,6 +31,8 @@ class AnthropicProvider(InstrumentedProvider):
         from anthropic.resources import AsyncMessages
         from anthropic.types import Message
 
+        from ..replay import AsyncReplayStream, ReplayStream
+
         llm_event = LLMEvent(init_timestamp=init_timestamp, params=kwargs)
         if session is not None:
             llm_event.session_id = session.session_id
@@ -44,6 +46,12 @@ class AnthropicProvider(InstrumentedProvider):
                     llm_event.model = kwargs["model"]
                     llm_event.prompt = kwargs["messages"]
                     llm_event.prompt_tokens = chunk.message.usage.input_tokens
+                    llm_event.cache_read_tokens = getattr(
+                        chunk.message.usage, "cache_read_input_tokens", None
+                    )
+                    llm_event.cache_creation_tokens = getattr(
+                        chunk.message.usage, "cache_creation_input_tokens", None
+                    )
                     llm_event.completion = {
                         "role": chunk.message.role,
                         "content": "",  # Always returned as [] in this instance type
@@ -93,7 +101,7 @@ class AnthropicProvider(InstrumentedProvider):
                 )
 
         # if the response is a generator, decorate the generator
-        if isinstance(response, Stream):
+        if isinstance(response, (Stream, ReplayStream)):
 
             def generator():
                 for chunk in response:
@@ -103,7 +111,7 @@ class AnthropicProvider(InstrumentedProvider):
             return generator()
 
         # For asynchronous AsyncStream
-        if isinstance(response, AsyncStream):
+        if isinstance(response, (AsyncStream, AsyncReplayStream)):
 
             async def async_generator():
                 async for chunk in response:
@@ -128,6 +136,13 @@ class AnthropicProvider(InstrumentedProvider):
             llm_event.agent_id = check_call_stack_for_agent_id()
             llm_event.prompt = kwargs["messages"]
             llm_event.prompt_tokens = response.usage.input_tokens
+            # Anthropic reports prompt cache reads and writes separately from input_tokens
+            llm_event.cache_read_tokens = getattr(
+                response.usage, "cache_read_input_tokens", None
+            )
+            llm_event.cache_creation_tokens = getattr(
+                response.usage, "cache_creation_input_tokens", None
+            )
             llm_event.completion = {
                 "role": "assistant",
                 "content": response.content[0].text,
@@ -165,6 +180,17 @@ class AnthropicProvider(InstrumentedProvider):
             RawMessageStopEvent,
         )
 
+        pydantic_models = (
+            Message,
+            RawContentBlockDeltaEvent,
+            RawContentBlockStartEvent,
+            RawContentBlockStopEvent,
+            RawMessageDeltaEvent,
+            RawMessageStartEvent,
+            RawMessageStopEvent,
+        )
+        register_override_types(pydantic_models)
+
         # Store the original method
         self.original_create = messages.Messages.create
 
@@ -174,43 +200,19 @@ class AnthropicProvider(InstrumentedProvider):
             if "session" in kwargs.keys():
                 del kwargs["session"]
 
-            completion_override = fetch_completion_override_from_time_travel_cache(
-                kwargs
-            )
-            if completion_override:
-                result_model = None
-                pydantic_models = (
-                    Message,
-                    RawContentBlockDeltaEvent,
-                    RawContentBlockStartEvent,
-                    RawContentBlockStopEvent,
-                    RawMessageDeltaEvent,
-                    RawMessageStartEvent,
-                    RawMessageStopEvent,
-                )
-
-                for pydantic_model in pydantic_models:
-                    try:
-                        result_model = pydantic_model.model_validate_json(
-                            completion_override
-                        )
-                        break
-                    except Exception as e:
-                        pass
-
-                if result_model is None:
-                    logger.error(
-                        f"Time Travel: Pydantic validation failed for {pydantic_models} \n"
-                        f"Time Travel: Completion override was:\n"
-                        f"{pprint.pformat(completion_override)}"
-                    )
-                    return None
+            # Time Travel override or recorded response
+            intercepted = self.intercept(kwargs, pydantic_models)
+            if intercepted is not None:
                 return self.handle_response(
-                    result_model, kwargs, init_timestamp, session=session
+                    intercepted, kwargs, init_timestamp, session=session
                 )
 
             # Call the original function with its original arguments
-            result = self.original_create(*args, **kwargs)
+            try:
+                result = self.original_create(*args, **kwargs)
+                result = self.record(kwargs, result)
+            finally:
+                self._clear_cache_miss()
             return self.handle_response(result, kwargs, init_timestamp, session=session)
 
         # Override the original method with the patched one
@@ -228,6 +230,17 @@ class AnthropicProvider(InstrumentedProvider):
             RawMessageStopEvent,
         )
 
+        pydantic_models = (
+            Message,
+            RawContentBlockDeltaEvent,
+            RawContentBlockStartEvent,
+            RawContentBlockStopEvent,
+            RawMessageDeltaEvent,
+            RawMessageStartEvent,
+            RawMessageStopEvent,
+        )
+        register_override_types(pydantic_models)
+
         # Store the original method
         self.original_create_async = messages.AsyncMessages.create
 
@@ -238,43 +251,18 @@ class AnthropicProvider(InstrumentedProvider):
             if "session" in kwargs.keys():
                 del kwargs["session"]
 
-            completion_override = fetch_completion_override_from_time_travel_cache(
-                kwargs
-            )
-            if completion_override:
-                result_model = None
-                pydantic_models = (
-                    Message,
-                    RawContentBlockDeltaEvent,
-                    RawContentBlockStartEvent,
-                    RawContentBlockStopEvent,
-                    RawMessageDeltaEvent,
-                    RawMessageStartEvent,
-                    RawMessageStopEvent,
-                )
-
-                for pydantic_model in pydantic_models:
-                    try:
-                        result_model = pydantic_model.model_validate_json(
-                            completion_override
-                        )
-                        break
-                    except Exception as e:
-                        pass
-
-                if result_model is None:
-                    logger.error(
-                        f"Time Travel: Pydantic validation failed for {pydantic_models} \n"
-                        f"Time Travel: Completion override was:\n"
-                        f"{pprint.pformat(completion_override)}"
-                    )
-                    return None
-
+            # Time Travel override or recorded response
+            intercepted = self.intercept(kwargs, pydantic_models, is_async=True)
+            if intercepted is not None:
                 return self.handle_response(
-                    result_model, kwargs, init_timestamp, session=session
+                    intercepted, kwargs, init_timestamp, session=session
                 )
 
-            result = await self.original_create_async(*args, **kwargs)
+            try:
+                result = await self.original_create_async(*args, **kwargs)
+                result = self.record(kwargs, result, is_async=True)
+            finally:
+                self._clear_cache_miss()
             return self.handle_response(result, kwargs, init_timestamp, session=session)
 
         # Override the original method with the patched one
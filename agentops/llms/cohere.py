@@ -8,6 +8,7 @@ from ..session import Session
 from ..log_config import logger
 from agentops.helpers import get_ISO_time, check_call_stack_for_agent_id
 from ..singleton import singleton
+from .. import replay as _replay
 
 
 @singleton
@@ -35,6 +36,55 @@ class CohereProvider(InstrumentedProvider):
 
     def __init__(self, client):
         super().__init__(client)
+        self._provider_name = "Cohere"
+
+    def _stream_event_types(self):
+        from cohere.types.streamed_chat_response import (
+            StreamedChatResponse_StreamEnd,
+            StreamedChatResponse_StreamStart,
+            StreamedChatResponse_TextGeneration,
+            StreamedChatResponse_ToolCallsGeneration,
+        )
+
+        return {
+            "stream-start": StreamedChatResponse_StreamStart,
+            "text-generation": StreamedChatResponse_TextGeneration,
+            "tool-calls-generation": StreamedChatResponse_ToolCallsGeneration,
+            "stream-end": StreamedChatResponse_StreamEnd,
+        }
+
+    def replay_types(self):
+        from cohere.types import NonStreamedChatResponse
+
+        return (NonStreamedChatResponse, *self._stream_event_types().values())
+
+    def rehydrate(self, data, model_types):
+        # Stream events only differ by their event_type, which has a default: pick the type from it
+        if isinstance(data, dict) and "event_type" in data:
+            event_type = self._stream_event_types().get(data["event_type"])
+            if event_type is not None:
+                return _replay.rehydrate(data, (event_type,))
+        return _replay.rehydrate(data, model_types[:1])
+
+    def replay_request(self, kwargs):
+        # Cohere takes the last message apart from the chat history, with roles of its own
+        role_map = {"USER": "user", "CHATBOT": "assistant", "SYSTEM": "system"}
+        messages = []
+        if kwargs.get("preamble"):
+            messages.append({"role": "system", "content": kwargs["preamble"]})
+        for message in kwargs.get("chat_history") or []:
+            message = _replay.dump_model(message) or {}
+            role = message.get("role")
+            messages.append(
+                {"role": role_map.get(role, role), "content": message.get("message")}
+            )
+        messages.append({"role": "user", "content": kwargs.get("message")})
+        request = {
+            key: value
+            for key, value in kwargs.items()
+            if key not in ("preamble", "chat_history", "message")
+        }
+        return {**request, "messages": messages}
 
     def handle_response(
         self, response, kwargs, init_timestamp, session: Optional[Session] = None
@@ -50,6 +100,8 @@ class CohereProvider(InstrumentedProvider):
             StreamedChatResponse_ToolCallsGeneration,
         )
 
+        from ..replay import AsyncReplayStream, ReplayStream
+
         # from cohere.types.chat import ChatGenerationChunk
         # NOTE: Cohere only returns one message and its role will be CHATBOT which we are coercing to "assistant"
         llm_event = LLMEvent(init_timestamp=init_timestamp, params=kwargs)
@@ -153,7 +205,7 @@ class CohereProvider(InstrumentedProvider):
 
         # NOTE: As of Cohere==5.x.x, async is not supported
         # if the response is a generator, decorate the generator
-        if inspect.isasyncgen(response):
+        if inspect.isasyncgen(response) or isinstance(response, AsyncReplayStream):
 
             async def async_generator():
                 async for chunk in response:
@@ -162,7 +214,7 @@ class CohereProvider(InstrumentedProvider):
 
             return async_generator()
 
-        elif inspect.isgenerator(response):
+        elif inspect.isgenerator(response) or isinstance(response, ReplayStream):
 
             def generator():
                 for chunk in response:
@@ -223,7 +275,18 @@ class CohereProvider(InstrumentedProvider):
             session = kwargs.get("session", None)
             if "session" in kwargs.keys():
                 del kwargs["session"]
-            result = self.original_create(*args, **kwargs)
+
+            intercepted = self.intercept(kwargs)
+            if intercepted is not None:
+                return self.handle_response(
+                    intercepted, kwargs, init_timestamp, session=session
+                )
+
+            try:
+                result = self.original_create(*args, **kwargs)
+                result = self.record(kwargs, result)
+            finally:
+                self._clear_cache_miss()
             return self.handle_response(result, kwargs, init_timestamp, session=session)
 
         # Override the original method with the patched one
@@ -240,7 +303,18 @@ class CohereProvider(InstrumentedProvider):
             session = kwargs.get("session", None)
             if "session" in kwargs.keys():
                 del kwargs["session"]
-            result = await self.original_create_async(*args, **kwargs)
+
+            intercepted = self.intercept(kwargs, is_async=True)
+            if intercepted is not None:
+                return self.handle_response(
+                    intercepted, kwargs, init_timestamp, session=session
+                )
+
+            try:
+                result = await self.original_create_async(*args, **kwargs)
+                result = self.record(kwargs, result, is_async=True)
+            finally:
+                self._clear_cache_miss()
             return self.handle_response(result, kwargs, init_timestamp, session=session)
 
         # Override the original method with the patched one
@@ -254,7 +328,16 @@ class CohereProvider(InstrumentedProvider):
         def patched_function(*args, **kwargs):
             # Call the original function with its original arguments
             init_timestamp = get_ISO_time()
-            result = self.original_create_stream(*args, **kwargs)
+
+            intercepted = self.intercept(kwargs, stream=True)
+            if intercepted is not None:
+                return self.handle_response(intercepted, kwargs, init_timestamp)
+
+            try:
+                result = self.original_create_stream(*args, **kwargs)
+                result = self.record(kwargs, result, stream=True)
+            finally:
+                self._clear_cache_miss()
             return self.handle_response(result, kwargs, init_timestamp)
 
         # Override the original method with the patched one
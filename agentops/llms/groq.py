@@ -17,6 +17,12 @@ class GroqProvider(InstrumentedProvider):
     def __init__(self, client):
         super().__init__(client)
         self.client = client
+        self._provider_name = "Groq"
+
+    def replay_types(self):
+        from groq.types.chat import ChatCompletion, ChatCompletionChunk
+
+        return (ChatCompletion, ChatCompletionChunk)
 
     def override(self):
         self._override_chat()
@@ -37,6 +43,8 @@ class GroqProvider(InstrumentedProvider):
         from groq.resources.chat import AsyncCompletions
         from groq.types.chat import ChatCompletionChunk
 
+        from ..replay import AsyncReplayStream, ReplayStream
+
         llm_event = LLMEvent(init_timestamp=init_timestamp, params=kwargs)
         if session is not None:
             llm_event.session_id = session.session_id
@@ -94,7 +102,7 @@ class GroqProvider(InstrumentedProvider):
                 )
 
         # if the response is a generator, decorate the generator
-        if isinstance(response, Stream):
+        if isinstance(response, (Stream, ReplayStream)):
 
             def generator():
                 for chunk in response:
@@ -104,7 +112,7 @@ class GroqProvider(InstrumentedProvider):
             return generator()
 
         # For asynchronous AsyncStream
-        elif isinstance(response, AsyncStream):
+        elif isinstance(response, (AsyncStream, AsyncReplayStream)):
 
             async def async_generator():
                 async for chunk in response:
@@ -158,7 +166,18 @@ class GroqProvider(InstrumentedProvider):
             session = kwargs.get("session", None)
             if "session" in kwargs.keys():
                 del kwargs["session"]
-            result = self.original_create(*args, **kwargs)
+
+            intercepted = self.intercept(kwargs)
+            if intercepted is not None:
+                return self.handle_response(
+                    intercepted, kwargs, init_timestamp, session=session
+                )
+
+            try:
+                result = self.original_create(*args, **kwargs)
+                result = self.record(kwargs, result)
+            finally:
+                self._clear_cache_miss()
             return self.handle_response(result, kwargs, init_timestamp, session=session)
 
         # Override the original method with the patched one
@@ -172,7 +191,16 @@ class GroqProvider(InstrumentedProvider):
         async def patched_function(*args, **kwargs):
             # Call the original function with its original arguments
             init_timestamp = get_ISO_time()
-            result = await self.original_async_create(*args, **kwargs)
+
+            intercepted = self.intercept(kwargs, is_async=True)
+            if intercepted is not None:
+                return self.handle_response(intercepted, kwargs, init_timestamp)
+
+            try:
+                result = await self.original_async_create(*args, **kwargs)
+                result = self.record(kwargs, result, is_async=True)
+            finally:
+                self._clear_cache_miss()
             return self.handle_response(result, kwargs, init_timestamp)
 
         # Override the original method with the patched one
@@ -1,8 +1,30 @@
+import copy
+import time
 from abc import ABC, abstractmethod
-from typing import Optional
+from contextvars import ContextVar
+from decimal import Decimal
+from typing import Any, List, Optional, Sequence, Tuple
 
 from ..session import Session
 from ..event import LLMEvent
+from ..exceptions import ReplayMissError
+from ..log_config import logger
+from .. import replay as _replay
+from ..response_cache import cache_entry, get_response_cache, is_cacheable
+from ..time_travel import (
+    _decode_override,
+    fetch_completion_override_from_time_travel_cache,
+    fetch_typed_completion_override,
+)
+
+# The call arguments of the response cache hit being handled, and its marker
+_cache_hit: ContextVar[Optional[Tuple[dict, dict]]] = ContextVar(
+    "agentops_cache_hit", default=None
+)
+# The call arguments, key and start time of the cacheable call in flight
+_cache_miss: ContextVar[Optional[Tuple[dict, str, float]]] = ContextVar(
+    "agentops_cache_miss", default=None
+)
 
 
 class InstrumentedProvider(ABC):
@@ -32,7 +54,300 @@ class InstrumentedProvider(ABC):
         return self._provider_name
 
     def _safe_record(self, session, event):
+        if isinstance(event, LLMEvent):
+            self._mark_cache_hit(event)
+            if event.cost is None:
+                cost = self._cost(event)
+                if cost is not None:
+                    event.cost = float(cost)
         if session is not None:
             session.record(event)
         else:
             self.client.record(event)
+
+    # Offline replay: Time Travel overrides and local recordings (see agentops.replay). Providers
+    # describe their requests and responses with replay_request, replay_types and stream_chunks; their
+    # patched functions call intercept before the SDK, and record after it.
+
+    def replay_types(self) -> Tuple[type, ...]:
+        """Types replayed responses and chunks are rehydrated into, imported lazily like the SDK."""
+        return ()
+
+    def replay_request(self, kwargs: dict) -> dict:
+        """
+        Canonical form of a request, which Time Travel and recordings are keyed by: the call arguments,
+        with `messages` as plain {"role", "content"} dicts.
+        """
+        messages = kwargs.get("messages")
+        if isinstance(messages, (list, tuple)):
+            messages = [_replay.dump_model(message) or message for message in messages]
+            return {**kwargs, "messages": messages}
+        return kwargs
+
+    def rehydrate(self, data: Any, model_types: Sequence[type]) -> Any:
+        """A replayed response or chunk as an instance of the first of `model_types` that validates it."""
+        return _replay.rehydrate(data, model_types)
+
+    def stream_chunks(self, response: Any, request: dict) -> Optional[List[dict]]:
+        """The chunks the provider would have streamed for a complete response, or None."""
+        include_usage = bool((request.get("stream_options") or {}).get("include_usage"))
+        return _replay.synthesize_chunks(response, include_usage=include_usage)
+
+    def _request(self, kwargs: dict, stream: Optional[bool]) -> dict:
+        request = self.replay_request(kwargs)
+        if stream and not request.get("stream"):
+            # Streaming methods (Cohere's chat_stream, Mistral's stream) are keyed apart from the others
+            request = {**request, "stream": True}
+        return request
+
+    def _replay_config(self):
+        config = getattr(self.client, "_config", None)
+        mode = getattr(config, "replay_mode", None)
+        if mode is None:
+            return None, None
+        return mode, _replay.get_replay_store(config.replay_path)
+
+    def _stream_delay(self):
+        return getattr(
+            getattr(self.client, "_config", None), "replay_stream_delay", None
+        )
+
+    def intercept(
+        self,
+        kwargs: dict,
+        model_types: Optional[Sequence[type]] = None,
+        is_async: bool = False,
+        stream: Optional[bool] = None,
+    ) -> Optional[Any]:
+        """
+        The response of a request when it's served without calling the provider: its Time Travel
+        override, its recording when replay is enabled, or its cached response when the response cache is
+        enabled. None if the call should go to the provider.
+
+        Args:
+            kwargs (dict): Arguments of the call.
+            model_types (Sequence[type], optional): Types to rehydrate into. Defaults to `replay_types()`.
+            is_async (bool): Whether the caller awaits the response, which makes streams async.
+            stream (bool, optional): Whether a stream is expected. Defaults to the `stream` argument.
+
+        Raises:
+            ReplayMissError: In "replay" mode, when the request wasn't recorded.
+        """
+        model_types = (
+            tuple(model_types) if model_types is not None else self.replay_types()
+        )
+        request = self._request(kwargs, stream)
+        if model_types:
+            override = fetch_typed_completion_override(request, model_types)
+        else:
+            override = _decode_override(
+                fetch_completion_override_from_time_travel_cache(request)
+            )
+        if override is not None:
+            return self.simulate_stream(override, request, model_types, is_async)
+        replayed = self.replay(request, model_types, is_async)
+        if replayed is not None:
+            return replayed
+        return self.cached(kwargs, model_types, stream)
+
+    def simulate_stream(
+        self,
+        response: Any,
+        kwargs: dict,
+        model_types: Sequence[type] = (),
+        is_async: bool = False,
+        stream: Optional[bool] = None,
+    ):
+        """
+        A complete response, e.g. a Time Travel override, as the stream of chunks the provider would have
+        sent when the request asked for one. Other responses are returned as is.
+        """
+        request = self._request(kwargs, stream)
+        if not request.get("stream"):
+            return response
+        chunks = self.stream_chunks(response, request)
+        if chunks is None:
+            return response
+        delays = _replay.stream_delays(len(chunks), self._stream_delay())
+        rehydrate_chunk = lambda chunk: self.rehydrate(chunk, model_types)
+        if is_async:
+            return _replay.replay_async_stream(chunks, rehydrate_chunk, delays)
+        return _replay.replay_stream(chunks, rehydrate_chunk, delays)
+
+    def replay(
+        self,
+        kwargs: dict,
+        model_types: Sequence[type] = (),
+        is_async: bool = False,
+        stream: Optional[bool] = None,
+    ) -> Optional[Any]:
+        """
+        The recorded response of a request when replay is enabled, rehydrated as `model_types`, or a
+        ReplayStream of its chunks for streamed requests. None if the call should go to the provider.
+
+        Raises:
+            ReplayMissError: In "replay" mode, when the request wasn't recorded.
+        """
+        mode, store = self._replay_config()
+        if mode not in ("replay", "auto"):
+            return None
+        request = self._request(kwargs, stream)
+        key = _replay.request_key(self.provider_name, request)
+        entry = store.get(key)
+        if entry is None:
+            if mode == "replay":
+                raise ReplayMissError(
+                    f"No recording of this {self.provider_name} request (key {key}) in {store.path}. "
+                    f'Record it with replay_mode="record" or "auto"'
+                )
+            return None
+
+        logger.debug(
+            f"Replay: serving {self.provider_name} request {key[:12]} from {store.path}"
+        )
+        if entry.get("kind") == "stream":
+            chunks = entry.get("chunks", [])
+            delays = _replay.stream_delays(
+                len(chunks), self._stream_delay(), entry.get("delays_ms")
+            )
+            rehydrate_chunk = lambda chunk: self.rehydrate(chunk, model_types)
+            if is_async:
+                return _replay.replay_async_stream(chunks, rehydrate_chunk, delays)
+            return _replay.replay_stream(chunks, rehydrate_chunk, delays)
+        response = self.rehydrate(entry.get("response"), model_types)
+        return self.simulate_stream(response, request, model_types, is_async)
+
+    def record(
+        self,
+        kwargs: dict,
+        response: Any,
+        is_async: bool = False,
+        stream: Optional[bool] = None,
+    ) -> Any:
+        """
+        Record a provider response when recording is enabled, and cache it when the call was cacheable.
+        Streams are returned wrapped, and recorded once consumed; other responses are returned as is.
+        """
+        self._cache_response(kwargs, response, stream)
+        mode, store = self._replay_config()
+        if mode not in ("record", "auto"):
+            return response
+        request = self._request(kwargs, stream)
+        key = _replay.request_key(self.provider_name, request)
+        try:
+            if is_async and hasattr(response, "__aiter__"):
+                return _replay.record_async_stream(
+                    store, key, self.provider_name, request, response
+                )
+            if _replay.dump_model(response) is None and hasattr(response, "__iter__"):
+                return _replay.record_stream(
+                    store, key, self.provider_name, request, response
+                )
+            _replay.record_response(store, key, self.provider_name, request, response)
+        except Exception as e:
+            logger.warning(
+                f"Replay: unable to record {self.provider_name} response - {e}"
+            )
+        return response
+
+    # Response cache: deterministic calls are served from agentops.response_cache when it's enabled.
+    # intercept looks requests up, record caches the responses of misses, and _safe_record marks the
+    # LLMEvent of hits with what the original call cost. Patched functions call _clear_cache_miss in a
+    # finally around the provider call and record.
+
+    def _response_cache(self):
+        config = getattr(self.client, "_config", None)
+        if not getattr(config, "response_cache", False):
+            return None, None
+        cache = get_response_cache(
+            config.response_cache_size,
+            config.response_cache_ttl,
+            config.response_cache_path,
+        )
+        return cache, config.response_cache_models
+
+    def cached(
+        self,
+        kwargs: dict,
+        model_types: Sequence[type] = (),
+        stream: Optional[bool] = None,
+    ) -> Optional[Any]:
+        """
+        The cached response of a deterministic request, rehydrated as `model_types`, when the response
+        cache is enabled. None if the call should go to the provider, in which case it's timed until
+        `record` caches its response.
+        """
+        cache, models = self._response_cache()
+        if cache is None:
+            return None
+        request = self._request(kwargs, stream)
+        if not is_cacheable(request, models):
+            return None
+        key = _replay.request_key(self.provider_name, request)
+        entry = cache.get(key)
+        if entry is None:
+            _cache_miss.set((kwargs, key, time.perf_counter()))
+            return None
+
+        logger.debug(f"Response cache: serving {self.provider_name} request {key[:12]}")
+        marker = {
+            "hit": True,
+            "key": key,
+            "cached_at": entry.get("recorded_at"),
+            "saved_latency_ms": entry.get("latency_ms"),
+        }
+        _cache_hit.set((kwargs, marker))
+        # A copy, so that changes the caller makes to the response don't change the cache
+        return self.rehydrate(copy.deepcopy(entry.get("response")), model_types)
+
+    def _cache_response(
+        self, kwargs: dict, response: Any, stream: Optional[bool]
+    ) -> None:
+        pending = _cache_miss.get()
+        if pending is None or pending[0] is not kwargs:
+            return
+        _cache_miss.set(None)
+        cache, _ = self._response_cache()
+        if cache is None:
+            return
+        _, key, started = pending
+        latency_ms = round((time.perf_counter() - started) * 1000, 3)
+        try:
+            entry = cache_entry(
+                self.provider_name, self._request(kwargs, stream), response, latency_ms
+            )
+            if entry is not None:
+                cache.put(key, entry)
+        except Exception as e:
+            logger.warning(
+                f"Response cache: unable to cache {self.provider_name} response - {e}"
+            )
+
+    def _clear_cache_miss(self) -> None:
+        # Called once the provider call is over, so that the miss of a failed call isn't left behind
+        _cache_miss.set(None)
+
+    def _price_table(self):
+        return getattr(getattr(self.client, "_config", None), "price_table", None)
+
+    def _cost(self, event: LLMEvent) -> Optional[Decimal]:
+        """Cost of an event, looked up with the provider so that its own price entries match."""
+        price_table = self._price_table()
+        if price_table is None:
+            return None
+        return price_table.event_cost(event, self.provider_name)
+
+    def _mark_cache_hit(self, event: LLMEvent) -> None:
+        hit = _cache_hit.get()
+        if hit is None or hit[0] is not event.params:
+            return
+        _cache_hit.set(None)
+        marker = dict(hit[1])
+        marker["saved_prompt_tokens"] = event.prompt_tokens
+        marker["saved_completion_tokens"] = event.completion_tokens
+        if self._price_table() is not None:
+            cost = self._cost(event)
+            marker["saved_cost"] = float(cost) if cost is not None else None
+        event.cache = marker
+        # Nothing was billed for it
+        event.cost = 0.0
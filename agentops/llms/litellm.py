@@ -6,7 +6,7 @@ from ..event import LLMEvent, ErrorEvent
 from ..session import Session
 from agentops.helpers import get_ISO_time, check_call_stack_for_agent_id
 from agentops.llms.instrumented_provider import InstrumentedProvider
-from agentops.time_travel import fetch_completion_override_from_time_travel_cache
+from agentops.time_travel import register_override_types
 from ..singleton import singleton
 
 
@@ -19,6 +19,7 @@ class LiteLLMProvider(InstrumentedProvider):
 
     def __init__(self, client):
         super().__init__(client)
+        self._provider_name = "LiteLLM"
 
     def override(self):
         self._override_async_completion()
@@ -49,6 +50,8 @@ class LiteLLMProvider(InstrumentedProvider):
         from openai.types.chat import ChatCompletionChunk
         from litellm.utils import CustomStreamWrapper
 
+        from ..replay import AsyncReplayStream, ReplayStream
+
         llm_event = LLMEvent(init_timestamp=init_timestamp, params=kwargs)
         if session is not None:
             llm_event.session_id = session.session_id
@@ -116,7 +119,7 @@ class LiteLLMProvider(InstrumentedProvider):
             return generator()
 
         # litellm uses a CustomStreamWrapper
-        if isinstance(response, CustomStreamWrapper):
+        if isinstance(response, (CustomStreamWrapper, ReplayStream)):
 
             def generator():
                 for chunk in response:
@@ -126,7 +129,7 @@ class LiteLLMProvider(InstrumentedProvider):
             return generator()
 
         # For asynchronous AsyncStream
-        elif isinstance(response, AsyncStream):
+        elif isinstance(response, (AsyncStream, AsyncReplayStream)):
 
             async def async_generator():
                 async for chunk in response:
@@ -151,6 +154,11 @@ class LiteLLMProvider(InstrumentedProvider):
             llm_event.agent_id = check_call_stack_for_agent_id()
             llm_event.prompt = kwargs["messages"]
             llm_event.prompt_tokens = response.usage.prompt_tokens
+            llm_event.cached_prompt_tokens = getattr(
+                getattr(response.usage, "prompt_tokens_details", None),
+                "cached_tokens",
+                None,
+            )
             llm_event.completion = response.choices[0].message.model_dump()
             llm_event.completion_tokens = response.usage.completion_tokens
             llm_event.model = response.model
@@ -173,9 +181,14 @@ class LiteLLMProvider(InstrumentedProvider):
         import litellm
         from openai.types.chat import (
             ChatCompletion,
+            ChatCompletionChunk,
         )  # Note: litellm calls all LLM APIs using the OpenAI format
         from openai.resources.chat import completions
 
+        pydantic_models = (ChatCompletion,)
+        register_override_types(pydantic_models)
+        replay_models = (ChatCompletion, ChatCompletionChunk)
+
         self.original_create = litellm.completion
         self.original_oai_create = completions.Completions.create
 
@@ -186,13 +199,11 @@ class LiteLLMProvider(InstrumentedProvider):
             if "session" in kwargs.keys():
                 del kwargs["session"]
 
-            completion_override = fetch_completion_override_from_time_travel_cache(
-                kwargs
-            )
-            if completion_override:
-                result_model = ChatCompletion.model_validate_json(completion_override)
+            # Time Travel override or recorded response
+            intercepted = self.intercept(kwargs, replay_models)
+            if intercepted is not None:
                 return self.handle_response(
-                    result_model, kwargs, init_timestamp, session=session
+                    intercepted, kwargs, init_timestamp, session=session
                 )
 
             # prompt_override = fetch_prompt_override_from_time_travel_cache(kwargs)
@@ -200,7 +211,11 @@ class LiteLLMProvider(InstrumentedProvider):
             #     kwargs["messages"] = prompt_override["messages"]
 
             # Call the original function with its original arguments
-            result = self.original_create(*args, **kwargs)
+            try:
+                result = self.original_create(*args, **kwargs)
+                result = self.record(kwargs, result)
+            finally:
+                self._clear_cache_miss()
             return self.handle_response(result, kwargs, init_timestamp, session=session)
 
         litellm.completion = patched_function
@@ -209,9 +224,14 @@ class LiteLLMProvider(InstrumentedProvider):
         import litellm
         from openai.types.chat import (
             ChatCompletion,
+            ChatCompletionChunk,
         )  # Note: litellm calls all LLM APIs using the OpenAI format
         from openai.resources.chat import completions
 
+        pydantic_models = (ChatCompletion,)
+        register_override_types(pydantic_models)
+        replay_models = (ChatCompletion, ChatCompletionChunk)
+
         self.original_create_async = litellm.acompletion
         self.original_oai_create_async = completions.AsyncCompletions.create
 
@@ -222,13 +242,11 @@ class LiteLLMProvider(InstrumentedProvider):
             if "session" in kwargs.keys():
                 del kwargs["session"]
 
-            completion_override = fetch_completion_override_from_time_travel_cache(
-                kwargs
-            )
-            if completion_override:
-                result_model = ChatCompletion.model_validate_json(completion_override)
+            # Time Travel override or recorded response
+            intercepted = self.intercept(kwargs, replay_models, is_async=True)
+            if intercepted is not None:
                 return self.handle_response(
-                    result_model, kwargs, init_timestamp, session=session
+                    intercepted, kwargs, init_timestamp, session=session
                 )
 
             # prompt_override = fetch_prompt_override_from_time_travel_cache(kwargs)
@@ -236,7 +254,11 @@ class LiteLLMProvider(InstrumentedProvider):
             #     kwargs["messages"] = prompt_override["messages"]
 
             # Call the original function with its original arguments
-            result = await self.original_create_async(*args, **kwargs)
+            try:
+                result = await self.original_create_async(*args, **kwargs)
+                result = self.record(kwargs, result, is_async=True)
+            finally:
+                self._clear_cache_miss()
             return self.handle_response(result, kwargs, init_timestamp, session=session)
 
         # Override the original method with the patched one
@@ -8,6 +8,7 @@ from ..session import Session
 from ..log_config import logger
 from agentops.helpers import get_ISO_time, check_call_stack_for_agent_id
 from .instrumented_provider import InstrumentedProvider
+from .. import replay as _replay
 
 
 class MistralProvider(InstrumentedProvider):
@@ -21,6 +22,32 @@ class MistralProvider(InstrumentedProvider):
         super().__init__(client)
         self._provider_name = "Mistral"
 
+    def replay_types(self):
+        from mistralai.models import ChatCompletionResponse, CompletionEvent
+
+        return (ChatCompletionResponse, CompletionEvent)
+
+    def stream_chunks(self, response, request):
+        chunks = super().stream_chunks(response, request)
+        if chunks is None:
+            return None
+        # Streams are events wrapping CompletionChunks, the last of which carries the usage
+        usage = (_replay.dump_model(response) or {}).get("usage")
+        events = []
+        for chunk in chunks:
+            data = {
+                key: chunk[key]
+                for key in ("id", "object", "created", "model", "choices")
+            }
+            data["choices"] = [
+                {k: v for k, v in choice.items() if k != "logprobs"}
+                for choice in data["choices"]
+            ]
+            events.append({"data": data})
+        if usage is not None:
+            events[-1]["data"]["usage"] = usage
+        return events
+
     def handle_response(
         self, response, kwargs, init_timestamp, session: Optional[Session] = None
     ) -> dict:
@@ -28,6 +55,8 @@ class MistralProvider(InstrumentedProvider):
         from mistralai import Chat
         from mistralai.types import UNSET, UNSET_SENTINEL
 
+        from ..replay import AsyncReplayStream, ReplayStream
+
         llm_event = LLMEvent(init_timestamp=init_timestamp, params=kwargs)
         if session is not None:
             llm_event.session_id = session.session_id
@@ -86,7 +115,7 @@ class MistralProvider(InstrumentedProvider):
                 )
 
         # if the response is a generator, decorate the generator
-        if inspect.isgenerator(response):
+        if inspect.isgenerator(response) or isinstance(response, ReplayStream):
 
             def generator():
                 for chunk in response:
@@ -95,7 +124,7 @@ class MistralProvider(InstrumentedProvider):
 
             return generator()
 
-        elif inspect.isasyncgen(response):
+        elif inspect.isasyncgen(response) or isinstance(response, AsyncReplayStream):
 
             async def async_generator():
                 async for chunk in response:
@@ -139,7 +168,18 @@ class MistralProvider(InstrumentedProvider):
             session = kwargs.get("session", None)
             if "session" in kwargs.keys():
                 del kwargs["session"]
-            result = original_complete(*args, **kwargs)
+
+            intercepted = self.intercept(kwargs)
+            if intercepted is not None:
+                return self.handle_response(
+                    intercepted, kwargs, init_timestamp, session=session
+                )
+
+            try:
+                result = original_complete(*args, **kwargs)
+                result = self.record(kwargs, result)
+            finally:
+                self._clear_cache_miss()
             return self.handle_response(result, kwargs, init_timestamp, session=session)
 
         # Override the original method with the patched one
@@ -157,7 +197,18 @@ class MistralProvider(InstrumentedProvider):
             session = kwargs.get("session", None)
             if "session" in kwargs.keys():
                 del kwargs["session"]
-            result = await original_complete_async(*args, **kwargs)
+
+            intercepted = self.intercept(kwargs, is_async=True)
+            if intercepted is not None:
+                return self.handle_response(
+                    intercepted, kwargs, init_timestamp, session=session
+                )
+
+            try:
+                result = await original_complete_async(*args, **kwargs)
+                result = self.record(kwargs, result, is_async=True)
+            finally:
+                self._clear_cache_miss()
             return self.handle_response(result, kwargs, init_timestamp, session=session)
 
         # Override the original method with the patched one
@@ -175,7 +226,18 @@ class MistralProvider(InstrumentedProvider):
             session = kwargs.get("session", None)
             if "session" in kwargs.keys():
                 del kwargs["session"]
-            result = original_stream(*args, **kwargs)
+
+            intercepted = self.intercept(kwargs, stream=True)
+            if intercepted is not None:
+                return self.handle_response(
+                    intercepted, kwargs, init_timestamp, session=session
+                )
+
+            try:
+                result = original_stream(*args, **kwargs)
+                result = self.record(kwargs, result, stream=True)
+            finally:
+                self._clear_cache_miss()
             return self.handle_response(result, kwargs, init_timestamp, session=session)
 
         # Override the original method with the patched one
@@ -193,7 +255,18 @@ class MistralProvider(InstrumentedProvider):
             session = kwargs.get("session", None)
             if "session" in kwargs.keys():
                 del kwargs["session"]
-            result = await original_stream_async(*args, **kwargs)
+
+            intercepted = self.intercept(kwargs, is_async=True, stream=True)
+            if intercepted is not None:
+                return self.handle_response(
+                    intercepted, kwargs, init_timestamp, session=session
+                )
+
+            try:
+                result = await original_stream_async(*args, **kwargs)
+                result = self.record(kwargs, result, is_async=True, stream=True)
+            finally:
+                self._clear_cache_miss()
             return self.handle_response(result, kwargs, init_timestamp, session=session)
 
         # Override the original method with the patched one
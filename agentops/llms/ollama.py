@@ -3,6 +3,7 @@ import sys
 from typing import Optional
 
 from ..event import LLMEvent
+from ..replay import AsyncReplayStream, ReplayStream
 from ..session import Session
 from agentops.helpers import get_ISO_time, check_call_stack_for_agent_id
 from .instrumented_provider import InstrumentedProvider
@@ -10,6 +11,22 @@ from ..singleton import singleton
 
 original_func = {}
 
+# Positional parameters of ollama.chat and Client.chat
+_CHAT_PARAMETERS = (
+    "model",
+    "messages",
+    "tools",
+    "stream",
+    "format",
+    "options",
+    "keep_alive",
+)
+
+
+def _chat_kwargs(args, kwargs) -> dict:
+    # The replay layer works on keyword arguments; Ollama's model and messages are usually positional
+    return {**dict(zip(_CHAT_PARAMETERS, args)), **kwargs}
+
 
 @singleton
 class OllamaProvider(InstrumentedProvider):
@@ -39,7 +56,7 @@ class OllamaProvider(InstrumentedProvider):
             else:
                 llm_event.completion["content"] += message.get("content")
 
-        if inspect.isgenerator(response):
+        if inspect.isgenerator(response) or isinstance(response, ReplayStream):
 
             def generator():
                 for chunk in response:
@@ -48,6 +65,15 @@ class OllamaProvider(InstrumentedProvider):
 
             return generator()
 
+        if inspect.isasyncgen(response) or isinstance(response, AsyncReplayStream):
+
+            async def async_generator():
+                async for chunk in response:
+                    handle_stream_chunk(chunk)
+                    yield chunk
+
+            return async_generator()
+
         llm_event.end_timestamp = get_ISO_time()
 
         llm_event.model = f'ollama/{response["model"]}'
@@ -74,6 +100,15 @@ class OllamaProvider(InstrumentedProvider):
 
     def __init__(self, client):
         super().__init__(client)
+        self._provider_name = "Ollama"
+
+    def replay_types(self):
+        try:
+            # ollama>=0.4 returns pydantic models; earlier versions return dicts
+            from ollama import ChatResponse
+        except ImportError:
+            return ()
+        return (ChatResponse,)
 
     def _override_chat(self):
         import ollama
@@ -83,9 +118,22 @@ class OllamaProvider(InstrumentedProvider):
         def patched_function(*args, **kwargs):
             # Call the original function with its original arguments
             init_timestamp = get_ISO_time()
-            result = original_func["ollama.chat"](*args, **kwargs)
+            session = kwargs.get("session", None)
+            call_kwargs = _chat_kwargs(args, kwargs)
+
+            intercepted = self.intercept(call_kwargs)
+            if intercepted is not None:
+                return self.handle_response(
+                    intercepted, call_kwargs, init_timestamp, session=session
+                )
+
+            try:
+                result = original_func["ollama.chat"](*args, **kwargs)
+                result = self.record(call_kwargs, result)
+            finally:
+                self._clear_cache_miss()
             return self.handle_response(
-                result, kwargs, init_timestamp, session=kwargs.get("session", None)
+                result, call_kwargs, init_timestamp, session=session
             )
 
         # Override the original method with the patched one
@@ -99,8 +147,18 @@ class OllamaProvider(InstrumentedProvider):
         def patched_function(*args, **kwargs):
             # Call the original function with its original arguments
             init_timestamp = get_ISO_time()
-            result = original_func["ollama.Client.chat"](*args, **kwargs)
-            return self.handle_response(result, kwargs, init_timestamp)
+            call_kwargs = _chat_kwargs(args[1:], kwargs)
+
+            intercepted = self.intercept(call_kwargs)
+            if intercepted is not None:
+                return self.handle_response(intercepted, call_kwargs, init_timestamp)
+
+            try:
+                result = original_func["ollama.Client.chat"](*args, **kwargs)
+                result = self.record(call_kwargs, result)
+            finally:
+                self._clear_cache_miss()
+            return self.handle_response(result, call_kwargs, init_timestamp)
 
         # Override the original method with the patched one
         Client.chat = patched_function
@@ -113,8 +171,18 @@ class OllamaProvider(InstrumentedProvider):
         async def patched_function(*args, **kwargs):
             # Call the original function with its original arguments
             init_timestamp = get_ISO_time()
-            result = await original_func["ollama.AsyncClient.chat"](*args, **kwargs)
-            return self.handle_response(result, kwargs, init_timestamp)
+            call_kwargs = _chat_kwargs(args[1:], kwargs)
+
+            intercepted = self.intercept(call_kwargs, is_async=True)
+            if intercepted is not None:
+                return self.handle_response(intercepted, call_kwargs, init_timestamp)
+
+            try:
+                result = await original_func["ollama.AsyncClient.chat"](*args, **kwargs)
+                result = self.record(call_kwargs, result, is_async=True)
+            finally:
+                self._clear_cache_miss()
+            return self.handle_response(result, call_kwargs, init_timestamp)
 
         # Override the original method with the patched one
         AsyncClient.chat = patched_function
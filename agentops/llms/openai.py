@@ -3,7 +3,7 @@ import pprint
 from typing import Optional
 
 from agentops.llms.instrumented_provider import InstrumentedProvider
-from agentops.time_travel import fetch_completion_override_from_time_travel_cache
+from agentops.time_travel import register_override_types
 
 from ..event import ActionEvent, ErrorEvent, LLMEvent
 from ..session import Session
@@ -30,6 +30,8 @@ class OpenAiProvider(InstrumentedProvider):
         from openai.resources import AsyncCompletions
         from openai.types.chat import ChatCompletionChunk
 
+        from ..replay import AsyncReplayStream, ReplayStream
+
         llm_event = LLMEvent(init_timestamp=init_timestamp, params=kwargs)
         if session is not None:
             llm_event.session_id = session.session_id
@@ -87,7 +89,7 @@ class OpenAiProvider(InstrumentedProvider):
                 )
 
         # if the response is a generator, decorate the generator
-        if isinstance(response, Stream):
+        if isinstance(response, (Stream, ReplayStream)):
 
             def generator():
                 for chunk in response:
@@ -97,7 +99,7 @@ class OpenAiProvider(InstrumentedProvider):
             return generator()
 
         # For asynchronous AsyncStream
-        elif isinstance(response, AsyncStream):
+        elif isinstance(response, (AsyncStream, AsyncReplayStream)):
 
             async def async_generator():
                 async for chunk in response:
@@ -122,6 +124,11 @@ class OpenAiProvider(InstrumentedProvider):
             llm_event.agent_id = check_call_stack_for_agent_id()
             llm_event.prompt = kwargs["messages"]
             llm_event.prompt_tokens = response.usage.prompt_tokens
+            llm_event.cached_prompt_tokens = getattr(
+                getattr(response.usage, "prompt_tokens_details", None),
+                "cached_tokens",
+                None,
+            )
             llm_event.completion = response.choices[0].message.model_dump()
             llm_event.completion_tokens = response.usage.completion_tokens
             llm_event.model = response.model
@@ -148,6 +155,9 @@ class OpenAiProvider(InstrumentedProvider):
         from openai.resources.chat import completions
         from openai.types.chat import ChatCompletion, ChatCompletionChunk
 
+        pydantic_models = (ChatCompletion, ChatCompletionChunk)
+        register_override_types(pydantic_models)
+
         # Store the original method
         self.original_create = completions.Completions.create
 
@@ -157,30 +167,11 @@ class OpenAiProvider(InstrumentedProvider):
             if "session" in kwargs.keys():
                 del kwargs["session"]
 
-            completion_override = fetch_completion_override_from_time_travel_cache(
-                kwargs
-            )
-            if completion_override:
-                result_model = None
-                pydantic_models = (ChatCompletion, ChatCompletionChunk)
-                for pydantic_model in pydantic_models:
-                    try:
-                        result_model = pydantic_model.model_validate_json(
-                            completion_override
-                        )
-                        break
-                    except Exception as e:
-                        pass
-
-                if result_model is None:
-                    logger.error(
-                        f"Time Travel: Pydantic validation failed for {pydantic_models} \n"
-                        f"Time Travel: Completion override was:\n"
-                        f"{pprint.pformat(completion_override)}"
-                    )
-                    return None
+            # Time Travel override or recorded response
+            intercepted = self.intercept(kwargs, pydantic_models)
+            if intercepted is not None:
                 return self.handle_response(
-                    result_model, kwargs, init_timestamp, session=session
+                    intercepted, kwargs, init_timestamp, session=session
                 )
 
             # prompt_override = fetch_prompt_override_from_time_travel_cache(kwargs)
@@ -188,7 +179,11 @@ class OpenAiProvider(InstrumentedProvider):
             #     kwargs["messages"] = prompt_override["messages"]
 
             # Call the original function with its original arguments
-            result = self.original_create(*args, **kwargs)
+            try:
+                result = self.original_create(*args, **kwargs)
+                result = self.record(kwargs, result)
+            finally:
+                self._clear_cache_miss()
             return self.handle_response(result, kwargs, init_timestamp, session=session)
 
         # Override the original method with the patched one
@@ -198,6 +193,9 @@ class OpenAiProvider(InstrumentedProvider):
         from openai.resources.chat import completions
         from openai.types.chat import ChatCompletion, ChatCompletionChunk
 
+        pydantic_models = (ChatCompletion, ChatCompletionChunk)
+        register_override_types(pydantic_models)
+
         # Store the original method
         self.original_create_async = completions.AsyncCompletions.create
 
@@ -209,30 +207,11 @@ class OpenAiProvider(InstrumentedProvider):
             if "session" in kwargs.keys():
                 del kwargs["session"]
 
-            completion_override = fetch_completion_override_from_time_travel_cache(
-                kwargs
-            )
-            if completion_override:
-                result_model = None
-                pydantic_models = (ChatCompletion, ChatCompletionChunk)
-                for pydantic_model in pydantic_models:
-                    try:
-                        result_model = pydantic_model.model_validate_json(
-                            completion_override
-                        )
-                        break
-                    except Exception as e:
-                        pass
-
-                if result_model is None:
-                    logger.error(
-                        f"Time Travel: Pydantic validation failed for {pydantic_models} \n"
-                        f"Time Travel: Completion override was:\n"
-                        f"{pprint.pformat(completion_override)}"
-                    )
-                    return None
+            # Time Travel override or recorded response
+            intercepted = self.intercept(kwargs, pydantic_models, is_async=True)
+            if intercepted is not None:
                 return self.handle_response(
-                    result_model, kwargs, init_timestamp, session=session
+                    intercepted, kwargs, init_timestamp, session=session
                 )
 
             # prompt_override = fetch_prompt_override_from_time_travel_cache(kwargs)
@@ -240,7 +219,11 @@ class OpenAiProvider(InstrumentedProvider):
             #     kwargs["messages"] = prompt_override["messages"]
 
             # Call the original function with its original arguments
-            result = await self.original_create_async(*args, **kwargs)
+            try:
+                result = await self.original_create_async(*args, **kwargs)
+                result = self.record(kwargs, result, is_async=True)
+            finally:
+                self._clear_cache_miss()
             return self.handle_response(result, kwargs, init_timestamp, session=session)
 
         # Override the original method with the patched one
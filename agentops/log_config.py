@@ -45,9 +45,9 @@ class AgentOpsLogFileFormatter(logging.Formatter):
 ANSI_ESCAPE_PATTERN = re.compile(r"\x1b\[[0-9;]*m")
 log_to_file = os.environ.get("AGENTOPS_LOGGING_TO_FILE", "True").lower() == "true"
 if log_to_file:
-    file_handler = logging.FileHandler("agentops.log", mode="w")
+    # The file is only created when something is first logged, not on import
+    file_handler = logging.FileHandler("agentops.log", mode="w", delay=True)
     file_handler.setLevel(logging.DEBUG)
     formatter = AgentOpsLogFileFormatter("%(asctime)s - %(levelname)s - %(message)s")
     file_handler.setFormatter(formatter)
-    file_handler.setFormatter(formatter)
     logger.addHandler(file_handler)
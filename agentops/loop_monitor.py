@@ -0,0 +1,156 @@
+"""
+AgentOps asyncio event loop lag monitor.
+
+A heartbeat task sleeps for `interval_ms` and measures how late it wakes up. That delay is the time
+the loop was blocked by synchronous code (CPU-bound work, blocking I/O, sync HTTP calls) and is
+observed into the session metrics. A watchdog thread notices when a heartbeat is overdue by more than
+`threshold_ms` and captures the stack of the loop thread while it is still blocked, so the event
+recorded for the spike points at the offending code.
+
+Classes:
+    LoopLagMonitor: Monitors a single event loop on behalf of a session.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from .event import ActionEvent
+from .log_config import logger
+from .metrics import LOOP_LAG_ACTION_TYPE
+from .spans import set_current_event_id
+
+MAX_STACK_FRAMES = 30
+WATCHDOG_THREAD_NAME = "agentops-loop-lag-watchdog"
+
+
+class LoopLagMonitor:
+    """
+    Args:
+        session (Session): Session the lag samples and spike events are recorded on.
+        threshold_ms (float, optional): Lag above which a spike is recorded as an ActionEvent with
+            action_type "event_loop_lag", which isn't counted as an action. Defaults to 100.
+        interval_ms (float, optional): Time between heartbeats. Defaults to half the threshold.
+    """
+
+    def __init__(
+        self,
+        session,
+        threshold_ms: float = 100,
+        interval_ms: Optional[float] = None,
+    ):
+        self.session = session
+        self.threshold_ms = threshold_ms
+        self.interval = max(interval_ms or threshold_ms / 2, 5) / 1000
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop_thread_id: Optional[int] = None
+        self._beat = time.perf_counter()
+        self._stall: Optional[Tuple[float, Optional[str], Optional[str]]] = None
+        self._stop_flag = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self) -> "LoopLagMonitor":
+        """Start monitoring the running loop. Must be called from inside the loop."""
+        self.loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.perf_counter()
+        self._task = self.loop.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(
+            target=self._watch, name=WATCHDOG_THREAD_NAME, daemon=True
+        )
+        self._watchdog.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop_flag.set()
+        loop, task = self.loop, self._task
+        if loop is not None and task is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:  # loop closed in the meantime
+                pass
+
+    @property
+    def is_running(self) -> bool:
+        return (
+            not self._stop_flag.is_set()
+            and self._task is not None
+            and not self._task.done()
+        )
+
+    async def _heartbeat(self) -> None:
+        # Spike events must not be parented to whatever event was current when monitoring started
+        set_current_event_id(None)
+        try:
+            while not self._stop_flag.is_set():
+                beat = time.perf_counter()
+                self._beat = beat
+                await asyncio.sleep(self.interval)
+                lag_ms = max((time.perf_counter() - beat - self.interval) * 1000, 0.0)
+                self.session.metrics.observe_loop_lag(lag_ms)
+                if lag_ms >= self.threshold_ms:
+                    stall = self._stall
+                    stack, task_name = (
+                        (stall[1], stall[2])
+                        if stall and stall[0] == beat
+                        else (None, None)
+                    )
+                    self._record_spike(lag_ms, stack, task_name)
+        finally:
+            # Cancelled when the loop shuts down, e.g. at the end of asyncio.run: the watchdog stops too
+            self._stop_flag.set()
+
+    def _watch(self) -> None:
+        captured_beat = None
+        while not self._stop_flag.wait(self.threshold_ms / 2000):
+            if self.loop is not None and self.loop.is_closed():
+                break
+            beat = self._beat
+            if beat == captured_beat:
+                continue
+            overdue_ms = (time.perf_counter() - beat - self.interval) * 1000
+            if overdue_ms >= self.threshold_ms:
+                self._stall = (beat, *self._capture_loop_thread())
+                captured_beat = beat
+
+    def _capture_loop_thread(self) -> Tuple[Optional[str], Optional[str]]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = (
+            "".join(traceback.format_stack(frame, limit=MAX_STACK_FRAMES))
+            if frame is not None
+            else None
+        )
+        task_name = None
+        try:
+            task = asyncio.current_task(self.loop)
+            if task is not None:
+                # Task.get_coro was added in Python 3.8
+                coro = getattr(task, "get_coro", lambda: None)()
+                task_name = getattr(coro, "__qualname__", None) or repr(task)
+        except RuntimeError:
+            pass
+        return stack, task_name
+
+    def _record_spike(
+        self, lag_ms: float, stack: Optional[str], task_name: Optional[str]
+    ) -> None:
+        end = datetime.now(timezone.utc)
+        logger.debug(f"Event loop blocked for {lag_ms:.0f}ms in {task_name}")
+        self.session.record(
+            ActionEvent(
+                action_type=LOOP_LAG_ACTION_TYPE,
+                params={
+                    "lag_ms": lag_ms,
+                    "threshold_ms": self.threshold_ms,
+                    "task": task_name,
+                },
+                logs=stack,
+                init_timestamp=(end - timedelta(milliseconds=lag_ms)).isoformat(),
+                end_timestamp=end.isoformat(),
+            )
+        )
@@ -0,0 +1,198 @@
+"""
+Read-only key-value files that open in constant time.
+
+A store is a single file: a header, JSON metadata, a segment of values written back to back, then
+a sorted index of fixed-size records (SHA-256 key, offset, length) at the end. Opening a store
+memory-maps the file and reads the header; a lookup is a binary search over the mapped index and a
+slice of the value segment. Nothing is read until it's looked up, and the pages the OS loads are
+shared and evictable, so a multi-gigabyte store costs about the same to open as an empty one.
+
+Stores are written once, in a streaming fashion, by MappedStoreWriter, and replaced atomically.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+from .exceptions import MappedStoreError
+
+MAGIC = b"AOMAPST1"
+VERSION = 1
+
+# magic, version, number of records, offset of the index, length of the metadata
+_HEADER = struct.Struct("<8sIQQI")
+# key (SHA-256 digest), offset of the value, length of the value
+_RECORD = struct.Struct("<32sQI")
+KEY_SIZE = 32
+
+
+def _key_bytes(key: Union[str, bytes]) -> bytes:
+    # Hex SHA-256 keys, as produced by time_travel.cache_key, are stored as their digest
+    if isinstance(key, bytes):
+        if len(key) != KEY_SIZE:
+            raise ValueError(f"Keys must be {KEY_SIZE} bytes long")
+        return key
+    if len(key) == 2 * KEY_SIZE:
+        try:
+            return bytes.fromhex(key)
+        except ValueError:
+            pass
+    return hashlib.sha256(key.encode("utf-8")).digest()
+
+
+class MappedStore:
+    """
+    A store opened for reading.
+
+    Args:
+        path (str): Path of a file written by MappedStoreWriter.
+
+    Raises:
+        MappedStoreError: If the file isn't a valid store.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                raise MappedStoreError(f"{path} is not a mapped store: too short")
+            # The mapping stays valid after the file is closed, and after it's replaced on disk
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, index_offset, meta_length = _HEADER.unpack_from(
+            self._mm, 0
+        )
+        if magic != MAGIC:
+            raise MappedStoreError(f"{path} is not a mapped store")
+        if version != VERSION:
+            raise MappedStoreError(f"{path} has unsupported version {version}")
+        if index_offset + count * _RECORD.size > size:
+            raise MappedStoreError(f"{path} is truncated")
+        self._count = count
+        self._index_offset = index_offset
+        meta = self._mm[_HEADER.size : _HEADER.size + meta_length]
+        self.metadata: dict = json.loads(meta) if meta else {}
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _find(self, key: bytes) -> Optional[Tuple[int, int]]:
+        mm, base, size = self._mm, self._index_offset, _RECORD.size
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = base + mid * size
+            probe = mm[start : start + KEY_SIZE]
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                _, offset, length = _RECORD.unpack_from(mm, start)
+                return offset, length
+        return None
+
+    def get(self, key: Union[str, bytes]) -> Optional[bytes]:
+        """The value of a key, or None."""
+        found = self._find(_key_bytes(key))
+        if found is None:
+            return None
+        offset, length = found
+        return self._mm[offset : offset + length]
+
+    def __contains__(self, key: Union[str, bytes]) -> bool:
+        return self._find(_key_bytes(key)) is not None
+
+    def keys(self) -> Iterator[str]:
+        """Keys in sorted order, as hex strings."""
+        base, size = self._index_offset, _RECORD.size
+        for i in range(self._count):
+            start = base + i * size
+            yield self._mm[start : start + KEY_SIZE].hex()
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MappedStoreWriter:
+    """
+    Writes a store. Values are streamed to disk as they're added; only the index records (44 bytes
+    each) are kept in memory. The file is replaced atomically on `close()`.
+
+    Args:
+        path (str): Path of the store.
+        metadata (dict, optional): JSON-serializable metadata, available as `MappedStore.metadata`.
+    """
+
+    def __init__(self, path: str, metadata: Optional[dict] = None):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, self._tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        self._file = os.fdopen(fd, "w+b")
+        meta = json.dumps(metadata or {}, separators=(",", ":")).encode("utf-8")
+        self._meta_length = len(meta)
+        self._file.write(_HEADER.pack(MAGIC, VERSION, 0, 0, self._meta_length))
+        self._file.write(meta)
+        self._offset = _HEADER.size + len(meta)
+        self._records: Dict[bytes, Tuple[int, int]] = {}
+
+    def add(self, key: Union[str, bytes], value: bytes) -> bool:
+        """Add a value. If the key was already added, the first value is kept and False is returned."""
+        key = _key_bytes(key)
+        if key in self._records:
+            return False
+        self._file.write(value)
+        self._records[key] = (self._offset, len(value))
+        self._offset += len(value)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def close(self) -> None:
+        try:
+            index_offset = self._offset
+            for key in sorted(self._records):
+                offset, length = self._records[key]
+                self._file.write(_RECORD.pack(key, offset, length))
+            self._file.seek(0)
+            self._file.write(
+                _HEADER.pack(
+                    MAGIC, VERSION, len(self._records), index_offset, self._meta_length
+                )
+            )
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            os.replace(self._tmp, self.path)
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self) -> None:
+        """Discard the store being written."""
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,311 @@
+"""
+AgentOps local session metrics.
+
+Classes:
+    Histogram: Fixed-bucket latency histogram.
+    SessionMetrics: Streaming per-session aggregator, updated in O(1) for every recorded event.
+"""
+
+import threading
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple, Union
+
+from .enums import EventType
+from .event import ErrorEvent, Event
+from .sketch import LatencySketches
+
+# Upper bounds (in milliseconds) of the latency buckets. The last bucket is unbounded.
+DEFAULT_LATENCY_BUCKETS_MS: Tuple[float, ...] = (
+    5,
+    10,
+    25,
+    50,
+    100,
+    250,
+    500,
+    1000,
+    2500,
+    5000,
+    10000,
+    30000,
+    60000,
+)
+
+# Event loop lag is usually well under the smallest latency bucket
+LOOP_LAG_BUCKETS_MS: Tuple[float, ...] = (
+    1,
+    2,
+    5,
+    10,
+    25,
+    50,
+    100,
+    250,
+    500,
+    1000,
+    5000,
+)
+
+# Action type of the events recorded for event loop lag spikes. They are diagnostics of the loop, already
+# observed in the loop lag histogram, so they are left out of the action counts and statistics.
+LOOP_LAG_ACTION_TYPE = "event_loop_lag"
+
+
+def parse_ISO_time(timestamp: Optional[str]) -> Optional[datetime]:
+    """
+    Parse a timestamp produced by `helpers.get_ISO_time`. Returns None if it can't be parsed.
+    """
+    if not timestamp:
+        return None
+    try:
+        return datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        return None
+
+
+def event_duration_ms(event: Event) -> Optional[float]:
+    """
+    Duration of an event in milliseconds, or None if either timestamp is missing or invalid.
+    """
+    start = parse_ISO_time(event.init_timestamp)
+    end = parse_ISO_time(event.end_timestamp)
+    if start is None or end is None:
+        return None
+    return max((end - start).total_seconds() * 1000, 0.0)
+
+
+def format_ms(value_ms: Optional[float]) -> str:
+    if value_ms is None:
+        return "-"
+    if value_ms >= 1000:
+        return f"{value_ms / 1000:.2f}s"
+    return f"{value_ms:.0f}ms"
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. Observations are O(log(buckets)) and memory is constant.
+
+    Args:
+        buckets (Tuple[float, ...], optional): Sorted upper bounds of the buckets. Values above the
+            last bound are counted in an implicit overflow bucket.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float) -> None:
+        lo, hi = 0, len(self.buckets)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if value <= self.buckets[mid]:
+                hi = mid
+            else:
+                lo = mid + 1
+        self.counts[lo] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile by linear interpolation inside the bucket that contains it.
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count == 0:
+                continue
+            if seen + bucket_count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                lower = max(lower, self.min)
+                upper = min(upper, self.max)
+                fraction = (rank - seen) / bucket_count
+                return lower + (upper - lower) * fraction
+            seen += bucket_count
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.mean,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": {
+                **{str(bound): c for bound, c in zip(self.buckets, self.counts)},
+                "+Inf": self.counts[-1],
+            },
+        }
+
+
+class SessionMetrics:
+    """
+    Streaming aggregator for a single session. Every recorded event updates a few counters and one
+    quantile sketch, so metrics can be queried at any time without keeping events around.
+
+    Latencies are in milliseconds and keyed by LLM model, tool name and action type.
+
+    Args:
+        init_timestamp (str): ISO timestamp of when the session started. Used to compute wall time.
+    """
+
+    def __init__(self, init_timestamp: str):
+        self._lock = threading.Lock()
+        self._start = parse_ISO_time(init_timestamp) or datetime.now().astimezone()
+        self._end: Optional[datetime] = None
+
+        # Latency statistics and percentiles per model, tool and action type
+        self.latency = LatencySketches()
+
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = Decimal(0)
+        self.cost_by_model: Dict[str, Decimal] = {}
+        self.llm_time_ms = 0.0
+        self.tool_time_ms = 0.0
+        self.action_time_ms = 0.0
+        self.errors = 0
+        self.loop_lag = Histogram(LOOP_LAG_BUCKETS_MS)
+
+    def add_event(self, event: Union[Event, ErrorEvent]) -> None:
+        if isinstance(event, ErrorEvent):
+            with self._lock:
+                self.errors += 1
+            return
+
+        duration = event_duration_ms(event)
+        if duration is None:
+            return
+
+        with self._lock:
+            if event.event_type == EventType.LLM.value:
+                key = getattr(event, "model", None) or "unknown"
+                self.latency.add("llms", key, duration)
+                self.llm_time_ms += duration
+                self.prompt_tokens += getattr(event, "prompt_tokens", None) or 0
+                self.completion_tokens += getattr(event, "completion_tokens", None) or 0
+                cost = getattr(event, "cost", None)
+                if cost:
+                    cost = Decimal(str(cost))
+                    self.cost += cost
+                    self.cost_by_model[key] = self.cost_by_model.get(key, 0) + cost
+            elif event.event_type == EventType.TOOL.value:
+                key = getattr(event, "name", None) or "unknown"
+                self.latency.add("tools", key, duration)
+                self.tool_time_ms += duration
+            elif event.event_type == EventType.ACTION.value:
+                key = getattr(event, "action_type", None) or "unknown"
+                if key == LOOP_LAG_ACTION_TYPE:
+                    return
+                self.latency.add("actions", key, duration)
+                self.action_time_ms += duration
+
+    def observe_loop_lag(self, lag_ms: float) -> None:
+        """Scheduling delay of an asyncio heartbeat, see `loop_monitor.LoopLagMonitor`."""
+        with self._lock:
+            self.loop_lag.observe(lag_ms)
+
+    def end(self, end_timestamp: str) -> None:
+        """Freeze wall time at the end of the session."""
+        self._end = parse_ISO_time(end_timestamp)
+
+    @property
+    def wall_time_ms(self) -> float:
+        end = self._end or datetime.now(self._start.tzinfo)
+        return max((end - self._start).total_seconds() * 1000, 0.0)
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Completion tokens generated per second of LLM time."""
+        if self.llm_time_ms <= 0:
+            return None
+        return self.completion_tokens / (self.llm_time_ms / 1000)
+
+    def time_shares(self) -> Dict[str, float]:
+        """
+        Fraction of session wall time spent in LLM calls, tools and untracked code. Actions are not
+        counted as tracked time because they usually wrap LLM calls and tools.
+        """
+        wall = self.wall_time_ms
+        if wall <= 0:
+            return {"llms": 0.0, "tools": 0.0, "untracked": 1.0}
+        llms = min(self.llm_time_ms / wall, 1.0)
+        tools = min(self.tool_time_ms / wall, 1.0 - llms)
+        return {"llms": llms, "tools": tools, "untracked": 1.0 - llms - tools}
+
+    def summary(self) -> dict:
+        with self._lock:
+            summary = {
+                "wall_time_ms": self.wall_time_ms,
+                "llm_time_ms": self.llm_time_ms,
+                "tool_time_ms": self.tool_time_ms,
+                "action_time_ms": self.action_time_ms,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "tokens_per_second": self.tokens_per_second,
+                "cost": float(self.cost),
+                "cost_by_model": {k: float(v) for k, v in self.cost_by_model.items()},
+                "errors": self.errors,
+                "time_shares": self.time_shares(),
+            }
+            latency = self.latency.summary()
+            for kind in ("llms", "tools", "actions"):
+                summary[kind] = latency.get(kind, {})
+            if self.loop_lag.count:
+                summary["event_loop_lag"] = self.loop_lag.to_dict()
+            return summary
+
+    def format_summary(self) -> List[str]:
+        """Human readable summary lines, printed at the end of a session."""
+        with self._lock:
+            shares = self.time_shares()
+            tps = self.tokens_per_second
+            lines = [
+                f"Tokens: {self.prompt_tokens} in / {self.completion_tokens} out"
+                + (f" ({tps:.1f} tok/s)" if tps is not None else "")
+                + f" | Local cost: ${self.cost:.6f}"
+                + f" | Time: LLMs {shares['llms']:.0%} · Tools {shares['tools']:.0%}"
+                + f" · Untracked {shares['untracked']:.0%}"
+            ]
+            latency = self.latency.summary()
+            for label, kind in (
+                ("LLM", "llms"),
+                ("Tool", "tools"),
+                ("Action", "actions"),
+            ):
+                for key, stats in latency.get(kind, {}).items():
+                    lines.append(
+                        f"{label} {key}: {stats['count']} calls | "
+                        f"p50 {format_ms(stats['p50'])} | "
+                        f"p95 {format_ms(stats['p95'])} | "
+                        f"max {format_ms(stats['max'])}"
+                    )
+            if self.loop_lag.count:
+                h = self.loop_lag
+                lines.append(
+                    f"Event loop lag: {h.count} samples | "
+                    f"p50 {format_ms(h.quantile(0.5))} | "
+                    f"p99 {format_ms(h.quantile(0.99))} | "
+                    f"max {format_ms(h.max)}"
+                )
+            return lines
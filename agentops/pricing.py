@@ -0,0 +1,336 @@
+"""
+AgentOps offline token pricing.
+
+Classes:
+    ModelPrice: Prices of a single model, in USD per million tokens.
+    PriceTable: Pluggable price lookup keyed by provider and model.
+"""
+
+import json
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Optional, Set, Tuple, Union
+
+from .log_config import logger
+
+ONE_MILLION = Decimal(1_000_000)
+
+# Characters that can follow a model family in the name of one of its versions
+_SEPARATORS = "-_:@"
+
+
+@dataclass(frozen=True)
+class ModelPrice:
+    """
+    prompt(Decimal): Price per million prompt tokens.
+    completion(Decimal): Price per million completion tokens.
+    cached_prompt(Decimal, optional): Price per million prompt tokens read from the provider's prompt cache.
+        Defaults to the prompt price.
+    cache_creation(Decimal, optional): Price per million prompt tokens written to the provider's prompt cache.
+        Defaults to the prompt price.
+    """
+
+    prompt: Decimal
+    completion: Decimal
+    cached_prompt: Optional[Decimal] = None
+    cache_creation: Optional[Decimal] = None
+
+    def cost(
+        self,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cached_prompt_tokens: int = 0,
+        cache_read_tokens: int = 0,
+        cache_creation_tokens: int = 0,
+    ) -> Decimal:
+        """
+        cached_prompt_tokens are part of prompt_tokens, as OpenAI reports them. cache_read_tokens and
+        cache_creation_tokens come on top of prompt_tokens, as Anthropic reports them.
+        """
+        cached_prompt_tokens = min(cached_prompt_tokens, prompt_tokens)
+        cached_price = (
+            self.cached_prompt if self.cached_prompt is not None else self.prompt
+        )
+        creation_price = (
+            self.cache_creation if self.cache_creation is not None else self.prompt
+        )
+        return (
+            (prompt_tokens - cached_prompt_tokens) * self.prompt
+            + (cached_prompt_tokens + cache_read_tokens) * cached_price
+            + cache_creation_tokens * creation_price
+            + completion_tokens * self.completion
+        ) / ONE_MILLION
+
+
+# USD per million tokens: (prompt, completion, cached prompt, cache creation). Variants priced apart
+# from their family (e.g. "gpt-4-32k" from "gpt-4") need their own entry, or the family price is used.
+DEFAULT_PRICES: Dict[str, Dict[str, Tuple[str, str, Optional[str], Optional[str]]]] = {
+    "openai": {
+        "gpt-4o-mini": ("0.15", "0.60", "0.075", None),
+        "gpt-4o": ("2.50", "10.00", "1.25", None),
+        "gpt-4o-2024-05-13": ("5.00", "15.00", None, None),
+        "gpt-4o-realtime-preview": ("5.00", "20.00", "2.50", None),
+        "chatgpt-4o-latest": ("5.00", "15.00", None, None),
+        "gpt-4-turbo": ("10.00", "30.00", None, None),
+        "gpt-4-0125-preview": ("10.00", "30.00", None, None),
+        "gpt-4-1106-preview": ("10.00", "30.00", None, None),
+        "gpt-4-vision-preview": ("10.00", "30.00", None, None),
+        "gpt-4-32k": ("60.00", "120.00", None, None),
+        "gpt-4": ("30.00", "60.00", None, None),
+        "gpt-3.5-turbo": ("0.50", "1.50", None, None),
+        "gpt-3.5-turbo-1106": ("1.00", "2.00", None, None),
+        "gpt-3.5-turbo-0613": ("1.50", "2.00", None, None),
+        "gpt-3.5-turbo-16k": ("3.00", "4.00", None, None),
+        "gpt-3.5-turbo-instruct": ("1.50", "2.00", None, None),
+        "o1-mini": ("3.00", "12.00", "1.50", None),
+        "o1-preview": ("15.00", "60.00", "7.50", None),
+        "o1": ("15.00", "60.00", "7.50", None),
+    },
+    "anthropic": {
+        "claude-3-5-sonnet": ("3.00", "15.00", "0.30", "3.75"),
+        "claude-3-5-haiku": ("0.80", "4.00", "0.08", "1.00"),
+        "claude-3-opus": ("15.00", "75.00", "1.50", "18.75"),
+        "claude-3-sonnet": ("3.00", "15.00", "0.30", "3.75"),
+        "claude-3-haiku": ("0.25", "1.25", "0.03", "0.30"),
+    },
+    "mistral": {
+        "mistral-large": ("2.00", "6.00", None, None),
+        "mistral-small": ("0.20", "0.60", None, None),
+        "open-mistral-nemo": ("0.15", "0.15", None, None),
+        "codestral": ("0.20", "0.60", None, None),
+    },
+    "groq": {
+        "llama-3.1-8b-instant": ("0.05", "0.08", None, None),
+        "llama-3.1-70b-versatile": ("0.59", "0.79", None, None),
+        "mixtral-8x7b-32768": ("0.24", "0.24", None, None),
+    },
+    "cohere": {
+        "command-r-plus": ("2.50", "10.00", None, None),
+        "command-r-plus-04-2024": ("3.00", "15.00", None, None),
+        "command-r": ("0.15", "0.60", None, None),
+        "command-r-03-2024": ("0.50", "1.50", None, None),
+    },
+    "ai21": {
+        "jamba-1.5-large": ("2.00", "8.00", None, None),
+        "jamba-1.5-mini": ("0.20", "0.40", None, None),
+    },
+    # Local models are free
+    "ollama": {"*": ("0", "0", None, None)},
+}
+
+
+class PriceTable:
+    """
+    Price lookup keyed by provider and model.
+
+    Models are matched exactly first and then by the longest registered prefix that ends at a separator
+    ("-", "_", ":" or "@"), so dated snapshots such as "gpt-4o-2024-08-06" resolve to "gpt-4o" but
+    "gpt-4.5-preview" doesn't resolve to "gpt-4". A model of "*" matches any model of that provider.
+    Model names may carry the prefix of a registered provider (e.g. "ollama/llama3"), which is used as
+    the provider; other prefixes, such as "org/model" ids, are part of the model name.
+    Resolved lookups are memoized so pricing an event is O(1) after the first call per model.
+    """
+
+    def __init__(self, prices: Optional[Dict[str, Dict[str, ModelPrice]]] = None):
+        self._prices: Dict[Tuple[str, str], ModelPrice] = {}
+        self._by_model: Dict[str, ModelPrice] = {}
+        self._providers: Set[str] = set()
+        self._resolved: Dict[Tuple[Optional[str], str], Optional[ModelPrice]] = {}
+        for provider, models in (prices or {}).items():
+            for model, price in models.items():
+                self.register(provider, model, price)
+
+    def register(
+        self,
+        provider: str,
+        model: str,
+        price: Union[ModelPrice, dict],
+    ) -> None:
+        """
+        Add or replace the price of a model.
+
+        Args:
+            provider (str): Provider name, e.g. "openai".
+            model (str): Model name or prefix, or "*" for every model of the provider.
+            price (ModelPrice, dict): Price per million tokens. Dicts use the keys "prompt",
+                "completion" and optionally "cached_prompt" and "cache_creation".
+        """
+        if isinstance(price, dict):
+            price = ModelPrice(
+                prompt=Decimal(str(price["prompt"])),
+                completion=Decimal(str(price["completion"])),
+                cached_prompt=(
+                    Decimal(str(price["cached_prompt"]))
+                    if price.get("cached_prompt") is not None
+                    else None
+                ),
+                cache_creation=(
+                    Decimal(str(price["cache_creation"]))
+                    if price.get("cache_creation") is not None
+                    else None
+                ),
+            )
+        provider = provider.lower()
+        model = model.lower()
+        self._prices[(provider, model)] = price
+        self._providers.add(provider)
+        if model != "*":
+            self._by_model[model] = price
+        self._resolved.clear()
+
+    def lookup(
+        self, model: Optional[str], provider: Optional[str] = None
+    ) -> Optional[ModelPrice]:
+        if not model:
+            return None
+        key = (provider, model)
+        if key in self._resolved:
+            return self._resolved[key]
+
+        name = model.lower()
+        if "/" in name:
+            prefix, rest = name.split("/", 1)
+            # The prefix names the provider more precisely than a router such as litellm
+            if prefix in self._providers:
+                provider, name = prefix, rest
+        provider = provider.lower() if provider else None
+
+        price = self._match(provider, name)
+        self._resolved[key] = price
+        return price
+
+    def _match(self, provider: Optional[str], name: str) -> Optional[ModelPrice]:
+        if provider is not None:
+            candidates = {
+                m: p for (prov, m), p in self._prices.items() if prov == provider
+            }
+        else:
+            candidates = self._by_model
+
+        if name in candidates:
+            return candidates[name]
+
+        best = None
+        for model, price in candidates.items():
+            if (
+                model != "*"
+                and name.startswith(model)
+                and name[len(model)] in _SEPARATORS
+            ):
+                if best is None or len(model) > len(best[0]):
+                    best = (model, price)
+        if best is not None:
+            return best[1]
+
+        if provider is not None:
+            if "*" in candidates:
+                return candidates["*"]
+            # The provider prefix may be a router (e.g. litellm), fall back to the model name alone
+            return self._match(None, name)
+        return None
+
+    def cost(
+        self,
+        model: Optional[str],
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        cached_prompt_tokens: Optional[int] = None,
+        provider: Optional[str] = None,
+        cache_read_tokens: Optional[int] = None,
+        cache_creation_tokens: Optional[int] = None,
+    ) -> Optional[Decimal]:
+        """
+        Cost in USD of a single LLM call, or None if the model is not in the table.
+        """
+        price = self.lookup(model, provider)
+        if price is None:
+            return None
+        return price.cost(
+            prompt_tokens=prompt_tokens or 0,
+            completion_tokens=completion_tokens or 0,
+            cached_prompt_tokens=cached_prompt_tokens or 0,
+            cache_read_tokens=cache_read_tokens or 0,
+            cache_creation_tokens=cache_creation_tokens or 0,
+        )
+
+    def event_cost(self, event, provider: Optional[str] = None) -> Optional[Decimal]:
+        """Cost in USD of an LLMEvent, or None if its model is not in the table."""
+        return self.cost(
+            event.model,
+            prompt_tokens=event.prompt_tokens,
+            completion_tokens=event.completion_tokens,
+            cached_prompt_tokens=event.cached_prompt_tokens,
+            provider=provider,
+            cache_read_tokens=event.cache_read_tokens,
+            cache_creation_tokens=event.cache_creation_tokens,
+        )
+
+    @classmethod
+    def from_dict(cls, prices: Dict[str, Dict[str, dict]]) -> "PriceTable":
+        """
+        Build a table from {"provider": {"model": {"prompt": ..., "completion": ..., "cached_prompt": ...,
+        "cache_creation": ...}}}.
+        """
+        table = cls()
+        for provider, models in prices.items():
+            for model, price in models.items():
+                table.register(provider, model, price)
+        return table
+
+    @classmethod
+    def from_file(cls, path: str) -> "PriceTable":
+        """
+        Load a price table from a JSON or YAML file with the same layout as `from_dict`.
+        """
+        with open(path, "r") as file:
+            if path.endswith((".yaml", ".yml")):
+                import yaml
+
+                prices = yaml.safe_load(file)
+            else:
+                prices = json.load(file)
+        return cls.from_dict(prices or {})
+
+
+def get_default_price_table() -> PriceTable:
+    table = PriceTable()
+    for provider, models in DEFAULT_PRICES.items():
+        for model, (
+            prompt,
+            completion,
+            cached_prompt,
+            cache_creation,
+        ) in models.items():
+            table.register(
+                provider,
+                model,
+                ModelPrice(
+                    prompt=Decimal(prompt),
+                    completion=Decimal(completion),
+                    cached_prompt=(
+                        Decimal(cached_prompt) if cached_prompt is not None else None
+                    ),
+                    cache_creation=(
+                        Decimal(cache_creation) if cache_creation is not None else None
+                    ),
+                ),
+            )
+    return table
+
+
+def load_price_table(price_table: Union[PriceTable, dict, str]) -> Optional[PriceTable]:
+    """
+    Accepts a PriceTable, a dict in the `PriceTable.from_dict` layout or a path to a JSON/YAML file.
+    """
+    if isinstance(price_table, PriceTable):
+        return price_table
+    try:
+        if isinstance(price_table, dict):
+            return PriceTable.from_dict(price_table)
+        if isinstance(price_table, str):
+            return PriceTable.from_file(price_table)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Could not load price table - {e}")
+        return None
+    logger.warning(f"Unsupported price table type: {type(price_table).__name__}")
+    return None
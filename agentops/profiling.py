@@ -0,0 +1,109 @@
+"""
+AgentOps call profiling, used by @record_action(profile=True) and @record_tool(profile=True).
+
+Overhead:
+    CPU and wall time profiling reads three clocks at the start and end of each call, which adds
+    roughly a microsecond per call (see tests/benchmarks/decorator_overhead.py).
+    Memory profiling uses tracemalloc, which is started on first use and stopped when no profiled
+    call is running. While it is tracing, every allocation in the process is slower (typically
+    2-4x for allocation-heavy code), so only enable it while investigating.
+"""
+
+import threading
+import time
+import tracemalloc
+from typing import List
+
+_memory_lock = threading.Lock()
+_memory_users = 0
+_started_tracemalloc = False
+_active_memory_profiles: List["CallProfiler"] = []
+
+
+def _start_memory_tracing() -> None:
+    global _memory_users, _started_tracemalloc
+    with _memory_lock:
+        if _memory_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracemalloc = True
+        _memory_users += 1
+
+
+def _stop_memory_tracing() -> None:
+    global _memory_users, _started_tracemalloc
+    with _memory_lock:
+        _memory_users -= 1
+        if _memory_users == 0 and _started_tracemalloc:
+            tracemalloc.stop()
+            _started_tracemalloc = False
+
+
+class CallProfiler:
+    """
+    Measures wall time, CPU time of the process and of the calling thread, and optionally the peak
+    and net change of traced memory between `start()` and `stop()`.
+
+    CPU time lower than wall time means the call was waiting (I/O, locks, sleeping or, for coroutines,
+    other tasks). Memory figures come from tracemalloc and are process-wide, so allocations made by
+    other threads during the call are included.
+
+    Args:
+        memory (bool): Whether to trace allocations with tracemalloc.
+    """
+
+    __slots__ = (
+        "memory",
+        "_wall",
+        "_process",
+        "_thread",
+        "_memory_start",
+        "_nested_peak",
+    )
+
+    def __init__(self, memory: bool = False):
+        self.memory = memory
+        self._memory_start = 0
+        self._nested_peak = 0
+
+    def start(self) -> "CallProfiler":
+        if self.memory:
+            _start_memory_tracing()
+            with _memory_lock:
+                self._memory_start, _ = tracemalloc.get_traced_memory()
+                # reset_peak is only available on Python 3.9+
+                if hasattr(tracemalloc, "reset_peak"):
+                    # An enclosing profiled call must not lose the peak reached so far
+                    current_peak = tracemalloc.get_traced_memory()[1]
+                    for profile in _active_memory_profiles:
+                        profile._nested_peak = max(profile._nested_peak, current_peak)
+                    tracemalloc.reset_peak()
+                _active_memory_profiles.append(self)
+        self._wall = time.perf_counter()
+        self._process = time.process_time()
+        self._thread = time.thread_time()
+        return self
+
+    def stop(self) -> dict:
+        wall_ms = (time.perf_counter() - self._wall) * 1000
+        process_ms = (time.process_time() - self._process) * 1000
+        thread_ms = (time.thread_time() - self._thread) * 1000
+        profile = {
+            "wall_ms": wall_ms,
+            "cpu_process_ms": process_ms,
+            "cpu_thread_ms": thread_ms,
+            "cpu_utilization": thread_ms / wall_ms if wall_ms > 0 else None,
+        }
+
+        if self.memory:
+            with _memory_lock:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, self._nested_peak)
+                if self in _active_memory_profiles:
+                    _active_memory_profiles.remove(self)
+                for outer in _active_memory_profiles:
+                    outer._nested_peak = max(outer._nested_peak, peak)
+            profile["memory_peak_bytes"] = max(peak - self._memory_start, 0)
+            profile["memory_net_bytes"] = current - self._memory_start
+            _stop_memory_tracing()
+
+        return profile
@@ -0,0 +1,546 @@
+"""
+Local record and replay of LLM calls.
+
+With `replay_mode="record"`, every instrumented LLM call is stored in a local content-addressed store:
+the key is a hash of the provider and the canonicalized request, the value the serialized response, or
+the chunks of a streamed response with the delay before each one. With `replay_mode="replay"`, the
+recorded responses are served back without any network call, and a request that wasn't recorded raises
+ReplayMissError. `replay_mode="auto"` replays what was recorded and records the rest, which keeps CI
+fixtures up to date as prompts change.
+
+The store is a directory with one JSON file per request, `<path>/<key[:2]>/<key>.json`, so recordings
+can be committed next to the tests that use them and diffed in review.
+
+Streams are replayed as the provider's own chunks. A complete response served to a streaming request,
+like a Time Travel override, is split into the chunk sequence the provider would have sent
+(`synthesize_chunks`): OpenAI-format chat.completion.chunk objects, or Anthropic message_start,
+content_block_* and message_* events. Chunks are yielded immediately, or paced by the recorded delays
+or a fixed delay, see `replay_stream_delay`.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import (
+    Any,
+    AsyncIterable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from .helpers import get_ISO_time
+from .log_config import logger
+
+REPLAY_MODES = ("record", "replay", "auto")
+# replay_stream_delay value that paces replayed streams like the recording
+RECORDED_DELAY = "recorded"
+DEFAULT_REPLAY_PATH = os.path.join(".agentops", "replay")
+
+# Arguments that don't change the response
+_IGNORED_KWARGS = {"session", "timeout", "extra_headers", "extra_query", "api_key"}
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            str(k): _canonical(v) for k, v in value.items() if k not in _IGNORED_KWARGS
+        }
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    dumped = dump_model(value)
+    if dumped is not None and dumped is not value:
+        return _canonical(dumped)
+    return repr(value)
+
+
+def request_key(provider: str, kwargs: dict) -> str:
+    """Content address of a request: SHA-256 of the provider and the canonical JSON of its arguments."""
+    canonical = json.dumps(
+        {"provider": provider, "request": _canonical(kwargs)},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def dump_model(obj: Any) -> Optional[Any]:
+    """A JSON-compatible form of a response or chunk: pydantic models and dicts. None if unsupported."""
+    if isinstance(obj, dict):
+        return obj
+    if hasattr(obj, "model_dump"):
+        try:
+            return obj.model_dump(mode="json")
+        except TypeError:
+            return json.loads(json.dumps(obj.model_dump(), default=str))
+    if hasattr(obj, "dict") and callable(obj.dict):
+        return json.loads(json.dumps(obj.dict(), default=str))
+    return None
+
+
+def rehydrate(data: Any, model_types: Sequence[type]) -> Any:
+    """`data` as an instance of the first of `model_types` that validates it, or as is if there are none."""
+    if not model_types:
+        return data
+    for model_type in model_types:
+        try:
+            return model_type.model_validate(data)
+        except Exception:
+            continue
+    logger.warning(
+        f"Replay: response doesn't match any of {[t.__name__ for t in model_types]}, returning a dict"
+    )
+    return data
+
+
+class ReplayStream:
+    """A stream of chunks, replayed or being recorded. Iterates like the provider's own stream."""
+
+    def __init__(self, chunks: Iterable[Any]):
+        self._chunks = chunks
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._chunks)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        close = getattr(self._chunks, "close", None)
+        if close is not None:
+            close()
+
+
+class AsyncReplayStream:
+    """Async counterpart of ReplayStream."""
+
+    def __init__(self, chunks: AsyncIterable[Any]):
+        self._chunks = chunks
+
+    def __aiter__(self):
+        return self._chunks.__aiter__()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self) -> None:
+        close = getattr(self._chunks, "aclose", None)
+        if close is not None:
+            await close()
+
+
+class ReplayStore:
+    """
+    Content-addressed store of recorded LLM calls.
+
+    Args:
+        path (str): Directory of the store. Created on first write.
+    """
+
+    def __init__(self, path: str = DEFAULT_REPLAY_PATH):
+        self.path = os.path.abspath(os.path.expanduser(path))
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        """The recorded entry of a request key, or None."""
+        try:
+            with open(self._file(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.warning(
+                f"Replay: ignoring unreadable recording {self._file(key)} - {e}"
+            )
+            return None
+
+    def put(self, key: str, entry: dict) -> None:
+        """Write an entry atomically, so concurrent test workers never read a partial file."""
+        path = self._file(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self._file(key))
+
+    def keys(self) -> Iterator[str]:
+        if not os.path.isdir(self.path):
+            return
+        for prefix in sorted(os.listdir(self.path)):
+            directory = os.path.join(self.path, prefix)
+            if len(prefix) != 2 or not os.path.isdir(directory):
+                continue
+            for name in sorted(os.listdir(directory)):
+                if name.endswith(".json"):
+                    yield name[: -len(".json")]
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.keys())
+
+
+_stores: Dict[str, ReplayStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_replay_store(path: Optional[str] = None) -> ReplayStore:
+    """The store at `path`, shared by every provider of the process."""
+    path = os.path.abspath(os.path.expanduser(path or DEFAULT_REPLAY_PATH))
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = ReplayStore(path)
+        return store
+
+
+def _entry(provider: str, kwargs: dict, kind: str, **fields) -> dict:
+    return {
+        "provider": provider,
+        "kind": kind,
+        "recorded_at": get_ISO_time(),
+        "request": _canonical(kwargs),
+        **fields,
+    }
+
+
+def record_response(
+    store: ReplayStore, key: str, provider: str, kwargs: dict, response: Any
+) -> None:
+    data = dump_model(response)
+    if data is None:
+        logger.debug(
+            f"Replay: cannot serialize {type(response).__name__}, not recorded"
+        )
+        return
+    store.put(key, _entry(provider, kwargs, "response", response=data))
+
+
+def record_stream(
+    store: ReplayStore, key: str, provider: str, kwargs: dict, stream: Iterable[Any]
+) -> ReplayStream:
+    """Wrap a stream so its chunks, and the delay before each, are recorded once it is exhausted."""
+
+    def generator():
+        chunks: List[Any] = []
+        delays: List[float] = []
+        last = time.perf_counter()
+        for chunk in stream:
+            now = time.perf_counter()
+            delays.append(round((now - last) * 1000, 3))
+            last = now
+            chunks.append(dump_model(chunk))
+            yield chunk
+        if all(c is not None for c in chunks):
+            store.put(
+                key, _entry(provider, kwargs, "stream", chunks=chunks, delays_ms=delays)
+            )
+
+    return ReplayStream(generator())
+
+
+def record_async_stream(
+    store: ReplayStore,
+    key: str,
+    provider: str,
+    kwargs: dict,
+    stream: AsyncIterable[Any],
+) -> AsyncReplayStream:
+    async def generator():
+        chunks: List[Any] = []
+        delays: List[float] = []
+        last = time.perf_counter()
+        async for chunk in stream:
+            now = time.perf_counter()
+            delays.append(round((now - last) * 1000, 3))
+            last = now
+            chunks.append(dump_model(chunk))
+            yield chunk
+        if all(c is not None for c in chunks):
+            store.put(
+                key, _entry(provider, kwargs, "stream", chunks=chunks, delays_ms=delays)
+            )
+
+    return AsyncReplayStream(generator())
+
+
+def stream_delays(
+    count: int,
+    delay: Optional[Union[float, str]],
+    recorded: Optional[List[float]] = None,
+) -> Optional[List[float]]:
+    """
+    Delay in milliseconds before each of `count` replayed chunks, or None to yield them immediately.
+
+    Args:
+        delay: None for no delay, "recorded" for the recorded delays (none if there are no recordings,
+            e.g. for synthesized streams), or a fixed number of milliseconds.
+        recorded (List[float], optional): The recorded delays of the stream.
+    """
+    if delay is None:
+        return None
+    if delay == RECORDED_DELAY:
+        if not recorded:
+            return None
+        return [float(d) for d in recorded[:count]] + [0.0] * max(
+            count - len(recorded), 0
+        )
+    return [float(delay)] * count
+
+
+def replay_stream(
+    chunks: List[Any],
+    rehydrate_chunk: Callable[[Any], Any],
+    delays_ms: Optional[List[float]] = None,
+) -> ReplayStream:
+    def generator():
+        for i, chunk in enumerate(chunks):
+            if delays_ms and delays_ms[i] > 0:
+                time.sleep(delays_ms[i] / 1000)
+            yield rehydrate_chunk(chunk)
+
+    return ReplayStream(generator())
+
+
+def replay_async_stream(
+    chunks: List[Any],
+    rehydrate_chunk: Callable[[Any], Any],
+    delays_ms: Optional[List[float]] = None,
+) -> AsyncReplayStream:
+    async def generator():
+        for i, chunk in enumerate(chunks):
+            if delays_ms and delays_ms[i] > 0:
+                await asyncio.sleep(delays_ms[i] / 1000)
+            yield rehydrate_chunk(chunk)
+
+    return AsyncReplayStream(generator())
+
+
+# A word and the whitespace before it, about the granularity of the tokens providers stream
+_PIECE = re.compile(r"\s*\S+|\s+")
+
+
+def _pieces(text: Optional[str]) -> List[str]:
+    return _PIECE.findall(text) if text else []
+
+
+def _openai_chunks(completion: dict, include_usage: bool) -> List[dict]:
+    base = {
+        "id": completion.get("id"),
+        "object": "chat.completion.chunk",
+        "created": completion.get("created"),
+        "model": completion.get("model"),
+        "system_fingerprint": completion.get("system_fingerprint"),
+    }
+
+    def chunk(index: int, delta: dict, finish_reason: Optional[str] = None) -> dict:
+        choice = {
+            "index": index,
+            "delta": delta,
+            "finish_reason": finish_reason,
+            "logprobs": None,
+        }
+        return {**base, "choices": [choice]}
+
+    chunks = []
+    for choice in completion.get("choices") or []:
+        index = choice.get("index", 0)
+        message = choice.get("message") or {}
+        chunks.append(
+            chunk(index, {"role": message.get("role") or "assistant", "content": ""})
+        )
+        for piece in _pieces(message.get("content")):
+            chunks.append(chunk(index, {"content": piece}))
+        for i, tool_call in enumerate(message.get("tool_calls") or []):
+            function = tool_call.get("function") or {}
+            chunks.append(
+                chunk(
+                    index,
+                    {
+                        "tool_calls": [
+                            {
+                                "index": i,
+                                "id": tool_call.get("id"),
+                                "type": tool_call.get("type", "function"),
+                                "function": {
+                                    "name": function.get("name"),
+                                    "arguments": "",
+                                },
+                            }
+                        ]
+                    },
+                )
+            )
+            for piece in _pieces(function.get("arguments")):
+                chunks.append(
+                    chunk(
+                        index,
+                        {
+                            "tool_calls": [
+                                {"index": i, "function": {"arguments": piece}}
+                            ]
+                        },
+                    )
+                )
+        chunks.append(chunk(index, {}, choice.get("finish_reason") or "stop"))
+    if include_usage and completion.get("usage"):
+        # As sent with stream_options={"include_usage": True}
+        chunks.append({**base, "choices": [], "usage": completion["usage"]})
+    return chunks
+
+
+def _anthropic_chunks(message: dict) -> List[dict]:
+    usage = dict(message.get("usage") or {})
+    output_tokens = usage.get("output_tokens", 0)
+    start = {
+        **message,
+        "content": [],
+        "stop_reason": None,
+        "stop_sequence": None,
+        "usage": {**usage, "output_tokens": min(output_tokens, 1)},
+    }
+    chunks: List[dict] = [{"type": "message_start", "message": start}]
+    for index, block in enumerate(message.get("content") or []):
+        if block.get("type") == "tool_use":
+            chunks.append(
+                {
+                    "type": "content_block_start",
+                    "index": index,
+                    "content_block": {**block, "input": {}},
+                }
+            )
+            for piece in _pieces(json.dumps(block.get("input") or {})):
+                chunks.append(
+                    {
+                        "type": "content_block_delta",
+                        "index": index,
+                        "delta": {"type": "input_json_delta", "partial_json": piece},
+                    }
+                )
+        else:
+            chunks.append(
+                {
+                    "type": "content_block_start",
+                    "index": index,
+                    "content_block": {**block, "text": ""},
+                }
+            )
+            for piece in _pieces(block.get("text")):
+                chunks.append(
+                    {
+                        "type": "content_block_delta",
+                        "index": index,
+                        "delta": {"type": "text_delta", "text": piece},
+                    }
+                )
+        chunks.append({"type": "content_block_stop", "index": index})
+    chunks.append(
+        {
+            "type": "message_delta",
+            "delta": {
+                "stop_reason": message.get("stop_reason"),
+                "stop_sequence": message.get("stop_sequence"),
+            },
+            "usage": {"output_tokens": output_tokens},
+        }
+    )
+    chunks.append({"type": "message_stop"})
+    return chunks
+
+
+def _ollama_chunks(response: dict) -> List[dict]:
+    message = response.get("message") or {}
+    role = message.get("role") or "assistant"
+    base = {
+        key: value for key, value in response.items() if key in ("model", "created_at")
+    }
+    chunks = [
+        {**base, "message": {"role": role, "content": piece}, "done": False}
+        for piece in _pieces(message.get("content"))
+    ]
+    # The last chunk carries the statistics of the response
+    last = {key: value for key, value in response.items() if key != "message"}
+    last_message = {key: value for key, value in message.items() if key != "content"}
+    chunks.append(
+        {**last, "message": {**last_message, "role": role, "content": ""}, "done": True}
+    )
+    return chunks
+
+
+def _cohere_events(response: dict) -> List[dict]:
+    events: List[dict] = [
+        {"event_type": "stream-start", "generation_id": response.get("generation_id")}
+    ]
+    for piece in _pieces(response.get("text")):
+        events.append({"event_type": "text-generation", "text": piece})
+    if response.get("tool_calls"):
+        events.append(
+            {
+                "event_type": "tool-calls-generation",
+                "text": response.get("text"),
+                "tool_calls": response["tool_calls"],
+            }
+        )
+    events.append(
+        {
+            "event_type": "stream-end",
+            "finish_reason": response.get("finish_reason") or "COMPLETE",
+            "response": response,
+        }
+    )
+    return events
+
+
+def synthesize_chunks(
+    response: Any, include_usage: bool = False
+) -> Optional[List[dict]]:
+    """
+    The chunks a provider would have streamed for a complete response, as JSON-compatible dicts, from
+    the shape of the response: OpenAI-format chat completions (OpenAI, LiteLLM, Groq, Mistral, AI21),
+    Anthropic messages, Ollama chat responses and Cohere chat responses. None for other responses.
+
+    Args:
+        include_usage (bool): End OpenAI-format streams with a usage chunk, as OpenAI does when asked
+            with stream_options={"include_usage": True}.
+    """
+    data = dump_model(response)
+    if not isinstance(data, dict):
+        return None
+    if data.get("object") == "chat.completion" or (
+        data.get("choices") and all("message" in choice for choice in data["choices"])
+    ):
+        return _openai_chunks(data, include_usage)
+    if data.get("type") == "message" and isinstance(data.get("content"), list):
+        return _anthropic_chunks(data)
+    if isinstance(data.get("message"), dict) and "done" in data:
+        return _ollama_chunks(data)
+    if "text" in data and ("generation_id" in data or "chat_history" in data):
+        return _cohere_events(data)
+    return None
@@ -0,0 +1,154 @@
+"""
+AgentOps process resource sampler.
+
+Classes:
+    ResourceSampler: Samples resource usage of the current process in a background thread and keeps
+        it as a compact, bounded time series.
+"""
+
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+
+import psutil
+
+from .log_config import logger
+
+# Column name -> array typecode. Counters are stored as cumulative values.
+SAMPLE_FIELDS = {
+    "timestamp": "d",  # seconds since the epoch
+    "rss_bytes": "q",
+    "cpu_percent": "d",  # of a single core, can exceed 100 for multi-threaded processes
+    "num_threads": "q",
+    "num_fds": "q",  # open file descriptors (handles on Windows)
+    "net_bytes_sent": "q",  # system-wide, psutil has no per-process network counters
+    "net_bytes_recv": "q",
+}
+
+
+class ResourceSampler:
+    """
+    Samples RSS, CPU %, thread count, open file descriptors and network bytes every `interval_ms`.
+
+    Samples are kept column-wise in typed arrays (about 50 bytes per sample). When `max_samples` is
+    reached every other sample is dropped and the sampling stride doubles, so the series always covers
+    the whole session in constant memory.
+
+    Args:
+        interval_ms (int): Time between samples in milliseconds.
+        max_samples (int, optional): Maximum number of samples to keep. Defaults to 2048.
+    """
+
+    def __init__(self, interval_ms: int, max_samples: int = 2048):
+        self.interval_ms = max(int(interval_ms), 10)
+        self.max_samples = max(max_samples, 2)
+        self._columns: Dict[str, array] = {
+            name: array(typecode) for name, typecode in SAMPLE_FIELDS.items()
+        }
+        self._lock = threading.Lock()
+        self._stride = 1
+        self._ticks = 0
+        self._stop_flag = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._process = psutil.Process()
+
+    def start(self) -> "ResourceSampler":
+        try:
+            # The first call always returns 0.0, it only sets the baseline
+            self._process.cpu_percent(interval=None)
+        except psutil.Error:
+            pass
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop_flag.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self.sample()  # always end the series with the latest values
+
+    def _run(self) -> None:
+        self.sample()
+        while not self._stop_flag.wait(self.interval_ms / 1000):
+            self._ticks += 1
+            if self._ticks % self._stride == 0:
+                self.sample()
+
+    def _read(self) -> Optional[dict]:
+        process = self._process
+        try:
+            with process.oneshot():
+                sample = {
+                    "timestamp": time.time(),
+                    "rss_bytes": process.memory_info().rss,
+                    "cpu_percent": process.cpu_percent(interval=None),
+                    "num_threads": process.num_threads(),
+                    "num_fds": (
+                        process.num_fds()
+                        if hasattr(process, "num_fds")
+                        else process.num_handles()
+                    ),
+                }
+            net = psutil.net_io_counters()
+            sample["net_bytes_sent"] = net.bytes_sent if net else 0
+            sample["net_bytes_recv"] = net.bytes_recv if net else 0
+            return sample
+        except (psutil.Error, OSError) as e:
+            logger.debug(f"Could not sample process resources - {e}")
+            return None
+
+    def sample(self) -> None:
+        sample = self._read()
+        if sample is None:
+            return
+        with self._lock:
+            for name, column in self._columns.items():
+                column.append(sample[name])
+            if len(self._columns["timestamp"]) >= self.max_samples:
+                self._downsample()
+
+    def _downsample(self) -> None:
+        for name, column in self._columns.items():
+            self._columns[name] = array(column.typecode, column[::2])
+        self._stride *= 2
+
+    def __len__(self) -> int:
+        return len(self._columns["timestamp"])
+
+    def samples(self) -> Dict[str, List]:
+        """The time series as {column: [values]}, oldest first."""
+        with self._lock:
+            return {name: column.tolist() for name, column in self._columns.items()}
+
+    def summary(self) -> dict:
+        with self._lock:
+            columns = self._columns
+            if not columns["timestamp"]:
+                return {"samples": 0}
+            cpu = columns["cpu_percent"]
+            return {
+                "samples": len(columns["timestamp"]),
+                "duration_s": columns["timestamp"][-1] - columns["timestamp"][0],
+                "peak_rss_bytes": max(columns["rss_bytes"]),
+                "avg_cpu_percent": sum(cpu) / len(cpu),
+                "max_cpu_percent": max(cpu),
+                "max_threads": max(columns["num_threads"]),
+                "max_fds": max(columns["num_fds"]),
+                "net_bytes_sent": columns["net_bytes_sent"][-1]
+                - columns["net_bytes_sent"][0],
+                "net_bytes_recv": columns["net_bytes_recv"][-1]
+                - columns["net_bytes_recv"][0],
+            }
+
+    def format_summary(self) -> Optional[str]:
+        summary = self.summary()
+        if summary["samples"] == 0:
+            return None
+        return (
+            f"Resources: peak RSS {summary['peak_rss_bytes'] / (1024 ** 2):.1f} MB | "
+            f"CPU avg {summary['avg_cpu_percent']:.0f}% max {summary['max_cpu_percent']:.0f}% | "
+            f"threads {summary['max_threads']} | fds {summary['max_fds']} | "
+            f"net {summary['net_bytes_sent'] / 1024:.0f} KB sent / {summary['net_bytes_recv'] / 1024:.0f} KB received"
+        )
@@ -0,0 +1,160 @@
+"""
+Opt-in memoization of deterministic LLM calls.
+
+With `response_cache=True`, instrumented providers serve repeated deterministic requests from a cache
+instead of calling the provider. A request is deterministic when it isn't streamed, asks for a single
+choice and sets `temperature` to 0. It's keyed like a replay recording: a hash of the provider and the
+canonical request, so the model, the messages and every argument that can change the response count.
+
+The cache has two tiers: an in-memory LRU, bounded by `response_cache_size`, and an optional directory
+on disk (`response_cache_path`), shared by processes and kept across runs. Entries expire after
+`response_cache_ttl` seconds in both. `response_cache_models` restricts caching to some models.
+
+The LLMEvent of a call served from the cache has a `cache` marker with the latency, tokens and cost the
+original call took, and a cost of 0.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from .helpers import get_ISO_time
+from .log_config import logger
+from .replay import ReplayStore, _canonical, dump_model
+
+DEFAULT_TTL = 3600.0
+DEFAULT_MAX_ENTRIES = 1024
+
+
+def is_cacheable(request: dict, models: Optional[Sequence[str]] = None) -> bool:
+    """
+    Whether the response of a request can be reused: a single, non-streamed choice at temperature 0,
+    for a model matching one of `models` (glob patterns) if given.
+    """
+    if request.get("stream") or request.get("n") not in (None, 1):
+        return False
+    # Ollama passes sampling parameters in `options`
+    options = request.get("options") if isinstance(request.get("options"), dict) else {}
+    temperature = request.get("temperature", options.get("temperature"))
+    try:
+        if temperature is None or float(temperature) != 0:
+            return False
+    except (TypeError, ValueError):
+        return False
+    if models is not None:
+        model = request.get("model")
+        return isinstance(model, str) and any(
+            fnmatchcase(model, pattern) for pattern in models
+        )
+    return True
+
+
+class ResponseCache:
+    """
+    Two-tier cache of LLM responses, keyed by request key. Thread-safe.
+
+    Args:
+        max_entries (int, optional): Entries kept in memory, least recently used first out. Defaults to 1024.
+        ttl (float, optional): Seconds an entry is served for. Defaults to an hour.
+        path (str, optional): Directory of the on-disk tier. Defaults to memory only.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl: float = DEFAULT_TTL,
+        path: Optional[str] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.store: Optional[ReplayStore] = ReplayStore(path) if path else None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+
+    def _expired(self, entry: dict) -> bool:
+        return time.time() - entry.get("cached_at", 0) > self.ttl
+
+    def get(self, key: str) -> Optional[dict]:
+        """The entry of a request key, or None if it isn't cached or has expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry
+                del self._entries[key]
+
+        entry = self.store.get(key) if self.store is not None else None
+        with self._lock:
+            if entry is None or self._expired(entry):
+                self.misses += 1
+                return None
+            self._insert(key, entry)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: dict) -> None:
+        with self._lock:
+            self._insert(key, entry)
+        if self.store is not None:
+            try:
+                self.store.put(key, entry)
+            except OSError as e:
+                logger.warning(
+                    f"Response cache: unable to write {key[:12]} to {self.store.path} - {e}"
+                )
+
+    def _insert(self, key: str, entry: dict) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """Empty the memory tier. The disk tier is left as is."""
+        with self._lock:
+            self._entries.clear()
+
+
+def cache_entry(
+    provider: str, request: dict, response: Any, latency_ms: Optional[float]
+) -> Optional[dict]:
+    """The entry of a response, or None if it can't be serialized."""
+    data = dump_model(response)
+    if data is None:
+        return None
+    return {
+        "provider": provider,
+        "kind": "response",
+        "recorded_at": get_ISO_time(),
+        "cached_at": time.time(),
+        "latency_ms": latency_ms,
+        "request": _canonical(request),
+        "response": data,
+    }
+
+
+_caches: Dict[Tuple[int, float, Optional[str]], ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(
+    max_entries: int = DEFAULT_MAX_ENTRIES,
+    ttl: float = DEFAULT_TTL,
+    path: Optional[str] = None,
+) -> ResponseCache:
+    """The cache with these settings, shared by every provider of the process."""
+    key = (max_entries, ttl, path)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = ResponseCache(max_entries, ttl, path)
+        return cache
@@ -1,3 +1,4 @@
+import asyncio
 import copy
 import functools
 import json
@@ -5,17 +6,23 @@ import threading
 import time
 from decimal import ROUND_HALF_UP, Decimal
 from termcolor import colored
-from typing import Optional, List, Union
+from typing import Callable, Optional, List, Union
 from uuid import UUID, uuid4
 from datetime import datetime
 
 from .exceptions import ApiServerException
 from .enums import EndState
-from .event import ErrorEvent, Event
+from .event import ErrorEvent, Event, LLMEvent
 from .log_config import logger
 from .config import Configuration
-from .helpers import get_ISO_time, filter_unjsonable, safe_serialize
+from .helpers import get_ISO_time, filter_unjsonable
 from .http_client import HttpClient
+from .telemetry import telemetry
+from .exporters import EventSink, build_sink
+from .metrics import LOOP_LAG_ACTION_TYPE, SessionMetrics
+from .sketch import LatencySketches
+from .resource_sampler import ResourceSampler
+from .loop_monitor import LoopLagMonitor
 
 
 class Session:
@@ -60,7 +67,19 @@ class Session:
             "errors": 0,
             "apis": 0,
         }
-
+        self.metrics = SessionMetrics(self.init_timestamp)
+        self._budget: Optional[Decimal] = None
+        self._on_budget_exceeded: Optional[Callable[["Session", Decimal], None]] = None
+        self._budget_lock = threading.Lock()
+        self.resource_sampler: Optional[ResourceSampler] = None
+        self._loop_monitors: List[LoopLagMonitor] = []
+        self._sink: EventSink = build_sink(config)
+        _register_sink(self._sink)
+
+        # Held while a batch is exported, so that batches are exported in order
+        self._flush_lock = threading.Lock()
+        # Wakes the flush thread before max_wait_time when the queue is full
+        self._flush_requested = threading.Event()
         self.stop_flag = threading.Event()
         self.thread = threading.Thread(target=self._run)
         self.thread.daemon = True
@@ -68,8 +87,11 @@ class Session:
 
         self.is_running = self._start_session()
         if self.is_running == False:
-            self.stop_flag.set()
-            self.thread.join(timeout=1)
+            self._stop_flush_thread()
+        elif self.config.resource_sampling_interval:
+            self.resource_sampler = ResourceSampler(
+                self.config.resource_sampling_interval
+            ).start()
 
     def set_video(self, video: str) -> None:
         """
@@ -101,9 +123,24 @@ class Session:
         if video is not None:
             self.video = video
 
-        self.stop_flag.set()
-        self.thread.join(timeout=1)
+        self._stop_flush_thread()
         self._flush_queue()
+        telemetry.session_closed(self.session_id)
+
+        # Computed locally so it is available even if the server can't be reached
+        self.metrics.end(self.end_timestamp)
+        # Uploaded with the session, so percentiles can be merged across sessions server-side
+        self.latency_sketches = self.metrics.latency.to_dict()
+        for monitor in self._loop_monitors:
+            monitor.stop()
+        summary_lines = self.metrics.format_summary()
+        if self.resource_sampler is not None:
+            self.resource_sampler.stop()
+            resources_line = self.resource_sampler.format_summary()
+            if resources_line:
+                summary_lines.append(resources_line)
+        for line in summary_lines:
+            logger.info(f"{colored('Session Performance -', attrs=['bold'])} {line}")
 
         def format_duration(start_time, end_time):
             start = datetime.fromisoformat(start_time.replace("Z", "+00:00"))
@@ -123,23 +160,21 @@ class Session:
             return " ".join(parts)
 
         with self.lock:
-            payload = {"session": self.__dict__}
             try:
-                res = HttpClient.post(
-                    f"{self.config.endpoint}/v2/update_session",
-                    json.dumps(filter_unjsonable(payload)).encode("utf-8"),
-                    jwt=self.jwt,
-                )
+                res_body = self._sink.end_session(self)
             except ApiServerException as e:
                 return logger.error(f"Could not end session - {e}")
 
-        logger.debug(res.body)
-        token_cost = res.body.get("token_cost", "unknown")
+        # Only once the session has ended, so that a retried end_session doesn't count it twice
+        ended_sessions_latency.merge(self.metrics.latency)
+
+        token_cost = (res_body or {}).get("token_cost", "unknown")
 
         formatted_duration = format_duration(self.init_timestamp, self.end_timestamp)
 
         if token_cost == "unknown" or token_cost is None:
-            token_cost_d = Decimal(0)
+            # Fall back to the cost computed locally from the price table
+            token_cost_d = self.metrics.cost
         else:
             token_cost_d = Decimal(token_cost)
 
@@ -162,18 +197,20 @@ class Session:
         )
         logger.info(analytics)
 
-        session_url = res.body.get(
-            "session_url",
-            f"https://app.agentops.ai/drilldown?session_id={self.session_id}",
-        )
+        if res_body is not None:
+            session_url = res_body.get(
+                "session_url",
+                f"https://app.agentops.ai/drilldown?session_id={self.session_id}",
+            )
 
-        logger.info(
-            colored(
-                f"\x1b[34mSession Replay: {session_url}\x1b[0m",
-                "blue",
+            logger.info(
+                colored(
+                    f"\x1b[34mSession Replay: {session_url}\x1b[0m",
+                    "blue",
+                )
             )
-        )
 
+        # The sink may be shared with other sessions; it's shut down by shutdown_sinks
         active_sessions.remove(self)
 
         return token_cost_d
@@ -212,12 +249,101 @@ class Session:
         self.tags = tags
         self._update_session()
 
+    def get_metrics(self) -> dict:
+        """
+        Live performance metrics for this session, aggregated locally from recorded events.
+
+        Returns:
+            dict: Latency statistics and percentiles per LLM model, tool and action type, token
+                totals, tokens/sec and the share of wall time spent in LLM calls, tools and untracked
+                code. Includes a "resources" summary when resource sampling is enabled.
+        """
+        summary = self.metrics.summary()
+        if self.resource_sampler is not None:
+            summary["resources"] = self.resource_sampler.summary()
+        return summary
+
+    def get_resource_samples(self) -> Optional[dict]:
+        """
+        Process resource usage sampled during this session, if `resource_sampling_interval` is configured.
+
+        Returns:
+            dict: {column: [values]} with timestamp, rss_bytes, cpu_percent, num_threads, num_fds,
+                net_bytes_sent and net_bytes_recv, oldest sample first. None if sampling is disabled.
+        """
+        if self.resource_sampler is None:
+            return None
+        return self.resource_sampler.samples()
+
+    def get_latency_sketches(self) -> LatencySketches:
+        """
+        Mergeable latency sketches of this session, per LLM model, tool and action type.
+
+        Returns:
+            LatencySketches: A copy; merge it with the sketches of other sessions or processes, or
+                serialize it with `to_dict()`.
+        """
+        return self.metrics.latency.copy()
+
+    @property
+    def token_cost(self) -> Decimal:
+        """
+        Running cost in USD of the LLM calls recorded so far, computed locally from the price table.
+        """
+        return self.metrics.cost
+
+    def set_budget(
+        self,
+        max_cost: Union[float, Decimal, None],
+        on_exceeded: Optional[Callable[["Session", Decimal], None]] = None,
+    ) -> None:
+        """
+        Set a cost budget for this session. Once the running cost reaches it, `on_exceeded` is called
+        once with the session and its current cost, e.g. to throttle or stop an expensive agent.
+
+        Args:
+            max_cost (float, Decimal): The budget in USD. Pass None to remove the budget.
+            on_exceeded (Callable, optional): Called as on_exceeded(session, cost). Defaults to logging a warning.
+        """
+        with self._budget_lock:
+            self._budget = Decimal(str(max_cost)) if max_cost is not None else None
+            self._on_budget_exceeded = on_exceeded
+        self._check_budget()
+
+    def _check_budget(self) -> None:
+        with self._budget_lock:
+            if self._budget is None or self.metrics.cost < self._budget:
+                return
+            budget, callback = self._budget, self._on_budget_exceeded
+            self._budget = None  # only notify once
+
+        cost = self.metrics.cost
+        if callback is None:
+            return logger.warning(
+                f"Session {self.session_id} exceeded its budget of ${budget} (${cost:.6f})"
+            )
+        try:
+            callback(self, cost)
+        except Exception as e:
+            logger.error(f"Budget callback failed - {e}")
+
+    def _price_llm_event(self, event: LLMEvent) -> None:
+        # Instrumented providers price their events first, with the provider in the lookup
+        if event.cost is not None:
+            return
+        cost = self.config.price_table.event_cost(event)
+        if cost is not None:
+            event.cost = float(cost)
+
     def record(self, event: Union[Event, ErrorEvent]):
         if not self.is_running:
+            telemetry.event_dropped("session_not_running")
             return
         if isinstance(event, Event):
             if not event.end_timestamp or event.init_timestamp == event.end_timestamp:
                 event.end_timestamp = get_ISO_time()
+            if isinstance(event, LLMEvent):
+                self._price_llm_event(event)
         elif isinstance(event, ErrorEvent):
             if event.trigger_event:
                 if (
@@ -229,17 +355,79 @@ class Session:
 
                 event.trigger_event_id = event.trigger_event.id
                 event.trigger_event_type = event.trigger_event.event_type
+                self.metrics.add_event(event.trigger_event)
                 self._add_event(event.trigger_event.__dict__)
                 event.trigger_event = None  # removes trigger_event from serialization
 
+        self.metrics.add_event(event)
         self._add_event(event.__dict__)
 
+        if isinstance(event, LLMEvent):
+            self._check_budget()
+
+        if self.config.loop_lag_threshold is not None:
+            self._monitor_running_loop()
+
+    def monitor_event_loop(
+        self,
+        threshold_ms: Optional[float] = None,
+        interval_ms: Optional[float] = None,
+    ) -> Optional[LoopLagMonitor]:
+        """
+        Measure the scheduling lag of the running asyncio event loop until the session ends. Must be
+        called from a coroutine. Lag percentiles are reported in the session metrics, and every lag
+        spike above `threshold_ms` is recorded as an ActionEvent ("event_loop_lag") with the stack of
+        the code that blocked the loop. Spikes aren't counted in the action statistics.
+
+        Args:
+            threshold_ms (float, optional): Lag that counts as a spike. Defaults to the
+                `loop_lag_threshold` option, or 100.
+            interval_ms (float, optional): Time between heartbeats. Defaults to half the threshold.
+
+        Returns:
+            LoopLagMonitor: The monitor of the running loop, or None if there is no running loop.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            logger.warning(
+                "monitor_event_loop must be called from a running event loop"
+            )
+            return None
+
+        with self.lock:
+            for monitor in self._loop_monitors:
+                if monitor.loop is loop and monitor.is_running:
+                    return monitor
+            if threshold_ms is None:
+                threshold_ms = self.config.loop_lag_threshold or 100
+            monitor = LoopLagMonitor(self, threshold_ms, interval_ms).start()
+            for finished in self._loop_monitors:
+                if not finished.is_running:
+                    # Their loop has shut down, stop their watchdog thread as well
+                    finished.stop()
+            self._loop_monitors = [m for m in self._loop_monitors if m.is_running]
+            self._loop_monitors.append(monitor)
+            return monitor
+
+    def _monitor_running_loop(self) -> None:
+        # Events recorded from coroutines start monitoring their loop when `loop_lag_threshold` is set
+        if not self.is_running:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.monitor_event_loop()
+
     def _add_event(self, event: dict) -> None:
         with self.lock:
             self.queue.append(event)
+            telemetry.event_enqueued(self.session_id, len(self.queue))
 
             if len(self.queue) >= self.config.max_queue_size:
-                self._flush_queue()
+                # Exported by the flush thread, so that recording never waits for the sink
+                self._flush_requested.set()
 
     def _reauthorize_jwt(self) -> Union[str, None]:
         with self.lock:
@@ -263,128 +451,72 @@ class Session:
     def _start_session(self):
         self.queue = []
         with self.lock:
-            payload = {"session": self.__dict__}
-            serialized_payload = json.dumps(filter_unjsonable(payload)).encode("utf-8")
-
-            try:
-                res = HttpClient.post(
-                    f"{self.config.endpoint}/v2/create_session",
-                    serialized_payload,
-                    self.config.api_key,
-                    self.config.parent_key,
-                )
-            except ApiServerException as e:
-                return logger.error(f"Could not start session - {e}")
-
-            logger.debug(res.body)
-
-            if res.code != 200:
-                return False
-
-            jwt = res.body.get("jwt", None)
-            self.jwt = jwt
-            if jwt is None:
-                return False
-
-            session_url = res.body.get(
-                "session_url",
-                f"https://app.agentops.ai/drilldown?session_id={self.session_id}",
-            )
-
-            logger.info(
-                colored(
-                    f"\x1b[34mSession Replay: {session_url}\x1b[0m",
-                    "blue",
-                )
-            )
-
-            return True
+            return self._sink.start_session(self)
 
     def _update_session(self) -> None:
         if not self.is_running:
             return
         with self.lock:
-            payload = {"session": self.__dict__}
-
-            try:
-                res = HttpClient.post(
-                    f"{self.config.endpoint}/v2/update_session",
-                    json.dumps(filter_unjsonable(payload)).encode("utf-8"),
-                    jwt=self.jwt,
-                )
-            except ApiServerException as e:
-                return logger.error(f"Could not update session - {e}")
+            self._sink.update_session(self)
 
     def _flush_queue(self) -> None:
         if not self.is_running:
             return
-        with self.lock:
-            queue_copy = self.queue[:]  # Copy the current items
-            self.queue = []
+        with self._flush_lock:
+            # The queue lock is only held to swap the queue, so that events can be recorded while the
+            # batch is exported
+            with self.lock:
+                queue_copy = self.queue
+                self.queue = []
 
             if len(queue_copy) > 0:
-                payload = {
-                    "events": queue_copy,
-                }
-
-                serialized_payload = safe_serialize(payload).encode("utf-8")
-                try:
-                    HttpClient.post(
-                        f"{self.config.endpoint}/v2/create_events",
-                        serialized_payload,
-                        jwt=self.jwt,
-                    )
-                except ApiServerException as e:
-                    return logger.error(f"Could not post events - {e}")
-
-                logger.debug("\n<AGENTOPS_DEBUG_OUTPUT>")
-                logger.debug(
-                    f"Session request to {self.config.endpoint}/v2/create_events"
+                started = time.perf_counter()
+                if not self._sink.export(self, queue_copy):
+                    telemetry.event_dropped("export_failed", len(queue_copy))
+                    return
+                telemetry.queue_flushed(
+                    self.session_id,
+                    len(queue_copy),
+                    (time.perf_counter() - started) * 1000,
                 )
-                logger.debug(serialized_payload)
-                logger.debug("</AGENTOPS_DEBUG_OUTPUT>\n")
-
-                # Count total events created based on type
-                events = payload["events"]
-                for event in events:
-                    event_type = event["event_type"]
-                    if event_type == "llms":
-                        self.event_counts["llms"] += 1
-                    elif event_type == "tools":
-                        self.event_counts["tools"] += 1
-                    elif event_type == "actions":
-                        self.event_counts["actions"] += 1
-                    elif event_type == "errors":
-                        self.event_counts["errors"] += 1
-                    elif event_type == "apis":
-                        self.event_counts["apis"] += 1
+
+                self._count_events(queue_copy)
+
+    def _count_events(self, events: List[dict]) -> None:
+        # Count total events created based on type
+        for event in events:
+            event_type = event["event_type"]
+            if event_type == "llms":
+                self.event_counts["llms"] += 1
+            elif event_type == "tools":
+                self.event_counts["tools"] += 1
+            elif event_type == "actions":
+                if event.get("action_type") != LOOP_LAG_ACTION_TYPE:
+                    self.event_counts["actions"] += 1
+            elif event_type == "errors":
+                self.event_counts["errors"] += 1
+            elif event_type == "apis":
+                self.event_counts["apis"] += 1
 
     def _run(self) -> None:
         while not self.stop_flag.is_set():
-            time.sleep(self.config.max_wait_time / 1000)
+            self._flush_requested.wait(self.config.max_wait_time / 1000)
+            self._flush_requested.clear()
             if self.queue:
                 self._flush_queue()
 
+    def _stop_flush_thread(self) -> None:
+        self.stop_flag.set()
+        self._flush_requested.set()
+        self.thread.join(timeout=1)
+
     def create_agent(self, name, agent_id):
         if not self.is_running:
             return
         if agent_id is None:
             agent_id = str(uuid4())
 
-        payload = {
-            "id": agent_id,
-            "name": name,
-        }
-
-        serialized_payload = safe_serialize(payload).encode("utf-8")
-        try:
-            HttpClient.post(
-                f"{self.config.endpoint}/v2/create_agent",
-                serialized_payload,
-                jwt=self.jwt,
-            )
-        except ApiServerException as e:
-            return logger.error(f"Could not create agent - {e}")
+        self._sink.create_agent(self, agent_id, name)
 
         return agent_id
 
@@ -398,3 +530,29 @@ class Session:
 
 
 active_sessions: List[Session] = []
+# Sinks of the sessions of this process. Sinks can be shared by sessions, so they're only shut down
+# once every session has ended, by shutdown_sinks
+open_sinks: List[EventSink] = []
+_open_sinks_lock = threading.Lock()
+
+
+def _register_sink(sink: EventSink) -> None:
+    with _open_sinks_lock:
+        if not any(open_sink is sink for open_sink in open_sinks):
+            open_sinks.append(sink)
+
+
+def shutdown_sinks() -> None:
+    """Shut down the sinks of every session. Called by the client once all sessions have ended."""
+    with _open_sinks_lock:
+        sinks = list(open_sinks)
+        open_sinks.clear()
+    for sink in sinks:
+        try:
+            sink.shutdown()
+        except Exception as e:
+            logger.error(f"{type(sink).__name__} failed to shut down - {e}")
+
+
+# Latency of the sessions of this process that have ended, see Client.get_latency_sketches
+ended_sessions_latency = LatencySketches()
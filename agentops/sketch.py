@@ -0,0 +1,272 @@
+"""
+Mergeable quantile sketches for latencies.
+
+DDSketch (Masson et al., VLDB 2019) maps each value to a logarithmic bin, so that every quantile it
+returns is within a fixed relative error of the exact one (1% by default), whatever the distribution.
+Sketches with the same accuracy merge exactly by adding bin counts, which is what lets percentiles be
+combined across sessions, workers and processes. Memory depends on the range of values, not their
+number: 1ms to 1h is about 750 bins at 1%, and `max_bins` bounds it by collapsing the lowest bins.
+"""
+
+import math
+import threading
+from typing import Dict, Iterable, Optional, Union
+
+# Values at or below this are counted as zero; latencies are never that precise
+MIN_INDEXABLE_VALUE = 1e-9
+
+LATENCY_KINDS = ("llms", "tools", "actions")
+
+
+class DDSketch:
+    """
+    Quantile sketch with relative error guarantees.
+
+    Args:
+        relative_accuracy (float, optional): Maximum relative error of quantiles. Defaults to 0.01.
+        max_bins (int, optional): Maximum number of bins. When exceeded, the lowest bins are collapsed,
+            which only reduces the accuracy of the lowest quantiles. Defaults to 2048.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index: int) -> float:
+        # Midpoint of the bin (gamma^(i-1), gamma^i], within relative_accuracy of anything in it
+        return 2 * self.gamma**index / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1) -> None:
+        if value <= MIN_INDEXABLE_VALUE:
+            self.zero_count += count
+        else:
+            index = self._index(value)
+            self.bins[index] = self.bins.get(index, 0) + count
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        self.count += count
+        self.sum += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def _collapse(self) -> None:
+        indexes = sorted(self.bins)
+        excess = len(indexes) - self.max_bins
+        target = indexes[excess]
+        for index in indexes[:excess]:
+            self.bins[target] += self.bins.pop(index)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile `q` (0 to 1), or None if the sketch is empty."""
+        if self.count == 0:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return max(self.min, 0.0)
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def merge(self, other: "DDSketch") -> None:
+        """Add the values of another sketch. Both must have the same relative accuracy."""
+        if not math.isclose(other.gamma, self.gamma):
+            raise ValueError("Cannot merge sketches with different relative accuracies")
+        if other.count == 0:
+            return
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def copy(self) -> "DDSketch":
+        sketch = DDSketch(self.relative_accuracy, self.max_bins)
+        sketch.merge(self)
+        return sketch
+
+    def to_dict(self) -> dict:
+        """
+        JSON-serializable form. Bins are stored densely from `offset`, the lowest bin index, which is
+        compact since latency bins are contiguous.
+        """
+        offset = min(self.bins) if self.bins else 0
+        counts = [0] * ((max(self.bins) - offset + 1) if self.bins else 0)
+        for index, count in self.bins.items():
+            counts[index - offset] = count
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "zero_count": self.zero_count,
+            "offset": offset,
+            "counts": counts,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, max_bins: int = 2048) -> "DDSketch":
+        sketch = cls(data["relative_accuracy"], max_bins)
+        offset = data.get("offset", 0)
+        sketch.bins = {
+            offset + i: count for i, count in enumerate(data.get("counts", [])) if count
+        }
+        sketch.zero_count = data.get("zero_count", 0)
+        sketch.count = data["count"]
+        sketch.sum = data.get("sum", 0.0)
+        sketch.min = data.get("min")
+        sketch.max = data.get("max")
+        if len(sketch.bins) > max_bins:
+            sketch._collapse()
+        return sketch
+
+
+class LatencySketches:
+    """
+    Latency sketches in milliseconds, keyed by LLM model, tool name and action type. Thread-safe.
+
+    Args:
+        relative_accuracy (float, optional): Relative accuracy of each sketch. Defaults to 0.01.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self._lock = threading.Lock()
+        self._sketches: Dict[str, Dict[str, DDSketch]] = {
+            kind: {} for kind in LATENCY_KINDS
+        }
+
+    def add(self, kind: str, key: str, value_ms: float) -> None:
+        with self._lock:
+            sketches = self._sketches.setdefault(kind, {})
+            sketch = sketches.get(key)
+            if sketch is None:
+                sketch = sketches[key] = DDSketch(self.relative_accuracy)
+            sketch.add(value_ms)
+
+    def get(self, kind: str, key: str) -> Optional[DDSketch]:
+        """A copy of one sketch, or None if nothing was recorded for it."""
+        with self._lock:
+            sketch = self._sketches.get(kind, {}).get(key)
+            return sketch.copy() if sketch is not None else None
+
+    def merge(self, other: Union["LatencySketches", dict]) -> None:
+        """Add the sketches of another LatencySketches, or of its `to_dict()` form, e.g. from another process."""
+        if isinstance(other, LatencySketches):
+            with other._lock:
+                incoming = {
+                    kind: {key: s.copy() for key, s in sketches.items()}
+                    for kind, sketches in other._sketches.items()
+                }
+        else:
+            incoming = {
+                kind: {key: DDSketch.from_dict(s) for key, s in sketches.items()}
+                for kind, sketches in other.items()
+            }
+        for sketches in incoming.values():
+            for sketch in sketches.values():
+                if not math.isclose(sketch.relative_accuracy, self.relative_accuracy):
+                    raise ValueError(
+                        "Cannot merge sketches with different relative accuracies"
+                    )
+        with self._lock:
+            for kind, sketches in incoming.items():
+                mine = self._sketches.setdefault(kind, {})
+                for key, sketch in sketches.items():
+                    if key in mine:
+                        mine[key].merge(sketch)
+                    else:
+                        mine[key] = sketch
+
+    def copy(self) -> "LatencySketches":
+        sketches = LatencySketches(self.relative_accuracy)
+        sketches.merge(self)
+        return sketches
+
+    def quantiles(
+        self, qs: Iterable[float] = (0.5, 0.95, 0.99)
+    ) -> Dict[str, Dict[str, dict]]:
+        """{kind: {key: {"count": n, "p50": ms, ...}}} for each kind with recorded latencies."""
+        qs = tuple(qs)
+        with self._lock:
+            return {
+                kind: {
+                    key: {
+                        "count": sketch.count,
+                        **{f"p{q * 100:g}": sketch.quantile(q) for q in qs},
+                    }
+                    for key, sketch in sketches.items()
+                }
+                for kind, sketches in self._sketches.items()
+                if sketches
+            }
+
+    def summary(
+        self, qs: Iterable[float] = (0.5, 0.95, 0.99)
+    ) -> Dict[str, Dict[str, dict]]:
+        """{kind: {key: {"count", "sum", "min", "max", "mean", "p50", ...}}}, empty kinds included."""
+        qs = tuple(qs)
+        with self._lock:
+            return {
+                kind: {
+                    key: {
+                        "count": sketch.count,
+                        "sum": sketch.sum,
+                        "min": sketch.min,
+                        "max": sketch.max,
+                        "mean": sketch.mean,
+                        **{f"p{q * 100:g}": sketch.quantile(q) for q in qs},
+                    }
+                    for key, sketch in sketches.items()
+                }
+                for kind, sketches in self._sketches.items()
+            }
+
+    def to_dict(self) -> Dict[str, Dict[str, dict]]:
+        with self._lock:
+            return {
+                kind: {key: sketch.to_dict() for key, sketch in sketches.items()}
+                for kind, sketches in self._sketches.items()
+                if sketches
+            }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Dict[str, dict]]) -> "LatencySketches":
+        accuracies = [
+            s["relative_accuracy"]
+            for sketches in data.values()
+            for s in sketches.values()
+        ]
+        sketches = cls(accuracies[0] if accuracies else 0.01)
+        sketches.merge(data)
+        return sketches
@@ -0,0 +1,123 @@
+"""
+AgentOps span hierarchy.
+
+The id of the event currently being recorded by @record_action / @record_tool is kept in a context
+variable. Every Event created while it is set (tools, nested actions, LLM calls made by the provider
+wrappers) gets it as its `parent_id`. asyncio tasks copy the context when they are created, so they
+inherit the parent automatically; use `propagate_context` for functions handed to threads.
+"""
+
+import contextvars
+import functools
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+from uuid import UUID
+
+_current_event_id: contextvars.ContextVar[Optional[UUID]] = contextvars.ContextVar(
+    "agentops_current_event_id", default=None
+)
+
+
+def get_current_event_id() -> Optional[UUID]:
+    """Id of the innermost event being recorded in the current context, if any."""
+    return _current_event_id.get()
+
+
+def set_current_event_id(event_id: Optional[UUID]) -> contextvars.Token:
+    return _current_event_id.set(event_id)
+
+
+def reset_current_event_id(token: contextvars.Token) -> None:
+    _current_event_id.reset(token)
+
+
+@contextmanager
+def span(event_id: Optional[UUID]) -> Iterator[None]:
+    """
+    Make `event_id` the parent of every event created inside the block.
+
+    Usage:
+        event = ActionEvent(action_type="plan")
+        with span(event.id):
+            ...  # LLM calls and tools recorded here get parent_id=event.id
+        agentops.record(event)
+    """
+    token = _current_event_id.set(event_id)
+    try:
+        yield
+    finally:
+        _current_event_id.reset(token)
+
+
+def propagate_context(func):
+    """
+    Wrap `func` so it runs with the context of the caller, e.g. when submitting work to a thread:
+
+        executor.submit(propagate_context(fetch_page), url)
+
+    Events recorded by `func` in the other thread are then parented to the caller's current event.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # Run in a copy so the wrapper can be called concurrently from several threads
+        return context.copy().run(func, *args, **kwargs)
+
+    return wrapper
+
+
+def _get(event: Union[dict, Any], key: str):
+    if isinstance(event, dict):
+        return event.get(key)
+    return getattr(event, key, None)
+
+
+def _timestamp(event, key: str) -> Optional[datetime]:
+    value = _get(event, key)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _end_key(event):
+    end = _timestamp(event, "end_timestamp") or _timestamp(event, "init_timestamp")
+    return (end is not None, end)
+
+
+def build_span_tree(events: Iterable[Union[dict, Any]]) -> Dict[Optional[str], List]:
+    """
+    Group events by the id of their parent. Events without a parent (or whose parent was not
+    recorded) are under the None key. Works with Event objects and serialized event dicts.
+    """
+    events = list(events)
+    ids = {str(_get(event, "id")) for event in events}
+    children: Dict[Optional[str], List] = {}
+    for event in events:
+        parent_id = _get(event, "parent_id")
+        key = (
+            str(parent_id) if parent_id is not None and str(parent_id) in ids else None
+        )
+        children.setdefault(key, []).append(event)
+    for siblings in children.values():
+        siblings.sort(key=lambda e: _get(e, "init_timestamp") or "")
+    return children
+
+
+def critical_path(events: Iterable[Union[dict, Any]]) -> List:
+    """
+    The chain of events that determined when the run finished: starting from the root event that
+    ended last, repeatedly descend into the child that ended last.
+    """
+    children = build_span_tree(events)
+    path: List = []
+    level = children.get(None, [])
+    while level:
+        latest = max(level, key=_end_key)
+        path.append(latest)
+        level = children.get(str(_get(latest, "id")), [])
+    return path
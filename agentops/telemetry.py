@@ -0,0 +1,288 @@
+"""
+AgentOps SDK self-telemetry.
+
+Counters and histograms describing the overhead and health of the SDK itself: events enqueued and
+dropped, queue depth, serialization and flush time, bytes sent, and HTTP latency, retries and
+failures per endpoint. They are process-wide, exposed through `Client.get_telemetry()` and, when
+`telemetry_port` is configured, in the Prometheus text exposition format on `/metrics`.
+
+Classes:
+    SDKTelemetry: Thread-safe container of the SDK's own metrics.
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from .log_config import logger
+from .metrics import Histogram
+
+# Serialization and queue operations are sub-millisecond, HTTP calls are not
+SERIALIZATION_BUCKETS_MS: Tuple[float, ...] = (0.1, 0.5, 1, 5, 10, 50, 100, 500)
+HTTP_BUCKETS_MS: Tuple[float, ...] = (
+    10,
+    25,
+    50,
+    100,
+    250,
+    500,
+    1000,
+    2500,
+    5000,
+    10000,
+    20000,
+)
+
+
+def endpoint_of(url: str) -> str:
+    """Path of a request URL, used as the endpoint label (e.g. "/v2/create_events")."""
+    return urlparse(url).path or url
+
+
+class SDKTelemetry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.events_enqueued = 0
+        self.events_dropped: Dict[str, int] = {}
+        self.events_sent = 0
+        self.bytes_sent = 0
+        self._queue_depths: Dict[str, int] = {}
+        self.max_queue_depth = 0
+        self.serialization_ms = Histogram(SERIALIZATION_BUCKETS_MS)
+        self.flush_ms = Histogram(HTTP_BUCKETS_MS)
+        self.http_latency_ms: Dict[str, Histogram] = {}
+        self.http_retries: Dict[str, int] = {}
+        self.http_failures: Dict[str, int] = {}
+
+    def event_enqueued(self, session_id, queue_depth: int) -> None:
+        with self._lock:
+            self.events_enqueued += 1
+            self._set_queue_depth(session_id, queue_depth)
+
+    def event_dropped(self, reason: str, count: int = 1) -> None:
+        with self._lock:
+            self.events_dropped[reason] = self.events_dropped.get(reason, 0) + count
+
+    def serialized(self, serialization_ms: float) -> None:
+        with self._lock:
+            self.serialization_ms.observe(serialization_ms)
+
+    def queue_flushed(self, session_id, events: int, flush_ms: float) -> None:
+        with self._lock:
+            self.events_sent += events
+            self.flush_ms.observe(flush_ms)
+            self._set_queue_depth(session_id, 0)
+
+    def _set_queue_depth(self, session_id, queue_depth: int) -> None:
+        self._queue_depths[str(session_id)] = queue_depth
+        self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+
+    def session_closed(self, session_id) -> None:
+        with self._lock:
+            self._queue_depths.pop(str(session_id), None)
+
+    @property
+    def queue_depth(self) -> int:
+        """Events currently waiting to be flushed, across all sessions."""
+        return sum(self._queue_depths.values())
+
+    def http_request(
+        self,
+        url: str,
+        latency_ms: float,
+        bytes_sent: int = 0,
+        retries: int = 0,
+        failed: bool = False,
+    ) -> None:
+        endpoint = endpoint_of(url)
+        with self._lock:
+            histogram = self.http_latency_ms.get(endpoint)
+            if histogram is None:
+                histogram = self.http_latency_ms[endpoint] = Histogram(HTTP_BUCKETS_MS)
+            histogram.observe(latency_ms)
+            self.bytes_sent += bytes_sent
+            if retries:
+                self.http_retries[endpoint] = (
+                    self.http_retries.get(endpoint, 0) + retries
+                )
+            if failed:
+                self.http_failures[endpoint] = self.http_failures.get(endpoint, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "events_enqueued": self.events_enqueued,
+                "events_sent": self.events_sent,
+                "events_dropped": dict(self.events_dropped),
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "bytes_sent": self.bytes_sent,
+                "serialization_ms": self.serialization_ms.to_dict(),
+                "flush_ms": self.flush_ms.to_dict(),
+                "http": {
+                    endpoint: {
+                        "latency_ms": histogram.to_dict(),
+                        "retries": self.http_retries.get(endpoint, 0),
+                        "failures": self.http_failures.get(endpoint, 0),
+                    }
+                    for endpoint, histogram in self.http_latency_ms.items()
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, help_text: str, samples) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+        def histogram(name: str, help_text: str, histograms) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, h in histograms:
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    bucket_labels = {**labels, "le": _number(bound)}
+                    lines.append(f"{name}_bucket{_labels(bucket_labels)} {cumulative}")
+                inf_labels = {**labels, "le": "+Inf"}
+                lines.append(f"{name}_bucket{_labels(inf_labels)} {h.count}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(h.sum)}")
+                lines.append(f"{name}_count{_labels(labels)} {h.count}")
+
+        with self._lock:
+            metric(
+                "agentops_events_enqueued_total",
+                "counter",
+                "Events added to a session queue.",
+                [({}, self.events_enqueued)],
+            )
+            metric(
+                "agentops_events_sent_total",
+                "counter",
+                "Events acknowledged by the configured sinks.",
+                [({}, self.events_sent)],
+            )
+            metric(
+                "agentops_events_dropped_total",
+                "counter",
+                "Events that were never delivered, by reason.",
+                [({"reason": r}, c) for r, c in self.events_dropped.items()],
+            )
+            metric(
+                "agentops_queue_depth",
+                "gauge",
+                "Events waiting to be flushed.",
+                [({}, self.queue_depth)],
+            )
+            metric(
+                "agentops_bytes_sent_total",
+                "counter",
+                "Request body bytes sent to the API.",
+                [({}, self.bytes_sent)],
+            )
+            histogram(
+                "agentops_serialization_duration_ms",
+                "Time to serialize a batch of events.",
+                [({}, self.serialization_ms)],
+            )
+            histogram(
+                "agentops_flush_duration_ms",
+                "Time to export a batch of events to the configured sinks.",
+                [({}, self.flush_ms)],
+            )
+            histogram(
+                "agentops_http_request_duration_ms",
+                "API request latency by endpoint, including retries.",
+                [({"endpoint": e}, h) for e, h in self.http_latency_ms.items()],
+            )
+            metric(
+                "agentops_http_retries_total",
+                "counter",
+                "API request retries by endpoint.",
+                [({"endpoint": e}, c) for e, c in self.http_retries.items()],
+            )
+            metric(
+                "agentops_http_failures_total",
+                "counter",
+                "Failed API requests by endpoint.",
+                [({"endpoint": e}, c) for e, c in self.http_failures.items()],
+            )
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = (f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return "{" + ",".join(pairs) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+telemetry = SDKTelemetry()
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = telemetry.to_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server: Optional[HTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_prometheus_server(port: int, addr: str = "127.0.0.1") -> Optional[HTTPServer]:
+    """
+    Serve the SDK telemetry on http://{addr}:{port}/metrics in a daemon thread. Only one server is
+    started per process; later calls return the running one.
+    """
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+        try:
+            _server = _ThreadingHTTPServer((addr, port), _MetricsHandler)
+        except OSError as e:
+            logger.warning(f"Could not start telemetry server on port {port} - {e}")
+            return None
+        thread = threading.Thread(target=_server.serve_forever, daemon=True)
+        thread.start()
+        return _server
+
+
+def stop_prometheus_server() -> None:
+    global _server
+    with _server_lock:
+        if _server is not None:
+            _server.shutdown()
+            _server.server_close()
+            _server = None
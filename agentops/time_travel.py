@@ -1,30 +1,440 @@
+import ast
+import copy
+import hashlib
 import json
-import yaml
+import threading
+import time
 import os
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 from .http_client import HttpClient
-from .exceptions import ApiServerException
+from .exceptions import ApiServerException, MappedStoreError
+from .mapped_store import MappedStore, MappedStoreWriter
 from .singleton import singleton
 
 ttd_prepend_string = "🖇️ Agentops: ⏰ Time Travel |"
 
+# How often the Time Travel files are checked for changes. A check is one stat() call
+CHECK_INTERVAL_MS = float(
+    os.environ.get("AGENTOPS_TIME_TRAVEL_CHECK_INTERVAL_MS", 1000)
+)
+
+# Overrides of a mapped cache are typed on hit; this many typed overrides are kept per group of types
+TYPED_CACHE_SIZE = 4096
+
+
+def _package_parent_path(filename: str) -> str:
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parent_dir = os.path.dirname(script_dir)
+    return os.path.join(parent_dir, filename)
+
+
+def mapped_cache_path(cache_path: str) -> str:
+    """Path of the compiled form of a Time Travel cache, see `compile_time_travel_cache`."""
+    return os.path.splitext(cache_path)[0] + ".ttc"
+
+
+def _mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class _FileWatch:
+    """
+    Tells whether a file was created, deleted or modified since the last check, from its inode, mtime
+    and size. Checks at most once every `CHECK_INTERVAL_MS`; in between, `changed()` costs a clock read.
+    """
+
+    _UNSEEN = object()
+
+    def __init__(self, path: str):
+        self.path = path
+        self._signature = self._UNSEEN
+        self._last_check: Optional[float] = None
+
+    def changed(self) -> bool:
+        now = time.monotonic()
+        if (
+            self._last_check is not None
+            and (now - self._last_check) * 1000 < CHECK_INTERVAL_MS
+        ):
+            return False
+        self._last_check = now
+        try:
+            stat = os.stat(self.path)
+            signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            signature = None
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        return True
+
+    def invalidate(self) -> None:
+        self._signature = self._UNSEEN
+        self._last_check = None
+
+
+# Groups of response types providers decode overrides into, see register_override_types
+_override_types: List[Tuple[type, ...]] = []
+
+
+def register_override_types(model_types: Sequence[type]) -> None:
+    """
+    Declare the pydantic models a provider's overrides are decoded into, e.g. (ChatCompletion,
+    ChatCompletionChunk). Overrides are then typed when the cache is loaded rather than on each hit.
+    """
+    model_types = tuple(model_types)
+    if model_types not in _override_types:
+        _override_types.append(model_types)
+
+
+def _decode_override(value: Any) -> Any:
+    if isinstance(value, (str, bytes)):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return None
+    return value
+
 
 @singleton
 class TimeTravel:
+    """
+    Completion overrides of the Time Travel cache (agentops_time_travel.json), indexed by the canonical
+    hash of their prompt (see `cache_key`) when loaded, so a lookup is a single dict access. The cache
+    is reloaded when the file changes, see `refresh`.
+
+    The cache may list request fields that must also match, e.g. `"match_on": ["model", "temperature"]`.
+    Those fields are then read from the cached prompts and from the request.
+
+    Overrides are JSON-decoded once when loaded, and validated once per group of response types (see
+    `register_override_types`), recording the type each one belongs to; a hit returns a shallow copy of
+    the ready object.
+
+    Large caches can be compiled into a memory-mapped file (agentops_time_travel.ttc, see
+    `compile_time_travel_cache`), used instead of the JSON file when it's at least as recent. Only its
+    header is read when it's loaded; an override is read, decoded and typed on its first hit.
+    """
+
     def __init__(self):
         self._completion_overrides = {}
+        self._match_on = ()
+        self._index: Dict[str, Any] = {}
+        self._decoded: Dict[str, Any] = {}
+        # {types: {key: (type, instance)}}
+        self._typed: Dict[Tuple[type, ...], Dict[str, Tuple[type, Any]]] = {}
+        self._mapped: Optional[MappedStore] = None
+        self._lock = threading.Lock()
+
+        cache_path = _package_parent_path("agentops_time_travel.json")
+        self._watch = _FileWatch(cache_path)
+        self._mapped_watch = _FileWatch(mapped_cache_path(cache_path))
+        self._changed()
+        self._load(cache_path)
 
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        parent_dir = os.path.dirname(script_dir)
-        cache_path = os.path.join(parent_dir, "agentops_time_travel.json")
+    def _changed(self) -> bool:
+        # Both files are checked, so both signatures are up to date
+        changed = [self._watch.changed(), self._mapped_watch.changed()]
+        return any(changed)
 
+    def _load_mapped(self, cache_path: str) -> bool:
+        mapped_path = mapped_cache_path(cache_path)
+        mapped_mtime = _mtime(mapped_path)
+        if mapped_mtime is None:
+            return False
+        json_mtime = _mtime(cache_path)
+        if json_mtime is not None and json_mtime > mapped_mtime:
+            print(
+                f"{ttd_prepend_string} {cache_path} is newer than {mapped_path}, which is ignored"
+            )
+            return False
+        try:
+            store = MappedStore(mapped_path)
+        except (OSError, ValueError, MappedStoreError) as e:
+            print(f"{ttd_prepend_string} Error - Could not read {mapped_path}: {e}")
+            return False
+        # The previous store isn't closed: lookups in flight may still read from it
+        (
+            self._completion_overrides,
+            self._match_on,
+            self._index,
+            self._decoded,
+            self._typed,
+            self._mapped,
+        ) = (
+            {},
+            tuple(store.metadata.get("match_on") or ()),
+            store,
+            {},
+            {},
+            store,
+        )
+        return True
+
+    def _load(self, cache_path: str) -> None:
+        if self._load_mapped(cache_path):
+            return
+
+        completion_overrides, match_on = {}, ()
         try:
             with open(cache_path, "r") as file:
                 time_travel_cache_json = json.load(file)
-                self._completion_overrides = time_travel_cache_json.get(
-                    "completion_overrides"
+                completion_overrides = (
+                    time_travel_cache_json.get("completion_overrides") or {}
                 )
+                match_on = tuple(time_travel_cache_json.get("match_on") or ())
         except FileNotFoundError:
-            return
+            pass
+        except ValueError as e:
+            print(f"{ttd_prepend_string} Error - Could not read {cache_path}: {e}")
+
+        index = (
+            build_cache_index(completion_overrides, match_on)
+            if completion_overrides
+            else {}
+        )
+        decoded = {key: _decode_override(value) for key, value in index.items()}
+        typed = {types: _type_overrides(decoded, types) for types in _override_types}
+        (
+            self._completion_overrides,
+            self._match_on,
+            self._index,
+            self._decoded,
+            self._typed,
+            self._mapped,
+        ) = (
+            completion_overrides,
+            match_on,
+            index,
+            decoded,
+            typed,
+            None,
+        )
+
+    def refresh(self) -> None:
+        """Reload the cache if the file changed since it was loaded. Rate limited, see `CHECK_INTERVAL_MS`."""
+        if self._changed():
+            with self._lock:
+                self._load(self._watch.path)
+
+    def reload(self) -> None:
+        """Reload the cache now."""
+        with self._lock:
+            self._watch.invalidate()
+            self._mapped_watch.invalidate()
+            self._changed()
+            self._load(self._watch.path)
+
+    def _override(self, key: str) -> Optional[Any]:
+        mapped = self._mapped
+        if mapped is not None:
+            raw = mapped.get(key)
+            return json.loads(raw) if raw is not None else None
+        return self._index.get(key)
+
+    def find(self, kwargs: dict) -> Optional[Any]:
+        """The completion override of a request, or None."""
+        key = cache_key(
+            kwargs.get("messages"),
+            {field: kwargs.get(field) for field in self._match_on},
+        )
+        if key is None:
+            return None
+        return self._override(key)
+
+    def find_typed(self, kwargs: dict, model_types: Sequence[type]) -> Optional[Any]:
+        """
+        The completion override of a request as an instance of the first of `model_types` it validates
+        against, or None if there is no override or it doesn't match any of the types.
+        """
+        key = cache_key(
+            kwargs.get("messages"),
+            {field: kwargs.get(field) for field in self._match_on},
+        )
+        if key is None or key not in self._index:
+            return None
+        model_types = tuple(model_types)
+        if self._mapped is not None:
+            hit = self._find_mapped_typed(key, model_types)
+        else:
+            typed = self._typed.get(model_types)
+            if typed is None:
+                with self._lock:
+                    typed = self._typed.get(model_types)
+                    if typed is None:
+                        typed = self._typed[model_types] = _type_overrides(
+                            self._decoded, model_types
+                        )
+            hit = typed.get(key)
+        if hit is None:
+            names = ", ".join(t.__name__ for t in model_types)
+            print(
+                f"{ttd_prepend_string} Error - Completion override doesn't match any of {names}: "
+                f"{str(self._override(key))[:200]}"
+            )
+            return None
+        return copy.copy(hit[1])
+
+    def _find_mapped_typed(
+        self, key: str, model_types: Tuple[type, ...]
+    ) -> Optional[Tuple[type, Any]]:
+        # Typed on first hit, and kept while it's among the TYPED_CACHE_SIZE most recently used
+        typed = self._typed.get(model_types)
+        if typed is None:
+            with self._lock:
+                typed = self._typed.setdefault(model_types, OrderedDict())
+        with self._lock:
+            if key in typed:
+                typed.move_to_end(key)
+                return typed[key]
+        hit = _type_overrides(
+            {key: _decode_override(self._override(key))}, model_types
+        ).get(key)
+        if hit is not None:
+            with self._lock:
+                typed[key] = hit
+                while len(typed) > TYPED_CACHE_SIZE:
+                    typed.popitem(last=False)
+        return hit
+
+
+def _type_overrides(
+    decoded: Dict[str, Any], model_types: Tuple[type, ...]
+) -> Dict[str, Tuple[type, Any]]:
+    typed: Dict[str, Tuple[type, Any]] = {}
+    for key, data in decoded.items():
+        for model_type in model_types:
+            try:
+                typed[key] = (model_type, model_type.model_validate(data))
+                break
+            except Exception:
+                continue
+    return typed
+
+
+class _ActiveState:
+    # check_time_travel_active, re-read only when the config file changes
+    def __init__(self):
+        self._watch = _FileWatch(_package_parent_path(".agentops_time_travel.yaml"))
+        self._active = False
+
+    def get(self) -> bool:
+        if self._watch.changed():
+            self._active = bool(check_time_travel_active())
+        return self._active
+
+    def invalidate(self) -> None:
+        self._watch.invalidate()
+
+
+_active_state = _ActiveState()
+
+
+def is_time_travel_active() -> bool:
+    """
+    Whether Time Travel is on, without file I/O on the hot path: the config file is stat()-ed at most
+    every `CHECK_INTERVAL_MS` and only parsed again when it changed.
+    """
+    return _active_state.get()
+
+
+def reload_time_travel() -> None:
+    """Re-read the Time Travel config and cache now, e.g. after editing them programmatically."""
+    _active_state.invalidate()
+    TimeTravel().reload()
+
+
+def cache_key(messages, fields: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """
+    Canonical hash of a prompt: the content of each message, in order, and the optional `fields`.
+    Roles and other message keys are ignored, as they always were when matching overrides. None if
+    `messages` isn't a list of dicts.
+    """
+    if not isinstance(messages, (list, tuple)) or not all(
+        isinstance(message, dict) for message in messages
+    ):
+        return None
+    payload: Dict[str, Any] = {
+        "contents": [message.get("content") for message in messages]
+    }
+    if fields:
+        payload["fields"] = fields
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _parse_cache_key(key: str) -> Optional[dict]:
+    # Keys are str() of a dict, written by fetch_time_travel_id; parsed as literals, never evaluated
+    try:
+        parsed = json.loads(key)
+    except ValueError:
+        try:
+            parsed = ast.literal_eval(key)
+        except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+            return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def build_cache_index(
+    completion_overrides: Dict[str, Any], match_on: Iterable[str] = ()
+) -> Dict[str, Any]:
+    """
+    Index completion overrides by `cache_key`. When several prompts hash the same, the first one
+    wins, like the linear search this replaces.
+    """
+    match_on = tuple(match_on)
+    index: Dict[str, Any] = {}
+    for key, value in completion_overrides.items():
+        parsed = _parse_cache_key(key)
+        if parsed is None:
+            print(
+                f"{ttd_prepend_string} Error - Could not parse completion_overrides key: {key[:100]}"
+            )
+            continue
+        cached_messages = parsed.get("messages")
+        if not isinstance(cached_messages, list):
+            print(
+                f"{ttd_prepend_string} Error - unexpected type for cached_messages. Expected 'list'. Got ",
+                type(cached_messages),
+            )
+            continue
+        hashed = cache_key(
+            cached_messages, {field: parsed.get(field) for field in match_on}
+        )
+        if hashed is not None:
+            index.setdefault(hashed, value)
+    return index
+
+
+def compile_time_travel_cache(
+    source: Optional[str] = None, destination: Optional[str] = None
+) -> int:
+    """
+    Compile a Time Travel cache into the memory-mapped form TimeTravel opens in constant time:
+    overrides stored back to back, indexed by `cache_key`. Compile again after the JSON file changes.
+
+    Args:
+        source (str, optional): The JSON cache. Defaults to agentops_time_travel.json.
+        destination (str, optional): Defaults to the source with a ".ttc" extension.
+
+    Returns:
+        int: Number of overrides written.
+    """
+    source = source or _package_parent_path("agentops_time_travel.json")
+    destination = destination or mapped_cache_path(source)
+    with open(source, "r") as file:
+        time_travel_cache_json = json.load(file)
+    match_on = list(time_travel_cache_json.get("match_on") or ())
+    index = build_cache_index(
+        time_travel_cache_json.get("completion_overrides") or {}, match_on
+    )
+    with MappedStoreWriter(destination, metadata={"match_on": match_on}) as writer:
+        for key, value in index.items():
+            writer.add(key, json.dumps(value, separators=(",", ":")).encode("utf-8"))
+    return len(index)
 
 
 def fetch_time_travel_id(ttd_id):
@@ -48,6 +458,7 @@ def fetch_time_travel_id(ttd_id):
             json.dump(completion_overrides, file, indent=4)
 
         set_time_travel_active_state(True)
+        reload_time_travel()
     except ApiServerException as e:
         print(f"{ttd_prepend_string} Error - {e}")
     except Exception as e:
@@ -55,15 +466,35 @@ def fetch_time_travel_id(ttd_id):
 
 
 def fetch_completion_override_from_time_travel_cache(kwargs):
-    if not check_time_travel_active():
+    if not is_time_travel_active():
         return
 
-    if TimeTravel()._completion_overrides:
-        return find_cache_hit(kwargs["messages"], TimeTravel()._completion_overrides)
+    time_travel = TimeTravel()
+    time_travel.refresh()
+    if time_travel._index:
+        return time_travel.find(kwargs)
+
+
+def fetch_typed_completion_override(kwargs, model_types: Sequence[type]):
+    """
+    The completion override of a request, decoded into one of `model_types` (pydantic models) when the
+    cache was loaded. None if Time Travel is off or there is no usable override.
+    """
+    if not is_time_travel_active():
+        return None
+
+    time_travel = TimeTravel()
+    time_travel.refresh()
+    if time_travel._index:
+        return time_travel.find_typed(kwargs, model_types)
 
 
 # NOTE: This is specific to the messages: [{'role': '...', 'content': '...'}, ...] format
 def find_cache_hit(prompt_messages, completion_overrides):
+    """
+    Look up a prompt in a dict of completion overrides. Builds an index of the overrides on every
+    call; the Time Travel cache itself is indexed once, see TimeTravel.
+    """
     if not isinstance(prompt_messages, (list, tuple)):
         print(
             f"{ttd_prepend_string} Error - unexpected type for prompt_messages. Expected 'list' or 'tuple'. Got ",
@@ -77,43 +508,11 @@ def find_cache_hit(prompt_messages, completion_overrides):
             type(completion_overrides),
         )
         return None
-    for key, value in completion_overrides.items():
-        try:
-            completion_override_dict = eval(key)
-            if not isinstance(completion_override_dict, dict):
-                print(
-                    f"{ttd_prepend_string} Error - unexpected type for completion_override_dict. Expected 'dict'. Got ",
-                    type(completion_override_dict),
-                )
-                continue
 
-            cached_messages = completion_override_dict.get("messages")
-            if not isinstance(cached_messages, list):
-                print(
-                    f"{ttd_prepend_string} Error - unexpected type for cached_messages. Expected 'list'. Got ",
-                    type(cached_messages),
-                )
-                continue
-
-            if len(cached_messages) != len(prompt_messages):
-                continue
-
-            if all(
-                isinstance(a, dict)
-                and isinstance(b, dict)
-                and a.get("content") == b.get("content")
-                for a, b in zip(prompt_messages, cached_messages)
-            ):
-                return value
-        except (SyntaxError, ValueError, TypeError) as e:
-            print(
-                f"{ttd_prepend_string} Error - Error processing completion_overrides item: {e}"
-            )
-        except Exception as e:
-            print(
-                f"{ttd_prepend_string} Error - Unexpected error in find_cache_hit: {e}"
-            )
-    return None
+    key = cache_key(prompt_messages)
+    if key is None:
+        return None
+    return build_cache_index(completion_overrides).get(key)
 
 
 def check_time_travel_active():
@@ -121,6 +520,8 @@ def check_time_travel_active():
     parent_dir = os.path.dirname(script_dir)
     config_file_path = os.path.join(parent_dir, ".agentops_time_travel.yaml")
 
+    import yaml
+
     try:
         with open(config_file_path, "r") as config_file:
             config = yaml.safe_load(config_file)
@@ -130,6 +531,8 @@ def check_time_travel_active():
 
 
 def set_time_travel_active_state(is_active: bool):
+    import yaml
+
     config_path = ".agentops_time_travel.yaml"
     try:
         with open(config_path, "r") as config_file:
@@ -148,6 +551,8 @@ def set_time_travel_active_state(is_active: bool):
             )
             return
 
+    _active_state.invalidate()
+
     if is_active:
         print(f"{ttd_prepend_string} Activated")
     else:
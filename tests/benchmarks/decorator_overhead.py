@@ -0,0 +1,87 @@
+"""
+Microbenchmark of the per-call overhead added by @record_action and @record_tool.
+
+Run with: python tests/benchmarks/decorator_overhead.py [--calls N]
+
+Reports the cost of a plain call, a decorated call while the client is not initialized (fast path),
+a decorated call that records into a session, and the same with CPU or memory profiling enabled. The session used here only keeps the events in
+memory so the numbers measure the decorators, not the exporter.
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+os.environ.setdefault("AGENTOPS_LOGGING_TO_FILE", "False")
+
+from agentops import record_action, record_tool  # noqa: E402
+
+
+class InMemorySession:
+    def __init__(self):
+        self.events = []
+
+    def record(self, event):
+        self.events.append(event)
+
+    def __bool__(self):
+        return True
+
+
+def add(x, y, z=3):
+    return x + y + z
+
+
+def report(label: str, seconds: float, calls: int, baseline: float = 0.0) -> None:
+    per_call_us = seconds / calls * 1e6
+    overhead_us = (seconds - baseline) / calls * 1e6
+    print(
+        f"{label:<45} {per_call_us:9.3f} us/call   overhead {overhead_us:9.3f} us/call"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+    calls = args.calls
+
+    action = record_action("bench_action")(add)
+    tool = record_tool("bench_tool")(add)
+    session = InMemorySession()
+
+    baseline = min(timeit.repeat(lambda: add(1, 2), number=calls, repeat=5))
+    report("plain call", baseline, calls)
+
+    for name, wrapped in (("record_action", action), ("record_tool", tool)):
+        uninitialized = min(
+            timeit.repeat(lambda: wrapped(1, 2), number=calls, repeat=5)
+        )
+        report(f"{name} (client not initialized)", uninitialized, calls, baseline)
+
+        recording = min(
+            timeit.repeat(
+                lambda: wrapped(1, 2, session=session), number=calls, repeat=5
+            )
+        )
+        report(f"{name} (recording)", recording, calls, baseline)
+        session.events.clear()
+
+    for label, options in (
+        ("profile=True", {"profile": True}),
+        ("profile_memory=True", {"profile_memory": True}),
+    ):
+        profiled = record_tool("bench_tool", **options)(add)
+        seconds = min(
+            timeit.repeat(
+                lambda: profiled(1, 2, session=session), number=calls, repeat=5
+            )
+        )
+        report(f"record_tool ({label})", seconds, calls, baseline)
+        session.events.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark of the cold-start cost of importing the SDK.
+
+Run with: python tests/benchmarks/import_time.py [--runs N] [--top N]
+
+Each measurement runs in a fresh interpreter. Reports the time of `import agentops`, of the first access
+to `agentops.Client` (which loads the client and its dependencies), and the modules with the highest
+cumulative import time according to `python -X importtime`. Exits with status 1 when the fastest
+`import agentops` exceeds `--budget-ms`, so that it can gate regressions like an eager import of the
+client or of a provider SDK on a machine with stable timings.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# Well above the few milliseconds `import agentops` takes
+IMPORT_BUDGET_MS = 50
+
+MEASURE = """
+import time
+start = time.perf_counter()
+import agentops
+imported = time.perf_counter()
+agentops.Client
+print((imported - start) * 1000, (time.perf_counter() - imported) * 1000)
+"""
+
+
+def run(code: str, *options: str) -> subprocess.CompletedProcess:
+    env = {
+        **os.environ,
+        "PYTHONPATH": ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""),
+    }
+    # A scratch directory, so that nothing is written next to the caller
+    with tempfile.TemporaryDirectory() as cwd:
+        return subprocess.run(
+            [sys.executable, *options, "-c", code],
+            cwd=cwd,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+
+def measure(runs: int):
+    imports, clients = [], []
+    for _ in range(runs):
+        import_ms, client_ms = map(float, run(MEASURE).stdout.split())
+        imports.append(import_ms)
+        clients.append(client_ms)
+    return imports, clients
+
+
+def slowest_modules(top: int):
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    modules = []
+    for line in run(
+        "import agentops; agentops.Client", "-X", "importtime"
+    ).stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        modules.append((int(parts[1]), parts[2].strip()))
+    return sorted(modules, reverse=True)[:top]
+
+
+def report(label: str, values) -> None:
+    print(
+        f"{label:<30} min {min(values):8.2f} ms   median {statistics.median(values):8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    args = parser.parse_args()
+
+    imports, clients = measure(args.runs)
+    report("import agentops", imports)
+    report("first access to Client", clients)
+
+    print("\nSlowest imports of `import agentops; agentops.Client` (cumulative):")
+    for cumulative_us, module in slowest_modules(args.top):
+        print(f"{cumulative_us / 1000:10.2f} ms   {module}")
+
+    if min(imports) > args.budget_ms:
+        print(f"\nimport agentops exceeds its budget of {args.budget_ms:g} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import gzip
+import io
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from agentops.analytics import (  # noqa: E402
+    EventStats,
+    _iter_json_export,
+    load_columns,
+    summarize,
+)
+
+START = datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def llm(
+    model, start_s, duration_ms, prompt=100, completion=50, cost=0.001, event_id=None
+):
+    start = START + timedelta(seconds=start_s)
+    return {
+        "session_id": "s1",
+        "id": event_id or f"{model}-{start_s}",
+        "event_type": "llms",
+        "model": model,
+        "init_timestamp": start.isoformat(),
+        "end_timestamp": (start + timedelta(milliseconds=duration_ms)).isoformat(),
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "cost": cost,
+    }
+
+
+def error(trigger_id, trigger_type="llms"):
+    return {
+        "session_id": "s1",
+        "event_type": "errors",
+        "trigger_event_id": trigger_id,
+        "trigger_event_type": trigger_type,
+        "error_type": "RateLimitError",
+        "timestamp": START.isoformat(),
+    }
+
+
+@pytest.fixture
+def events():
+    rng = random.Random(11)
+    events = []
+    for i in range(1000):
+        events.append(llm("gpt-4o", i, rng.uniform(100, 2000)))
+        events.append(llm("gpt-4o-mini", i, rng.uniform(50, 500), cost=None))
+    events.append(llm("gpt-4o", 1000, 1500, event_id="failed"))
+    events.append(error("failed"))
+    events.append(
+        {"event_type": "tools", "name": "search", "init_timestamp": START.isoformat()}
+    )
+    return events
+
+
+def test_columns(events):
+    chunks = list(load_columns(events, chunk_size=600))
+    assert [len(c) for c in chunks] == [600, 600, 600, 203]
+    first = chunks[0]
+    assert first.keys[first.key[0]] == "gpt-4o"
+    assert first.start[0] == START.timestamp()
+    assert first.duration_ms.dtype == np.float64
+    # The error is attributed to the model of its trigger event
+    last = chunks[-1]
+    assert last.keys[last.key[-2]] == "gpt-4o"
+
+
+def test_summary_matches_exact_values(events):
+    report = summarize(events, chunk_size=250)
+    gpt = report["gpt-4o"]
+
+    durations = np.array(
+        [
+            (
+                datetime.fromisoformat(e["end_timestamp"])
+                - datetime.fromisoformat(e["init_timestamp"])
+            ).total_seconds()
+            * 1000
+            for e in events
+            if e.get("model") == "gpt-4o"
+        ]
+    )
+    assert gpt["calls"] == 1001
+    assert gpt["errors"] == 1
+    assert gpt["error_rate"] == pytest.approx(1 / 1001)
+    for q in (50, 95, 99):
+        exact = np.percentile(durations, q, method="lower")
+        assert gpt[f"p{q}"] == pytest.approx(exact, rel=0.011)
+    assert gpt["prompt_tokens"] == 100_100
+    assert gpt["tokens_per_second"] == pytest.approx(50_050 / (durations.sum() / 1000))
+    assert gpt["cost"] == pytest.approx(1.001)
+    # 1001 calls started over 1000 seconds
+    assert gpt["calls_per_second"] == pytest.approx(1001 / 1001.5, rel=0.01)
+
+    mini = report["gpt-4o-mini"]
+    assert mini["errors"] == 0
+    assert mini["cost"] == 0
+
+    assert list(summarize(events, event_type="tools")) == ["search"]
+
+
+def test_chunked_equals_whole(events):
+    whole, chunked = EventStats(), EventStats()
+    for columns in load_columns(events, chunk_size=len(events)):
+        whole.update(columns)
+    for columns in load_columns(events, chunk_size=7):
+        chunked.update(columns)
+    whole, chunked = whole.report(), chunked.report()
+    assert whole.keys() == chunked.keys()
+    for model in whole:
+        # Sums are added in a different order
+        assert chunked[model] == pytest.approx(whole[model])
+
+
+def test_loads_spools_and_exports(tmp_path, events):
+    spool = tmp_path / "events.jsonl"
+    spool.write_text("\n".join(json.dumps(e) for e in events[:1000]) + "\n")
+    rotated = tmp_path / "events.jsonl.1.gz"
+    with gzip.open(rotated, "wt") as f:
+        f.write("\n".join(json.dumps(e) for e in events[1000:]) + "\n")
+        f.write(json.dumps({"session_id": "s1", "event_type": "session"}) + "\n")
+
+    expected = summarize(events)
+    report = summarize(str(tmp_path))
+    assert report["gpt-4o"] == pytest.approx(expected["gpt-4o"])
+
+    export = tmp_path / "export.json"
+    export.write_text(json.dumps({"events": events}))
+    assert summarize(str(export))["gpt-4o"] == pytest.approx(expected["gpt-4o"])
+
+
+def test_json_exports_are_decoded_one_event_at_a_time(events):
+    events = events[:50]
+    document = json.dumps({"version": 1, "meta": {"n": [1, 2]}, "events": events})
+    # Reads of a few characters split numbers, strings and events
+    decoded = list(_iter_json_export(io.StringIO(document), read_size=5))
+    assert decoded == events
+    assert (
+        list(_iter_json_export(io.StringIO(json.dumps(events)), read_size=3)) == events
+    )
+    assert list(_iter_json_export(io.StringIO(" [ ] "))) == []
+    # A number cut at the end of a read
+    assert list(_iter_json_export(io.StringIO("[1, 234]"), read_size=6)) == [1, 234]
+
+    with pytest.raises(ValueError):
+        list(_iter_json_export(io.StringIO('{"events": [{"a": 1}')))
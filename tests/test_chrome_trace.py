@@ -0,0 +1,182 @@
+import gzip
+import io
+import json
+
+import pytest
+
+from agentops.cli import main
+from agentops.exporters import (
+    InMemorySink,
+    JSONLFileSink,
+    SQLiteStore,
+    write_chrome_trace,
+)
+from agentops.exporters.chrome_trace import sort_by_start
+
+
+class FakeSession:
+    session_id = "6f1b4c4e-2f4a-4d51-9d53-3b6f0f7f1c11"
+    init_timestamp = "2024-06-01T12:00:00+00:00"
+    end_timestamp = None
+    end_state = "Success"
+    end_state_reason = None
+    tags = None
+    host_env = None
+
+    class metrics:
+        cost = 0
+
+
+AGENT = "0b5f3c5e-8f56-4c43-9bb6-3fd7f2a6a1c2"
+
+
+def at(seconds: float) -> str:
+    return f"2024-06-01T12:00:{seconds:06.3f}+00:00"
+
+
+def event(event_type, start, end, **fields):
+    return {
+        "id": f"{event_type}-{start}-{end}",
+        "event_type": event_type,
+        "init_timestamp": at(start),
+        "end_timestamp": at(end),
+        **fields,
+    }
+
+
+EVENTS = [
+    event("actions", 0, 10, action_type="plan", agent_id=AGENT),
+    event("llms", 1, 4, model="gpt-4o", agent_id=AGENT),
+    # Overlaps the previous call without nesting in it
+    event("llms", 2, 6, model="gpt-4o-mini", agent_id=AGENT),
+    event("tools", 6, 8, name="search", agent_id=AGENT),
+    event("llms", 3, 5, model="gpt-4o"),
+    {"event_type": "errors", "error_type": "ValueError", "timestamp": at(7)},
+]
+
+
+def export(source, **kwargs) -> list:
+    out = io.StringIO()
+    written = write_chrome_trace(source, out, **kwargs)
+    trace = json.loads(out.getvalue())["traceEvents"]
+    assert written == len(trace)
+    return trace
+
+
+def slices(trace):
+    """Rebuild the slices from the begin/end pairs, checking they nest on each track."""
+    stacks, result = {}, []
+    for record in sorted(
+        (r for r in trace if r["ph"] in "BE"), key=lambda r: (r["ts"], r["ph"] == "B")
+    ):
+        stack = stacks.setdefault(record["tid"], [])
+        if record["ph"] == "B":
+            stack.append(record)
+        else:
+            begin = stack.pop()
+            result.append((begin["name"], begin["tid"], begin["ts"], record["ts"]))
+    assert all(not stack for stack in stacks.values())
+    return result
+
+
+def thread_names(trace):
+    return {
+        r["tid"]: r["args"]["name"] for r in trace if r.get("name") == "thread_name"
+    }
+
+
+def test_tracks_and_lanes():
+    trace = export(
+        sorted(EVENTS, key=lambda e: e.get("init_timestamp") or e["timestamp"])
+    )
+    names = thread_names(trace)
+    assert len(slices(trace)) == 5
+    by_name = {name: (tid, start, end) for name, tid, start, end in slices(trace)}
+
+    plan_tid, plan_start, plan_end = by_name["action plan"]
+    assert names[plan_tid] == f"agent {AGENT[:8]}"
+    assert (plan_end - plan_start) == 10_000_000
+    # The tool call nests in the action, the concurrent LLM call gets its own lane
+    assert by_name["tool search"][0] == plan_tid
+    assert names[by_name["llm gpt-4o-mini"][0]] == f"agent {AGENT[:8]} #2"
+    assert "session" in names.values()
+
+    errors = [r for r in trace if r["ph"] == "i"]
+    assert errors[0]["name"] == "error ValueError"
+
+
+def test_end_events_are_written_in_order():
+    trace = export(sorted(EVENTS[:4], key=lambda e: e["init_timestamp"]))
+    timestamps = [r["ts"] for r in trace if r["ph"] in "BE"]
+    assert timestamps == sorted(timestamps)
+    assert len(slices(trace)) == 4
+
+
+def test_out_of_order_events_still_nest():
+    trace = export(list(reversed(EVENTS[:4])))
+    assert len(slices(trace)) == 4
+
+
+def test_children_flushed_before_their_parent_share_its_lane(tmp_path):
+    # Flush order: each event once it has ended, so the enclosing action comes last
+    flushed = sorted(EVENTS[:4], key=lambda e: e["end_timestamp"])
+    path = tmp_path / "events.jsonl"
+    path.write_text("".join(json.dumps(e) + "\n" for e in flushed))
+
+    for source in (str(path), iter(flushed)):
+        trace = export(source)
+        by_name = {name: tid for name, tid, _, _ in slices(trace)}
+        assert by_name["llm gpt-4o"] == by_name["tool search"] == by_name["action plan"]
+        assert len(thread_names(trace)) == 2
+
+
+def test_sort_by_start_merges_spilled_runs():
+    flushed = sorted(EVENTS, key=lambda e: e.get("end_timestamp") or e["timestamp"])
+    ordered = list(sort_by_start(flushed, run_size=2))
+    assert ordered == list(sort_by_start(flushed))
+    assert [e.get("init_timestamp") or e["timestamp"] for e in ordered] == sorted(
+        e.get("init_timestamp") or e["timestamp"] for e in EVENTS
+    )
+
+
+def test_from_memory_sink():
+    sink = InMemorySink()
+    sink.export(FakeSession, list(reversed(EVENTS)))
+    trace = export(sink, session_id=FakeSession.session_id)
+    assert len(slices(trace)) == 5
+    assert trace[0]["args"]["name"] == f"session {FakeSession.session_id}"
+
+
+def test_from_jsonl_spool_and_store(tmp_path):
+    path = tmp_path / "events.jsonl"
+    sink = JSONLFileSink(str(path))
+    sink.export(FakeSession, EVENTS)
+    sink.end_session(FakeSession)
+    sink.shutdown()
+    assert len(slices(export(str(path)))) == 5
+
+    store = SQLiteStore(str(tmp_path / "sessions.db"))
+    store.start_session(FakeSession)
+    store.create_agent(FakeSession, AGENT, "planner")
+    store.export(FakeSession, EVENTS)
+    trace = export(store, session_id=FakeSession.session_id)
+    assert len(slices(trace)) == 5
+    assert "agent planner" in thread_names(trace).values()
+
+    with pytest.raises(ValueError):
+        write_chrome_trace(store, io.StringIO())
+    store.close()
+
+
+def test_cli_writes_gzipped_trace(tmp_path, capsys):
+    db = str(tmp_path / "sessions.db")
+    store = SQLiteStore(db)
+    store.start_session(FakeSession)
+    store.export(FakeSession, EVENTS)
+    store.close()
+
+    out = tmp_path / "run.trace.json.gz"
+    main(["trace", FakeSession.session_id, "--db", db, "-o", str(out)])
+    assert "Wrote" in capsys.readouterr().out
+    with gzip.open(out, "rt") as f:
+        assert len(slices(json.load(f)["traceEvents"])) == 5
@@ -0,0 +1,236 @@
+import tracemalloc
+
+import pytest
+
+import agentops
+from agentops import record_action, record_tool
+from agentops.decorators import _FuncSignature
+from agentops.singleton import clear_singletons
+
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    clear_singletons()
+    yield
+    agentops.end_all_sessions()  # teardown part
+
+
+class InMemorySession:
+    def __init__(self):
+        self.events = []
+
+    def record(self, event):
+        self.events.append(event)
+
+
+class TestFuncSignature:
+    def test_bind_defaults_positional_and_keywords(self):
+        def func(a, b=2, *, c=3):
+            pass
+
+        signature = _FuncSignature(func)
+
+        assert signature.bind((1,), {}) == {"a": 1, "b": 2, "c": 3}
+        assert signature.bind((1, 5), {"c": 7}) == {"a": 1, "b": 5, "c": 7}
+        # Defaults are not shared between calls
+        assert signature.bind((1,), {})["b"] == 2
+
+
+class TestDecoratorFastPath:
+    def test_uninitialized_client_calls_through(self):
+        @record_tool("add")
+        def add(x, y):
+            return x + y
+
+        assert add(1, 2) == 3
+
+    def test_explicit_session_is_recorded_without_client(self):
+        session = InMemorySession()
+
+        @record_action("add")
+        def add(x, y=10):
+            return x + y
+
+        assert add(1, session=session) == 11
+        assert len(session.events) == 1
+        assert session.events[0].action_type == "add"
+        assert session.events[0].params == {"x": 1, "y": 10}
+        assert session.events[0].returns == 11
+
+
+class TestStreamingRecording:
+    def test_generator_recorded_on_exhaustion(self):
+        session = InMemorySession()
+
+        @record_tool("count")
+        def count(n):
+            for i in range(n):
+                yield i
+
+        stream = count(3, session=session)
+        assert session.events == []  # nothing is recorded until the stream ends
+
+        assert list(stream) == [0, 1, 2]
+        assert len(session.events) == 1
+        event = session.events[0]
+        assert event.returns is None
+        assert event.stream_stats["status"] == "exhausted"
+        assert event.stream_stats["items"] == 3
+        assert event.stream_stats["time_to_first_item_ms"] is not None
+        assert event.end_timestamp is not None
+
+    def test_generator_recorded_on_close(self):
+        session = InMemorySession()
+
+        @record_action("count")
+        def count():
+            i = 0
+            while True:
+                yield i
+                i += 1
+
+        stream = count(session=session)
+        assert next(stream) == 0
+        assert next(stream) == 1
+        stream.close()
+
+        assert session.events[0].stream_stats["status"] == "closed"
+        assert session.events[0].stream_stats["items"] == 2
+
+    @pytest.mark.asyncio
+    async def test_async_generator(self):
+        session = InMemorySession()
+
+        @record_tool("count")
+        async def count(n):
+            for i in range(n):
+                yield i
+
+        items = [item async for item in count(2, session=session)]
+
+        assert items == [0, 1]
+        assert session.events[0].stream_stats["status"] == "exhausted"
+        assert session.events[0].stream_stats["items"] == 2
+
+    def test_generator_send_and_throw(self):
+        session = InMemorySession()
+
+        @record_tool("accumulate")
+        def accumulate():
+            total = 0
+            while True:
+                try:
+                    value = yield total
+                except ValueError:
+                    value = -total
+                if value is None:
+                    return total
+                total += value
+
+        stream = accumulate(session=session)
+        assert next(stream) == 0
+        assert stream.send(5) == 5
+        assert stream.send(2) == 7
+        # The generator handles the exception, so the stream goes on
+        assert stream.throw(ValueError("reset")) == 0
+        assert stream.send(4) == 4
+        with pytest.raises(StopIteration) as stop:
+            stream.send(None)
+        assert stop.value.value == 4
+
+        assert len(session.events) == 1
+        assert session.events[0].stream_stats["status"] == "exhausted"
+        assert session.events[0].stream_stats["items"] == 5
+
+    def test_generator_throw_unhandled(self):
+        session = InMemorySession()
+        seen = []
+
+        @record_tool("echo")
+        def echo():
+            try:
+                yield 1
+            except KeyError as e:
+                seen.append(e)
+                raise
+
+        stream = echo(session=session)
+        next(stream)
+        with pytest.raises(KeyError):
+            stream.throw(KeyError("boom"))
+        assert len(seen) == 1
+
+    @pytest.mark.asyncio
+    async def test_async_generator_asend_and_athrow(self):
+        session = InMemorySession()
+
+        @record_tool("accumulate")
+        async def accumulate():
+            total = 0
+            while True:
+                try:
+                    value = yield total
+                except ValueError:
+                    value = -total
+                total += value or 0
+
+        stream = accumulate(session=session)
+        assert await stream.__anext__() == 0
+        assert await stream.asend(3) == 3
+        assert await stream.athrow(ValueError("reset")) == 0
+        assert await stream.asend(2) == 2
+        await stream.aclose()
+
+        assert session.events[0].stream_stats["status"] == "closed"
+        assert session.events[0].stream_stats["items"] == 4
+
+
+class TestProfiling:
+    def test_cpu_profile(self):
+        session = InMemorySession()
+
+        @record_tool("busy", profile=True)
+        def busy():
+            return sum(i * i for i in range(20000))
+
+        busy(session=session)
+
+        profile = session.events[0].profile
+        assert profile["wall_ms"] > 0
+        assert profile["cpu_thread_ms"] >= 0
+        assert "memory_peak_bytes" not in profile
+
+    def test_memory_profile(self):
+        session = InMemorySession()
+
+        @record_action("allocate", profile_memory=True)
+        def allocate():
+            return [bytearray(1024) for _ in range(1000)]
+
+        kept = allocate(session=session)
+
+        profile = session.events[0].profile
+        assert profile["memory_peak_bytes"] >= 1000 * 1024
+        assert profile["memory_net_bytes"] >= 1000 * 1024
+        assert len(kept) == 1000
+
+    def test_memory_tracing_stopped_on_error(self):
+        session = InMemorySession()
+
+        @record_tool("fails", profile_memory=True)
+        def fails():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            fails(session=session)
+        assert not tracemalloc.is_tracing()
+
+    def test_no_profile_by_default(self):
+        session = InMemorySession()
+
+        @record_tool("plain")
+        def plain():
+            return 1
+
+        plain(session=session)
+        assert session.events[0].profile is None
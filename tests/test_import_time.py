@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import agentops
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# The time budget of `import agentops` is checked by tests/benchmarks/import_time.py, which isn't part of
+# the default run since wall-clock timings depend on the machine
+
+# Dependencies that must only be loaded by the first call that needs them
+DEFERRED_MODULES = (
+    "agentops.client",
+    "agentops.llms",
+    "agentops.session",
+    "agentops.partners.langchain_callback_handler",
+    "requests",
+    "psutil",
+    "yaml",
+    "termcolor",
+    "packaging",
+)
+
+
+def _run(code, cwd):
+    env = {
+        **os.environ,
+        "PYTHONPATH": ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""),
+    }
+    env.pop("AGENTOPS_LOGGING_TO_FILE", None)
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+class TestImportTime:
+    def test_import_is_lazy(self, tmp_path):
+        modules = json.loads(
+            _run(
+                "import sys, json, agentops; print(json.dumps(sorted(sys.modules)))",
+                tmp_path,
+            )
+        )
+        assert [module for module in DEFERRED_MODULES if module in modules] == []
+        # The log file is only created when something is logged
+        assert not (tmp_path / "agentops.log").exists()
+
+
+class TestLazyAttributes:
+    def test_public_names(self):
+        from agentops.client import Client
+        from agentops.event import LLMEvent
+
+        assert agentops.Client is Client
+        assert agentops.LLMEvent is LLMEvent
+        assert {"Client", "record_action", "Session", "init"} <= set(dir(agentops))
+
+    def test_unknown_name(self):
+        with pytest.raises(AttributeError):
+            agentops.not_a_name
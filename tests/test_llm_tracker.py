@@ -0,0 +1,96 @@
+import importlib
+import sys
+
+import pytest
+
+from agentops.llms import (
+    LlmTracker,
+    ProviderImportHook,
+    _InstrumentingLoader,
+    resolve_version,
+)
+
+
+class _FakeProvider:
+    overrides = 0
+
+    def __init__(self, client):
+        self.client = client
+
+    def override(self):
+        _FakeProvider.overrides += 1
+
+    def undo_override(self):
+        _FakeProvider.overrides -= 1
+
+
+class _Tracker(LlmTracker):
+    SUPPORTED_APIS = {"fakellm": {"1.0.0": ("chat",)}}
+    PROVIDERS = {"fakellm": (_FakeProvider, "1.0.0", "FakeLLM")}
+
+
+@pytest.fixture
+def fake_package(tmp_path):
+    def write(version):
+        package = tmp_path / "fakellm"
+        package.mkdir(exist_ok=True)
+        (package / "__init__.py").write_text(f'__version__ = "{version}"\n')
+
+    sys.path.insert(0, str(tmp_path))
+    _FakeProvider.overrides = 0
+    resolve_version.cache_clear()
+    yield write
+    sys.path.remove(str(tmp_path))
+    sys.modules.pop("fakellm", None)
+    sys.meta_path[:] = [
+        f for f in sys.meta_path if not isinstance(f, ProviderImportHook)
+    ]
+    resolve_version.cache_clear()
+    importlib.invalidate_caches()
+
+
+class TestImportHook:
+    def test_instruments_on_first_import(self, fake_package):
+        fake_package("1.2.0")
+        tracker = _Tracker(client=None)
+        tracker.override_api()
+        assert _FakeProvider.overrides == 0
+
+        module = importlib.import_module("fakellm")
+        assert _FakeProvider.overrides == 1
+        assert not isinstance(module.__loader__, _InstrumentingLoader)
+        assert not isinstance(module.__spec__.loader, _InstrumentingLoader)
+
+        importlib.reload(module)
+        assert _FakeProvider.overrides == 1
+
+    def test_already_imported(self, fake_package):
+        fake_package("1.2.0")
+        importlib.import_module("fakellm")
+        _Tracker(client=None).override_api()
+        assert _FakeProvider.overrides == 1
+
+    def test_unsupported_version(self, fake_package):
+        fake_package("0.9.0")
+        _Tracker(client=None).override_api()
+        assert importlib.import_module("fakellm").__version__ == "0.9.0"
+        assert _FakeProvider.overrides == 0
+
+    def test_failures_dont_break_the_import(self, fake_package, monkeypatch):
+        fake_package("1.2.0")
+        monkeypatch.setattr(_FakeProvider, "override", lambda self: 1 / 0)
+        _Tracker(client=None).override_api()
+        assert importlib.import_module("fakellm").__version__ == "1.2.0"
+
+    def test_single_hook(self, fake_package):
+        fake_package("1.2.0")
+        first, second = _Tracker(client=None), _Tracker(client=None)
+        first.override_api()
+        second.override_api()
+        hooks = [f for f in sys.meta_path if isinstance(f, ProviderImportHook)]
+        assert len(hooks) == 1 and hooks[0].tracker is second
+
+        second.stop_instrumenting()
+        assert not any(isinstance(f, ProviderImportHook) for f in sys.meta_path)
+        importlib.import_module("fakellm")
+        assert _FakeProvider.overrides == 0
@@ -0,0 +1,149 @@
+import asyncio
+import threading
+import time
+
+import pytest
+import requests_mock
+
+import agentops
+from agentops import ActionEvent, record_tool
+from agentops.loop_monitor import LOOP_LAG_ACTION_TYPE, WATCHDOG_THREAD_NAME
+from agentops.singleton import clear_singletons
+
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    clear_singletons()
+    yield
+    agentops.end_all_sessions()  # teardown part
+
+
+@pytest.fixture(autouse=True, scope="function")
+def mock_req():
+    with requests_mock.Mocker() as m:
+        url = "https://api.agentops.ai"
+        m.post(url + "/v2/create_events", json={"status": "ok"})
+        m.post(
+            url + "/v2/create_session", json={"status": "success", "jwt": "some_jwt"}
+        )
+        m.post(url + "/v2/update_session", json={"status": "success", "token_cost": 5})
+        m.post(url + "/v2/developer_errors", json={"status": "ok"})
+        m.post("https://pypi.org/pypi/agentops/json", status_code=404)
+        yield m
+
+
+def blocking_call():
+    time.sleep(0.3)
+
+
+def lag_events(session):
+    return [
+        event
+        for event in session.queue
+        if event.get("action_type") == LOOP_LAG_ACTION_TYPE
+    ]
+
+
+class TestLoopLagMonitor:
+    @pytest.mark.asyncio
+    async def test_records_spike_with_blocking_stack(self):
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=5000,
+            auto_start_session=False,
+        )
+        session = agentops.start_session()
+
+        monitor = agentops.monitor_event_loop(threshold_ms=100, interval_ms=10)
+        assert agentops.monitor_event_loop() is monitor  # one monitor per loop
+
+        await asyncio.sleep(0.05)
+        blocking_call()
+        await asyncio.sleep(0.05)
+
+        events = lag_events(session)
+        assert len(events) == 1
+        assert events[0]["params"]["lag_ms"] >= 200
+        assert "blocking_call" in events[0]["logs"]
+        assert events[0]["parent_id"] is None
+
+        lag = session.get_metrics()["event_loop_lag"]
+        assert lag["count"] >= 5
+        assert lag["max"] >= 200
+
+        monitor.stop()
+        await asyncio.sleep(0.02)
+        assert not monitor.is_running
+
+    @pytest.mark.asyncio
+    async def test_started_by_recorded_events_when_configured(self):
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=5000,
+            auto_start_session=False,
+            loop_lag_threshold=100,
+        )
+        session = agentops.start_session()
+
+        @record_tool("noop")
+        async def noop():
+            return None
+
+        await noop()
+        assert len(session._loop_monitors) == 1
+        await asyncio.sleep(0.1)
+
+        assert session.get_metrics()["event_loop_lag"]["count"] >= 1
+
+    def test_requires_running_loop(self):
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=50,
+            auto_start_session=False,
+        )
+        agentops.start_session()
+
+        assert agentops.monitor_event_loop() is None
+
+    def test_spikes_are_not_counted_as_actions(self):
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=5000,
+            auto_start_session=False,
+        )
+        session = agentops.start_session()
+        session.record(ActionEvent(action_type=LOOP_LAG_ACTION_TYPE))
+        session.record(ActionEvent(action_type="plan"))
+        session._flush_queue()
+
+        assert session.event_counts["actions"] == 1
+        assert list(session.get_metrics()["actions"]) == ["plan"]
+
+    def test_watchdogs_stop_with_their_loop(self):
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=5000,
+            auto_start_session=False,
+            loop_lag_threshold=20,
+        )
+        session = agentops.start_session()
+
+        @record_tool("noop")
+        async def noop():
+            await asyncio.sleep(0.01)
+
+        def watchdogs():
+            return [
+                t
+                for t in threading.enumerate()
+                if t.name == WATCHDOG_THREAD_NAME and t.is_alive()
+            ]
+
+        for _ in range(10):
+            asyncio.run(noop())
+        time.sleep(0.1)
+        assert watchdogs() == []
+        assert len(session._loop_monitors) <= 1
+
+        session.end_session(end_state="Success")
+        assert watchdogs() == []
@@ -0,0 +1,82 @@
+import hashlib
+import os
+
+import pytest
+
+from agentops.exceptions import MappedStoreError
+from agentops.mapped_store import MappedStore, MappedStoreWriter
+
+
+def _key(i):
+    return hashlib.sha256(f"prompt {i}".encode()).hexdigest()
+
+
+def test_write_and_read(tmp_path):
+    path = str(tmp_path / "cache.ttc")
+    with MappedStoreWriter(path, metadata={"match_on": ["model"]}) as writer:
+        for i in range(1000):
+            writer.add(_key(i), f"completion {i}".encode())
+
+    with MappedStore(path) as store:
+        assert len(store) == 1000
+        assert store.metadata == {"match_on": ["model"]}
+        assert store.get(_key(0)) == b"completion 0"
+        assert store.get(_key(999)) == b"completion 999"
+        assert store.get(_key(1000)) is None
+        assert _key(500) in store
+        assert list(store.keys()) == sorted(_key(i) for i in range(1000))
+
+
+def test_first_value_wins(tmp_path):
+    path = str(tmp_path / "cache.ttc")
+    with MappedStoreWriter(path) as writer:
+        assert writer.add(_key(1), b"first")
+        assert not writer.add(_key(1), b"second")
+        writer.add("not a digest", b"hashed")
+    with MappedStore(path) as store:
+        assert store.get(_key(1)) == b"first"
+        assert store.get("not a digest") == b"hashed"
+
+
+def test_empty_store(tmp_path):
+    path = str(tmp_path / "cache.ttc")
+    MappedStoreWriter(path).close()
+    with MappedStore(path) as store:
+        assert len(store) == 0
+        assert store.get(_key(0)) is None
+
+
+def test_aborted_write_leaves_nothing(tmp_path):
+    path = str(tmp_path / "cache.ttc")
+    with pytest.raises(RuntimeError):
+        with MappedStoreWriter(path) as writer:
+            writer.add(_key(0), b"value")
+            raise RuntimeError("interrupted")
+    assert os.listdir(tmp_path) == []
+
+
+def test_invalid_files(tmp_path):
+    path = tmp_path / "cache.ttc"
+    path.write_bytes(b"")
+    with pytest.raises(MappedStoreError):
+        MappedStore(str(path))
+    path.write_bytes(b"{" * 64)
+    with pytest.raises(MappedStoreError):
+        MappedStore(str(path))
+
+    with MappedStoreWriter(str(path)) as writer:
+        writer.add(_key(0), b"value")
+    path.write_bytes(path.read_bytes()[:-10])
+    with pytest.raises(MappedStoreError):
+        MappedStore(str(path))
+
+
+def test_replaced_file_stays_readable(tmp_path):
+    path = str(tmp_path / "cache.ttc")
+    with MappedStoreWriter(path) as writer:
+        writer.add(_key(0), b"old")
+    store = MappedStore(path)
+    with MappedStoreWriter(path) as writer:
+        writer.add(_key(0), b"new")
+    assert store.get(_key(0)) == b"old"
+    assert MappedStore(path).get(_key(0)) == b"new"
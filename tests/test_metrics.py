@@ -0,0 +1,94 @@
+import pytest
+import requests_mock
+
+import agentops
+from agentops import ActionEvent, Client, ErrorEvent, LLMEvent, ToolEvent
+from agentops.metrics import Histogram, SessionMetrics
+from agentops.singleton import clear_singletons
+
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    clear_singletons()
+    yield
+    agentops.end_all_sessions()  # teardown part
+
+
+@pytest.fixture(autouse=True, scope="function")
+def mock_req():
+    with requests_mock.Mocker() as m:
+        url = "https://api.agentops.ai"
+        m.post(url + "/v2/create_events", json={"status": "ok"})
+        m.post(
+            url + "/v2/create_session", json={"status": "success", "jwt": "some_jwt"}
+        )
+        m.post(url + "/v2/update_session", json={"status": "success", "token_cost": 5})
+        m.post(url + "/v2/developer_errors", json={"status": "ok"})
+        m.post("https://pypi.org/pypi/agentops/json", status_code=404)
+        yield m
+
+
+class TestHistogram:
+    def test_quantiles(self):
+        histogram = Histogram()
+        for value in range(1, 101):
+            histogram.observe(float(value))
+
+        assert histogram.count == 100
+        assert histogram.min == 1
+        assert histogram.max == 100
+        assert 40 <= histogram.quantile(0.5) <= 60
+        assert 90 <= histogram.quantile(0.95) <= 100
+
+    def test_empty(self):
+        assert Histogram().quantile(0.5) is None
+
+
+class TestSessionMetrics:
+    def test_aggregates_by_type(self):
+        metrics = SessionMetrics("2024-01-01T00:00:00+00:00")
+        metrics.add_event(
+            LLMEvent(
+                model="gpt-4o",
+                prompt_tokens=10,
+                completion_tokens=20,
+                init_timestamp="2024-01-01T00:00:00+00:00",
+                end_timestamp="2024-01-01T00:00:02+00:00",
+            )
+        )
+        metrics.add_event(
+            ToolEvent(
+                name="search",
+                init_timestamp="2024-01-01T00:00:02+00:00",
+                end_timestamp="2024-01-01T00:00:03+00:00",
+            )
+        )
+        metrics.add_event(ErrorEvent(logs=None))
+        metrics.end("2024-01-01T00:00:04+00:00")
+
+        summary = metrics.summary()
+        assert summary["prompt_tokens"] == 10
+        assert summary["completion_tokens"] == 20
+        assert summary["tokens_per_second"] == 10
+        assert summary["errors"] == 1
+        assert summary["llms"]["gpt-4o"]["count"] == 1
+        assert summary["tools"]["search"]["max"] == 1000
+        assert summary["time_shares"] == {"llms": 0.5, "tools": 0.25, "untracked": 0.25}
+
+
+class TestSessionMetricsIntegration:
+    def setup_method(self):
+        self.api_key = "11111111-1111-4111-8111-111111111111"
+        agentops.init(api_key=self.api_key, max_wait_time=50, auto_start_session=False)
+
+    def test_live_metrics_before_flush(self, mock_req):
+        session = agentops.start_session()
+        agentops.record(ActionEvent(action_type="plan"))
+        agentops.record(ActionEvent(action_type="plan"))
+
+        # Metrics are available immediately, without waiting for the queue to flush
+        metrics = Client().get_metrics()
+        assert metrics["actions"]["plan"]["count"] == 2
+        assert session.get_metrics()["actions"]["plan"]["count"] == 2
+
+        agentops.end_session("Success")
@@ -0,0 +1,179 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests_mock
+
+import agentops
+from agentops import ActionEvent, ErrorEvent, LLMEvent, ToolEvent
+from agentops.exporters.otlp import (
+    OTLPExporter,
+    event_to_span,
+    root_span_id_of,
+    span_id_of,
+    trace_id_of,
+)
+from agentops.singleton import clear_singletons
+
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    clear_singletons()
+    yield
+    agentops.end_all_sessions()  # teardown part
+
+
+@pytest.fixture(autouse=True, scope="function")
+def mock_req():
+    # real_http lets requests to the local collector through
+    with requests_mock.Mocker(real_http=True) as m:
+        url = "https://api.agentops.ai"
+        m.post(url + "/v2/create_events", json={"status": "ok"})
+        m.post(
+            url + "/v2/create_session", json={"status": "success", "jwt": "some_jwt"}
+        )
+        m.post(url + "/v2/update_session", json={"status": "success", "token_cost": 5})
+        m.post(url + "/v2/developer_errors", json={"status": "ok"})
+        m.post("https://pypi.org/pypi/agentops/json", status_code=404)
+        yield m
+
+
+@pytest.fixture
+def collector():
+    """A local stand-in for an OpenTelemetry collector that keeps every request it receives."""
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            requests.append((self.path, self.headers["Content-Type"], body))
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, format, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.requests = requests
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def all_spans(requests):
+    return [
+        span
+        for _, _, body in requests
+        for resource_spans in json.loads(body)["resourceSpans"]
+        for scope_spans in resource_spans["scopeSpans"]
+        for span in scope_spans["spans"]
+    ]
+
+
+def attribute(span, key):
+    for attr in span["attributes"]:
+        if attr["key"] == key:
+            return next(iter(attr["value"].values()))
+    return None
+
+
+class TestSpanMapping:
+    def test_llm_event(self):
+        session_id = "8c0b1c2f-4a2e-4b7d-9e3f-0123456789ab"
+        event = LLMEvent(model="gpt-4o", prompt_tokens=10, completion_tokens=5)
+        event.end_timestamp = event.init_timestamp
+
+        span = event_to_span(event.__dict__, session_id)
+
+        assert span["traceId"] == trace_id_of(session_id)
+        assert span["spanId"] == span_id_of(event.id)
+        assert span["parentSpanId"] == root_span_id_of(session_id)
+        assert span["name"] == "chat gpt-4o"
+        assert attribute(span, "gen_ai.request.model") == "gpt-4o"
+        assert attribute(span, "gen_ai.usage.input_tokens") == "10"
+
+    def test_nested_tool_and_error(self):
+        session_id = "8c0b1c2f-4a2e-4b7d-9e3f-0123456789ab"
+        action = ActionEvent(action_type="plan")
+        tool = ToolEvent(name="search", parent_id=action.id)
+        error = ErrorEvent(exception=ValueError("bad"))
+        error.trigger_event_id = tool.id
+
+        tool_span = event_to_span(tool.__dict__, session_id)
+        error_span = event_to_span(error.__dict__, session_id)
+
+        assert tool_span["parentSpanId"] == span_id_of(action.id)
+        assert tool_span["name"] == "execute_tool search"
+        assert error_span["parentSpanId"] == span_id_of(tool.id)
+        assert error_span["status"]["code"] == 2
+        assert error_span["events"][0]["name"] == "exception"
+
+
+class TestOTLPExport:
+    def test_exports_alongside_agentops(self, collector, mock_req):
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=50,
+            auto_start_session=False,
+            otlp_endpoint=collector.url,
+        )
+        session = agentops.start_session()
+        agentops.record(ToolEvent(name="search"))
+        time.sleep(0.15)
+        session.end_session(end_state="Success")
+
+        spans = all_spans(collector.requests)
+        assert [span["name"] for span in spans] == ["execute_tool search", "session"]
+        assert all(path == "/v1/traces" for path, _, _ in collector.requests)
+        assert spans[1]["spanId"] == spans[0]["parentSpanId"]
+        assert any(
+            request.url.endswith("/v2/create_events")
+            for request in mock_req.request_history
+        )
+
+    def test_otlp_only(self, collector, mock_req):
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=50,
+            auto_start_session=False,
+            otlp_endpoint=collector.url,
+            otlp_only=True,
+        )
+        session = agentops.start_session()
+        agentops.record(ActionEvent(action_type="test_event"))
+        time.sleep(0.15)
+        session.end_session(end_state="Success")
+
+        assert len(all_spans(collector.requests)) == 2
+        assert not any(
+            request.url.endswith("/v2/create_events")
+            for request in mock_req.request_history
+        )
+        assert session.event_counts["actions"] == 1
+
+    def test_protobuf(self, collector):
+        pytest.importorskip("opentelemetry.proto")
+        from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import (
+            ExportTraceServiceRequest,
+        )
+
+        class FakeSession:
+            session_id = "8c0b1c2f-4a2e-4b7d-9e3f-0123456789ab"
+
+        exporter = OTLPExporter(collector.url, protocol="protobuf")
+        event = ActionEvent(action_type="plan")
+        assert exporter.export(FakeSession(), [event.__dict__])
+
+        _, content_type, body = collector.requests[0]
+        assert content_type == "application/x-protobuf"
+        request = ExportTraceServiceRequest.FromString(body)
+        span = request.resource_spans[0].scope_spans[0].spans[0]
+        assert span.name == "plan"
+        assert span.span_id.hex() == span_id_of(event.id)
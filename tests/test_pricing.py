@@ -0,0 +1,188 @@
+from decimal import Decimal
+
+import pytest
+import requests_mock
+
+import agentops
+from agentops import LLMEvent, PriceTable
+from agentops.llms.instrumented_provider import InstrumentedProvider
+from agentops.pricing import ModelPrice, get_default_price_table
+from agentops.singleton import clear_singletons
+
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    clear_singletons()
+    yield
+    agentops.end_all_sessions()  # teardown part
+
+
+@pytest.fixture(autouse=True, scope="function")
+def mock_req():
+    with requests_mock.Mocker() as m:
+        url = "https://api.agentops.ai"
+        m.post(url + "/v2/create_events", json={"status": "ok"})
+        m.post(
+            url + "/v2/create_session", json={"status": "success", "jwt": "some_jwt"}
+        )
+        m.post(url + "/v2/update_session", json={"status": "success"})
+        m.post(url + "/v2/developer_errors", json={"status": "ok"})
+        m.post("https://pypi.org/pypi/agentops/json", status_code=404)
+        yield m
+
+
+class TestPriceTable:
+    def test_prefix_and_provider_lookup(self):
+        table = get_default_price_table()
+
+        assert table.lookup("gpt-4o-mini-2024-07-18") == table.lookup("gpt-4o-mini")
+        assert table.lookup("gpt-4o-2024-08-06") == table.lookup("gpt-4o")
+        assert table.lookup("ollama/llama3").prompt == 0
+        assert table.lookup("mistral/mistral-large-latest") is not None
+        assert table.lookup("some-unknown-model") is None
+
+    def test_variants_priced_apart_from_their_family(self):
+        table = get_default_price_table()
+
+        assert table.lookup("gpt-4-32k-0613").prompt == Decimal("60")
+        assert table.lookup("gpt-4-0125-preview") == table.lookup("gpt-4-turbo")
+        assert table.lookup("gpt-4-0613") == table.lookup("gpt-4")
+        # A prefix only matches up to a separator
+        assert table.lookup("gpt-4.5-preview") is None
+        assert table.lookup("command-r7b-12-2024") is None
+
+    def test_only_registered_providers_are_split_off(self):
+        table = PriceTable.from_dict(
+            {
+                "acme": {"org/model-1": {"prompt": 1, "completion": 1}},
+                "globex": {"model-1": {"prompt": 2, "completion": 2}},
+            }
+        )
+
+        assert table.lookup("org/model-1").prompt == 1
+        assert table.lookup("globex/model-1").prompt == 2
+
+    def test_cached_prompt_discount(self):
+        price = ModelPrice(
+            prompt=Decimal("2"), completion=Decimal("10"), cached_prompt=Decimal("1")
+        )
+
+        cost = price.cost(
+            prompt_tokens=1_000_000, completion_tokens=0, cached_prompt_tokens=500_000
+        )
+
+        assert cost == Decimal("1.5")
+
+    def test_cache_reads_and_writes_on_top_of_the_prompt(self):
+        price = ModelPrice(
+            prompt=Decimal("3"),
+            completion=Decimal("15"),
+            cached_prompt=Decimal("0.3"),
+            cache_creation=Decimal("3.75"),
+        )
+
+        cost = price.cost(
+            prompt_tokens=1_000_000,
+            cache_read_tokens=1_000_000,
+            cache_creation_tokens=1_000_000,
+        )
+
+        assert cost == Decimal("7.05")
+
+    def test_anthropic_event_cost(self):
+        event = LLMEvent(
+            model="claude-3-5-sonnet-20241022",
+            prompt_tokens=1_000_000,
+            cache_read_tokens=2_000_000,
+            cache_creation_tokens=1_000_000,
+        )
+
+        cost = get_default_price_table().event_cost(event, "Anthropic")
+
+        assert cost == Decimal("3") + Decimal("0.6") + Decimal("3.75")
+
+    def test_provider_entries(self):
+        table = PriceTable.from_dict(
+            {
+                "acme": {"shared-1": {"prompt": 1, "completion": 1}},
+                "globex": {
+                    "shared-1": {"prompt": 2, "completion": 2},
+                    "*": {"prompt": 5, "completion": 5},
+                },
+            }
+        )
+
+        assert table.lookup("shared-1", "Acme").prompt == 1
+        assert table.lookup("shared-1", "Globex").prompt == 2
+        assert table.lookup("globex-large", "Globex").prompt == 5
+        # Routers pass their own name, the model prefix names the provider
+        assert table.lookup("acme/shared-1", "LiteLLM").prompt == 1
+
+    def test_from_dict(self):
+        table = PriceTable.from_dict(
+            {"acme": {"acme-1": {"prompt": 1, "completion": 2}}}
+        )
+
+        assert table.cost("acme-1", 1_000_000, 1_000_000) == Decimal("3")
+
+
+class TestSessionCost:
+    def setup_method(self):
+        self.api_key = "11111111-1111-4111-8111-111111111111"
+        agentops.init(
+            api_key=self.api_key,
+            max_wait_time=50,
+            auto_start_session=False,
+            price_table={"acme": {"acme-1": {"prompt": 1, "completion": 2}}},
+        )
+
+    def test_cost_at_record_time(self, mock_req):
+        session = agentops.start_session()
+        event = LLMEvent(model="acme-1", prompt_tokens=500_000, completion_tokens=0)
+        session.record(event)
+
+        assert event.cost == 0.5
+        assert session.token_cost == Decimal("0.5")
+
+        # The server doesn't return a token_cost, so the local cost is used
+        assert session.end_session("Success") == Decimal("0.5")
+
+    def test_budget_callback(self, mock_req):
+        session = agentops.start_session()
+        exceeded = []
+        session.set_budget(1, lambda s, cost: exceeded.append(cost))
+
+        session.record(LLMEvent(model="acme-1", prompt_tokens=600_000))
+        assert exceeded == []
+
+        session.record(LLMEvent(model="acme-1", prompt_tokens=600_000))
+        session.record(LLMEvent(model="acme-1", prompt_tokens=600_000))
+        assert exceeded == [Decimal("1.2")]
+
+        agentops.end_session("Success")
+
+    def test_providers_price_with_their_own_entries(self, mock_req):
+        class AcmeProvider(InstrumentedProvider):
+            _provider_name = "Acme"
+
+            def handle_response(self, response, kwargs, init_timestamp, session=None):
+                pass
+
+            def override(self):
+                pass
+
+            def undo_override(self):
+                pass
+
+        agentops.configure(
+            price_table={
+                "acme": {"*": {"prompt": 1, "completion": 2}},
+                "globex": {"acme-2": {"prompt": 100, "completion": 100}},
+            }
+        )
+        session = agentops.start_session()
+        event = LLMEvent(model="acme-2", prompt_tokens=1_000_000)
+        AcmeProvider(agentops.Client())._safe_record(session, event)
+
+        assert event.cost == 1.0
+        agentops.end_session("Success")
@@ -0,0 +1,595 @@
+import asyncio
+import json
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+import requests_mock
+
+import agentops
+from agentops import Client
+from agentops.exceptions import ReplayMissError
+from agentops import time_travel
+from agentops.llms.cohere import CohereProvider
+from agentops.llms.instrumented_provider import InstrumentedProvider
+from agentops.llms.ollama import _chat_kwargs
+from agentops.replay import (
+    ReplayStore,
+    ReplayStream,
+    request_key,
+    stream_delays,
+    synthesize_chunks,
+)
+from agentops.singleton import clear_singletons
+
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    clear_singletons()
+    yield
+    agentops.end_all_sessions()  # teardown part
+
+
+@pytest.fixture(autouse=True, scope="function")
+def mock_req():
+    with requests_mock.Mocker() as m:
+        url = "https://api.agentops.ai"
+        m.post(url + "/v2/create_events", json={"status": "ok"})
+        m.post(
+            url + "/v2/create_session", json={"status": "success", "jwt": "some_jwt"}
+        )
+        m.post(url + "/v2/update_session", json={"status": "success", "token_cost": 5})
+        m.post(url + "/v2/developer_errors", json={"status": "ok"})
+        m.post("https://pypi.org/pypi/agentops/json", status_code=404)
+        yield m
+
+
+class _Model:
+    def __init__(self, data):
+        self.data = data
+
+    @classmethod
+    def model_validate(cls, data):
+        if not isinstance(data, dict) or data.get("object") != cls.object:
+            raise ValueError(f"not a {cls.__name__}")
+        return cls(data)
+
+    def model_dump(self, mode="python"):
+        return dict(self.data)
+
+
+class _ChatCompletion(_Model):
+    object = "chat.completion"
+
+
+class _ChatCompletionChunk(_Model):
+    object = "chat.completion.chunk"
+
+
+MODELS = (_ChatCompletion, _ChatCompletionChunk)
+
+
+def _completion(content):
+    return _ChatCompletion({"object": "chat.completion", "content": content})
+
+
+def _chunks(*contents):
+    return [
+        _ChatCompletionChunk({"object": "chat.completion.chunk", "content": c})
+        for c in contents
+    ]
+
+
+class _Provider(InstrumentedProvider):
+    """Calls a fake provider through the same replay hooks as the patched SDK methods."""
+
+    _provider_name = "Fake"
+
+    def __init__(self, client, responses):
+        super().__init__(client)
+        self.responses = responses
+        self.calls = 0
+
+    def create(self, override=None, **kwargs):
+        if override is not None:
+            return self.simulate_stream(override, kwargs, MODELS)
+        replayed = self.replay(kwargs, MODELS)
+        if replayed is not None:
+            return replayed
+        self.calls += 1
+        return self.record(kwargs, self.responses(kwargs))
+
+    async def acreate(self, override=None, **kwargs):
+        if override is not None:
+            return self.simulate_stream(override, kwargs, MODELS, is_async=True)
+        replayed = self.replay(kwargs, MODELS, is_async=True)
+        if replayed is not None:
+            return replayed
+        self.calls += 1
+        return self.record(kwargs, self.responses(kwargs), is_async=True)
+
+    def handle_response(self, response, kwargs, init_timestamp, session=None):
+        return response
+
+    def override(self):
+        pass
+
+    def undo_override(self):
+        pass
+
+
+def _init(mode, path):
+    agentops.init(
+        api_key="11111111-1111-4111-8111-111111111111",
+        max_wait_time=50,
+        auto_start_session=False,
+        replay_mode=mode,
+        replay_path=str(path),
+    )
+
+
+MESSAGES = [{"role": "user", "content": "Hello"}]
+
+
+class TestRequestKey:
+    def test_canonical(self):
+        a = request_key(
+            "OpenAI", {"model": "gpt-4o", "messages": MESSAGES, "temperature": 0}
+        )
+        b = request_key(
+            "OpenAI",
+            {"temperature": 0, "messages": MESSAGES, "model": "gpt-4o", "timeout": 30},
+        )
+        assert a == b
+
+    def test_distinguishes_requests(self):
+        base = {"model": "gpt-4o", "messages": MESSAGES}
+        keys = {
+            request_key("OpenAI", base),
+            request_key("Anthropic", base),
+            request_key("OpenAI", {**base, "model": "gpt-4o-mini"}),
+            request_key("OpenAI", {**base, "stream": True}),
+            request_key(
+                "OpenAI", {**base, "messages": [{"role": "user", "content": "Hello!"}]}
+            ),
+        }
+        assert len(keys) == 5
+
+    def test_models_in_arguments(self):
+        tool = _Model({"name": "search"})
+        assert request_key("OpenAI", {"tools": [tool]}) == request_key(
+            "OpenAI", {"tools": [{"name": "search"}]}
+        )
+
+
+class TestReplay:
+    def test_disabled_by_default(self, tmp_path):
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=50,
+            auto_start_session=False,
+        )
+        provider = _Provider(Client(), lambda kwargs: _completion("live"))
+        provider.create(model="m", messages=MESSAGES)
+        provider.create(model="m", messages=MESSAGES)
+        assert provider.calls == 2
+
+    def test_record_then_replay(self, tmp_path):
+        _init("record", tmp_path)
+        recorder = _Provider(
+            Client(), lambda kwargs: _completion(f"live {kwargs['model']}")
+        )
+        assert recorder.create(model="m", messages=MESSAGES).data["content"] == "live m"
+        assert len(ReplayStore(str(tmp_path))) == 1
+
+        clear_singletons()
+        _init("replay", tmp_path)
+        player = _Provider(
+            Client(), lambda kwargs: pytest.fail("the provider must not be called")
+        )
+        replayed = player.create(model="m", messages=MESSAGES)
+        assert isinstance(replayed, _ChatCompletion)
+        assert replayed.data["content"] == "live m"
+        assert player.calls == 0
+
+    def test_miss_raises_in_replay_mode(self, tmp_path):
+        _init("replay", tmp_path)
+        provider = _Provider(Client(), lambda kwargs: _completion("live"))
+        with pytest.raises(ReplayMissError):
+            provider.create(model="m", messages=MESSAGES)
+        assert provider.calls == 0
+
+    def test_auto_records_misses(self, tmp_path):
+        _init("auto", tmp_path)
+        provider = _Provider(Client(), lambda kwargs: _completion("live"))
+        provider.create(model="m", messages=MESSAGES)
+        provider.create(model="m", messages=MESSAGES)
+        provider.create(model="other", messages=MESSAGES)
+        assert provider.calls == 2
+
+    def test_stream(self, tmp_path):
+        _init("record", tmp_path)
+        recorder = _Provider(Client(), lambda kwargs: iter(_chunks("Hel", "lo")))
+        stream = recorder.create(model="m", messages=MESSAGES, stream=True)
+        assert isinstance(stream, ReplayStream)
+        assert [c.data["content"] for c in stream] == ["Hel", "lo"]
+
+        entry = ReplayStore(str(tmp_path)).get(
+            request_key("Fake", {"model": "m", "messages": MESSAGES, "stream": True})
+        )
+        assert entry["kind"] == "stream"
+        assert len(entry["delays_ms"]) == 2
+
+        clear_singletons()
+        _init("replay", tmp_path)
+        player = _Provider(
+            Client(), lambda kwargs: pytest.fail("the provider must not be called")
+        )
+        replayed = list(player.create(model="m", messages=MESSAGES, stream=True))
+        assert all(isinstance(c, _ChatCompletionChunk) for c in replayed)
+        assert [c.data["content"] for c in replayed] == ["Hel", "lo"]
+
+    def test_unfinished_stream_is_not_recorded(self, tmp_path):
+        _init("record", tmp_path)
+        provider = _Provider(Client(), lambda kwargs: iter(_chunks("Hel", "lo")))
+        stream = iter(provider.create(model="m", messages=MESSAGES, stream=True))
+        next(stream)
+        assert len(ReplayStore(str(tmp_path))) == 0
+
+    def test_async_stream(self, tmp_path):
+        async def live(kwargs):
+            for chunk in _chunks("Hel", "lo"):
+                yield chunk
+
+        async def consume(provider):
+            stream = await provider.acreate(model="m", messages=MESSAGES, stream=True)
+            return [c async for c in stream]
+
+        _init("record", tmp_path)
+        recorded = asyncio.run(consume(_Provider(Client(), live)))
+        assert [c.data["content"] for c in recorded] == ["Hel", "lo"]
+
+        clear_singletons()
+        _init("replay", tmp_path)
+        player = _Provider(
+            Client(), lambda kwargs: pytest.fail("the provider must not be called")
+        )
+        replayed = asyncio.run(consume(player))
+        assert [c.data["content"] for c in replayed] == ["Hel", "lo"]
+        assert all(isinstance(c, _ChatCompletionChunk) for c in replayed)
+
+    def test_invalid_mode(self, tmp_path):
+        _init("rewind", tmp_path)
+        assert Client()._config.replay_mode is None
+
+
+OPENAI_COMPLETION = {
+    "id": "chatcmpl-1",
+    "object": "chat.completion",
+    "created": 1700000000,
+    "model": "gpt-4o",
+    "choices": [
+        {
+            "index": 0,
+            "finish_reason": "tool_calls",
+            "message": {
+                "role": "assistant",
+                "content": "Let me look that up for you.",
+                "tool_calls": [
+                    {
+                        "id": "call_1",
+                        "type": "function",
+                        "function": {
+                            "name": "search",
+                            "arguments": '{"query": "weather in Paris"}',
+                        },
+                    }
+                ],
+            },
+        }
+    ],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 12, "total_tokens": 22},
+}
+
+ANTHROPIC_MESSAGE = {
+    "id": "msg_1",
+    "type": "message",
+    "role": "assistant",
+    "model": "claude-3-5-sonnet",
+    "content": [
+        {"type": "text", "text": "Let me look that up."},
+        {
+            "type": "tool_use",
+            "id": "toolu_1",
+            "name": "search",
+            "input": {"query": "weather in Paris"},
+        },
+    ],
+    "stop_reason": "tool_use",
+    "stop_sequence": None,
+    "usage": {"input_tokens": 10, "output_tokens": 12},
+}
+
+
+class TestSimulatedStreams:
+    def test_openai_chunks(self):
+        chunks = synthesize_chunks(_ChatCompletion(OPENAI_COMPLETION))
+        assert all(
+            c["object"] == "chat.completion.chunk" and c["model"] == "gpt-4o"
+            for c in chunks
+        )
+        deltas = [c["choices"][0]["delta"] for c in chunks if c["choices"]]
+        assert deltas[0]["role"] == "assistant"
+        assert len([d for d in deltas if d.get("content")]) > 1
+        assert (
+            "".join(d.get("content") or "" for d in deltas)
+            == "Let me look that up for you."
+        )
+
+        tool_deltas = [d["tool_calls"][0] for d in deltas if d.get("tool_calls")]
+        assert (
+            tool_deltas[0]["id"] == "call_1"
+            and tool_deltas[0]["function"]["name"] == "search"
+        )
+        arguments = "".join(t["function"]["arguments"] for t in tool_deltas)
+        assert json.loads(arguments) == {"query": "weather in Paris"}
+
+        assert chunks[-1]["choices"][0]["finish_reason"] == "tool_calls"
+        with_usage = synthesize_chunks(
+            _ChatCompletion(OPENAI_COMPLETION), include_usage=True
+        )
+        assert (
+            with_usage[-1]["choices"] == []
+            and with_usage[-1]["usage"]["total_tokens"] == 22
+        )
+
+    def test_anthropic_events(self):
+        events = synthesize_chunks(ANTHROPIC_MESSAGE)
+        types = [e["type"] for e in events]
+        assert types[0] == "message_start" and types[-2:] == [
+            "message_delta",
+            "message_stop",
+        ]
+        assert (
+            events[0]["message"]["content"] == []
+            and events[0]["message"]["usage"]["input_tokens"] == 10
+        )
+        assert (
+            types.count("content_block_start") == types.count("content_block_stop") == 2
+        )
+
+        text = "".join(
+            e["delta"]["text"]
+            for e in events
+            if e.get("delta", {}).get("type") == "text_delta"
+        )
+        assert text == "Let me look that up."
+        partial_json = "".join(
+            e["delta"]["partial_json"]
+            for e in events
+            if e.get("delta", {}).get("type") == "input_json_delta"
+        )
+        assert json.loads(partial_json) == {"query": "weather in Paris"}
+        assert events[-2]["delta"]["stop_reason"] == "tool_use"
+        assert events[-2]["usage"]["output_tokens"] == 12
+
+    def test_unknown_response(self):
+        assert synthesize_chunks({"text": "hi"}) is None
+        assert synthesize_chunks("hi") is None
+
+    def test_stream_delays(self):
+        assert stream_delays(3, None, [1, 2, 3]) is None
+        assert stream_delays(3, 5) == [5.0, 5.0, 5.0]
+        assert stream_delays(3, "recorded", [1, 2]) == [1.0, 2.0, 0.0]
+        assert stream_delays(3, "recorded") is None
+
+    def test_override_as_stream(self, tmp_path):
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=50,
+            auto_start_session=False,
+        )
+        provider = _Provider(
+            Client(), lambda kwargs: pytest.fail("the provider must not be called")
+        )
+        override = _ChatCompletion(OPENAI_COMPLETION)
+
+        assert (
+            provider.create(override=override, model="gpt-4o", messages=MESSAGES)
+            is override
+        )
+        stream = provider.create(
+            override=override, model="gpt-4o", messages=MESSAGES, stream=True
+        )
+        chunks = list(stream)
+        assert all(isinstance(c, _ChatCompletionChunk) for c in chunks)
+
+        async def consume():
+            stream = await provider.acreate(
+                override=override, model="gpt-4o", messages=MESSAGES, stream=True
+            )
+            return [c async for c in stream]
+
+        assert [c.data for c in asyncio.run(consume())] == [c.data for c in chunks]
+
+    def test_paced_stream(self, tmp_path):
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=50,
+            auto_start_session=False,
+            replay_stream_delay=5,
+        )
+        provider = _Provider(
+            Client(), lambda kwargs: pytest.fail("the provider must not be called")
+        )
+        completion = {**OPENAI_COMPLETION, "usage": None}
+        completion["choices"] = [
+            {
+                **completion["choices"][0],
+                "message": {"role": "assistant", "content": "a b c"},
+            }
+        ]
+        start = time.perf_counter()
+        chunks = list(
+            provider.create(
+                override=_ChatCompletion(completion), messages=MESSAGES, stream=True
+            )
+        )
+        assert len(chunks) == 5
+        assert time.perf_counter() - start >= 5 * 0.005
+
+    def test_recorded_timing(self, tmp_path):
+        def live(kwargs):
+            for chunk in _chunks("Hel", "lo"):
+                time.sleep(0.02)
+                yield chunk
+
+        _init("record", tmp_path)
+        list(
+            _Provider(Client(), live).create(model="m", messages=MESSAGES, stream=True)
+        )
+
+        clear_singletons()
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=50,
+            auto_start_session=False,
+            replay_mode="replay",
+            replay_path=str(tmp_path),
+            replay_stream_delay="recorded",
+        )
+        player = _Provider(
+            Client(), lambda kwargs: pytest.fail("the provider must not be called")
+        )
+        start = time.perf_counter()
+        assert len(list(player.create(model="m", messages=MESSAGES, stream=True))) == 2
+        assert time.perf_counter() - start >= 0.04
+
+
+class _Intercepting(_Provider):
+    """A provider whose calls go through intercept, as in every patched SDK method."""
+
+    def create(self, stream_method=False, **kwargs):
+        stream = True if stream_method else None
+        intercepted = self.intercept(kwargs, stream=stream)
+        if intercepted is not None:
+            return intercepted
+        self.calls += 1
+        return self.record(kwargs, self.responses(kwargs), stream=stream)
+
+    def replay_types(self):
+        return MODELS
+
+
+class TestIntercept:
+    def test_time_travel_override(self, tmp_path):
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=50,
+            auto_start_session=False,
+        )
+        cache_path = os.path.join(tmp_path, "agentops_time_travel.json")
+        with open(cache_path, "w") as f:
+            json.dump(
+                {
+                    "completion_overrides": {
+                        str({"messages": MESSAGES}): json.dumps(OPENAI_COMPLETION)
+                    }
+                },
+                f,
+            )
+        with patch(
+            "agentops.time_travel._package_parent_path", return_value=cache_path
+        ):
+            time_travel.TimeTravel()
+
+        provider = _Intercepting(Client(), lambda kwargs: _completion("live"))
+        with patch("agentops.time_travel.is_time_travel_active", return_value=True):
+            override = provider.create(model="gpt-4o", messages=MESSAGES)
+            assert (
+                isinstance(override, _ChatCompletion)
+                and override.data["id"] == "chatcmpl-1"
+            )
+            chunks = list(
+                provider.create(model="gpt-4o", messages=MESSAGES, stream=True)
+            )
+            assert all(isinstance(c, _ChatCompletionChunk) for c in chunks)
+            provider.create(
+                model="gpt-4o", messages=[{"role": "user", "content": "Bye"}]
+            )
+        assert provider.calls == 1
+
+    def test_stream_methods_are_keyed_apart(self, tmp_path):
+        _init("auto", tmp_path)
+        provider = _Intercepting(Client(), lambda kwargs: _completion("live"))
+        provider.create(message="Hello")
+        provider.create(message="Hello", stream_method=True)
+        provider.create(message="Hello", stream_method=True)
+        assert provider.calls == 2
+
+    def test_pydantic_messages(self):
+        provider = _Intercepting(None, None)
+        messages = [_Model({"role": "user", "content": "Hello"})]
+        assert provider.replay_request({"messages": messages})["messages"] == MESSAGES
+
+    def test_cohere_request(self):
+        request = CohereProvider(None).replay_request(
+            {
+                "model": "command-r",
+                "preamble": "Be brief",
+                "chat_history": [
+                    {"role": "USER", "message": "Hi"},
+                    {"role": "CHATBOT", "message": "Hello"},
+                ],
+                "message": "How are you?",
+            }
+        )
+        assert request == {
+            "model": "command-r",
+            "messages": [
+                {"role": "system", "content": "Be brief"},
+                {"role": "user", "content": "Hi"},
+                {"role": "assistant", "content": "Hello"},
+                {"role": "user", "content": "How are you?"},
+            ],
+        }
+
+    def test_ollama_positional_arguments(self):
+        assert _chat_kwargs(("llama3", MESSAGES), {"stream": True}) == {
+            "model": "llama3",
+            "messages": MESSAGES,
+            "stream": True,
+        }
+
+
+class TestProviderChunks:
+    def test_ollama(self):
+        response = {
+            "model": "llama3",
+            "created_at": "2024-01-01T00:00:00Z",
+            "message": {"role": "assistant", "content": "Hello there"},
+            "done": True,
+            "eval_count": 3,
+        }
+        chunks = synthesize_chunks(response)
+        assert [c["done"] for c in chunks] == [False, False, True]
+        assert "".join(c["message"]["content"] for c in chunks) == "Hello there"
+        assert chunks[-1]["eval_count"] == 3 and "eval_count" not in chunks[0]
+
+    def test_cohere(self):
+        response = {
+            "text": "Hello there",
+            "generation_id": "gen-1",
+            "finish_reason": "COMPLETE",
+            "chat_history": [],
+        }
+        events = synthesize_chunks(response)
+        assert [e["event_type"] for e in events] == [
+            "stream-start",
+            "text-generation",
+            "text-generation",
+            "stream-end",
+        ]
+        assert events[0]["generation_id"] == "gen-1"
+        assert events[-1]["response"] == response
@@ -0,0 +1,83 @@
+import time
+
+import pytest
+import requests_mock
+
+import agentops
+from agentops.resource_sampler import ResourceSampler
+from agentops.singleton import clear_singletons
+
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    clear_singletons()
+    yield
+    agentops.end_all_sessions()  # teardown part
+
+
+@pytest.fixture(autouse=True, scope="function")
+def mock_req():
+    with requests_mock.Mocker() as m:
+        url = "https://api.agentops.ai"
+        m.post(url + "/v2/create_events", json={"status": "ok"})
+        m.post(
+            url + "/v2/create_session", json={"status": "success", "jwt": "some_jwt"}
+        )
+        m.post(url + "/v2/update_session", json={"status": "success", "token_cost": 5})
+        m.post(url + "/v2/developer_errors", json={"status": "ok"})
+        m.post("https://pypi.org/pypi/agentops/json", status_code=404)
+        yield m
+
+
+class TestResourceSampler:
+    def test_samples_in_background(self):
+        sampler = ResourceSampler(interval_ms=10).start()
+        time.sleep(0.1)
+        sampler.stop()
+
+        samples = sampler.samples()
+        assert len(samples["timestamp"]) >= 3
+        assert all(rss > 0 for rss in samples["rss_bytes"])
+        assert all(threads >= 1 for threads in samples["num_threads"])
+        assert samples["timestamp"] == sorted(samples["timestamp"])
+
+        summary = sampler.summary()
+        assert summary["samples"] == len(samples["timestamp"])
+        assert summary["peak_rss_bytes"] == max(samples["rss_bytes"])
+        assert summary["net_bytes_sent"] >= 0
+
+    def test_downsamples_when_full(self):
+        sampler = ResourceSampler(interval_ms=10, max_samples=8)
+        for _ in range(20):
+            sampler.sample()
+
+        assert len(sampler) < 8
+        assert sampler._stride > 1
+        assert sampler.summary()["samples"] == len(sampler)
+
+    def test_disabled_by_default(self):
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=50,
+            auto_start_session=False,
+        )
+        session = agentops.start_session()
+
+        assert session.resource_sampler is None
+        assert session.get_resource_samples() is None
+        assert "resources" not in session.get_metrics()
+
+    def test_attached_to_session(self):
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=50,
+            auto_start_session=False,
+            resource_sampling_interval=10,
+        )
+        session = agentops.start_session()
+        time.sleep(0.05)
+        session.end_session(end_state="Success")
+
+        assert not session.resource_sampler._thread.is_alive()
+        assert len(session.get_resource_samples()["rss_bytes"]) >= 2
+        assert session.get_metrics()["resources"]["peak_rss_bytes"] > 0
@@ -0,0 +1,265 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+import requests_mock
+
+import agentops
+from agentops import Client
+from agentops.event import LLMEvent
+from agentops.llms.instrumented_provider import InstrumentedProvider, _cache_miss
+from agentops import response_cache
+from agentops.response_cache import ResponseCache, cache_entry, is_cacheable
+from agentops.singleton import clear_singletons
+
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    clear_singletons()
+    response_cache._caches.clear()
+    yield
+    agentops.end_all_sessions()  # teardown part
+
+
+@pytest.fixture(autouse=True, scope="function")
+def mock_req():
+    with requests_mock.Mocker() as m:
+        url = "https://api.agentops.ai"
+        m.post(url + "/v2/create_events", json={"status": "ok"})
+        m.post(
+            url + "/v2/create_session", json={"status": "success", "jwt": "some_jwt"}
+        )
+        m.post(url + "/v2/update_session", json={"status": "success", "token_cost": 5})
+        m.post(url + "/v2/developer_errors", json={"status": "ok"})
+        m.post("https://pypi.org/pypi/agentops/json", status_code=404)
+        yield m
+
+
+class _ChatCompletion:
+    def __init__(self, data):
+        self.data = data
+
+    @classmethod
+    def model_validate(cls, data):
+        if not isinstance(data, dict) or data.get("object") != "chat.completion":
+            raise ValueError("not a chat completion")
+        return cls(data)
+
+    def model_dump(self, mode="python"):
+        return dict(self.data)
+
+
+def _completion(content):
+    return _ChatCompletion(
+        {
+            "object": "chat.completion",
+            "model": "gpt-4o-mini",
+            "content": content,
+            "usage": {"prompt_tokens": 12, "completion_tokens": 3},
+        }
+    )
+
+
+class _Session:
+    def __init__(self):
+        self.events = []
+
+    def record(self, event):
+        self.events.append(event)
+
+
+class _Provider(InstrumentedProvider):
+    """Calls a fake provider through intercept and record, like the patched SDK methods."""
+
+    _provider_name = "Fake"
+
+    def __init__(self, client, latency=0.0):
+        super().__init__(client)
+        self.latency = latency
+        self.error = None
+        self.calls = 0
+        self.session = _Session()
+
+    def create(self, **kwargs):
+        intercepted = self.intercept(kwargs, (_ChatCompletion,))
+        if intercepted is not None:
+            return self.handle_response(intercepted, kwargs, None, session=self.session)
+        try:
+            self.calls += 1
+            time.sleep(self.latency)
+            if self.error is not None:
+                raise self.error
+            result = self.record(kwargs, _completion(f"call {self.calls}"))
+        finally:
+            self._clear_cache_miss()
+        return self.handle_response(result, kwargs, None, session=self.session)
+
+    async def acreate(self, **kwargs):
+        intercepted = self.intercept(kwargs, (_ChatCompletion,), is_async=True)
+        if intercepted is not None:
+            return self.handle_response(intercepted, kwargs, None, session=self.session)
+        try:
+            self.calls += 1
+            result = self.record(
+                kwargs, _completion(f"call {self.calls}"), is_async=True
+            )
+        finally:
+            self._clear_cache_miss()
+        return self.handle_response(result, kwargs, None, session=self.session)
+
+    def handle_response(self, response, kwargs, init_timestamp, session=None):
+        event = LLMEvent(params=kwargs, model=response.data["model"])
+        event.prompt_tokens = response.data["usage"]["prompt_tokens"]
+        event.completion_tokens = response.data["usage"]["completion_tokens"]
+        self._safe_record(session, event)
+        return response
+
+    def override(self):
+        pass
+
+    def undo_override(self):
+        pass
+
+
+def _init(**kwargs):
+    agentops.init(
+        api_key="11111111-1111-4111-8111-111111111111",
+        max_wait_time=50,
+        auto_start_session=False,
+        **kwargs,
+    )
+
+
+MESSAGES = [{"role": "user", "content": "Capital of France?"}]
+
+
+class TestIsCacheable:
+    def test_deterministic_requests(self):
+        assert is_cacheable({"model": "gpt-4o", "messages": MESSAGES, "temperature": 0})
+        assert is_cacheable({"model": "llama3", "options": {"temperature": 0}})
+        assert not is_cacheable({"model": "gpt-4o", "messages": MESSAGES})
+        assert not is_cacheable({"model": "gpt-4o", "temperature": 0.7})
+        assert not is_cacheable({"model": "gpt-4o", "temperature": 0, "stream": True})
+        assert not is_cacheable({"model": "gpt-4o", "temperature": 0, "n": 3})
+
+    def test_model_allow_list(self):
+        request = {"model": "gpt-4o-mini", "temperature": 0}
+        assert is_cacheable(request, ["gpt-4o*"])
+        assert not is_cacheable(request, ["claude-*"])
+        assert not is_cacheable({"temperature": 0}, ["gpt-4o*"])
+
+
+class TestResponseCache:
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_entries=2)
+        for key in ("a", "b"):
+            cache.put(key, cache_entry("Fake", {}, {"key": key}, 10))
+        cache.get("a")
+        cache.put("c", cache_entry("Fake", {}, {"key": "c"}, 10))
+        assert cache.get("b") is None
+        assert cache.get("a")["response"] == {"key": "a"}
+        assert len(cache) == 2
+
+    def test_ttl(self):
+        cache = ResponseCache(ttl=60)
+        cache.put("a", cache_entry("Fake", {}, {"key": "a"}, 10))
+        now = time.time()
+        with patch("agentops.response_cache.time.time", return_value=now + 30):
+            assert cache.get("a") is not None
+        with patch("agentops.response_cache.time.time", return_value=now + 90):
+            assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_disk_tier(self, tmp_path):
+        ResponseCache(path=str(tmp_path)).put(
+            "ab" * 32, cache_entry("Fake", {}, {"key": "a"}, 10)
+        )
+        cache = ResponseCache(path=str(tmp_path))
+        assert cache.get("ab" * 32)["response"] == {"key": "a"}
+        assert len(cache) == 1
+        assert (cache.hits, cache.misses) == (1, 0)
+
+
+class TestProviderCache:
+    def test_disabled_by_default(self):
+        _init()
+        provider = _Provider(Client())
+        provider.create(model="gpt-4o-mini", messages=MESSAGES, temperature=0)
+        provider.create(model="gpt-4o-mini", messages=MESSAGES, temperature=0)
+        assert provider.calls == 2
+
+    def test_serves_repeated_calls(self):
+        _init(response_cache=True)
+        provider = _Provider(Client(), latency=0.02)
+        first = provider.create(model="gpt-4o-mini", messages=MESSAGES, temperature=0)
+        second = provider.create(model="gpt-4o-mini", messages=MESSAGES, temperature=0)
+        assert provider.calls == 1
+        assert isinstance(second, _ChatCompletion) and second.data == first.data
+
+        live, hit = provider.session.events
+        assert live.cache is None
+        assert hit.cost == 0.0
+        assert hit.cache["hit"] is True
+        assert hit.cache["saved_latency_ms"] >= 20
+        assert hit.cache["saved_prompt_tokens"] == 12
+        assert hit.cache["saved_completion_tokens"] == 3
+        assert hit.cache["saved_cost"] > 0
+
+    def test_hits_are_copies(self):
+        _init(response_cache=True)
+        provider = _Provider(Client())
+        provider.create(model="gpt-4o-mini", messages=MESSAGES, temperature=0)
+        hit = provider.create(model="gpt-4o-mini", messages=MESSAGES, temperature=0)
+        hit.data["content"] = "changed"
+        hit.data["usage"]["prompt_tokens"] = 0
+
+        again = provider.create(model="gpt-4o-mini", messages=MESSAGES, temperature=0)
+        assert again.data["content"] == "call 1"
+        assert again.data["usage"]["prompt_tokens"] == 12
+
+    def test_failed_call_leaves_no_pending_miss(self):
+        _init(response_cache=True)
+        provider = _Provider(Client())
+        provider.error = TimeoutError("provider timed out")
+        with pytest.raises(TimeoutError):
+            provider.create(model="gpt-4o-mini", messages=MESSAGES, temperature=0)
+        assert _cache_miss.get() is None
+
+        provider.error = None
+        provider.create(model="gpt-4o-mini", messages=MESSAGES, temperature=0)
+        provider.create(model="gpt-4o-mini", messages=MESSAGES, temperature=0)
+        assert provider.calls == 2
+
+    def test_other_requests_go_to_the_provider(self):
+        _init(response_cache=True, response_cache_models=["gpt-4o*"])
+        provider = _Provider(Client())
+        for _ in range(2):
+            provider.create(model="gpt-4o-mini", messages=MESSAGES, temperature=0.5)
+            provider.create(model="claude-3-5-haiku", messages=MESSAGES, temperature=0)
+            provider.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": "Hi"}],
+                temperature=0,
+            )
+        # Only the deterministic call to an allowed model was served from the cache, once
+        assert provider.calls == 5
+        assert [
+            event.params["model"] for event in provider.session.events if event.cache
+        ] == ["gpt-4o-mini"]
+
+    def test_async(self, tmp_path):
+        _init(response_cache=True, response_cache_path=str(tmp_path))
+        provider = _Provider(Client())
+
+        async def run():
+            await provider.acreate(
+                model="gpt-4o-mini", messages=MESSAGES, temperature=0
+            )
+            return await provider.acreate(
+                model="gpt-4o-mini", messages=MESSAGES, temperature=0
+            )
+
+        assert asyncio.run(run()).data["content"] == "call 1"
+        assert provider.calls == 1
+        assert provider.session.events[1].cache["hit"] is True
@@ -0,0 +1,195 @@
+import json
+import time
+
+import pytest
+import requests_mock
+
+import agentops
+from agentops import ActionEvent, ToolEvent
+from agentops.exporters import EventSink, FanOutSink, InMemorySink, JSONLFileSink
+from agentops.singleton import clear_singletons
+from agentops.telemetry import telemetry
+
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    clear_singletons()
+    yield
+    agentops.end_all_sessions()  # teardown part
+
+
+@pytest.fixture(autouse=True, scope="function")
+def mock_req():
+    with requests_mock.Mocker() as m:
+        url = "https://api.agentops.ai"
+        m.post(url + "/v2/create_events", json={"status": "ok"})
+        m.post(
+            url + "/v2/create_session", json={"status": "success", "jwt": "some_jwt"}
+        )
+        m.post(url + "/v2/update_session", json={"status": "success", "token_cost": 5})
+        m.post(url + "/v2/developer_errors", json={"status": "ok"})
+        m.post("https://pypi.org/pypi/agentops/json", status_code=404)
+        yield m
+
+
+class FakeSession:
+    session_id = "8c0b1c2f-4a2e-4b7d-9e3f-0123456789ab"
+
+
+class FailingSink(EventSink):
+    def export(self, session, events):
+        return False
+
+
+class BrokenSink(EventSink):
+    def export(self, session, events):
+        return True
+
+    def end_session(self, session):
+        raise OSError("disk full")
+
+
+class TrackedSink(InMemorySink):
+    def __init__(self):
+        super().__init__()
+        self.shutdowns = 0
+
+    def shutdown(self):
+        self.shutdowns += 1
+
+
+class SlowSink(InMemorySink):
+    def export(self, session, events):
+        time.sleep(0.2)
+        return super().export(session, events)
+
+
+def api_calls(mock_req):
+    return [
+        request.url
+        for request in mock_req.request_history
+        if "api.agentops.ai" in request.url
+    ]
+
+
+class TestSinks:
+    def test_memory_ring(self):
+        sink = InMemorySink(capacity=3)
+        events = [ActionEvent(action_type=str(i)).__dict__ for i in range(5)]
+
+        assert sink.export(FakeSession(), events)
+
+        assert [e["action_type"] for e in sink.events()] == ["2", "3", "4"]
+        assert sink.overwritten == 2
+        assert (
+            sink.events(FakeSession.session_id)[0]["session_id"]
+            == FakeSession.session_id
+        )
+
+    def test_jsonl_rotation(self, tmp_path):
+        path = tmp_path / "spool" / "events.jsonl"
+        sink = JSONLFileSink(str(path), max_bytes=600, backup_count=2)
+        for i in range(20):
+            assert sink.export(FakeSession(), [ToolEvent(name=f"tool{i}").__dict__])
+        sink.shutdown()
+
+        assert path.exists()
+        assert (tmp_path / "spool" / "events.jsonl.1").exists()
+        assert (tmp_path / "spool" / "events.jsonl.2").exists()
+        assert not (tmp_path / "spool" / "events.jsonl.3").exists()
+        assert path.stat().st_size <= 600
+        last = json.loads(path.read_text().splitlines()[-1])
+        assert last["name"] == "tool19"
+        assert last["session_id"] == FakeSession.session_id
+
+    def test_fan_out_acks_only_if_all_acked(self):
+        memory = InMemorySink()
+        assert FanOutSink([memory, InMemorySink()]).export(FakeSession(), [{"a": 1}])
+        assert not FanOutSink([memory, FailingSink()]).export(FakeSession(), [{"a": 1}])
+        # The other sinks still receive the batch
+        assert len(memory) == 2
+
+    def test_fan_out_end_session_survives_failing_sink(self):
+        memory = InMemorySink()
+        assert FanOutSink([BrokenSink(), memory]).end_session(FakeSession()) is None
+        assert memory.ended_sessions == [FakeSession.session_id]
+
+
+class TestSessionSinks:
+    def test_offline_session(self, tmp_path, mock_req):
+        memory = InMemorySink()
+        path = tmp_path / "events.jsonl"
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=50,
+            auto_start_session=False,
+            sinks=[memory, JSONLFileSink(str(path))],
+        )
+        session = agentops.start_session()
+        agentops.record(ActionEvent(action_type="plan"))
+        time.sleep(0.15)
+        session.end_session(end_state="Success")
+
+        assert [e["action_type"] for e in memory.events()] == ["plan"]
+        assert memory.ended_sessions == [str(session.session_id)]
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [line["event_type"] for line in lines] == ["actions", "session"]
+        assert lines[1]["end_state"] == "Success"
+        assert api_calls(mock_req) == []
+
+    def test_unacknowledged_batch_is_dropped(self):
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=50,
+            auto_start_session=False,
+            sinks=[FailingSink()],
+        )
+        session = agentops.start_session()
+        dropped = telemetry.events_dropped.get("export_failed", 0)
+
+        agentops.record(ActionEvent(action_type="plan"))
+        time.sleep(0.15)
+
+        assert telemetry.events_dropped["export_failed"] == dropped + 1
+        assert session.event_counts["actions"] == 0
+
+    def test_shared_sink_outlives_sessions(self):
+        sink = TrackedSink()
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=50,
+            auto_start_session=False,
+            sinks=[sink],
+        )
+        first = agentops.start_session()
+        second = agentops.start_session()
+        first.end_session(end_state="Success")
+        assert sink.shutdowns == 0
+
+        second.record(ActionEvent(action_type="plan"))
+        second.end_session(end_state="Success")
+        assert [e["action_type"] for e in sink.events()] == ["plan"]
+
+        agentops.end_all_sessions()
+        assert sink.shutdowns == 1
+
+    def test_full_queue_is_exported_in_the_background(self):
+        sink = SlowSink()
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=5000,
+            max_queue_size=2,
+            auto_start_session=False,
+            sinks=[sink],
+        )
+        session = agentops.start_session()
+
+        started = time.perf_counter()
+        for i in range(4):
+            session.record(ActionEvent(action_type=str(i)))
+        assert time.perf_counter() - started < 0.1
+
+        # Woken well before max_wait_time
+        time.sleep(0.6)
+        assert [e["action_type"] for e in sink.events()] == ["0", "1", "2", "3"]
+        session.end_session(end_state="Success")
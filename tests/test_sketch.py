@@ -0,0 +1,174 @@
+import json
+import random
+
+from unittest.mock import patch
+
+import pytest
+import requests_mock
+
+import agentops
+from agentops import Client, LLMEvent, ToolEvent
+from agentops.exceptions import ApiServerException
+from agentops.sketch import DDSketch, LatencySketches
+from agentops.singleton import clear_singletons
+
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    clear_singletons()
+    yield
+    agentops.end_all_sessions()  # teardown part
+
+
+@pytest.fixture(autouse=True, scope="function")
+def mock_req():
+    with requests_mock.Mocker() as m:
+        url = "https://api.agentops.ai"
+        m.post(url + "/v2/create_events", json={"status": "ok"})
+        m.post(
+            url + "/v2/create_session", json={"status": "success", "jwt": "some_jwt"}
+        )
+        m.post(url + "/v2/update_session", json={"status": "success", "token_cost": 5})
+        m.post(url + "/v2/developer_errors", json={"status": "ok"})
+        m.post("https://pypi.org/pypi/agentops/json", status_code=404)
+        yield m
+
+
+def exact_quantile(values, q):
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))]
+
+
+class TestDDSketch:
+    def test_relative_accuracy(self):
+        rng = random.Random(7)
+        values = [rng.lognormvariate(6, 1.5) for _ in range(20_000)]
+        sketch = DDSketch(relative_accuracy=0.01)
+        for value in values:
+            sketch.add(value)
+
+        assert sketch.count == len(values)
+        assert sketch.min == min(values) and sketch.max == max(values)
+        for q in (0.01, 0.5, 0.95, 0.99, 0.999):
+            exact = exact_quantile(values, q)
+            assert abs(sketch.quantile(q) - exact) <= 0.01 * exact
+        # Memory depends on the range of values, not their number
+        assert len(sketch.bins) < 1000
+
+    def test_merge_equals_single_sketch(self):
+        rng = random.Random(3)
+        values = [rng.uniform(1, 5000) for _ in range(5000)]
+        whole, first, second = DDSketch(), DDSketch(), DDSketch()
+        for i, value in enumerate(values):
+            whole.add(value)
+            (first if i % 2 else second).add(value)
+        first.merge(second)
+
+        assert first.bins == whole.bins
+        assert first.count == whole.count
+        assert first.quantile(0.99) == whole.quantile(0.99)
+
+        with pytest.raises(ValueError):
+            first.merge(DDSketch(relative_accuracy=0.02))
+
+    def test_serialization_round_trip(self):
+        sketch = DDSketch()
+        for value in (0, 0.5, 12, 250, 250, 30_000):
+            sketch.add(value)
+        restored = DDSketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+
+        assert restored.bins == sketch.bins
+        assert restored.zero_count == 1
+        assert restored.quantile(0.5) == sketch.quantile(0.5)
+        assert restored.max == 30_000
+
+    def test_max_bins_collapses_lowest(self):
+        sketch = DDSketch(max_bins=10)
+        for exponent in range(-5, 10):
+            sketch.add(10.0**exponent)
+
+        assert len(sketch.bins) == 10
+        assert sketch.count == 15
+        assert sketch.quantile(1) == 1e9
+        # Upper quantiles keep their accuracy, the lowest values now fall in the bin of 1
+        assert abs(sketch.quantile(0.5) - 100) <= 1
+        assert abs(sketch.quantile(0.1) - 1) <= 0.01
+
+    def test_empty(self):
+        assert DDSketch().quantile(0.5) is None
+        assert DDSketch().to_dict()["counts"] == []
+
+
+class TestLatencySketches:
+    def test_merge_across_processes(self):
+        worker_a, worker_b = LatencySketches(), LatencySketches()
+        for value in range(1, 101):
+            worker_a.add("llms", "gpt-4o", float(value))
+            worker_b.add("llms", "gpt-4o", float(value + 100))
+        worker_b.add("tools", "search", 5.0)
+
+        merged = LatencySketches.from_dict(json.loads(json.dumps(worker_a.to_dict())))
+        merged.merge(worker_b.to_dict())
+        quantiles = merged.quantiles()
+
+        assert quantiles["llms"]["gpt-4o"]["count"] == 200
+        assert abs(quantiles["llms"]["gpt-4o"]["p50"] - 100) <= 2
+        assert abs(quantiles["llms"]["gpt-4o"]["p99"] - 198) <= 2
+        assert quantiles["tools"]["search"]["count"] == 1
+        assert "actions" not in quantiles
+
+
+class TestSessionSketches:
+    def setup_method(self):
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=50,
+            auto_start_session=False,
+        )
+
+    def record(self, session, model, seconds):
+        session.record(
+            LLMEvent(
+                model=model,
+                init_timestamp="2024-06-01T12:00:00+00:00",
+                end_timestamp=f"2024-06-01T12:00:{seconds:02d}+00:00",
+            )
+        )
+
+    def test_session_and_client_sketches(self):
+        before = Client().get_latency_sketches().get("llms", "sketch-model")
+        before_count = before.count if before else 0
+
+        first = agentops.start_session()
+        for seconds in (1, 2, 3):
+            self.record(first, "sketch-model", seconds)
+        first.record(ToolEvent(name="search"))
+
+        summary = first.get_metrics()["llms"]["sketch-model"]
+        assert abs(summary["p50"] - 2000) <= 20
+        assert first.get_latency_sketches().get("llms", "sketch-model").count == 3
+
+        first.end_session("Success")
+        assert first.latency_sketches["llms"]["sketch-model"]["count"] == 3
+
+        second = agentops.start_session()
+        self.record(second, "sketch-model", 10)
+
+        merged = Client().get_latency_sketches().get("llms", "sketch-model")
+        assert merged.count - before_count == 4
+        assert merged.max == 10_000
+
+    def test_retried_end_session_merges_once(self):
+        before = Client().get_latency_sketches().get("llms", "retry-model")
+        before_count = before.count if before else 0
+
+        session = agentops.start_session()
+        self.record(session, "retry-model", 1)
+        with patch.object(
+            session._sink, "end_session", side_effect=ApiServerException("unavailable")
+        ):
+            session.end_session("Success")
+        session.end_session("Success")
+
+        merged = Client().get_latency_sketches().get("llms", "retry-model")
+        assert merged.count - before_count == 1
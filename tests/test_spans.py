@@ -0,0 +1,93 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from agentops import ActionEvent, LLMEvent, ToolEvent, record_action, record_tool
+from agentops.spans import critical_path, get_current_event_id, propagate_context, span
+
+
+class InMemorySession:
+    def __init__(self):
+        self.events = []
+
+    def record(self, event):
+        self.events.append(event)
+
+
+class TestSpans:
+    def test_nested_decorators_set_parent(self):
+        session = InMemorySession()
+
+        @record_tool("search")
+        def search(query):
+            session.record(LLMEvent(model="gpt-4o"))
+            return query
+
+        @record_action("plan")
+        def plan():
+            return search("x", session=session)
+
+        plan(session=session)
+
+        llm, tool, action = session.events
+        assert action.parent_id is None
+        assert tool.parent_id == action.id
+        assert llm.parent_id == tool.id
+        assert get_current_event_id() is None
+
+    def test_generator_body_runs_inside_span(self):
+        session = InMemorySession()
+
+        @record_action("stream")
+        def stream():
+            yield ToolEvent(name="inner")
+
+        inner = next(iter(stream(session=session)))
+        assert inner.parent_id is not None
+        assert get_current_event_id() is None
+
+    @pytest.mark.asyncio
+    async def test_asyncio_tasks_inherit_parent(self):
+        session = InMemorySession()
+
+        @record_action("fan_out")
+        async def fan_out():
+            async def child():
+                return ToolEvent(name="child")
+
+            return await asyncio.gather(child(), child())
+
+        children = await fan_out(session=session)
+        action = session.events[0]
+        assert all(c.parent_id == action.id for c in children)
+
+    def test_propagate_context_to_threads(self):
+        parent = ActionEvent(action_type="parent")
+        with span(parent.id):
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                plain = executor.submit(lambda: ToolEvent(name="plain")).result()
+                propagated = executor.submit(
+                    propagate_context(lambda: ToolEvent(name="propagated"))
+                ).result()
+
+        assert plain.parent_id is None
+        assert propagated.parent_id == parent.id
+
+    def test_critical_path(self):
+        root = ActionEvent(
+            init_timestamp="2024-01-01T00:00:00+00:00",
+            end_timestamp="2024-01-01T00:00:10+00:00",
+        )
+        fast = ToolEvent(
+            parent_id=root.id,
+            init_timestamp="2024-01-01T00:00:00+00:00",
+            end_timestamp="2024-01-01T00:00:02+00:00",
+        )
+        slow = LLMEvent(
+            parent_id=root.id,
+            init_timestamp="2024-01-01T00:00:00+00:00",
+            end_timestamp="2024-01-01T00:00:09+00:00",
+        )
+
+        assert critical_path([fast, slow, root]) == [root, slow]
@@ -0,0 +1,122 @@
+import time
+
+import pytest
+import requests_mock
+
+import agentops
+from agentops import ActionEvent, ErrorEvent, LLMEvent, ToolEvent
+from agentops.cli import main, parse_since
+from agentops.exporters import SQLiteStore
+from agentops.singleton import clear_singletons
+
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    clear_singletons()
+    yield
+    agentops.end_all_sessions()  # teardown part
+
+
+@pytest.fixture(autouse=True, scope="function")
+def mock_req():
+    with requests_mock.Mocker() as m:
+        url = "https://api.agentops.ai"
+        m.post(url + "/v2/create_events", json={"status": "ok"})
+        m.post(
+            url + "/v2/create_session", json={"status": "success", "jwt": "some_jwt"}
+        )
+        m.post(url + "/v2/update_session", json={"status": "success", "token_cost": 5})
+        m.post(url + "/v2/developer_errors", json={"status": "ok"})
+        m.post("https://pypi.org/pypi/agentops/json", status_code=404)
+        yield m
+
+
+def llm_event(model: str, duration_s: int) -> LLMEvent:
+    return LLMEvent(
+        model=model,
+        prompt_tokens=10,
+        completion_tokens=20,
+        init_timestamp="2024-06-01T12:00:00+00:00",
+        end_timestamp=f"2024-06-01T12:00:{duration_s:02d}+00:00",
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteStore(str(tmp_path / "sessions.db"))
+    agentops.init(
+        api_key="11111111-1111-4111-8111-111111111111",
+        max_wait_time=50,
+        auto_start_session=False,
+        sinks=[store],
+    )
+    session = agentops.start_session(tags=["bench"])
+    action = ActionEvent(action_type="plan")
+    session.record(action)
+    session.record(llm_event("gpt-4o", 3))
+    session.record(llm_event("gpt-4o-mini", 1))
+    session.record(llm_event("gpt-4o", 7))
+    session.record(ToolEvent(name="search", parent_id=action.id))
+    session.record(ErrorEvent(trigger_event=ToolEvent(name="fetch"), details="boom"))
+    session.end_session(end_state="Success")
+    store.session_id = str(session.session_id)
+    yield store
+    store.close()
+
+
+class TestSQLiteStore:
+    def test_uses_wal(self, store):
+        assert store._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_slowest_llm_calls(self, store):
+        rows = store.query_events(
+            "llms", order_by="duration_ms", descending=True, limit=2
+        )
+        assert [(r["model"], r["duration_ms"]) for r in rows] == [
+            ("gpt-4o", 7000),
+            ("gpt-4o", 3000),
+        ]
+
+    def test_filters(self, store):
+        assert len(store.query_events(model="gpt-4o-mini")) == 1
+        assert len(store.query_events("llms", since="2024-06-02T00:00:00+00:00")) == 0
+        assert len(store.query_events("llms", min_duration_ms=2000)) == 2
+        tool = store.query_events("tools", name="search", include_data=True)[0]
+        assert tool["parent_id"] is not None
+        assert tool["data"]["name"] == "search"
+        errors = store.query_events("errors")
+        assert errors[0]["name"] is None or errors[0]["event_type"] == "errors"
+
+    def test_sessions_and_stats(self, store):
+        sessions = store.sessions()
+        assert sessions[0]["session_id"] == store.session_id
+        assert sessions[0]["end_state"] == "Success"
+        assert sessions[0]["tags"] == ["bench"]
+        assert sessions[0]["events"] == 7  # the error's trigger event is stored too
+
+        stats = {row["key"]: row for row in store.stats(group_by="model")}
+        assert stats["gpt-4o"]["count"] == 2
+        assert stats["gpt-4o"]["max_ms"] == 7000
+        assert stats["gpt-4o"]["completion_tokens"] == 40
+
+    def test_iter_events_in_batches(self, store):
+        events = list(store.iter_events(store.session_id, batch_size=2))
+        assert len(events) == 7
+        assert len({event["id"] for event in events}) == 7
+
+    def test_cli(self, store, capsys):
+        main(["store", "--db", store.path, "slowest", "--limit", "1"])
+        output = capsys.readouterr().out.splitlines()
+        assert output[0].startswith("duration_ms")
+        assert len(output) == 2
+        assert "gpt-4o" in output[1]
+
+        main(["store", "--db", store.path, "stats", "--by", "model"])
+        assert "gpt-4o-mini" in capsys.readouterr().out
+
+
+def test_parse_since():
+    now = time.time()
+    assert now - 3600 - 1 < parse_since("1h") < now - 3600 + 1
+    assert parse_since("today") <= now
+    assert parse_since("2024-01-01T00:00:00+00:00") == 1704067200
@@ -0,0 +1,141 @@
+import socket
+import time
+import urllib.request
+
+import pytest
+import requests
+import requests_mock
+from urllib3.exceptions import MaxRetryError
+
+import agentops
+from agentops import ActionEvent, Client
+from agentops.exceptions import ApiServerException
+from agentops.http_client import HttpClient, retry_config
+from agentops.singleton import clear_singletons
+from agentops.telemetry import SDKTelemetry, stop_prometheus_server, telemetry
+
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    clear_singletons()
+    yield
+    agentops.end_all_sessions()  # teardown part
+
+
+@pytest.fixture(autouse=True, scope="function")
+def mock_req():
+    with requests_mock.Mocker(real_http=True) as m:
+        url = "https://api.agentops.ai"
+        m.post(url + "/v2/create_events", json={"status": "ok"})
+        m.post(
+            url + "/v2/create_session", json={"status": "success", "jwt": "some_jwt"}
+        )
+        m.post(url + "/v2/update_session", json={"status": "success", "token_cost": 5})
+        m.post(url + "/v2/developer_errors", json={"status": "ok"})
+        m.post("https://pypi.org/pypi/agentops/json", status_code=404)
+        yield m
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class TestSDKTelemetry:
+    def test_prometheus_exposition(self):
+        t = SDKTelemetry()
+        t.event_enqueued("s1", 3)
+        t.event_dropped("post_failed", 2)
+        t.http_request("https://api.agentops.ai/v2/create_events", 42.0, bytes_sent=10)
+        t.http_request("https://api.agentops.ai/v2/create_events", 80.0, failed=True)
+
+        text = t.to_prometheus()
+
+        assert "agentops_events_enqueued_total 1" in text
+        assert 'agentops_events_dropped_total{reason="post_failed"} 2' in text
+        assert "agentops_queue_depth 3" in text
+        assert (
+            'agentops_http_request_duration_ms_bucket{endpoint="/v2/create_events",le="50"} 1'
+            in text
+        )
+        assert (
+            'agentops_http_request_duration_ms_bucket{endpoint="/v2/create_events",le="+Inf"} 2'
+            in text
+        )
+        assert 'agentops_http_failures_total{endpoint="/v2/create_events"} 1' in text
+
+
+class TestClientTelemetry:
+    def test_flush_is_measured(self, mock_req):
+        before = Client().get_telemetry()
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=50,
+            auto_start_session=False,
+        )
+        agentops.start_session()
+        agentops.record(ActionEvent("test_event"))
+        time.sleep(0.15)
+
+        after = Client().get_telemetry()
+        assert after["events_enqueued"] == before["events_enqueued"] + 1
+        assert after["events_sent"] == before["events_sent"] + 1
+        assert after["serialization_ms"]["count"] > before["serialization_ms"]["count"]
+        assert after["bytes_sent"] > before["bytes_sent"]
+        assert after["http"]["/v2/create_events"]["latency_ms"]["count"] >= 1
+        assert after["queue_depth"] == 0
+
+    def test_failed_post_counts_dropped_events(self, mock_req):
+        mock_req.post(
+            "https://api.agentops.ai/v2/create_events", status_code=500, json={}
+        )
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=50,
+            auto_start_session=False,
+        )
+        agentops.start_session()
+        dropped = telemetry.events_dropped.get("export_failed", 0)
+        failures = telemetry.http_failures.get("/v2/create_events", 0)
+
+        agentops.record(ActionEvent("test_event"))
+        time.sleep(0.15)
+
+        assert telemetry.events_dropped["export_failed"] == dropped + 1
+        assert telemetry.http_failures["/v2/create_events"] == failures + 1
+
+    def test_request_that_raises_is_recorded(self, mock_req):
+        url = "https://api.agentops.ai/v2/create_events"
+        mock_req.post(
+            url,
+            exc=requests.exceptions.ConnectTimeout(
+                MaxRetryError(None, url, "connect timed out")
+            ),
+        )
+        failures = telemetry.http_failures.get("/v2/create_events", 0)
+        retries = telemetry.http_retries.get("/v2/create_events", 0)
+
+        with pytest.raises(ApiServerException):
+            HttpClient.post(url, b"{}")
+
+        assert telemetry.http_failures["/v2/create_events"] == failures + 1
+        assert telemetry.http_retries["/v2/create_events"] == (
+            retries + retry_config.total
+        )
+
+    def test_prometheus_server(self):
+        port = free_port()
+        agentops.init(
+            api_key="11111111-1111-4111-8111-111111111111",
+            max_wait_time=50,
+            auto_start_session=False,
+            telemetry_port=port,
+        )
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as res:
+                body = res.read().decode()
+            assert res.headers["Content-Type"].startswith("text/plain")
+            assert "# TYPE agentops_events_enqueued_total counter" in body
+        finally:
+            stop_prometheus_server()
@@ -1,9 +1,18 @@
 import unittest
 from unittest.mock import patch, mock_open, Mock
 
+import json
+import os
+import tempfile
+
+from agentops import time_travel as time_travel_module
+from agentops.singleton import clear_singletons
 from agentops.time_travel import (
     TimeTravel,
+    build_cache_index,
+    cache_key,
     check_time_travel_active,
+    find_cache_hit,
 )
 
 
@@ -34,3 +43,259 @@ class TestTimeTravel(unittest.TestCase):
         mock_dirname.return_value = "/path/to"
         result = check_time_travel_active()
         self.assertTrue(result)
+
+    def test_find_cache_hit(self):
+        overrides = {
+            str({"messages": [{"role": "user", "content": "hi"}]}): "first",
+            str(
+                {"messages": [{"role": "user", "content": {"b": 1, "a": [2]}}]}
+            ): "second",
+            "not a literal": "ignored",
+            "__import__('os').system('exit 1')": "never evaluated",
+        }
+        self.assertEqual(
+            find_cache_hit([{"role": "system", "content": "hi"}], overrides), "first"
+        )
+        self.assertEqual(
+            find_cache_hit([{"content": {"a": [2], "b": 1}}], overrides), "second"
+        )
+        self.assertIsNone(
+            find_cache_hit([{"content": "hi"}, {"content": "hi"}], overrides)
+        )
+        self.assertIsNone(find_cache_hit(["hi"], overrides))
+        self.assertIsNone(find_cache_hit("hi", overrides))
+
+    def test_cache_index(self):
+        overrides = {
+            str(
+                {"messages": [{"role": "user", "content": f"prompt {i}"}]}
+            ): f"completion {i}"
+            for i in range(10_000)
+        }
+        index = build_cache_index(overrides)
+        self.assertEqual(len(index), 10_000)
+        self.assertEqual(
+            index[cache_key([{"content": "prompt 9999"}])], "completion 9999"
+        )
+        # Duplicate prompts keep the first override
+        overrides[json.dumps({"messages": [{"content": "prompt 0"}]})] = "duplicate"
+        self.assertEqual(
+            build_cache_index(overrides)[cache_key([{"content": "prompt 0"}])],
+            "completion 0",
+        )
+
+    def test_match_on(self):
+        cache = {
+            "match_on": ["model"],
+            "completion_overrides": {
+                str({"messages": [{"content": "hi"}], "model": "gpt-4o"}): "gpt-4o",
+                str({"messages": [{"content": "hi"}], "model": "gpt-4o-mini"}): "mini",
+            },
+        }
+        clear_singletons()
+        with patch("builtins.open", mock_open(read_data=json.dumps(cache))):
+            time_travel = TimeTravel()
+        clear_singletons()
+
+        messages = [{"role": "user", "content": "hi"}]
+        self.assertEqual(
+            time_travel.find({"messages": messages, "model": "gpt-4o-mini"}), "mini"
+        )
+        self.assertEqual(
+            time_travel.find({"messages": messages, "model": "gpt-4o"}), "gpt-4o"
+        )
+        self.assertIsNone(time_travel.find({"messages": messages, "model": "o1"}))
+
+    def test_active_flag_is_cached(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            config_path = os.path.join(tmp, ".agentops_time_travel.yaml")
+            state = time_travel_module._ActiveState()
+            state._watch.path = config_path
+
+            with patch.object(time_travel_module, "_active_state", state), patch(
+                "agentops.time_travel.check_time_travel_active",
+                wraps=lambda: _read_flag(config_path),
+            ) as reader:
+                self.assertFalse(time_travel_module.is_time_travel_active())
+
+                with open(config_path, "w") as f:
+                    f.write("Time_Travel_Debugging_Active: true\n")
+                # Not checked again before the interval elapses
+                self.assertFalse(time_travel_module.is_time_travel_active())
+                self.assertEqual(reader.call_count, 1)
+
+                with patch.object(time_travel_module, "CHECK_INTERVAL_MS", 0):
+                    self.assertTrue(time_travel_module.is_time_travel_active())
+                    # Unchanged file: stat() only
+                    for _ in range(100):
+                        self.assertTrue(time_travel_module.is_time_travel_active())
+                    self.assertEqual(reader.call_count, 2)
+
+                    os.remove(config_path)
+                    self.assertFalse(time_travel_module.is_time_travel_active())
+
+    def test_cache_reloads_when_file_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = os.path.join(tmp, "agentops_time_travel.json")
+
+            def write(content):
+                with open(cache_path, "w") as f:
+                    json.dump(
+                        {
+                            "completion_overrides": {
+                                str({"messages": [{"content": "hi"}]}): content
+                            }
+                        },
+                        f,
+                    )
+
+            write("first")
+            with patch(
+                "agentops.time_travel._package_parent_path", return_value=cache_path
+            ):
+                clear_singletons()
+                time_travel = TimeTravel()
+                clear_singletons()
+            request = {"messages": [{"role": "user", "content": "hi"}]}
+            self.assertEqual(time_travel.find(request), "first")
+
+            write("second, longer")
+            time_travel.refresh()  # within the check interval
+            self.assertEqual(time_travel.find(request), "first")
+            time_travel.reload()
+            self.assertEqual(time_travel.find(request), "second, longer")
+
+            write("third")
+            with patch.object(time_travel_module, "CHECK_INTERVAL_MS", 0):
+                time_travel.refresh()
+            self.assertEqual(time_travel.find(request), "third")
+
+    def test_overrides_are_typed_once(self):
+        cache = {
+            "completion_overrides": {
+                str({"messages": [{"content": "chat"}]}): json.dumps(
+                    {"object": "chat.completion"}
+                ),
+                str({"messages": [{"content": "chunk"}]}): json.dumps(
+                    {"object": "chat.completion.chunk"}
+                ),
+                str({"messages": [{"content": "other"}]}): json.dumps(
+                    {"object": "message"}
+                ),
+            },
+        }
+        types = (_ChatCompletion, _ChatCompletionChunk)
+        time_travel_module.register_override_types(types)
+        try:
+            clear_singletons()
+            with patch("builtins.open", mock_open(read_data=json.dumps(cache))):
+                time_travel = TimeTravel()
+            clear_singletons()
+            validations = _Completion.validations
+
+            first = time_travel.find_typed({"messages": [{"content": "chat"}]}, types)
+            second = time_travel.find_typed({"messages": [{"content": "chat"}]}, types)
+            self.assertIsInstance(first, _ChatCompletion)
+            self.assertIsNot(first, second)
+            chunk = time_travel.find_typed({"messages": [{"content": "chunk"}]}, types)
+            self.assertIsInstance(chunk, _ChatCompletionChunk)
+            self.assertIsNone(
+                time_travel.find_typed({"messages": [{"content": "other"}]}, types)
+            )
+            self.assertIsNone(
+                time_travel.find_typed({"messages": [{"content": "missing"}]}, types)
+            )
+            # Everything was validated when the cache was loaded
+            self.assertEqual(_Completion.validations, validations)
+        finally:
+            time_travel_module._override_types.remove(types)
+
+        # Types registered after the cache was loaded are validated on their first lookup
+        late = time_travel.find_typed(
+            {"messages": [{"content": "chat"}]}, (_ChatCompletion,)
+        )
+        self.assertIsInstance(late, _ChatCompletion)
+
+    def test_mapped_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = os.path.join(tmp, "agentops_time_travel.json")
+            cache = {
+                "match_on": ["model"],
+                "completion_overrides": {
+                    str(
+                        {"messages": [{"content": f"prompt {i}"}], "model": "gpt-4o"}
+                    ): json.dumps({"object": "chat.completion", "i": i})
+                    for i in range(1000)
+                },
+            }
+            with open(cache_path, "w") as f:
+                json.dump(cache, f)
+            self.assertEqual(
+                time_travel_module.compile_time_travel_cache(cache_path), 1000
+            )
+
+            with patch(
+                "agentops.time_travel._package_parent_path", return_value=cache_path
+            ):
+                clear_singletons()
+                time_travel = TimeTravel()
+                clear_singletons()
+            self.assertIsNotNone(time_travel._mapped)
+            self.assertEqual(len(time_travel._index), 1000)
+
+            request = {
+                "messages": [{"role": "user", "content": "prompt 7"}],
+                "model": "gpt-4o",
+            }
+            self.assertEqual(
+                json.loads(time_travel.find(request)),
+                {"object": "chat.completion", "i": 7},
+            )
+            self.assertIsNone(time_travel.find({**request, "model": "o1"}))
+
+            types = (_ChatCompletion, _ChatCompletionChunk)
+            validations = _ChatCompletion.validations
+            first = time_travel.find_typed(request, types)
+            second = time_travel.find_typed(request, types)
+            self.assertIsInstance(first, _ChatCompletion)
+            self.assertEqual(first.data["i"], 7)
+            self.assertIsNot(first, second)
+            # Typed on the first hit only
+            self.assertEqual(_ChatCompletion.validations, validations + 1)
+
+            # An edited JSON file takes precedence over a stale compiled one
+            later = os.stat(cache_path).st_mtime_ns + 10**9
+            os.utime(cache_path, ns=(later, later))
+            time_travel.reload()
+            self.assertIsNone(time_travel._mapped)
+            self.assertEqual(json.loads(time_travel.find(request))["i"], 7)
+
+
+class _Completion:
+    validations = 0
+
+    def __init__(self, data):
+        self.data = data
+
+    @classmethod
+    def model_validate(cls, data):
+        cls.validations += 1
+        if not isinstance(data, dict) or data.get("object") != cls.object:
+            raise ValueError(f"not a {cls.__name__}")
+        return cls(data)
+
+
+class _ChatCompletion(_Completion):
+    object = "chat.completion"
+
+
+class _ChatCompletionChunk(_Completion):
+    object = "chat.completion.chunk"
+
+
+def _read_flag(path):
+    try:
+        with open(path) as f:
+            return "true" in f.read()
+    except FileNotFoundError:
+        return False